@@ -0,0 +1,31 @@
+"""Add analysis mode to fraud checks
+
+Revision ID: 9b2f4c1d7e3a
+Revises: 5e63186c7b8f
+Create Date: 2026-10-19 10:12:04.512731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2f4c1d7e3a'
+down_revision: Union[str, Sequence[str], None] = '5e63186c7b8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing checks all ran every job with the advanced synthesis.
+    op.add_column('fraud_checks', sa.Column('mode', sa.String(length=16), server_default='deep', nullable=False))
+    op.create_index(op.f('ix_fraud_checks_mode'), 'fraud_checks', ['mode'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_fraud_checks_mode'), table_name='fraud_checks')
+    op.drop_column('fraud_checks', 'mode')
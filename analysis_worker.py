@@ -1,10 +1,13 @@
 # analysis_worker.py
+import argparse
 import logging
 import platform
 import redis
 from rq import Queue
 from rq.worker import SimpleWorker, Worker
+from rq.worker_pool import WorkerPool
 from app.core.config import settings
+from app.workers.serialization import CompactSerializer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,15 +22,100 @@ logger = logging.getLogger(__name__)
 
 listen = ['analysis-fast', 'analysis-heavy']
 
-redis_url = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}"
-logger.info(f"Connecting ANALYSIS worker to Redis at {redis_url}")
+if settings.REDIS_SSL:
+    redis_url = f"rediss://default:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}"
+else:
+    redis_url = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}"
+logger.info(f"Connecting ANALYSIS worker to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
 
 conn = redis.from_url(redis_url)
 
+
+def run_fork_worker(queue_names: list[str]):
+    """Standard RQ worker: forks a fresh work horse for every job."""
+    if settings.FAIR_SCHEDULING:
+        from app.workers.worker_classes import FairSimpleWorker, FairWorker
+        WorkerClass = FairSimpleWorker if platform.system() == "Windows" else FairWorker
+    else:
+        WorkerClass = SimpleWorker if platform.system() == "Windows" else Worker
+    worker = WorkerClass(queue_names, connection=conn, serializer=CompactSerializer)
+
+    logger.info(f"Analysis worker starting... Listening on queues (in order): {', '.join(queue_names)}")
+    worker.work()
+
+
+def run_prefork_pool(queue_names: list[str], processes: int):
+    """
+    Imports and builds all SDK clients once, then forks `processes` long-lived
+    workers that run jobs in-process, so clients and their TLS connections are
+    reused across jobs. The pool respawns any worker that dies, so a crash only
+    takes down the job that was running in that process.
+    """
+    from app.workers.fair_queue import FairQueue
+    from app.workers.warmup import preload_clients, prepare_for_fork
+    from app.workers.worker_classes import FairSimpleWorker
+
+    preload_clients()
+    prepare_for_fork()
+
+    if settings.FAIR_SCHEDULING:
+        worker_class, queue_class = FairSimpleWorker, FairQueue
+    else:
+        worker_class, queue_class = SimpleWorker, Queue
+    pool = WorkerPool(
+        queue_names, connection=conn, num_workers=processes, worker_class=worker_class, queue_class=queue_class,
+        serializer=CompactSerializer,
+    )
+    logger.info(
+        f"Pre-forked analysis pool starting with {processes} processes... "
+        f"Listening on queues (in order): {', '.join(queue_names)}"
+    )
+    pool.start()
+
+
+def run_threaded_worker(queue_names: list[str], threads: int):
+    """
+    Single process running up to `threads` jobs at once. Jobs are almost all
+    waiting on HTTP, so one small container can keep many of them in flight.
+    Per-queue limits come from WORKER_QUEUE_CONCURRENCY.
+    """
+    from app.workers.warmup import preload_clients
+    from app.workers.worker_classes import FairThreadedWorker, ThreadedWorker
+
+    preload_clients()
+
+    WorkerClass = FairThreadedWorker if settings.FAIR_SCHEDULING else ThreadedWorker
+    worker = WorkerClass(queue_names, connection=conn, concurrency=threads, serializer=CompactSerializer)
+    logger.info(
+        f"Threaded analysis worker starting with {worker.concurrency} threads "
+        f"(per-queue limits: {worker.queue_limits})... Listening on queues (in order): {', '.join(queue_names)}"
+    )
+    worker.work()
+
+
 if __name__ == '__main__':
-    queues = [Queue(name, connection=conn) for name in listen]
-    WorkerClass = SimpleWorker if platform.system() == "Windows" else Worker
-    worker = WorkerClass(queues, connection=conn)
+    parser = argparse.ArgumentParser(description="Runs the analysis RQ workers.")
+    parser.add_argument("--mode", choices=["fork", "prefork", "threaded"], default=settings.WORKER_MODE)
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    parser.add_argument("--threads", type=int, default=settings.WORKER_THREADS)
+    parser.add_argument("--queues", nargs="+", default=listen)
+    args = parser.parse_args()
+
+    if settings.SWEEPER_INTERVAL_SECONDS > 0:
+        # Own connection: the sweeper thread never shares a socket with a
+        # worker or with the processes forked below.
+        from app.workers.redis_memory import start_sweeper
+        start_sweeper(redis.from_url(redis_url))
+
+    if settings.GOOGLE_SAFE_BROWSING_API_KEY and settings.SAFE_BROWSING_UPDATE_INTERVAL_SECONDS > 0:
+        # Keeps the local Safe Browsing lists current; every worker process
+        # reads them from SAFE_BROWSING_DB_DIR.
+        from app.services.safe_browsing import start_updater
+        start_updater()
 
-    logger.info(f"Analysis worker starting... Listening on queues (in order): {', '.join(listen)}")
-    worker.work()
\ No newline at end of file
+    if args.mode == "prefork" and platform.system() != "Windows":
+        run_prefork_pool(args.queues, args.processes)
+    elif args.mode == "threaded":
+        run_threaded_worker(args.queues, args.threads)
+    else:
+        run_fork_worker(args.queues)
@@ -1,9 +1,13 @@
 import asyncio
 import json
 import logging
-from typing import List
+import time
+from typing import List, Literal
 import uuid
+import redis
 from fastapi import APIRouter, Depends, HTTPException, Header, Request, Query
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -11,18 +15,21 @@ from sse_starlette.sse import EventSourceResponse
 
 logger = logging.getLogger(__name__)
 
+from app.core.config import settings
 from app.core.limiter import limiter
 from app.db import models
 from app.db.session import async_get_db, SessionLocal
-from app.workers.queues import analysis_fast_queue, redis_conn
+from app.workers import admission, bulk, modes
+from app.workers.queues import get_lane_queue, get_redis_conn
 from app.schemas import (
-    FraudCheckRequest, JobResponse, JobStatusResponse,
+    ExtractedData, FraudCheckRequest, JobResponse, JobStatusResponse,
     ChatRequest, HistoryResponse, ChatResponse,
     ExtractRequest, ExtractDataResponse,
     UrlExtractRequest, UrlExtractResponse,
     FeedbackRequest, FeedbackResponse, Message,
+    PrecheckRequest, PrecheckResponse,
 )
-from app.services import chat_service, extract_data_service
+from app.services import chat_service, circuit_breaker, extract_data_service, precheck, reverse_image_cache
 
 
 router = APIRouter()
@@ -112,6 +119,20 @@ async def handle_post_analysis_chat(request: Request, chat_request: ChatRequest)
     )
 
 
+def _input_hash(input_data: dict, mode: str) -> str:
+    """Checks of different modes are separate; deep checks keep the hash they had before modes existed."""
+    from app.utils.helpers import generate_hash
+
+    return generate_hash(input_data if mode == modes.DEEP else {**input_data, "analysis_mode": mode})
+
+
+async def _existing_check(db: AsyncSession, input_hash: str):
+    result = await db.execute(
+        select(models.FraudCheck).where(models.FraudCheck.input_hash == input_hash)
+    )
+    return result.scalar_one_or_none()
+
+
 @router.post("/analysis", response_model=JobResponse, status_code=202)
 @limiter.limit("10/hour")
 async def create_analysis(
@@ -120,27 +141,46 @@ async def create_analysis(
     db: AsyncSession = Depends(async_get_db),
 ):
     """Starts a new full analysis based on the verified data from the frontend."""
-    from app.workers.orchestrator import start_full_analysis
-    from app.utils.helpers import generate_hash
-
+    mode = fraud_request.mode or settings.DEFAULT_ANALYSIS_MODE
+    priority = fraud_request.source == "extension"
+    analysis_fast_queue = get_lane_queue("analysis-fast", fraud_request.session_id, priority)
     if not analysis_fast_queue:
         raise HTTPException(status_code=503, detail="Worker service unavailable.")
 
-    input_data = fraud_request.model_dump(exclude_unset=True, exclude={'session_id', 'chat_history'})
-    input_hash = generate_hash(input_data)
+    input_data = fraud_request.model_dump(exclude_unset=True, exclude={'session_id', 'chat_history', 'source', 'mode'})
+    input_hash = _input_hash(input_data, mode)
 
-    result = await db.execute(
-        select(models.FraudCheck).where(models.FraudCheck.input_hash == input_hash)
-    )
-    existing_check = result.scalar_one_or_none()
+    existing_check = await _existing_check(db, input_hash)
     if existing_check:
         return {"job_id": str(existing_check.id)}
 
+    try:
+        stats = await asyncio.to_thread(admission.snapshot, get_redis_conn())
+        decision = stats["admission"]
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Admission check failed, accepting request: {e}")
+        decision = {"action": admission.ACCEPT, "retry_after": None}
+
+    if decision["action"] == admission.REJECT:
+        raise HTTPException(
+            status_code=429,
+            detail="The analysis service is at capacity. Please try again later.",
+            headers={"Retry-After": str(decision["retry_after"])},
+        )
+    if decision["action"] == admission.DEGRADE and modes.degraded_mode(mode) != mode:
+        # Under load the check runs, and is recorded, in a lighter mode.
+        mode = modes.degraded_mode(mode)
+        input_hash = _input_hash(input_data, mode)
+        existing_check = await _existing_check(db, input_hash)
+        if existing_check:
+            return {"job_id": str(existing_check.id)}
+
     new_check = models.FraudCheck(
         input_hash=input_hash,
         input_data=input_data,
         session_id=fraud_request.session_id,
         status=models.JobStatus.PENDING,
+        mode=mode,
     )
     db.add(new_check)
     await db.commit()
@@ -153,10 +193,289 @@ async def create_analysis(
     db.add(new_chat)
     await db.commit()
 
-    analysis_fast_queue.enqueue(start_full_analysis, new_check.id)
+    # Enqueued by path so the API never imports the worker modules and their SDKs.
+    analysis_fast_queue.enqueue(
+        "app.workers.orchestrator.start_full_analysis", new_check.id, priority=priority,
+        result_ttl=settings.JOB_RESULT_TTL_SECONDS, failure_ttl=settings.JOB_FAILURE_TTL_SECONDS,
+    )
     return {"job_id": str(new_check.id)}
 
 
+TERMINAL_STATUSES = (models.JobStatus.COMPLETED, models.JobStatus.FAILED)
+
+
+def _parse_bulk_records(body: bytes) -> list[tuple[int, dict]]:
+    """Validates a JSONL body of ExtractedData records. Returns (line number, input_data) pairs."""
+    records, errors = [], []
+    for line_number, line in enumerate(body.decode("utf-8", errors="replace").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = ExtractedData.model_validate_json(line)
+        except ValidationError as e:
+            errors.append({"line": line_number, "errors": e.errors(include_url=False, include_context=False)})
+            continue
+        records.append((line_number, record.model_dump(exclude_unset=True)))
+    if errors:
+        raise HTTPException(status_code=422, detail=errors[:20])
+    if not records:
+        raise HTTPException(status_code=400, detail="No records provided.")
+    if len(records) > settings.BULK_MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_RECORDS} records per batch.")
+    return records
+
+
+async def _bulk_checks(db: AsyncSession, records: list[tuple[int, dict]], mode: str) -> tuple[dict[str, dict], dict]:
+    """
+    The batch's distinct inputs in `mode`, by input hash ({"input_data",
+    "records"}), and the checks that already exist for them, by input hash.
+    """
+    records_by_hash: dict[str, dict] = {}
+    for line_number, input_data in records:
+        entry = records_by_hash.setdefault(_input_hash(input_data, mode), {"input_data": input_data, "records": []})
+        entry["records"].append(line_number)
+
+    result = await db.execute(
+        select(models.FraudCheck.id, models.FraudCheck.input_hash, models.FraudCheck.status)
+        .where(models.FraudCheck.input_hash.in_(list(records_by_hash)))
+    )
+    return records_by_hash, {row.input_hash: row for row in result}
+
+
+async def _bulk_result_stream(request: Request, db: AsyncSession, redis_conn, batch: dict, after: int, header: dict | None = None):
+    """
+    Yields the batch's results as NDJSON in completion order, from position
+    `after` on, until every check has finished or the client disconnects.
+    While waiting it also finishes checks the database already reports as
+    done, in case their worker could not advance the batch.
+    """
+    batch_id = batch["batch_id"]
+    if header:
+        yield json.dumps(header) + "\n"
+
+    seq = after
+    while seq < batch["total"]:
+        if await request.is_disconnected():
+            return
+        done = await asyncio.to_thread(bulk.read_done, redis_conn, batch_id, seq)
+        if done:
+            result = await db.execute(
+                select(models.FraudCheck.id, models.FraudCheck.status, models.FraudCheck.final_report)
+                .where(models.FraudCheck.id.in_([uuid.UUID(check_id) for check_id, _ in done]))
+            )
+            rows = {str(row.id): row for row in result}
+            for check_id, item in done:
+                row = rows.get(check_id)
+                yield json.dumps({
+                    "type": "result",
+                    "seq": seq,
+                    "check_id": check_id,
+                    "input_hash": item.get("input_hash"),
+                    "records": item.get("records", []),
+                    "status": row.status.value if row else "UNKNOWN",
+                    "final_report": row.final_report if row else None,
+                }) + "\n"
+                seq += 1
+            continue
+
+        active = await asyncio.to_thread(bulk.active_checks, redis_conn, batch_id)
+        if active:
+            result = await db.execute(
+                select(models.FraudCheck.id)
+                .where(models.FraudCheck.id.in_([uuid.UUID(check_id) for check_id in active]))
+                .where(models.FraudCheck.status.in_(TERMINAL_STATUSES))
+            )
+            for check_id in result.scalars():
+                await asyncio.to_thread(bulk.finish_check, redis_conn, batch, str(check_id))
+        await db.rollback()  # don't hold a connection between polls
+        await asyncio.sleep(settings.BULK_POLL_SECONDS)
+
+    yield json.dumps({"type": "end", "batch_id": batch_id, "total": batch["total"]}) + "\n"
+
+
+@router.post("/analysis/bulk", status_code=202)
+@limiter.limit("5/hour")
+async def create_bulk_analysis(
+    request: Request,
+    session_id: str = Header(...),
+    concurrency: int | None = Query(None, ge=1),
+    mode: Literal["quick", "standard", "deep"] | None = Query(None),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """
+    Screens many listings at once. The body is JSONL, one ExtractedData record
+    per line. Identical records (same input hash) are analyzed once, and
+    listings analyzed before are not analyzed again. At most `concurrency`
+    checks of the batch run at a time, sharing one result cache. Every new
+    check runs in analysis `mode` (default DEFAULT_ANALYSIS_MODE).
+
+    Streams NDJSON: a "batch" line with the batch id, then one "result" line
+    per check in completion order, then "end". A dropped stream is resumed
+    with GET /analysis/bulk/{batch_id}?after=<next seq>.
+    """
+    records = _parse_bulk_records(await request.body())
+    redis_conn = get_redis_conn()
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Worker service unavailable.")
+
+    mode = mode or settings.DEFAULT_ANALYSIS_MODE
+    records_by_hash, existing = await _bulk_checks(db, records, mode)
+    if len(existing) < len(records_by_hash):
+        try:
+            stats = await asyncio.to_thread(admission.snapshot, redis_conn)
+            decision = stats["admission"]
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Admission check failed, accepting batch: {e}")
+            decision = {"action": admission.ACCEPT, "retry_after": None}
+        if decision["action"] == admission.REJECT:
+            raise HTTPException(
+                status_code=429,
+                detail="The analysis service is at capacity. Please try again later.",
+                headers={"Retry-After": str(decision["retry_after"])},
+            )
+        if decision["action"] == admission.DEGRADE and modes.degraded_mode(mode) != mode:
+            # Under load the new checks run, and are recorded, in a lighter mode.
+            mode = modes.degraded_mode(mode)
+            records_by_hash, existing = await _bulk_checks(db, records, mode)
+
+    items, to_start, running, finished = {}, [], [], []
+    for input_hash, entry in records_by_hash.items():
+        row = existing.get(input_hash)
+        if row is None:
+            check_id = uuid.uuid4()
+            db.add(models.FraudCheck(
+                id=check_id,
+                input_hash=input_hash,
+                input_data=entry["input_data"],
+                session_id=session_id,
+                status=models.JobStatus.PENDING,
+                mode=mode,
+            ))
+            db.add(models.Chat(session_id=session_id, fraud_check_id=check_id))
+            to_start.append(str(check_id))
+        else:
+            check_id = row.id
+            (finished if row.status in TERMINAL_STATUSES else running).append(str(check_id))
+        items[str(check_id)] = {"input_hash": input_hash, "records": entry["records"]}
+    if to_start:
+        await db.commit()
+
+    concurrency = min(concurrency or settings.BULK_DEFAULT_CONCURRENCY, settings.BULK_MAX_CONCURRENCY)
+    try:
+        batch_id, started = await asyncio.to_thread(
+            bulk.create_batch, redis_conn, session_id, items, to_start, running, finished, concurrency
+        )
+        batch = await asyncio.to_thread(bulk.get_batch, redis_conn, batch_id)
+        await asyncio.to_thread(bulk.enqueue_checks, batch, started)
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Redis unavailable: {e}")
+
+    header = {
+        "type": "batch",
+        "batch_id": batch_id,
+        "total": len(items),
+        "records": len(records),
+        "duplicates": len(records) - len(items),
+        "already_analyzed": len(finished),
+    }
+    return StreamingResponse(
+        _bulk_result_stream(request, db, redis_conn, batch, 0, header),
+        media_type="application/x-ndjson",
+        status_code=202,
+        headers={"X-Batch-Id": batch_id},
+    )
+
+
+@router.get("/analysis/bulk/{batch_id}")
+@limiter.limit("60/minute")
+async def stream_bulk_analysis(
+    request: Request,
+    batch_id: str,
+    session_id: str = Header(...),
+    after: int = Query(0, ge=0),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Resumes a batch's NDJSON result stream from position `after`."""
+    redis_conn = get_redis_conn()
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Redis unavailable.")
+    batch = await asyncio.to_thread(bulk.get_batch, redis_conn, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found or expired.")
+    if batch["session_id"] != session_id:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    return StreamingResponse(
+        _bulk_result_stream(request, db, redis_conn, batch, after),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Id": batch_id},
+    )
+
+
+@router.post("/precheck", response_model=PrecheckResponse)
+@limiter.limit("120/minute")
+async def precheck_listing(request: Request, precheck_request: PrecheckRequest):
+    """
+    Provisional risk level for the browser extension, answered from what
+    earlier checks left in Redis (known-bad contacts, domain age, reused
+    images, a prior report for the same listing). Calls no provider; when
+    Redis is unavailable the answer is `unknown`.
+    """
+    started = time.perf_counter()
+    result = {"risk_level": precheck.UNKNOWN, "signals": [], "prior_report": None, "deep_analysis_recommended": True}
+    redis_conn = get_redis_conn()
+    if redis_conn:
+        try:
+            result = await asyncio.to_thread(
+                precheck.precheck, redis_conn,
+                listing_url=precheck_request.listing_url,
+                host_email=precheck_request.host_email,
+                host_phone=precheck_request.host_phone,
+                ibans=precheck_request.ibans,
+                image_urls=precheck_request.image_urls,
+            )
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Precheck answered without indicators: {e}")
+    return {**result, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe: ready when Redis answers. Includes the admission decision
+    and the state of each provider's circuit breaker (open breakers degrade
+    results but don't make the API unready).
+    """
+    redis_conn = get_redis_conn()
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Redis unavailable.")
+    try:
+        stats = await asyncio.to_thread(admission.snapshot, redis_conn)
+        breakers = await asyncio.to_thread(circuit_breaker.snapshot, redis_conn)
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Redis unavailable: {e}")
+    return {"status": "ready", "admission": stats["admission"], "circuit_breakers": breakers}
+
+
+@router.get("/metrics")
+async def queue_metrics():
+    """
+    Queue depth, oldest-job age, workers and estimated drain time per queue,
+    the current admission decision, provider circuit breaker states and the
+    Vision calls saved by the reverse image cache.
+    Meant for autoscalers and dashboards.
+    """
+    redis_conn = get_redis_conn()
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Redis unavailable.")
+    try:
+        stats = await asyncio.to_thread(admission.snapshot, redis_conn)
+        breakers = await asyncio.to_thread(circuit_breaker.snapshot, redis_conn)
+        image_cache = await asyncio.to_thread(reverse_image_cache.stats, redis_conn)
+        return {**stats, "circuit_breakers": breakers, "reverse_image_cache": image_cache}
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Redis unavailable: {e}")
+
+
 @router.get("/analysis/history/{url_session_id}", response_model=HistoryResponse)
 @limiter.limit("20/minute")
 async def get_session_history(
@@ -210,6 +529,8 @@ async def stream_analysis_progress(
 
     channel = f"analysis:{check_id}:progress"
 
+    redis_conn = get_redis_conn()
+
     async def event_generator():
         if not redis_conn:
             yield {"event": "error", "data": json.dumps({"error": "Redis unavailable"})}
@@ -337,6 +658,14 @@ async def submit_feedback(
     await db.commit()
     await db.refresh(new_feedback)
 
+    if feedback.was_fraud:
+        redis_conn = get_redis_conn()
+        if redis_conn:
+            try:
+                await asyncio.to_thread(precheck.record_feedback, redis_conn, check_id, check.input_data or {})
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Could not record precheck indicators for {check_id}: {e}")
+
     return FeedbackResponse(
         id=str(new_feedback.id),
         fraud_check_id=str(new_feedback.fraud_check_id),
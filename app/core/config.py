@@ -23,11 +23,129 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_SSL: bool = False
 
+    # Analysis workers
+    # "fork": standard RQ worker, one fresh work horse per job.
+    # "prefork": clients preloaded once, WORKER_PROCESSES long-lived processes.
+    # "threaded": one process running WORKER_THREADS jobs concurrently.
+    WORKER_MODE: Literal["fork", "prefork", "threaded"] = "fork"
+    WORKER_PROCESSES: int = 2
+    WORKER_THREADS: int = 8
+    # Comma-separated "queue=limit" pairs, e.g. "analysis-heavy=2"
+    WORKER_QUEUE_CONCURRENCY: str = "analysis-heavy=2"
+    # Per-session lanes served round-robin, plus a priority lane for the extension.
+    # Must match between the API and the workers.
+    FAIR_SCHEDULING: bool = True
+
+    # Admission control for POST /analysis (see app/workers/admission.py)
+    ADMISSION_ENABLED: bool = True
+    # SLO: estimated seconds to drain a queue, and max wait of its oldest job
+    ADMISSION_MAX_DRAIN_SECONDS: int = 120
+    ADMISSION_MAX_WAIT_SECONDS: int = 180
+    # "degrade" runs deep checks in standard mode while the backlog is under 2x the SLO; "reject" always returns 429
+    ADMISSION_OVERLOAD_ACTION: Literal["reject", "degrade"] = "degrade"
+    # Per-job estimate used before any completions have been recorded
+    ADMISSION_FALLBACK_JOB_SECONDS: float = 5.0
+    ADMISSION_CACHE_SECONDS: float = 2.0
+
+    # Gemini limits, account-wide and shared by every worker through Redis
+    GEMINI_FAST_RPM: int = 1000
+    GEMINI_FAST_TPM: int = 1_000_000
+    GEMINI_ADVANCED_RPM: int = 150
+    GEMINI_ADVANCED_TPM: int = 2_000_000
+    # AIMD bounds for concurrent Gemini calls per model
+    GEMINI_MIN_CONCURRENCY: int = 2
+    GEMINI_MAX_CONCURRENCY: int = 32
+    GEMINI_MAX_RETRIES: int = 4
+    # Token budgets per prompt (instructions + JSON context); contexts are compacted
+    # and, if still over, their long fields truncated to fit (app/services/context_compactor.py)
+    GEMINI_SYNTHESIS_PROMPT_TOKENS: int = 16000
+    GEMINI_CHAT_PROMPT_TOKENS: int = 12000
+    GEMINI_PROMPT_TOKENS: int = 8000
+
+    # Circuit breakers for external providers (Vision, CSE, WHOIS, Wayback)
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_WINDOW_SECONDS: int = 60
+    BREAKER_OPEN_SECONDS: int = 30
+
+    # Hedged requests: providers listed here get a second attempt once the
+    # first has been slower than the provider's observed p90.
+    HEDGED_PROVIDERS: str = "whois,wayback,uk_land_registry"
+    # At most this fraction of a provider's requests may be hedged
+    HEDGE_BUDGET_RATIO: float = 0.1
+
+    # Redis memory: lifetime of cached job results (cache:{check_id}) and of
+    # RQ job results, and the most memory the analysis cache may use before
+    # the sweeper evicts its oldest entries. An interval of 0 disables the sweeper.
+    CACHE_TTL_SECONDS: int = 86400
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    JOB_FAILURE_TTL_SECONDS: int = 7 * 86400
+    SWEEPER_INTERVAL_SECONDS: int = 300
+
+    # RQ payloads and cached results: orjson (pickle for non-JSON values),
+    # zlib-compressed from this size up. Turn COMPACT_SERIALIZATION off to
+    # keep writing the old formats while workers are being upgraded; both
+    # formats are always readable.
+    COMPACT_SERIALIZATION: bool = True
+    SERIALIZER_COMPRESS_MIN_BYTES: int = 1024
+
+    # Bulk analysis (POST /analysis/bulk): records per batch, checks of one
+    # batch running at once (default and cap), how long a batch can be
+    # resumed after it last moved, and how often its stream polls.
+    BULK_MAX_RECORDS: int = 500
+    BULK_DEFAULT_CONCURRENCY: int = 5
+    BULK_MAX_CONCURRENCY: int = 20
+    BULK_BATCH_TTL_SECONDS: int = 86400
+    BULK_POLL_SECONDS: float = 1.0
+
+    # Image preprocessing for the image analyzers: longest side and size an image
+    # may have to be sent as-is, and processes for decoding/resizing (0 = inline)
+    IMAGE_TARGET_SIDE: int = 1024
+    IMAGE_TARGET_MAX_BYTES: int = 1024 * 1024
+    IMAGE_PREPROCESS_PROCESSES: int = 2
+
+    # Reverse image search verdicts shared across checks (by image URL and content)
+    REVERSE_IMAGE_CACHE_TTL_SECONDS: int = 3 * 86400
+
+    # AI-generated image detection: images per Gemini request, images per check,
+    # and how long a verdict is reused for the same image bytes
+    AI_IMAGE_BATCH_SIZE: int = 4
+    AI_IMAGE_MAX_PER_CHECK: int = 6
+    AI_IMAGE_CACHE_TTL_SECONDS: int = 30 * 86400
+
+    # Wayback Machine histories (url_forensics), by canonical URL and by domain;
+    # histories with no captures are kept for less time
+    WAYBACK_CACHE_TTL_SECONDS: int = 7 * 86400
+    WAYBACK_EMPTY_CACHE_TTL_SECONDS: int = 86400
+
+    # Analysis mode for POST /analysis requests that don't pick one: quick, standard or deep
+    DEFAULT_ANALYSIS_MODE: Literal["quick", "standard", "deep"] = "deep"
+
+    # Local report synthesis (standard and deep modes): checks whose weighted risk
+    # score is at or below LOW or at or above HIGH, with no failed step and at least
+    # MIN_EVIDENCE scored steps, get a template report instead of the synthesis LLM
+    LOCAL_SYNTHESIS_ENABLED: bool = True
+    LOCAL_SYNTHESIS_LOW_RISK: int = 15
+    LOCAL_SYNTHESIS_HIGH_RISK: int = 75
+    LOCAL_SYNTHESIS_MIN_EVIDENCE: int = 4
+
+    # Precheck (POST /precheck): how long indicators learned from finished checks are kept
+    PRECHECK_INDICATOR_TTL_SECONDS: int = 90 * 86400
+
     # Google Services
     GOOGLE_API_KEY: str
     GOOGLE_GEMINI_API_KEY: str
     GOOGLE_SEARCH_ENGINE_ID: str
 
+    # Google Safe Browsing (url_forensics blacklist check; skipped without a key).
+    # URLs are checked against a local hash-prefix database that the analysis
+    # worker refreshes every SAFE_BROWSING_UPDATE_INTERVAL_SECONDS (0 = no local
+    # database: every URL is sent to threatMatches:find)
+    GOOGLE_SAFE_BROWSING_API_KEY: Optional[str] = None
+    SAFE_BROWSING_API_URL: str = "https://safebrowsing.googleapis.com/v4"
+    SAFE_BROWSING_DB_DIR: str = "var/safe_browsing"
+    SAFE_BROWSING_UPDATE_INTERVAL_SECONDS: int = 1800
+
     # Scraping
     FIRECRAWL_API_KEY: Optional[str] = None
 
@@ -54,4 +172,17 @@ class Settings(BaseSettings):
             origins.append(self.CHROME_EXTENSION_ORIGIN.strip())
         return origins
 
-settings = Settings()
\ No newline at end of file
+    @property
+    def worker_queue_limits(self) -> dict[str, int]:
+        limits = {}
+        for pair in self.WORKER_QUEUE_CONCURRENCY.split(","):
+            name, _, limit = pair.partition("=")
+            if name.strip() and limit.strip():
+                limits[name.strip()] = int(limit)
+        return limits
+
+    @property
+    def hedged_providers(self) -> set[str]:
+        return {p.strip() for p in self.HEDGED_PROVIDERS.split(",") if p.strip()}
+
+settings = Settings()
\ No newline at end of file
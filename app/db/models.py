@@ -26,6 +26,8 @@ class FraudCheck(Base):
                      server_default=func.now(), 
                      onupdate=func.now())
     session_id = Column(String(36), index=True, nullable=False)  
+    # Analysis mode (app/workers/modes.py); checks created before modes were all deep.
+    mode = Column(String(16), nullable=False, default="deep", server_default="deep", index=True)
 
 class Chat(Base):
     __tablename__ = "chats"
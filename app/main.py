@@ -1,5 +1,9 @@
 # app/main.py
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -7,15 +11,43 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from app.core.config import settings
 from app.db import models
-from app.db.session import engine
+from app.db.session import engine, async_engine
+from app.workers import queues
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens Redis and DB connections at startup instead of at import time,
+    so importing the app stays fast and never blocks on the network.
+    """
+    # Create database tables (only for development)
+    if settings.ENVIRONMENT == "development":
+        await asyncio.to_thread(models.Base.metadata.create_all, bind=engine)
+
+    await asyncio.to_thread(queues.init_redis)
+
+    if async_engine is not None:
+        try:
+            async with async_engine.connect():
+                pass
+        except Exception as e:
+            logger.error(f"Could not open a database connection at startup: {e}")
+
+    yield
+
+    queues.close_redis()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
 
-# Create database tables (only for development)
-if settings.ENVIRONMENT == "development":
-    models.Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc"
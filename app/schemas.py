@@ -1,7 +1,7 @@
 from datetime import datetime
 import uuid
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Literal
 from app.db.models import JobStatus
 class Message(BaseModel):
     role: str
@@ -71,6 +71,10 @@ class ExtractDataResponse(BaseModel):
     extracted_data: ExtractedData
 class FraudCheckRequest(ExtractedData):
     session_id: str
+    # Where the check was started from; "extension" checks use the priority lane.
+    source: Optional[Literal["web", "extension"]] = None
+    # Analysis mode (app/workers/modes.py); defaults to DEFAULT_ANALYSIS_MODE.
+    mode: Optional[Literal["quick", "standard", "deep"]] = None
 class JobResponse(BaseModel):
     job_id: str
 
@@ -109,6 +113,7 @@ class JobStatusResponse(BaseModel):
     created_at: datetime
     chat: Optional[ChatHistoryItem] = None
     analysis_steps: Optional[List[Dict[str, Any]]] = None 
+    mode: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -143,3 +148,33 @@ class FeedbackResponse(BaseModel):
     was_fraud: bool
     comments: Optional[str] = None
 
+
+
+class PrecheckRequest(BaseModel):
+    """Raw fields the browser extension scrapes from a listing page."""
+    listing_url: Optional[str] = Field(None, max_length=2048)
+    host_email: Optional[str] = Field(None, max_length=320)
+    host_phone: Optional[str] = Field(None, max_length=30)
+    image_urls: List[str] = Field(default_factory=list, max_length=20)
+    ibans: List[str] = Field(default_factory=list, max_length=10)
+
+
+class PrecheckSignal(BaseModel):
+    kind: str
+    detail: str
+    check_id: Optional[str] = None
+
+
+class PriorReport(BaseModel):
+    check_id: str
+    risk_score: int
+    analyzed_at: int
+
+
+class PrecheckResponse(BaseModel):
+    """Provisional risk from local state only; `unknown` when nothing is known."""
+    risk_level: str
+    signals: List[PrecheckSignal] = []
+    prior_report: Optional[PriorReport] = None
+    deep_analysis_recommended: bool
+    elapsed_ms: float
@@ -0,0 +1,173 @@
+"""
+Circuit breakers for external providers, with state shared by every worker
+through Redis.
+
+closed -> open:      BREAKER_FAILURE_THRESHOLD failures within BREAKER_WINDOW_SECONDS.
+open -> half_open:   after BREAKER_OPEN_SECONDS, one caller is let through as a probe.
+half_open -> closed: the probe succeeded.
+half_open -> open:   the probe failed (or timed out without reporting back).
+
+While open, `call()` raises ProviderUnavailable immediately instead of waiting
+for the provider's timeout. If Redis is unavailable the breaker stays closed.
+"""
+
+import logging
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("vision", "cse", "whois", "wayback")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# A probe that never reports back frees the half-open slot after this long.
+PROBE_TIMEOUT_SECONDS = 60
+
+_ALLOW = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state == 'closed' then return 1 end
+if state == 'open' then
+    local t = redis.call('TIME')
+    local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0')
+    if tonumber(t[1]) - opened_at < tonumber(ARGV[1]) then return 0 end
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'state', 'half_open')
+    return 1
+end
+return 0
+"""
+
+_FAILURE = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+local t = redis.call('TIME')
+if state == 'half_open' then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', t[1])
+    redis.call('DEL', KEYS[2], KEYS[3])
+    return 1
+end
+if state == 'open' then return 0 end
+local failures = redis.call('INCR', KEYS[3])
+if failures == 1 then redis.call('EXPIRE', KEYS[3], ARGV[2]) end
+if failures >= tonumber(ARGV[1]) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', t[1])
+    redis.call('DEL', KEYS[3])
+    return 1
+end
+return 0
+"""
+
+_SUCCESS = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state ~= 'closed' then
+    redis.call('HSET', KEYS[1], 'state', 'closed')
+    redis.call('HDEL', KEYS[1], 'opened_at')
+    redis.call('DEL', KEYS[2], KEYS[3])
+    return 1
+end
+return 0
+"""
+
+
+class ProviderUnavailable(Exception):
+    """The provider's breaker is open: the call was not attempted."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Provider unavailable ({provider}): circuit open.")
+        self.provider = provider
+
+
+def _get_connection():
+    from app.workers.queues import get_redis_conn
+    return get_redis_conn()
+
+
+class CircuitBreaker:
+    """
+    Breaker for one provider. Cheap to create; all state lives in Redis.
+    Only exceptions in `failure_exceptions` count as provider failures; other
+    exceptions (e.g. "domain not found") mean the provider did answer.
+    """
+
+    def __init__(self, name: str, connection=None, failure_exceptions: tuple = (Exception,)):
+        self.name = name
+        self._connection = connection
+        self.failure_exceptions = failure_exceptions
+        self.state_key = f"breaker:{name}"
+        self.probe_key = f"breaker:{name}:probe"
+        self.failures_key = f"breaker:{name}:failures"
+
+    @property
+    def connection(self):
+        return self._connection if self._connection is not None else _get_connection()
+
+    def _eval(self, script: str, *args) -> int | None:
+        conn = self.connection
+        if conn is None:
+            return None
+        return int(conn.eval(script, 3, self.state_key, self.probe_key, self.failures_key, *args))
+
+    def allow(self) -> bool:
+        """True if a call may go through (closed, or this caller is the half-open probe)."""
+        try:
+            return self._eval(_ALLOW, settings.BREAKER_OPEN_SECONDS, PROBE_TIMEOUT_SECONDS) != 0
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Circuit breaker {self.name} unavailable, allowing call: {e}")
+            return True
+
+    def record_success(self):
+        try:
+            if self._eval(_SUCCESS):
+                logger.info(f"Circuit breaker {self.name} closed: provider recovered.")
+        except redis.exceptions.RedisError:
+            pass
+
+    def record_failure(self):
+        try:
+            if self._eval(_FAILURE, settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_WINDOW_SECONDS):
+                logger.warning(f"Circuit breaker {self.name} opened for {settings.BREAKER_OPEN_SECONDS}s.")
+        except redis.exceptions.RedisError:
+            pass
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs `func` through the breaker. Raises ProviderUnavailable without
+        calling it while the breaker is open. Exceptions from `func` are
+        re-raised after being recorded.
+        """
+        if not self.allow():
+            raise ProviderUnavailable(self.name)
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def status(self) -> dict:
+        conn = self.connection
+        pipe = conn.pipeline()
+        pipe.hgetall(self.state_key)
+        pipe.get(self.failures_key)
+        state, failures = pipe.execute()
+        state = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                 for k, v in state.items()}
+        return {
+            "state": state.get("state", CLOSED),
+            "opened_at": int(state["opened_at"]) if state.get("opened_at") else None,
+            "recent_failures": int(failures) if failures else 0,
+        }
+
+
+def snapshot(connection) -> dict:
+    """State of every provider's breaker, for /metrics and /ready."""
+    return {name: CircuitBreaker(name, connection).status() for name in PROVIDERS}
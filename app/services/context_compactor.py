@@ -0,0 +1,159 @@
+"""
+Shrinks the JSON context sent with Gemini prompts (report synthesis, chat
+Q&A, online presence) to fit a token budget.
+
+In order, stopping as soon as the estimate fits:
+    1. drop empty values and SKIPPED steps; the skipped jobs and their reasons
+       stay in "skipped_steps", since the synthesis prompt moderates the score
+       for missing data,
+    2. replace long strings already sent earlier in the context (a step's
+       inputs_used repeating the description, say) with a reference to the
+       first copy,
+    3. serialize without indentation or ASCII escapes,
+    4. truncate long strings, lowest priority first: raw search text and step
+       inputs, then user-provided data, then step results, and last the
+       scoring summary, report and chat history (which keeps its end).
+
+Token counts are estimated locally, without a count_tokens request.
+"""
+
+import json
+import re
+
+# Shorter strings are cheaper to repeat than to reference.
+DEDUPE_MIN_CHARS = 64
+# Each priority tier is cut to these lengths in turn before the next tier is touched.
+TRUNCATE_LENGTHS = (2000, 600, 200)
+# Raw material the steps were computed from: first to go.
+RAW_KEYS = frozenset({"inputs_used", "search_results_text", "snippet", "html", "page_text", "raw_text"})
+# Strings whose end matters more than their start.
+TAIL_KEYS = frozenset({"chat_history"})
+
+# Digits are one token each; words cost about one token per five letters.
+_TOKEN = re.compile(r"\d|[^\W\d]+|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    """Local estimate of how many tokens Gemini bills for `text`."""
+    return sum(1 + (len(piece) - 1) // 5 for piece in _TOKEN.findall(text))
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _prune(value):
+    """Copy of `value` without None, empty strings or empty containers."""
+    if isinstance(value, dict):
+        pruned = {key: _prune(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        return [item for item in (_prune(item) for item in value) if not _is_empty(item)]
+    return value
+
+
+def _split_steps(steps) -> tuple[list, list[str]]:
+    """(steps worth sending, "job_name: reason" for each SKIPPED step)."""
+    kept, skipped = [], []
+    for step in steps or []:
+        if not isinstance(step, dict) or _is_empty(step):
+            continue
+        if step.get("status") == "SKIPPED":
+            reason = (step.get("result") or {}).get("reason")
+            skipped.append(f"{step.get('job_name')}: {reason}" if reason else str(step.get("job_name")))
+        else:
+            kept.append(step)
+    return kept, skipped
+
+
+def _dedupe(value, path: str, seen: dict[str, str]):
+    """Replaces long strings sent earlier (whole or as part of one) with a reference."""
+    if isinstance(value, dict):
+        return {key: _dedupe(item, f"{path}.{key}" if path else key, seen) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_dedupe(item, f"{path}[{index}]", seen) for index, item in enumerate(value)]
+    if not isinstance(value, str) or len(value) < DEDUPE_MIN_CHARS:
+        return value
+    if value in seen:
+        return f"(same as {seen[value]})"
+    for earlier, earlier_path in seen.items():
+        if value in earlier:
+            return f"(part of {earlier_path})"
+    seen[value] = path
+    return value
+
+
+def _tier(keys: tuple) -> int:
+    if RAW_KEYS.intersection(keys):
+        return 0
+    if keys[0] == "user_provided_data":
+        return 1
+    if keys[0] == "analysis_steps":
+        return 2
+    return 3
+
+
+def _string_leaves(value, keys: tuple, leaves: list):
+    """Appends (tier, container, key, keep_tail, text) for every string in `value`."""
+    items = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+    for key, item in items:
+        item_keys = keys + (key,) if isinstance(key, str) else keys
+        if isinstance(item, str):
+            leaves.append((_tier(item_keys), value, key, bool(TAIL_KEYS.intersection(item_keys)), item))
+        else:
+            _string_leaves(item, item_keys, leaves)
+
+
+def _truncate(text: str, limit: int, keep_tail: bool) -> str:
+    cut = len(text) - limit
+    if keep_tail:
+        return f"[…{cut} chars cut] {text[-limit:]}"
+    return f"{text[:limit]} […{cut} chars cut]"
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def compact_context(context: dict, budget_tokens: int) -> tuple[str, dict]:
+    """
+    Compact JSON for `context`, truncated by priority to fit `budget_tokens`
+    when it can. Returns (json text, stats) where stats has original_tokens
+    (indented JSON, as sent before), tokens, saved_tokens, truncated_fields
+    and over_budget.
+    """
+    original_tokens = estimate_tokens(json.dumps(context, indent=2, default=str))
+
+    compacted = dict(context)
+    if "analysis_steps" in compacted:
+        compacted["analysis_steps"], skipped = _split_steps(compacted["analysis_steps"])
+        if skipped:
+            compacted["skipped_steps"] = skipped
+    compacted = _dedupe(_prune(compacted), "", {})
+
+    text = _dumps(compacted)
+    tokens = estimate_tokens(text)
+    truncated = 0
+    if tokens > budget_tokens:
+        leaves = []
+        _string_leaves(compacted, (), leaves)
+        for tier in range(4):
+            for limit in TRUNCATE_LENGTHS:
+                for leaf_tier, container, key, keep_tail, original in leaves:
+                    if leaf_tier == tier and len(original) > limit:
+                        truncated += container[key] == original
+                        container[key] = _truncate(original, limit, keep_tail)
+                text = _dumps(compacted)
+                tokens = estimate_tokens(text)
+                if tokens <= budget_tokens:
+                    break
+            if tokens <= budget_tokens:
+                break
+
+    return text, {
+        "original_tokens": original_tokens,
+        "tokens": tokens,
+        "saved_tokens": original_tokens - tokens,
+        "truncated_fields": truncated,
+        "over_budget": tokens > budget_tokens,
+    }
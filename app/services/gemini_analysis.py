@@ -1,10 +1,14 @@
-from google import genai
-from google.genai import types
 from app.core.config import settings
-from app.utils.helpers import load_prompt
+from app.services.context_compactor import compact_context, estimate_tokens
+from app.services.rate_limiter import (
+    AdaptiveConcurrency, RateLimitTimeout, TokenBucket, backoff_delay, job_deadline,
+)
+from app.utils.helpers import lazy_client, load_prompt
 import logging
 import json
 import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -14,17 +18,94 @@ logger = logging.getLogger(__name__)
 FAST_MODEL = 'gemini-3.5-flash'
 ADVANCED_MODEL = 'gemini-3.1-pro-preview'
 
-# --- Initialize client ---
-try:
-    client = genai.Client(api_key=settings.GOOGLE_GEMINI_API_KEY)
-except Exception as e:
-    logger.error(f"Failed to initialize Gemini client: {e}")
-    client = None
+# --- Client (built on first use; google.genai is slow to import) ---
+def _build_client():
+    from google import genai
+    return genai.Client(api_key=settings.GOOGLE_GEMINI_API_KEY)
+
+get_client = lazy_client("Gemini", _build_client)
+
+# --- Rate limiting (shared by all workers through Redis) ---
+# Calls slower than this count as congestion for AIMD.
+LATENCY_TARGETS = {FAST_MODEL: 10.0, ADVANCED_MODEL: 60.0}
+# Gemini bills roughly this many tokens per inline image.
+IMAGE_TOKENS = 258
+RETRYABLE_STATUS = {429, 500, 503, 504}
+
+_limiters: dict[str, tuple] = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiters(model_name: str):
+    """(requests bucket, tokens bucket, concurrency) for `model_name`."""
+    with _limiters_lock:
+        if model_name in _limiters:
+            return _limiters[model_name]
+        from app.workers.queues import get_redis_conn
+        conn = get_redis_conn()
+        if model_name == ADVANCED_MODEL:
+            rpm, tpm = settings.GEMINI_ADVANCED_RPM, settings.GEMINI_ADVANCED_TPM
+        else:
+            rpm, tpm = settings.GEMINI_FAST_RPM, settings.GEMINI_FAST_TPM
+        latency_target = LATENCY_TARGETS.get(model_name, 10.0)
+        limiters = (
+            TokenBucket(conn, f"gemini:{model_name}:requests", rpm),
+            TokenBucket(conn, f"gemini:{model_name}:tokens", tpm),
+            AdaptiveConcurrency(
+                conn, f"gemini:{model_name}",
+                initial=settings.GEMINI_MAX_CONCURRENCY // 2,
+                minimum=settings.GEMINI_MIN_CONCURRENCY,
+                maximum=settings.GEMINI_MAX_CONCURRENCY,
+                latency_target=latency_target,
+                lease_seconds=latency_target * 6,
+            ),
+        )
+        # Without Redis the limiters are no-ops; try again on the next call.
+        if conn is not None:
+            _limiters[model_name] = limiters
+        return limiters
+
+
+def _estimate_tokens(content: list) -> int:
+    return sum(estimate_tokens(part) if isinstance(part, str) else IMAGE_TOKENS for part in content)
+
+
+def _context_json(name: str, prompt: str, context: dict, budget_tokens: int) -> str:
+    """Compact JSON of `context` for `prompt`, fitted to the prompt's token budget."""
+    context_str, stats = compact_context(context, budget_tokens - estimate_tokens(prompt))
+    logger.info(
+        f"Gemini context for {name}: {stats['tokens']} tokens, {stats['saved_tokens']} saved "
+        f"({stats['truncated_fields']} fields truncated)"
+    )
+    if stats["over_budget"]:
+        logger.warning(f"Gemini context for {name} is still over its {budget_tokens}-token budget.")
+    return context_str
+
+
+def _status_code(error: Exception):
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    return 429 if "RESOURCE_EXHAUSTED" in str(error) else None
+
+
+_CODE_FENCE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+
+
+def _parse_json_response(text: str):
+    """Strips code fences if present, then parses the full block as JSON."""
+    raw = text.strip()
+    code_block = _CODE_FENCE.search(raw)
+    json_str = code_block.group(1) if code_block else raw
+    return json.loads(json_str)
+
 
 def _call_gemini(model_name: str, content: list, is_json_response: bool = True, thinking: bool = False):
     """A flexible helper to call a Gemini model with various content types."""
+    client = get_client()
     if not client:
         return {"error": "Gemini client not initialized."}
+    from google.genai import types
 
     config = types.GenerateContentConfig(
         temperature=0,
@@ -37,20 +118,49 @@ def _call_gemini(model_name: str, content: list, is_json_response: bool = True,
         ],
     )
 
+    requests_bucket, tokens_bucket, concurrency = _get_limiters(model_name)
+    estimated_tokens = _estimate_tokens(content)
+    deadline = job_deadline()
+    attempt = 0
+
     try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=content,
-            config=config,
-        )
+        while True:
+            try:
+                requests_bucket.acquire(1, deadline)
+                tokens_bucket.acquire(estimated_tokens, deadline)
+                with concurrency.slot(deadline):
+                    started = time.monotonic()
+                    response = client.models.generate_content(
+                        model=model_name,
+                        contents=content,
+                        config=config,
+                    )
+                concurrency.record_success(time.monotonic() - started)
+                break
+            except RateLimitTimeout as e:
+                logger.error(f"Gemini rate limit reached (model={model_name}): {e}")
+                return {"error": "Gemini rate limit reached before the step deadline."}
+            except Exception as e:
+                status = _status_code(e)
+                if status == 429:
+                    concurrency.record_throttle()
+                delay = backoff_delay(attempt)
+                if (status not in RETRYABLE_STATUS or attempt >= settings.GEMINI_MAX_RETRIES
+                        or time.monotonic() + delay > deadline):
+                    raise
+                logger.warning(f"Gemini call failed with {status} (model={model_name}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+        usage = getattr(response, "usage_metadata", None)
+        total_tokens = getattr(usage, "total_token_count", None)
+        if isinstance(total_tokens, int):
+            tokens_bucket.debit(total_tokens - estimated_tokens)
+
         if not is_json_response:
             return response.text
 
-        raw = response.text.strip()
-        # Strip code fences if present, then parse the full block as JSON
-        code_block = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', raw)
-        json_str = code_block.group(1) if code_block else raw
-        return json.loads(json_str)
+        return _parse_json_response(response.text)
 
     except Exception as e:
         logger.error(f"Gemini API call failed (model={model_name}): {e}")
@@ -87,11 +197,17 @@ def check_price_sanity(price_details: str, property_type: str, description: str,
 
 def analyze_host_profile(host_data: dict) -> dict:
     prompt = load_prompt("analyze_host_profile_prompt")
-    return _call_gemini(FAST_MODEL, [prompt, json.dumps(host_data)])
+    context_str = _context_json("analyze_host_profile", prompt, host_data, settings.GEMINI_PROMPT_TOKENS)
+    return _call_gemini(FAST_MODEL, [prompt, context_str])
 
 def check_data_consistency(listing_data: dict, google_data: dict) -> dict:
     prompt = load_prompt("check_data_consistency_prompt")
-    context = f"Listing Data:\n{json.dumps(listing_data)}\n\nGoogle Maps Data:\n{json.dumps(google_data)}"
+    # What the prompt leaves of the budget is split evenly between the two sources.
+    budget = (settings.GEMINI_PROMPT_TOKENS - estimate_tokens(prompt)) // 2
+    context = (
+        f"Listing Data:\n{_context_json('check_data_consistency.listing', '', listing_data, budget)}\n\n"
+        f"Google Maps Data:\n{_context_json('check_data_consistency.google', '', google_data, budget)}"
+    )
     return _call_gemini(FAST_MODEL, [prompt, context])
 
 # --- Functions for the finalizer (simple vs. advanced) ---
@@ -100,15 +216,16 @@ def synthesize_simple_report(full_context: dict) -> dict:
     """Calls the FAST model for a straightforward final report."""
     prompt = load_prompt("synthesize_final_report_prompt")
     prompt = prompt.replace("[LANGUAGE_CODE]", "es")
-    context_str = json.dumps(full_context, indent=2)
+    context_str = _context_json("synthesize_simple_report", prompt, full_context, settings.GEMINI_SYNTHESIS_PROMPT_TOKENS)
     return _call_gemini(FAST_MODEL, [prompt, context_str])
 
 def synthesize_advanced_report(full_context: dict) -> dict:
     """Calls the ADVANCED model for a complex final report."""
     prompt = load_prompt("synthesize_final_report_prompt")
     prompt = prompt.replace("[LANGUAGE_CODE]", "es")
-    context_str = json.dumps(full_context, indent=2)
+    context_str = _context_json("synthesize_advanced_report", prompt, full_context, settings.GEMINI_SYNTHESIS_PROMPT_TOKENS)
     return _call_gemini(ADVANCED_MODEL, [prompt, context_str], thinking=True)
+
 def extract_data_from_text(raw_text: str) -> dict:
     """Extracts structured data from a raw text paste of a listing."""
     prompt = load_prompt("data_extraction_prompt")
@@ -121,7 +238,7 @@ def process_q_and_a(full_context: dict) -> dict:
     Handles post-analysis Q&A. Uses the fast model for low-latency chat responses.
     """
     prompt = load_prompt("post_analysis_chat_prompt")
-    context_str = json.dumps(full_context, indent=2)
+    context_str = _context_json("process_q_and_a", prompt, full_context, settings.GEMINI_CHAT_PROMPT_TOKENS)
     return _call_gemini(FAST_MODEL, [prompt, context_str])
 def analyze_cross_platform_results(search_results: list, address: str) -> dict:
     """
@@ -150,14 +267,28 @@ def filter_suspicious_urls(url_data: list) -> dict:
 def synthesize_online_presence(context: dict) -> dict:
     """Uses the advanced model to synthesize online presence data."""
     prompt = load_prompt("online_presence_prompt")
-    context_str = json.dumps(context, indent=2)
+    context_str = _context_json("synthesize_online_presence", prompt, context, settings.GEMINI_PROMPT_TOKENS)
     return _call_gemini(ADVANCED_MODEL, [prompt, context_str])
 
 def analyze_image_for_ai(image_data: dict) -> dict:
     """Analyzes an image for AI artifacts."""
+    from google.genai import types
     prompt = load_prompt("ai_image_detection_prompt")
     image_part = types.Part.from_bytes(
         data=image_data["data"],
         mime_type=image_data["mime_type"],
     )
-    return _call_gemini(ADVANCED_MODEL, [prompt, image_part])
\ No newline at end of file
+    return _call_gemini(ADVANCED_MODEL, [prompt, image_part])
+
+def analyze_images_for_ai(images: list[dict]) -> dict:
+    """
+    Analyzes several images for AI artifacts in one request. Returns
+    {"images": [{"index", "confidence_score", "verdict", "reason", "artifacts"}]}.
+    """
+    from google.genai import types
+    prompt = load_prompt("ai_image_detection_batch_prompt")
+    content = [prompt]
+    for index, image_data in enumerate(images):
+        content.append(f"Image {index}:")
+        content.append(types.Part.from_bytes(data=image_data["data"], mime_type=image_data["mime_type"]))
+    return _call_gemini(ADVANCED_MODEL, content)
@@ -1,22 +1,24 @@
 import concurrent
-import googlemaps
 from app.core.config import settings
+from app.utils.helpers import lazy_client
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Configure client once
-try:
-    gmaps = googlemaps.Client(key=settings.GOOGLE_API_KEY, timeout=10)
-except Exception as e:
-    logger.error(f"Failed to initialize Google Maps client: {e}")
-    gmaps = None
+
+# Configure client once, on first use
+def _build_gmaps():
+    import googlemaps
+    return googlemaps.Client(key=settings.GOOGLE_API_KEY, timeout=10)
+
+get_gmaps = lazy_client("Google Maps", _build_gmaps)
 # in app/services/google_apis.py
 def geocode_address(address: str) -> dict:
     """
     Performs the geocoding step, formats the result, extracts the country code,
     and returns a single, clean dictionary.
     """
+    gmaps = get_gmaps()
     if not gmaps:
         return {"error": "Google Maps client not initialized."}
     try:
@@ -57,6 +59,7 @@ def geocode_address(address: str) -> dict:
     
 def get_place_details(place_id: str) -> dict:
     """Performs the Place Details lookup."""
+    gmaps = get_gmaps()
     if not gmaps:
         return {"error": "Google Maps client not initialized."}
     try: 
@@ -85,6 +88,7 @@ def get_neighborhood_analysis(coordinates: dict) -> dict:
     Performs parallel Nearby Searches and returns a summary including the
     name and location of each place found.
     """
+    gmaps = get_gmaps()
     if not gmaps or not coordinates:
         return {}
 
@@ -125,4 +129,4 @@ def get_neighborhood_analysis(coordinates: dict) -> dict:
                 logger.error(f"Nearby Search for '{key}' failed: {e}")
                 results[key] = {"count": 0, "places": []}
                 
-    return results
\ No newline at end of file
+    return results
\ No newline at end of file
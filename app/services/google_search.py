@@ -1,32 +1,38 @@
 # app/services/Google Search.py
-from googleapiclient.discovery import build
 from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker, ProviderUnavailable
+from app.utils.helpers import lazy_client
 import logging
 import pycountry
 
-# Create the service client once to be reused. This is more efficient.
-try:
-    search_service = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY)
-except Exception as e:
-    logging.error(f"Failed to build Google Search service client: {e}")
-    search_service = None
+
+# Create the service client once (on first use) to be reused. This is more efficient.
+def _build_search_service():
+    from googleapiclient.discovery import build
+    return build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY)
+
+get_search_service = lazy_client("Google Search", _build_search_service)
+cse_breaker = CircuitBreaker("cse")
 
 def search_web(query: str, exact_match: bool = False) -> list[dict]:
     """
     Performs a single web search and returns a list of result items.
     Each item is a dictionary containing title, link, and snippet.
+    Raises ProviderUnavailable while the CSE circuit breaker is open.
     """
+    search_service = get_search_service()
     if not search_service:
         return []
     
     search_query = f'"{query}"' if exact_match else query
     logging.debug(f"Query: {search_query}")
     try:
-        res = search_service.cse().list(
+        request = search_service.cse().list(
             q=search_query,
             cx=settings.GOOGLE_SEARCH_ENGINE_ID,
             num=3
-        ).execute()
+        )
+        res = cse_breaker.call(request.execute)
 
         if 'items' not in res:
             return []
@@ -40,6 +46,8 @@ def search_web(query: str, exact_match: bool = False) -> list[dict]:
             } 
             for item in res.get("items", [])
         ]
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         logging.error(f"Google Search API call failed for query '{search_query}': {e}")
         return []
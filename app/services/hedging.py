@@ -0,0 +1,148 @@
+"""
+Hedged requests for lookups with long, unpredictable tails.
+
+`hedged(provider, func, ...)` starts `func`; if it has not answered by the
+provider's observed p90 latency, a second identical attempt is started and
+whichever returns first wins. Only providers listed in HEDGED_PROVIDERS are
+hedged, and at most HEDGE_BUDGET_RATIO of a provider's requests per minute get
+a second attempt.
+
+Latency samples and budget counters live in Redis so they survive RQ's
+per-job work-horse forks and are shared by all workers. Without Redis, or
+before enough samples exist, calls run once, unhedged.
+"""
+
+import concurrent.futures
+import logging
+import math
+import threading
+import time
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_KEY = "hedge:latency:{provider}"
+COUNTER_KEY = "hedge:{kind}:{provider}:{minute}"
+# Keep the latest N latencies per provider; hedge only once MIN_SAMPLES exist.
+LATENCY_SAMPLES = 200
+MIN_SAMPLES = 20
+# Re-read the p90 from Redis at most this often.
+P90_CACHE_SECONDS = 30
+
+_p90_lock = threading.Lock()
+_p90_cache: dict[str, tuple[float, float | None]] = {}
+
+
+def _get_connection():
+    from app.workers.queues import get_redis_conn
+    return get_redis_conn()
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(pct * len(ordered)) - 1)]
+
+
+def hedge_delay(connection, provider: str) -> float | None:
+    """The provider's p90 latency, or None if there are too few samples."""
+    now = time.monotonic()
+    with _p90_lock:
+        cached = _p90_cache.get(provider)
+        if cached and now - cached[0] < P90_CACHE_SECONDS:
+            return cached[1]
+
+    samples = [float(s) for s in connection.lrange(LATENCY_KEY.format(provider=provider), 0, -1)]
+    delay = _percentile(samples, 0.9) if len(samples) >= MIN_SAMPLES else None
+    with _p90_lock:
+        _p90_cache[provider] = (now, delay)
+    return delay
+
+
+def record_latency(connection, provider: str, seconds: float):
+    key = LATENCY_KEY.format(provider=provider)
+    pipe = connection.pipeline()
+    pipe.lpush(key, round(seconds, 3))
+    pipe.ltrim(key, 0, LATENCY_SAMPLES - 1)
+    pipe.execute()
+
+
+def _count_request(connection, provider: str):
+    key = COUNTER_KEY.format(kind="requests", provider=provider, minute=int(time.time() // 60))
+    pipe = connection.pipeline()
+    pipe.incr(key)
+    pipe.expire(key, 120)
+    pipe.execute()
+
+
+def take_budget(connection, provider: str) -> bool:
+    """Reserves one hedge if this minute's hedges stay within the budget."""
+    minute = int(time.time() // 60)
+    requests_key = COUNTER_KEY.format(kind="requests", provider=provider, minute=minute)
+    hedges_key = COUNTER_KEY.format(kind="hedges", provider=provider, minute=minute)
+    pipe = connection.pipeline()
+    pipe.incr(hedges_key)
+    pipe.expire(hedges_key, 120)
+    pipe.get(requests_key)
+    hedges, _, requests_seen = pipe.execute()
+    if hedges <= max(1, int(settings.HEDGE_BUDGET_RATIO * int(requests_seen or 0))):
+        return True
+    connection.decr(hedges_key)
+    return False
+
+
+def hedged(provider: str, func, *args, **kwargs):
+    """
+    Calls `func(*args, **kwargs)`, hedging it for opted-in providers.
+    Returns the first successful result; if every attempt fails, raises the
+    first attempt's exception.
+    """
+    if provider not in settings.hedged_providers:
+        return func(*args, **kwargs)
+    connection = _get_connection()
+    if connection is None:
+        return func(*args, **kwargs)
+
+    try:
+        _count_request(connection, provider)
+        delay = hedge_delay(connection, provider)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Hedging unavailable for {provider}: {e}")
+        return func(*args, **kwargs)
+
+    started = time.monotonic()
+
+    def on_primary_done(future):
+        if future.exception() is None:
+            try:
+                record_latency(connection, provider, time.monotonic() - started)
+            except redis.exceptions.RedisError:
+                pass
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    try:
+        primary = executor.submit(func, *args, **kwargs)
+        primary.add_done_callback(on_primary_done)
+        pending = {primary}
+
+        if delay is not None:
+            done, _ = concurrent.futures.wait(pending, timeout=delay)
+            try:
+                should_hedge = not done and take_budget(connection, provider)
+            except redis.exceptions.RedisError:
+                should_hedge = False
+            if should_hedge:
+                logger.info(f"Hedging {provider} request after {delay:.2f}s")
+                pending.add(executor.submit(func, *args, **kwargs))
+
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        return primary.result()
+    finally:
+        # The losing attempt finishes in the background.
+        executor.shutdown(wait=False)
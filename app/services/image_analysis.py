@@ -1,32 +1,39 @@
+import concurrent.futures
+import hashlib
 import json
 import logging
+import redis
 import requests
-import io
-from PIL import Image
+from app.core.config import settings
 from app.services import gemini_analysis
-from app.utils.helpers import load_prompt
-from google.cloud import vision
+from app.services.circuit_breaker import CircuitBreaker, ProviderUnavailable
+from app.utils.helpers import lazy_client, load_prompt
 
 logger = logging.getLogger(__name__)
 
-try:
-    vision_client = vision.ImageAnnotatorClient()
-except Exception as e:
-    logger.error(f"Failed to initialize Vision client in image_analysis: {e}")
-    vision_client = None
+
+def _build_vision_client():
+    from google.cloud import vision
+    return vision.ImageAnnotatorClient()
+
+get_vision_client = lazy_client("Vision", _build_vision_client)
+vision_breaker = CircuitBreaker("vision")
 
 def reverse_image_search(image_url: str) -> dict:
     """
     Performs an intelligent reverse image search by using an AI to classify
     the pages where matching images are found.
+    Raises ProviderUnavailable while the Vision circuit breaker is open.
     """
+    vision_client = get_vision_client()
     if not vision_client:
         return {"url": image_url, "is_reused": False, "error": "Vision client not initialized."}
+    from google.cloud import vision
 
     try:
         image = vision.Image()
         image.source.image_uri = image_url
-        response = vision_client.web_detection(image=image, timeout=20)
+        response = vision_breaker.call(vision_client.web_detection, image=image, timeout=20)
         detection = response.web_detection
 
         has_full_matches = bool(detection.full_matching_images)
@@ -99,56 +106,208 @@ def reverse_image_search(image_url: str) -> dict:
             "is_reused": True,
             "reason": f"Exact copy of this image found on {len(external_matches)} non-rental site(s): {', '.join(list(external_matches)[:3])}.",
             "suspicious_urls": suspicious_urls or list(external_matches),
+            "external_domains": sorted(external_matches),
             "url": image_url
         }
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Cloud Vision API call failed for url {image_url}: {e}")
-        return {"is_reused": False, "reason": "Error during reverse image search.", "url": image_url}
-    
+        return {"is_reused": False, "reason": "Error during reverse image search.", "url": image_url, "error": str(e)}
+
+
+def cached_reverse_image_search(image_url: str, content_hash: str | None = None, refresh: bool = False) -> dict:
+    """reverse_image_search through the cross-check verdict cache (see reverse_image_cache)."""
+    from app.services import reverse_image_cache
+    return reverse_image_cache.cached_search(reverse_image_search, image_url, content_hash, refresh)
+
+
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10 MB
+AI_VERDICTS = {"Likely Real", "Possibly AI", "Likely AI"}
 
-def check_for_ai_artifacts(image_url: str) -> dict:
-    """
-    Downloads, resizes, and then calls the Gemini service to analyze an image.
-    """
+
+class ImageTooLarge(Exception):
+    pass
+
+
+def _download_image(image_url: str) -> bytes:
     from app.utils.validators import validate_external_url
-    try:
-        validate_external_url(image_url)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://www.google.com/'
-        }
-        image_response = requests.get(image_url, stream=True, headers=headers, timeout=10)
-        image_response.raise_for_status()
+    validate_external_url(image_url)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Referer': 'https://www.google.com/'
+    }
+    image_response = requests.get(image_url, stream=True, headers=headers, timeout=10)
+    image_response.raise_for_status()
 
-        content_length = int(image_response.headers.get('Content-Length', 0))
-        if content_length > MAX_IMAGE_SIZE:
-            return {"confidence_score": 0.0, "verdict": "Skipped", "artifacts": ["Image too large."], "url": image_url}
+    content_length = int(image_response.headers.get('Content-Length', 0))
+    if content_length > MAX_IMAGE_SIZE:
+        raise ImageTooLarge()
+    return image_response.content
 
-        # --- Image Resizing Logic ---
-        image = Image.open(io.BytesIO(image_response.content))
-        target_size = (1024, 1024)
-        image.thumbnail(target_size, Image.Resampling.LANCZOS)
-        
-        byte_buffer = io.BytesIO()
-        image.convert("RGB").save(byte_buffer, format="JPEG")
-        resized_image_bytes = byte_buffer.getvalue()
 
-        image_data = {
-            "mime_type": "image/jpeg",
-            "data": resized_image_bytes
-        }
+def _ai_error(image_url: str, message: str) -> dict:
+    return {"confidence_score": 0.0, "verdict": "Error", "artifacts": [message], "url": image_url}
+
+
+def check_for_ai_artifacts(image_url: str) -> dict:
+    """
+    Downloads, resizes (see image_preprocessing), and then calls the Gemini
+    service to analyze an image.
+    """
+    from app.services import image_preprocessing
+    try:
+        image_data = image_preprocessing.prepare_image(_download_image(image_url))
 
         result = gemini_analysis.analyze_image_for_ai(image_data)
         
         result['url'] = image_url
         return result
 
+    except ImageTooLarge:
+        return {"confidence_score": 0.0, "verdict": "Skipped", "artifacts": ["Image too large."], "url": image_url}
     except Exception as e:
         logger.error(f"Gemini image analysis failed for url {image_url}: {e}")
-        return {
-            "confidence_score": 0.0,
-            "verdict": "Error",
-            "artifacts": [f"Error during analysis: {str(e)}"],
-            "url": image_url
-        }
\ No newline at end of file
+        return _ai_error(image_url, f"Error during analysis: {str(e)}")
+
+
+# --- Batched AI-image detection ---
+# Verdicts are cached by the SHA-256 of the image bytes, shared by every check.
+
+def _ai_cache_key(content_hash: str) -> str:
+    return f"aiimg:{content_hash}"
+
+
+def _ai_cache_connection():
+    from app.workers.queues import get_redis_conn
+    return get_redis_conn()
+
+
+def _read_ai_cache(connection, content_hashes: list[str]) -> dict:
+    if connection is None or not content_hashes:
+        return {}
+    try:
+        entries = connection.mget([_ai_cache_key(h) for h in content_hashes])
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"AI image cache unavailable: {e}")
+        return {}
+    return {h: json.loads(entry) for h, entry in zip(content_hashes, entries) if entry}
+
+
+def _write_ai_cache(connection, verdicts: dict):
+    if connection is None or not verdicts:
+        return
+    try:
+        pipe = connection.pipeline(transaction=False)
+        for content_hash, verdict in verdicts.items():
+            pipe.set(_ai_cache_key(content_hash), json.dumps(verdict), ex=settings.AI_IMAGE_CACHE_TTL_SECONDS)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Could not cache AI image verdicts: {e}")
+
+
+def _analyze_batch(images: list[dict]) -> list[dict | None]:
+    """Per-image verdicts for one Gemini request, in input order; None where the model gave none."""
+    response = gemini_analysis.analyze_images_for_ai(images)
+    if not isinstance(response, dict) or response.get("error"):
+        raise Exception((response or {}).get("error", "Empty response."))
+    verdicts: list[dict | None] = [None] * len(images)
+    for position, entry in enumerate(response.get("images") or []):
+        if not isinstance(entry, dict) or entry.get("verdict") not in AI_VERDICTS:
+            continue
+        index = entry.get("index", position)
+        if isinstance(index, int) and 0 <= index < len(images) and verdicts[index] is None:
+            verdicts[index] = {
+                "confidence_score": float(entry.get("confidence_score") or 0.0),
+                "verdict": entry["verdict"],
+                "reason": entry.get("reason", ""),
+                "artifacts": entry.get("artifacts") or [],
+            }
+    return verdicts
+
+
+def detect_ai_images(
+    image_urls: list[str],
+    content_hashes: dict[str, str] | None = None,
+    image_bytes: dict[str, bytes] | None = None,
+) -> dict:
+    """
+    AI-generation verdicts for `image_urls`, with AI_IMAGE_BATCH_SIZE images
+    per Gemini request instead of one request per image. Images whose bytes
+    were analyzed before (AI_IMAGE_CACHE_TTL_SECONDS) are not sent again.
+    `content_hashes` and `image_bytes` (by URL, as image_selection returns
+    them) let the cache be read before any download and skip downloading
+    bytes that were already fetched. Returns the per-image results, in order,
+    and the number of requests made.
+    """
+    from app.services import image_preprocessing
+
+    results: dict[str, dict] = {}
+    image_bytes = image_bytes or {}
+    hashes = {url: h for url, h in (content_hashes or {}).items() if url in image_urls}
+    connection = _ai_cache_connection()
+    cached = _read_ai_cache(connection, sorted(set(hashes.values())))
+    for url, content_hash in hashes.items():
+        if content_hash in cached:
+            results[url] = {**cached[content_hash], "url": url}
+
+    downloads: dict[str, bytes] = {}
+    missing = [url for url in dict.fromkeys(image_urls) if url not in results]
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = {url: executor.submit(_download_image, url) for url in missing if url not in image_bytes}
+    for url in missing:
+        try:
+            data = image_bytes[url] if url in image_bytes else futures[url].result()
+            image_preprocessing.needs_transform(data)  # raises if the bytes are not an image
+            downloads[url] = data
+        except ImageTooLarge:
+            results[url] = {"confidence_score": 0.0, "verdict": "Skipped", "artifacts": ["Image too large."], "url": url}
+        except Exception as e:
+            logger.info(f"Could not read image {url} for AI detection: {e}")
+            results[url] = _ai_error(url, f"Could not read image: {e}")
+
+    # Images the selection couldn't hash: hash them now and read the cache again.
+    unhashed = {url: hashlib.sha256(data).hexdigest() for url, data in downloads.items() if url not in hashes}
+    hashes.update(unhashed)
+    cached.update(_read_ai_cache(connection, sorted(set(unhashed.values()) - set(cached))))
+    for url, content_hash in unhashed.items():
+        if content_hash in cached:
+            results[url] = {**cached[content_hash], "url": url}
+
+    # One request per batch of distinct, not yet analyzed images.
+    pending = list(dict.fromkeys(hashes[url] for url in downloads if url not in results))
+    data_by_hash = {hashes[url]: data for url, data in downloads.items()}
+    prepared = dict(zip(pending, image_preprocessing.prepare_images([data_by_hash[h] for h in pending])))
+    fresh: dict[str, dict] = {}
+    errors: dict[str, str] = {}
+    batch_size = max(1, settings.AI_IMAGE_BATCH_SIZE)
+    requests_made = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        requests_made += 1
+        try:
+            verdicts = _analyze_batch([prepared[h] for h in batch])
+        except Exception as e:
+            logger.error(f"Gemini batch image analysis failed: {e}")
+            errors.update({h: f"Error during analysis: {e}" for h in batch})
+            continue
+        for content_hash, verdict in zip(batch, verdicts):
+            if verdict is None:
+                errors[content_hash] = "No verdict returned for this image."
+            else:
+                fresh[content_hash] = verdict
+    _write_ai_cache(connection, fresh)
+
+    for url, content_hash in hashes.items():
+        if url in results:
+            continue
+        if content_hash in fresh:
+            results[url] = {**fresh[content_hash], "url": url}
+        else:
+            results[url] = _ai_error(url, errors[content_hash])
+
+    return {
+        "results": [results[url] for url in image_urls],
+        "cached": sum(1 for url in hashes if hashes[url] in cached),
+        "gemini_requests": requests_made,
+    }
@@ -0,0 +1,114 @@
+"""
+Image preprocessing for the image analyzers: fit an image within
+IMAGE_TARGET_SIDE pixels as a JPEG, doing as little work as possible.
+
+- Images that already are baseline-decodable JPEGs within the target side and
+  IMAGE_TARGET_MAX_BYTES are passed through untouched (only the header is read).
+- Larger JPEGs are decoded in draft mode: libjpeg's DCT scaling decodes at
+  1/2, 1/4 or 1/8 of the size, the largest scale still at least the target,
+  so the full-resolution bitmap is never built.
+- Everything else is decoded, resized and re-encoded.
+
+Decoding and resizing hold the GIL, so the transforms run in a process pool
+shared by every analyzer in the process (IMAGE_PREPROCESS_PROCESSES; 0 runs
+them inline). The pool is started on first use and outlives a job only in
+worker modes that reuse the process (prefork, threaded).
+"""
+
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JPEG_QUALITY = 85
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _open(data: bytes):
+    from PIL import Image
+    return Image.open(io.BytesIO(data))
+
+
+def needs_transform(data: bytes) -> bool:
+    """True unless `data` already meets the format and size targets. Reads the header only."""
+    if len(data) > settings.IMAGE_TARGET_MAX_BYTES:
+        return True
+    image = _open(data)
+    return not (
+        image.format == "JPEG"
+        and image.mode in ("RGB", "L")
+        and max(image.size) <= settings.IMAGE_TARGET_SIDE
+    )
+
+
+def transform(data: bytes) -> bytes:
+    """Decodes (reduced-resolution for JPEG), fits within the target side and encodes as JPEG."""
+    from PIL import Image
+
+    side = settings.IMAGE_TARGET_SIDE
+    image = _open(data)
+    if image.format == "JPEG":
+        # Picks the smallest DCT scale (1/1 to 1/8) that stays at least the
+        # size the thumbnail ends up with.
+        scale = min(1.0, side / max(image.size))
+        image.draft("RGB", (round(image.width * scale), round(image.height * scale)))
+    image.thumbnail((side, side), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def get_pool():
+    """The shared process pool, or None when IMAGE_PREPROCESS_PROCESSES is 0."""
+    global _pool
+    if settings.IMAGE_PREPROCESS_PROCESSES <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the workers must not inherit the parent's threads, sockets and gRPC state.
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PREPROCESS_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def prepare_images(images: list[bytes]) -> list[dict]:
+    """
+    Image parts ({"mime_type", "data"}) for `images`, in order. Images that
+    already meet the targets never leave this process.
+    """
+    prepared = list(images)
+    pending = [i for i, data in enumerate(images) if needs_transform(data)]
+    pool = get_pool() if pending else None
+    if pool is not None:
+        try:
+            for i, data in zip(pending, pool.map(transform, [images[i] for i in pending])):
+                prepared[i] = data
+            pending = []
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.warning("Image preprocessing pool broke; transforming inline.")
+            shutdown_pool()
+    for i in pending:
+        prepared[i] = transform(images[i])
+    return [{"mime_type": "image/jpeg", "data": data} for data in prepared]
+
+
+def prepare_image(data: bytes) -> dict:
+    """Image part ({"mime_type", "data"}) for one image."""
+    return prepare_images([data])[0]
@@ -0,0 +1,180 @@
+"""
+Picks which listing images get a paid analysis (reverse image search).
+
+Listing pages repeat the same photo at several CDN sizes, so the first N
+URLs are often one photo N times. Selection runs in three steps:
+
+1. `canonical_url` strips platform resize parameters and size path segments;
+   URLs with the same canonical form are one candidate.
+2. Each candidate is fingerprinted with a 64-bit difference hash (dHash) from
+   a small, reduced-resolution decode of the image.
+3. Candidates within DUPLICATE_DISTANCE bits of each other form a cluster;
+   from the cluster representatives, the N most different are picked
+   (farthest-point selection on Hamming distance).
+
+Images that cannot be downloaded or decoded get no fingerprint and are kept
+as their own cluster, so a fetch failure never hides an image. The SHA-256 of
+each downloaded image is returned too, as the content key of the reverse
+image cache (app/services/reverse_image_cache.py).
+"""
+
+import concurrent.futures
+import hashlib
+import io
+import logging
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Max Hamming distance between dHashes of the same photo (resized,
+# recompressed or lightly cropped).
+DUPLICATE_DISTANCE = 10
+# Distance assumed to an image without fingerprint: unrelated but not
+# preferred over images known to be different.
+UNKNOWN_DISTANCE = 32
+FINGERPRINT_TIMEOUT = 5
+FINGERPRINT_MAX_BYTES = 5 * 1024 * 1024
+FINGERPRINT_WORKERS = 8
+
+# Query parameters platforms and image CDNs use for size, crop and quality.
+_RESIZE_PARAMS = {
+    "w", "h", "width", "height", "size", "s", "sz", "resize", "fit", "crop", "quality", "q",
+    "dpr", "auto", "fm", "format", "im_w", "im_h", "im_policy", "impolicy", "imwidth", "rule",
+    "aki_policy", "k", "o", "thumb",
+}
+# Size segments in paths: Booking "/max1024x768/", "/square60/"; idealista
+# "/WEB_DETAIL-M-L/"; WordPress-style "-1024x768.jpg".
+_RESIZE_PATHS = (
+    (re.compile(r"/(?:max|square|thumb)\d+(?:x\d+)?/", re.I), "/"),
+    (re.compile(r"/WEB_[A-Z_]+(?:-[A-Z]+)*/"), "/"),
+    (re.compile(r"-\d{2,4}x\d{2,4}(?=\.\w{3,4}$)"), ""),
+)
+
+
+def canonical_url(url: str) -> str:
+    """`url` without fragment, resize query parameters or size path segments."""
+    parts = urlsplit(url.strip())
+    path = parts.path
+    for pattern, replacement in _RESIZE_PATHS:
+        path = pattern.sub(replacement, path)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _RESIZE_PARAMS))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def dedupe_urls(urls: list[str]) -> list[str]:
+    """First URL of each canonical form, in order."""
+    seen = {}
+    for url in urls:
+        if isinstance(url, str) and url.strip():
+            seen.setdefault(canonical_url(url), url)
+    return list(seen.values())
+
+
+def dhash(data: bytes) -> int:
+    """64-bit difference hash of an image."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    if image.format == "JPEG":
+        image.draft("L", (64, 64))
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _fingerprint_with_bytes(url: str) -> tuple[tuple[int, str] | None, bytes | None]:
+    """((dHash, SHA-256), bytes) of the image at `url`; (None, None) if it can't be fetched or decoded."""
+    from app.utils.validators import validate_external_url
+
+    try:
+        validate_external_url(url)
+        response = requests.get(url, stream=True, timeout=FINGERPRINT_TIMEOUT, headers={"User-Agent": "Mozilla/5.0"})
+        response.raise_for_status()
+        data = response.raw.read(FINGERPRINT_MAX_BYTES + 1, decode_content=True)
+        if len(data) > FINGERPRINT_MAX_BYTES:
+            return None, None
+        return (dhash(data), hashlib.sha256(data).hexdigest()), data
+    except Exception as e:
+        logger.info(f"Could not fingerprint image {url}: {e}")
+        return None, None
+
+
+def fingerprint(url: str) -> tuple[int, str] | None:
+    """(dHash, SHA-256) of the image at `url`, or None if it can't be fetched or decoded."""
+    return _fingerprint_with_bytes(url)[0]
+
+
+def _distance(a: int | None, b: int | None) -> int:
+    return UNKNOWN_DISTANCE if a is None or b is None else hamming(a, b)
+
+
+def cluster(fingerprints: list[int | None]) -> list[list[int]]:
+    """Indexes grouped into near-duplicate clusters, each led by its first member."""
+    clusters: list[list[int]] = []
+    for i, fp in enumerate(fingerprints):
+        for members in clusters:
+            leader = fingerprints[members[0]]
+            if fp is not None and leader is not None and hamming(fp, leader) <= DUPLICATE_DISTANCE:
+                members.append(i)
+                break
+        else:
+            clusters.append([i])
+    return clusters
+
+
+def most_diverse(fingerprints: list[int | None], candidates: list[int], limit: int) -> list[int]:
+    """Farthest-point selection from `candidates`, starting with the first (the listing's cover)."""
+    if not candidates:
+        return []
+    picked = [candidates[0]]
+    remaining = candidates[1:]
+    while remaining and len(picked) < limit:
+        best = max(remaining, key=lambda i: min(_distance(fingerprints[i], fingerprints[p]) for p in picked))
+        picked.append(best)
+        remaining.remove(best)
+    return sorted(picked)
+
+
+def select_images(urls: list[str], limit: int, keep_bytes: bool = False) -> dict:
+    """
+    The `limit` most informative of `urls`. Returns the selected URLs (in
+    listing order), the content hash of those that were downloaded, and how
+    many candidates, clusters and URL duplicates there were. With
+    `keep_bytes`, also the downloaded bytes of the selected images
+    ("image_bytes"), so the caller doesn't fetch them again.
+    """
+    candidates = dedupe_urls(urls)
+    fetch = _fingerprint_with_bytes if keep_bytes else lambda url: (fingerprint(url), None)
+    if len(candidates) <= 1:
+        fetched = [(None, None)] * len(candidates)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=FINGERPRINT_WORKERS) as executor:
+            fetched = list(executor.map(fetch, candidates))
+    prints = [print_ for print_, _ in fetched]
+    fingerprints = [p[0] if p else None for p in prints]
+    clusters = cluster(fingerprints)
+    selected = most_diverse(fingerprints, [members[0] for members in clusters], limit)
+    selection = {
+        "selected_urls": [candidates[i] for i in selected],
+        "content_hashes": {candidates[i]: prints[i][1] for i in selected if prints[i]},
+        "stats": {
+            "urls": len(urls),
+            "url_duplicates": len(urls) - len(candidates),
+            "clusters": len(clusters),
+            "near_duplicates": len(candidates) - len(clusters),
+            "selected": len(selected),
+        },
+    }
+    if keep_bytes:
+        selection["image_bytes"] = {candidates[i]: fetched[i][1] for i in selected if fetched[i][1] is not None}
+    return selection
@@ -0,0 +1,227 @@
+"""
+Indicator store behind POST /precheck: a provisional risk level from local
+state only, answered with one Redis round-trip.
+
+Workers record what finished checks learned, keyed by a digest of the
+normalized value (no raw emails or phones in key names):
+
+    ind:listing:{digest}   latest report for a listing URL (check_id, risk_score)
+    ind:bad:{digest}       email / phone / IBAN / domain seen on a high-risk check
+                           or on a check users reported as fraud
+    ind:domain:{digest}    domain age from url_forensics
+    ind:image:{digest}     reverse image search hit (image reused elsewhere)
+
+Every key expires after PRECHECK_INDICATOR_TTL_SECONDS. Image URLs are keyed
+by image_selection.canonical_url, like the reverse image cache, so a resized
+copy of a photo matches; `precheck` also reads that cache's verdicts
+(revimg:url), which cover every image any check searched.
+"""
+
+import hashlib
+import json
+import re
+import time
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+from app.services import reverse_image_cache
+from app.utils.iban import input_ibans, normalize_iban
+
+# Same bar as the orchestrator's historical cross-check.
+HIGH_RISK_SCORE = 70
+MEDIUM_RISK_SCORE = 40
+
+LOW = "low"
+MEDIUM = "medium"
+HIGH = "high"
+UNKNOWN = "unknown"
+_LEVEL_ORDER = {UNKNOWN: 0, LOW: 1, MEDIUM: 2, HIGH: 3}
+
+# --- Normalization ---
+
+def normalize_email(value: str | None) -> str | None:
+    value = (value or "").strip().lower()
+    return value if "@" in value else None
+
+
+def normalize_phone(value: str | None) -> str | None:
+    digits = re.sub(r"\D", "", value or "")
+    # Compare on the national number so "+34 600..." and "600..." match.
+    return digits[-9:] if len(digits) >= 9 else None
+
+
+def normalize_domain(url: str | None) -> str | None:
+    host = (urlsplit(url or "").hostname or "").lower()
+    return host.removeprefix("www.") or None
+
+
+def normalize_url(url: str | None) -> str | None:
+    """Host and path, without scheme, www., query or fragment."""
+    parts = urlsplit((url or "").strip())
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if not host:
+        return None
+    return f"{host}{parts.path.rstrip('/')}"
+
+
+def normalize_image_url(url: str | None) -> str | None:
+    """Canonical image URL, without the size and crop variants of CDNs."""
+    from app.services.image_selection import canonical_url
+    return canonical_url(url) if url and url.strip() else None
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+def _key(kind: str, value: str) -> str:
+    return f"ind:{kind}:{_digest(value)}"
+
+
+def _contact_indicators(input_data: dict) -> list[tuple[str, str]]:
+    """(kind, normalized value) for every contact indicator in a check's input."""
+    indicators = []
+    if email := normalize_email(input_data.get("host_email")):
+        indicators.append(("email", email))
+    if phone := normalize_phone(input_data.get("host_phone")):
+        indicators.append(("phone", phone))
+    for iban in input_ibans(input_data):
+        indicators.append(("iban", iban))
+    if domain := normalize_domain(input_data.get("listing_url")):
+        indicators.append(("domain", domain))
+    return indicators
+
+
+# --- Writes (workers and feedback) ---
+
+def record_check(connection, check_id: str, input_data: dict, steps: list[dict], risk_score: int):
+    """Stores what a finished check learned about its listing, contacts, domain and images."""
+    ttl = settings.PRECHECK_INDICATOR_TTL_SECONDS
+    now = int(time.time())
+    pipe = connection.pipeline(transaction=False)
+
+    if listing := normalize_url(input_data.get("listing_url")):
+        key = _key("listing", listing)
+        pipe.hset(key, mapping={"check_id": check_id, "risk_score": risk_score, "at": now})
+        pipe.expire(key, ttl)
+
+    if risk_score >= HIGH_RISK_SCORE:
+        for kind, value in _contact_indicators(input_data):
+            key = _key("bad", f"{kind}:{value}")
+            pipe.hset(key, mapping={"kind": kind, "check_id": check_id, "source": "high_risk_check", "at": now})
+            pipe.expire(key, ttl)
+
+    for step in steps:
+        if not isinstance(step, dict) or step.get("status") != "COMPLETED":
+            continue
+        result = step.get("result") or {}
+        if step.get("job_name") == "url_forensics" and (domain := normalize_domain(input_data.get("listing_url"))):
+            domain_age = result.get("domain_age") or {}
+            if "is_new" in domain_age:
+                key = _key("domain", domain)
+                pipe.hset(key, mapping={"is_new": int(bool(domain_age["is_new"])), "reason": domain_age.get("reason", "")})
+                pipe.expire(key, ttl)
+        elif step.get("job_name") == "reverse_image_search":
+            for image in result.get("reverse_search_results") or []:
+                if image.get("is_reused") and (url := normalize_image_url(image.get("url"))):
+                    key = _key("image", url)
+                    pipe.hset(key, mapping={"check_id": check_id, "reason": image.get("reason", "")})
+                    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def record_feedback(connection, check_id: str, input_data: dict):
+    """Marks a check's contact indicators as bad after users reported it as fraud."""
+    ttl = settings.PRECHECK_INDICATOR_TTL_SECONDS
+    pipe = connection.pipeline(transaction=False)
+    for kind, value in _contact_indicators(input_data):
+        key = _key("bad", f"{kind}:{value}")
+        pipe.hset(key, mapping={"kind": kind, "check_id": check_id, "source": "user_feedback", "at": int(time.time())})
+        pipe.expire(key, ttl)
+    pipe.execute()
+
+
+# --- Read (API) ---
+
+_SIGNAL_TEXT = {
+    "email": "El email del anfitrión aparece en un análisis previo de alto riesgo.",
+    "phone": "El teléfono del anfitrión aparece en un análisis previo de alto riesgo.",
+    "iban": "El IBAN aparece en un análisis previo de alto riesgo.",
+    "domain": "El dominio del anuncio aparece en un análisis previo de alto riesgo.",
+}
+
+
+def _level_for_score(score: int) -> str:
+    if score >= HIGH_RISK_SCORE:
+        return HIGH
+    if score >= MEDIUM_RISK_SCORE:
+        return MEDIUM
+    return LOW
+
+
+def precheck(connection, listing_url=None, host_email=None, host_phone=None, ibans=(), image_urls=()) -> dict:
+    """
+    Provisional risk level for the fields the extension scrapes. Reads every
+    indicator in one pipelined round-trip and calls no provider.
+    """
+    lookups = []  # (what, value, key)
+    for kind, value in (
+        ("email", normalize_email(host_email)),
+        ("phone", normalize_phone(host_phone)),
+        ("domain", normalize_domain(listing_url)),
+        *(("iban", iban) for iban in {normalize_iban(i) for i in ibans} if iban),
+    ):
+        if value:
+            lookups.append(("bad", kind, _key("bad", f"{kind}:{value}")))
+    if listing := normalize_url(listing_url):
+        lookups.append(("listing", listing, _key("listing", listing)))
+    if domain := normalize_domain(listing_url):
+        lookups.append(("domain_age", domain, _key("domain", domain)))
+    for url in dict.fromkeys(filter(None, map(normalize_image_url, image_urls))):
+        lookups.append(("image", url, _key("image", url)))
+        lookups.append(("image_verdict", url, reverse_image_cache.url_key(url)))
+
+    pipe = connection.pipeline(transaction=False)
+    for what, _, key in lookups:
+        if what == "image_verdict":
+            pipe.get(key)
+        else:
+            pipe.hgetall(key)
+    replies = pipe.execute() if lookups else []
+
+    level, signals, prior = UNKNOWN, [], None
+    reused_images = set()
+    for (what, value, _), reply in zip(lookups, replies):
+        if not reply:
+            continue
+        if what == "image_verdict":
+            if json.loads(reply)["verdict"].get("is_reused"):
+                reused_images.add(value)
+            continue
+        hit = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v) for k, v in reply.items()}
+        if what == "bad":
+            level = HIGH
+            signals.append({"kind": f"known_bad_{value}", "detail": _SIGNAL_TEXT[value], "check_id": hit.get("check_id")})
+        elif what == "listing":
+            prior = {"check_id": hit["check_id"], "risk_score": int(hit["risk_score"]), "analyzed_at": int(hit.get("at", 0))}
+            level = max(level, _level_for_score(prior["risk_score"]), key=_LEVEL_ORDER.get)
+        elif what == "domain_age":
+            if hit.get("is_new") == "1":
+                level = max(level, MEDIUM, key=_LEVEL_ORDER.get)
+                signals.append({"kind": "new_domain", "detail": f"Dominio de creación reciente. {hit.get('reason', '')}".strip()})
+            else:
+                level = max(level, LOW, key=_LEVEL_ORDER.get)
+        elif what == "image":
+            reused_images.add(value)
+    if reused_images:
+        level = max(level, MEDIUM, key=_LEVEL_ORDER.get)
+        signals.append({"kind": "reused_images", "detail": f"{len(reused_images)} imagen(es) aparecen copiadas en otros sitios."})
+
+    return {
+        "risk_level": level,
+        "signals": signals,
+        "prior_report": prior,
+        # A report for this very listing answers the question already; otherwise
+        # only a full analysis can.
+        "deep_analysis_recommended": prior is None,
+    }
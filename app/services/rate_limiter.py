@@ -0,0 +1,203 @@
+"""
+Redis-backed rate limiting shared by every worker process.
+
+- TokenBucket: account-wide requests/tokens per minute. Refill is computed from
+  Redis TIME inside a Lua script, so all workers see the same bucket.
+- AdaptiveConcurrency: a distributed in-flight limit (leases in a sorted set,
+  so a crashed worker's slots expire) adjusted with AIMD: +1/limit after a fast
+  success, halved on a 429 or a slow call (at most once per cooldown).
+- backoff_delay / job_deadline: jittered exponential backoff that never sleeps
+  past the current RQ job's timeout.
+
+If Redis is unavailable every limiter fails open: the call goes through.
+"""
+
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Calls outside an RQ job (e.g. /extract-data) get this much time in total.
+DEFAULT_DEADLINE_SECONDS = 60
+# Stop retrying this long before the job would be killed.
+DEADLINE_MARGIN_SECONDS = 5
+# Sleep between polls while waiting for a concurrency slot.
+POLL_INTERVAL_SECONDS = (0.05, 0.25)
+
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), capacity)
+local force = ARGV[4] == '1'
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if force or tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+_ACQUIRE_LEASE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[3])
+if redis.call('ZCARD', KEYS[1]) < math.floor(limit) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])) * 2)
+    return 1
+end
+return 0
+"""
+
+_ADJUST_LIMIT = """
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[4])
+if ARGV[1] == 'increase' then
+    limit = math.min(tonumber(ARGV[3]), limit + 1 / limit)
+elseif redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[5]) then
+    limit = math.max(tonumber(ARGV[2]), limit / 2)
+end
+redis.call('SET', KEYS[1], tostring(limit), 'EX', 86400)
+return tostring(limit)
+"""
+
+
+class RateLimitTimeout(Exception):
+    """No capacity became available before the deadline."""
+
+
+def job_deadline(default_seconds: float = DEFAULT_DEADLINE_SECONDS) -> float:
+    """
+    Monotonic time by which the current call must be done: the running RQ
+    job's start + timeout (minus a margin), or now + `default_seconds`.
+    """
+    import rq
+
+    job = rq.get_current_job()
+    if job is not None and job.timeout and job.timeout > 0 and job.started_at:
+        started_at = job.started_at if job.started_at.tzinfo else job.started_at.replace(tzinfo=timezone.utc)
+        elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+        return time.monotonic() + job.timeout - elapsed - DEADLINE_MARGIN_SECONDS
+    return time.monotonic() + default_seconds
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """`per_minute` units per minute, bursting up to one minute's worth."""
+
+    def __init__(self, connection, name: str, per_minute: float):
+        self.connection = connection
+        self.key = f"ratelimit:bucket:{name}"
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self._script = connection.register_script(_TOKEN_BUCKET) if connection else None
+
+    def _take(self, cost: float, force: bool = False) -> float:
+        return float(self._script(keys=[self.key], args=[self.rate, self.capacity, cost, "1" if force else "0"]))
+
+    def acquire(self, cost: float, deadline: float):
+        """Blocks until `cost` units are available; raises RateLimitTimeout at `deadline`."""
+        if self._script is None or self.rate <= 0:
+            return
+        while True:
+            try:
+                wait = self._take(cost)
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Rate limiter unavailable, not limiting {self.key}: {e}")
+                return
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"{self.key}: needs {wait:.1f}s of refill, past the deadline")
+            time.sleep(wait)
+
+    def debit(self, cost: float):
+        """Charges usage discovered after the call (may leave the bucket negative)."""
+        if self._script is None or self.rate <= 0 or cost <= 0:
+            return
+        try:
+            self._take(cost, force=True)
+        except redis.exceptions.RedisError:
+            pass
+
+
+class AdaptiveConcurrency:
+    """Distributed AIMD concurrency limit."""
+
+    def __init__(self, connection, name: str, initial: int, minimum: int, maximum: int,
+                 latency_target: float, lease_seconds: float, cooldown_seconds: int = 5):
+        self.connection = connection
+        self.leases_key = f"ratelimit:leases:{name}"
+        self.limit_key = f"ratelimit:limit:{name}"
+        self.cooldown_key = f"ratelimit:cooldown:{name}"
+        # At least one slot, whatever the settings, or no call would ever get one.
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.initial = max(self.minimum, min(self.maximum, initial))
+        self.latency_target = latency_target
+        self.lease_seconds = lease_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._acquire = connection.register_script(_ACQUIRE_LEASE) if connection else None
+        self._adjust = connection.register_script(_ADJUST_LIMIT) if connection else None
+
+    @contextmanager
+    def slot(self, deadline: float):
+        """Holds one in-flight slot for the duration of the block."""
+        lease_id = None
+        if self._acquire is not None:
+            candidate = uuid.uuid4().hex
+            try:
+                while not self._acquire(keys=[self.leases_key, self.limit_key],
+                                        args=[candidate, self.lease_seconds, self.initial]):
+                    if time.monotonic() >= deadline:
+                        raise RateLimitTimeout(f"{self.leases_key}: no free slot before the deadline")
+                    time.sleep(random.uniform(*POLL_INTERVAL_SECONDS))
+                lease_id = candidate
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Concurrency limiter unavailable, not limiting {self.leases_key}: {e}")
+        try:
+            yield
+        finally:
+            if lease_id is not None:
+                try:
+                    self.connection.zrem(self.leases_key, lease_id)
+                except redis.exceptions.RedisError:
+                    pass
+
+    def _update(self, direction: str):
+        if self._adjust is None:
+            return
+        try:
+            limit = float(self._adjust(
+                keys=[self.limit_key, self.cooldown_key],
+                args=[direction, self.minimum, self.maximum, self.initial, self.cooldown_seconds],
+            ))
+            if direction == "decrease":
+                logger.info(f"{self.limit_key} lowered to {limit:.1f}")
+        except redis.exceptions.RedisError:
+            pass
+
+    def record_success(self, latency: float):
+        self._update("increase" if latency <= self.latency_target else "decrease")
+
+    def record_throttle(self):
+        self._update("decrease")
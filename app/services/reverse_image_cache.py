@@ -0,0 +1,138 @@
+"""
+Cache of reverse image search verdicts, shared by every check.
+
+Vision's web detection for a photo rarely changes within days, and the same
+photos come back in check after check (re-analyses, bulk batches, the same
+listing on several platforms). A verdict is stored under two keys:
+
+    revimg:url:{digest}       canonical image URL (image_selection.canonical_url)
+    revimg:content:{sha256}   image bytes, when the selection stage downloaded them
+
+so a resized copy (same canonical URL) or a re-hosted copy (same bytes) hits
+too. Entries expire after REVERSE_IMAGE_CACHE_TTL_SECONDS. Error results are
+never cached. `revimg:stats` counts hits (Vision calls saved) and misses.
+
+Usage:
+    python -m app.services.reverse_image_cache stats
+    python -m app.services.reverse_image_cache forget URL [URL ...]   # force a fresh search
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sys
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "revimg:stats"
+
+
+def _get_connection():
+    from app.workers.queues import get_redis_conn
+    return get_redis_conn()
+
+
+def url_key(image_url: str) -> str:
+    from app.services.image_selection import canonical_url
+    return f"revimg:url:{hashlib.sha256(canonical_url(image_url).encode()).hexdigest()[:32]}"
+
+
+def content_key(content_hash: str) -> str:
+    return f"revimg:content:{content_hash}"
+
+
+def lookup(connection, image_url: str, content_hash: str | None = None) -> dict | None:
+    """The cached verdict for the image, by content first, then by URL."""
+    keys = ([content_key(content_hash)] if content_hash else []) + [url_key(image_url)]
+    for entry in connection.mget(keys):
+        if entry:
+            return json.loads(entry)["verdict"]
+    return None
+
+
+def store(connection, image_url: str, verdict: dict, content_hash: str | None = None):
+    entry = json.dumps({"verdict": verdict, "content_hash": content_hash})
+    ttl = settings.REVERSE_IMAGE_CACHE_TTL_SECONDS
+    pipe = connection.pipeline(transaction=False)
+    pipe.set(url_key(image_url), entry, ex=ttl)
+    if content_hash:
+        pipe.set(content_key(content_hash), entry, ex=ttl)
+    pipe.execute()
+
+
+def forget(connection, image_url: str) -> int:
+    """Drops the verdict cached for `image_url` (and for its bytes). Returns keys deleted."""
+    key = url_key(image_url)
+    entry = connection.get(key)
+    keys = [key]
+    if entry and (content_hash := json.loads(entry).get("content_hash")):
+        keys.append(content_key(content_hash))
+    return connection.delete(*keys)
+
+
+def cached_search(search, image_url: str, content_hash: str | None = None, refresh: bool = False) -> dict:
+    """
+    `search(image_url)` through the cache. `refresh` skips the lookup and
+    overwrites the entry. If Redis is unavailable, searches uncached.
+    """
+    connection = _get_connection()
+    try:
+        if connection is not None and not refresh:
+            verdict = lookup(connection, image_url, content_hash)
+            if verdict is not None:
+                connection.hincrby(STATS_KEY, "hits", 1)
+                return {**verdict, "url": image_url}
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Reverse image cache unavailable: {e}")
+        connection = None
+
+    verdict = search(image_url)
+    if connection is not None:
+        try:
+            connection.hincrby(STATS_KEY, "misses", 1)
+            if not verdict.get("error"):
+                store(connection, image_url, verdict, content_hash)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Could not cache reverse image search of {image_url}: {e}")
+    return verdict
+
+
+def stats(connection) -> dict:
+    """Cache hits (= Vision calls saved) and misses since the counters were created."""
+    raw = {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in connection.hgetall(STATS_KEY).items()}
+    hits, misses = raw.get("hits", 0), raw.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "vision_calls_saved": hits,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Reverse image search cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    forget_parser = commands.add_parser("forget")
+    forget_parser.add_argument("urls", nargs="+")
+    args = parser.parse_args(argv)
+
+    connection = _get_connection()
+    if connection is None:
+        print("Redis unavailable.", file=sys.stderr)
+        return 1
+    if args.command == "stats":
+        print(json.dumps(stats(connection), indent=2))
+    else:
+        for url in args.urls:
+            print(f"{url}: {forget(connection, url)} key(s) deleted")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
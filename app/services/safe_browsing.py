@@ -0,0 +1,452 @@
+"""
+Local Google Safe Browsing database (Update API v4).
+
+Instead of sending every listing URL to threatMatches:find, the analysis
+worker keeps the SHA-256 hash prefixes of the MALWARE, SOCIAL_ENGINEERING and
+UNWANTED_SOFTWARE lists on disk and checks URLs locally:
+
+    no prefix matches  -> clean; no request is made
+    a prefix matches   -> fullHashes:find for the matching prefixes; the
+                          answer (positive or negative) is cached for the
+                          duration the server gives
+
+Each list is one file under SAFE_BROWSING_DB_DIR holding its prefixes, sorted,
+PREFIX_SIZE bytes each (see PrefixList); lookups binary-search it through mmap. `update()`
+fetches threatListUpdates:fetch with each list's client state, applies the
+removals and additions, verifies the list checksum (skipped while a list
+holds prefixes cut to PREFIX_SIZE, until a full update replaces them) and
+swaps the new file in atomically; manifest.json records the states, files and
+when the server allows the next update. The analysis worker's main process runs it every
+SAFE_BROWSING_UPDATE_INTERVAL_SECONDS (`start_updater`); worker processes
+reopen the files on their next lookup after the manifest changes.
+
+Usage:
+    python -m app.services.safe_browsing update
+    python -m app.services.safe_browsing check URL [URL ...]
+"""
+
+import argparse
+import array
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import unquote_to_bytes
+
+import requests
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLIENT = {"clientId": "fraudcheck", "clientVersion": "1.0"}
+THREAT_LISTS = (
+    ("MALWARE", "ANY_PLATFORM", "URL"),
+    ("SOCIAL_ENGINEERING", "ANY_PLATFORM", "URL"),
+    ("UNWANTED_SOFTWARE", "ANY_PLATFORM", "URL"),
+)
+# Longer prefixes sent by the server are cut to this size: a shorter prefix
+# only means a few more full-hash requests.
+PREFIX_SIZE = 4
+MANIFEST = "manifest.json"
+REQUEST_TIMEOUT = 10
+# Full-hash cache size, in prefixes.
+FULL_HASH_CACHE_SIZE = 10_000
+
+
+def list_name(threat_type: str, platform_type: str, threat_entry_type: str) -> str:
+    return f"{threat_type}_{platform_type}_{threat_entry_type}"
+
+
+def _duration(value: str | None, default: float = 0.0) -> float:
+    """Seconds from a protobuf Duration string ("300.5s")."""
+    try:
+        return float(value.rstrip("s")) if value else default
+    except ValueError:
+        return default
+
+
+# --- URL expressions (Safe Browsing canonicalization) ---
+
+_IP_LIKE = re.compile(r"^(?:0x[0-9a-f]+|[0-9]+)(?:\.(?:0x[0-9a-f]+|[0-9]+)){0,3}$")
+
+
+def _unescape(text: str) -> str:
+    """Percent-unescapes until nothing changes; one character per byte."""
+    while True:
+        unescaped = unquote_to_bytes(text).decode("latin-1")
+        if unescaped == text:
+            return text
+        text = unescaped
+
+
+def _escape(text: str) -> str:
+    return "".join(c if 0x20 < ord(c) < 0x7F and c not in "#%" else f"%{ord(c):02X}" for c in text)
+
+
+def _resolve_path(path: str) -> str:
+    segments: list[str] = []
+    for segment in path.split("/")[1:]:
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment not in (".", ""):
+            segments.append(segment)
+    trailing = path.endswith(("/", "/.", "/..")) and segments
+    return "/" + "/".join(segments) + ("/" if trailing else "")
+
+
+def canonicalize(url: str) -> tuple[str, str, str | None]:
+    """(host, path, query) of `url`, canonicalized as Safe Browsing requires."""
+    url = re.sub(r"[\t\r\n]", "", url.strip()).split("#", 1)[0]
+    if "://" not in url:
+        url = f"http://{url}"
+    url = _unescape(url.encode("utf-8").decode("latin-1"))
+    rest = url.split("://", 1)[1]
+    authority, _, path_and_query = rest.partition("/")
+    path_and_query = "/" + path_and_query
+    host = authority.rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    host = re.sub(r"\.+", ".", host.strip("."))
+    if _IP_LIKE.match(host):
+        try:
+            host = socket.inet_ntoa(socket.inet_aton(host))
+        except OSError:
+            pass
+    path, has_query, query = path_and_query.partition("?")
+    return _escape(host), _escape(_resolve_path(path)), _escape(query) if has_query else None
+
+
+def url_expressions(url: str) -> list[str]:
+    """The host-suffix/path-prefix expressions whose hashes are looked up for `url`."""
+    host, path, query = canonicalize(url)
+    hosts = [host]
+    if not _IP_LIKE.match(host):
+        parts = host.split(".")
+        for count in range(min(5, len(parts) - 1), 1, -1):
+            suffix = ".".join(parts[-count:])
+            if suffix != host:
+                hosts.append(suffix)
+
+    paths = [f"{path}?{query}"] if query is not None else []
+    paths.append(path)
+    directories = path.split("/")[1:-1]
+    for depth in range(min(4, len(directories) + 1)):
+        prefix = "/" + "".join(f"{d}/" for d in directories[:depth])
+        paths.append(prefix)
+    paths = list(dict.fromkeys(paths))[:6]
+    return [f"{h}{p}" for h in hosts for p in paths]
+
+
+def url_hashes(url: str) -> list[bytes]:
+    return [hashlib.sha256(expression.encode("latin-1")).digest() for expression in url_expressions(url)]
+
+
+# --- On-disk prefix lists ---
+
+class PrefixList:
+    """
+    A list's prefixes, sorted, in a file read through mmap. Each 4-byte prefix
+    is stored as a native-order uint32 of its big-endian value, so numeric
+    order is the prefixes' byte order and bisect runs over a memoryview in C.
+    """
+
+    def __init__(self, path: Path | None):
+        self._values = memoryview(b"").cast("I")
+        if path is not None and path.stat().st_size:
+            with open(path, "rb") as f:
+                self._values = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("I")
+
+    @staticmethod
+    def encode(prefixes: list[bytes]) -> bytes:
+        return array.array("I", (int.from_bytes(p, "big") for p in prefixes)).tobytes()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, prefix: bytes) -> bool:
+        value = int.from_bytes(prefix, "big")
+        index = bisect.bisect_left(self._values, value)
+        return index < len(self._values) and self._values[index] == value
+
+    def prefixes(self) -> list[bytes]:
+        return [value.to_bytes(PREFIX_SIZE, "big") for value in self._values]
+
+
+def _read_manifest(directory: Path) -> dict:
+    try:
+        return json.loads((directory / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {"lists": {}, "next_update_at": 0}
+
+
+def _write_atomic(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class Database:
+    """The lists named in the manifest. Reopens them when the manifest is replaced."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._manifest_version = None
+        self._lists: dict[str, PrefixList] = {}
+
+    def _refresh(self):
+        try:
+            stat = (self.directory / MANIFEST).stat()
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+        if version == self._manifest_version:
+            return
+        with self._lock:
+            if version == self._manifest_version:
+                return
+            manifest = _read_manifest(self.directory)
+            lists = {}
+            for name, entry in manifest["lists"].items():
+                if entry.get("file"):
+                    try:
+                        lists[name] = PrefixList(self.directory / entry["file"])
+                    except FileNotFoundError:
+                        continue
+            # Lookups in other threads may still hold the old lists; their
+            # maps are released when the last reference goes.
+            self._lists, self._manifest_version = lists, version
+
+    def ready(self) -> bool:
+        """True once every list has been downloaded."""
+        self._refresh()
+        return all(list_name(*threat_list) in self._lists for threat_list in THREAT_LISTS)
+
+    def matching_prefixes(self, hashes: list[bytes]) -> set[bytes]:
+        self._refresh()
+        prefixes = {h[:PREFIX_SIZE] for h in hashes}
+        return {p for p in prefixes if any(p in prefix_list for prefix_list in self._lists.values())}
+
+
+_databases: dict[str, Database] = {}
+
+
+def get_database() -> Database:
+    directory = settings.SAFE_BROWSING_DB_DIR
+    if directory not in _databases:
+        _databases[directory] = Database(directory)
+    return _databases[directory]
+
+
+# --- Updates ---
+
+def _apply_list_update(current: list[bytes], response: dict, truncated: bool = False) -> tuple[list[bytes], bool, bool]:
+    """
+    The list after `response`'s removals and additions, whether it matches the
+    checksum and whether it holds cut prefixes (`truncated`: the current list
+    already does).
+    """
+    full_update = response.get("responseType") == "FULL_UPDATE"
+    prefixes = [] if full_update else list(current)
+    truncated = truncated and not full_update
+
+    removed = set()
+    for removal in response.get("removals", []):
+        removed.update(removal.get("rawIndices", {}).get("indices", []))
+    if removed:
+        prefixes = [p for i, p in enumerate(prefixes) if i not in removed]
+
+    for addition in response.get("additions", []):
+        if addition.get("compressionType", "RAW") != "RAW":
+            raise ValueError(f"Unsupported compression {addition.get('compressionType')}")
+        raw = addition.get("rawHashes", {})
+        size = int(raw.get("prefixSize", PREFIX_SIZE))
+        data = base64.b64decode(raw.get("rawHashes", ""))
+        truncated |= size > PREFIX_SIZE
+        prefixes.extend(data[i:i + size][:PREFIX_SIZE] for i in range(0, len(data), size))
+    prefixes.sort()
+
+    expected = response.get("checksum", {}).get("sha256")
+    # Cut prefixes no longer hash to the server's checksum, in this update or
+    # any later one until a full update replaces them.
+    valid = truncated or not expected or hashlib.sha256(b"".join(prefixes)).digest() == base64.b64decode(expected)
+    return prefixes, valid, truncated
+
+
+def update(directory: str | Path | None = None) -> dict:
+    """Fetches and applies one round of list updates. Returns the prefix count per list."""
+    directory = Path(directory or settings.SAFE_BROWSING_DB_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(directory)
+    body = {
+        "client": CLIENT,
+        "listUpdateRequests": [
+            {
+                "threatType": threat_type,
+                "platformType": platform_type,
+                "threatEntryType": entry_type,
+                "state": manifest["lists"].get(list_name(threat_type, platform_type, entry_type), {}).get("state", ""),
+                "constraints": {"supportedCompressions": ["RAW"]},
+            }
+            for threat_type, platform_type, entry_type in THREAT_LISTS
+        ],
+    }
+    response = requests.post(
+        f"{settings.SAFE_BROWSING_API_URL}/threatListUpdates:fetch",
+        params={"key": settings.GOOGLE_SAFE_BROWSING_API_KEY},
+        json=body,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    generation = manifest.get("generation", 0) + 1
+    stale_files = []
+    for list_response in data.get("listUpdateResponses", []):
+        name = list_name(list_response["threatType"], list_response["platformType"], list_response["threatEntryType"])
+        entry = manifest["lists"].get(name, {})
+        current = PrefixList(directory / entry["file"] if entry.get("file") else None)
+        prefixes, valid, truncated = _apply_list_update(current.prefixes(), list_response, entry.get("truncated", False))
+        if entry.get("file"):
+            stale_files.append(entry["file"])
+        if not valid:
+            # Start over with a full update next time.
+            logger.warning(f"Safe Browsing list {name} failed its checksum; resetting it.")
+            manifest["lists"][name] = {"state": "", "file": None, "count": 0}
+            continue
+        file_name = f"{name}.{generation}.prefixes"
+        _write_atomic(directory / file_name, PrefixList.encode(prefixes))
+        manifest["lists"][name] = {
+            "state": list_response.get("newClientState", ""), "file": file_name, "count": len(prefixes), "truncated": truncated,
+        }
+
+    wait = _duration(data.get("minimumWaitDuration"))
+    manifest["generation"] = generation
+    manifest["next_update_at"] = time.time() + wait
+    _write_atomic(directory / MANIFEST, json.dumps(manifest).encode())
+    # Processes that still map the old files keep reading them until they reopen.
+    for file_name in stale_files:
+        (directory / file_name).unlink(missing_ok=True)
+    return {name: entry["count"] for name, entry in manifest["lists"].items()}
+
+
+def start_updater(interval: float | None = None) -> threading.Thread:
+    """Runs `update` in a daemon thread every `interval` seconds, or later if the server asks to wait."""
+    interval = settings.SAFE_BROWSING_UPDATE_INTERVAL_SECONDS if interval is None else interval
+
+    def loop():
+        while True:
+            next_update_at = _read_manifest(Path(settings.SAFE_BROWSING_DB_DIR)).get("next_update_at", 0)
+            if time.time() >= next_update_at:
+                try:
+                    counts = update()
+                    logger.info(f"Safe Browsing lists updated: {counts}")
+                except Exception as e:
+                    logger.warning(f"Safe Browsing update failed: {e}")
+            time.sleep(max(interval, next_update_at - time.time()))
+
+    thread = threading.Thread(target=loop, name="safe-browsing-updater", daemon=True)
+    thread.start()
+    return thread
+
+
+# --- Lookups ---
+
+# prefix -> (expires_at, {full_hash: [threat types]})
+_full_hashes: dict[bytes, tuple[float, dict[bytes, list[str]]]] = {}
+_full_hashes_lock = threading.Lock()
+
+
+def _find_full_hashes(prefixes: list[bytes]):
+    """Asks fullHashes:find about `prefixes` and caches the answer per prefix."""
+    manifest = _read_manifest(Path(settings.SAFE_BROWSING_DB_DIR))
+    body = {
+        "client": CLIENT,
+        "clientStates": [entry["state"] for entry in manifest["lists"].values() if entry.get("state")],
+        "threatInfo": {
+            "threatTypes": sorted({t for t, _, _ in THREAT_LISTS}),
+            "platformTypes": sorted({p for _, p, _ in THREAT_LISTS}),
+            "threatEntryTypes": sorted({e for _, _, e in THREAT_LISTS}),
+            "threatEntries": [{"hash": base64.b64encode(p).decode()} for p in prefixes],
+        },
+    }
+    response = requests.post(
+        f"{settings.SAFE_BROWSING_API_URL}/fullHashes:find",
+        params={"key": settings.GOOGLE_SAFE_BROWSING_API_KEY},
+        json=body,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    now = time.time()
+    answers = {p: (now + _duration(data.get("negativeCacheDuration"), 300.0), {}) for p in prefixes}
+    for match in data.get("matches", []):
+        full_hash = base64.b64decode(match["threat"]["hash"])
+        prefix = full_hash[:PREFIX_SIZE]
+        if prefix not in answers:
+            continue
+        expires_at, matches = answers[prefix]
+        matches.setdefault(full_hash, []).append(match["threatType"])
+        answers[prefix] = (min(expires_at, now + _duration(match.get("cacheDuration"), 300.0)), matches)
+
+    with _full_hashes_lock:
+        if len(_full_hashes) + len(answers) > FULL_HASH_CACHE_SIZE:
+            _full_hashes.clear()
+        _full_hashes.update(answers)
+
+
+def lookup(url: str) -> list[str]:
+    """Threat types `url` is listed under (empty if none). Needs a ready database."""
+    hashes = url_hashes(url)
+    prefixes = get_database().matching_prefixes(hashes)
+    if not prefixes:
+        return []
+
+    now = time.time()
+    with _full_hashes_lock:
+        missing = [p for p in prefixes if _full_hashes.get(p, (0, None))[0] <= now]
+    if missing:
+        _find_full_hashes(missing)
+
+    threats = set()
+    with _full_hashes_lock:
+        for full_hash in hashes:
+            entry = _full_hashes.get(full_hash[:PREFIX_SIZE])
+            if entry:
+                threats.update(entry[1].get(full_hash, []))
+    return sorted(threats)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Local Safe Browsing database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("update")
+    check_parser = commands.add_parser("check")
+    check_parser.add_argument("urls", nargs="+")
+    args = parser.parse_args(argv)
+
+    if not settings.GOOGLE_SAFE_BROWSING_API_KEY:
+        print("GOOGLE_SAFE_BROWSING_API_KEY is not set.", file=sys.stderr)
+        return 1
+    if args.command == "update":
+        print(json.dumps(update(), indent=2))
+    else:
+        for url in args.urls:
+            print(f"{url}: {', '.join(lookup(url)) or 'not listed'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ import logging
 import re
 import requests
 
+from app.services.hedging import hedged
+
 logger = logging.getLogger(__name__)
 
 SPARQL_ENDPOINT = "https://landregistry.data.gov.uk/landregistry/query"
@@ -29,19 +31,23 @@ def lookup_by_postcode(postcode: str) -> dict:
     query = _build_sparql_query(clean_postcode)
 
     try:
-        response = requests.get(
-            SPARQL_ENDPOINT,
-            params={"query": query, "output": "json"},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=TIMEOUT,
-        )
-        response.raise_for_status()
-        return _parse_sparql_response(response.json())
+        return _parse_sparql_response(hedged("uk_land_registry", _run_sparql_query, query))
     except Exception as e:
         logger.error(f"UK Land Registry lookup failed: {e}")
         return {"found": False, "error": str(e)}
 
 
+def _run_sparql_query(query: str) -> dict:
+    response = requests.get(
+        SPARQL_ENDPOINT,
+        params={"query": query, "output": "json"},
+        headers={"Accept": "application/sparql-results+json"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
 def _normalize_postcode(postcode: str) -> str:
     """Validates and normalizes a UK postcode (e.g. 'e1 6an' -> 'E1 6AN')."""
     cleaned = re.sub(r"[^A-Za-z0-9]", "", postcode).upper()
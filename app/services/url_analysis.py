@@ -1,23 +1,47 @@
 import whois
+import hashlib
+import json
+import logging
+import redis
 import requests
 import concurrent.futures
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse
 
+from app.core.config import settings
+from app.services import safe_browsing
+from app.services.circuit_breaker import CircuitBreaker, ProviderUnavailable
+from app.services.hedging import hedged
+from app.services.precheck import normalize_domain, normalize_url
+
+logger = logging.getLogger(__name__)
+
 WHOIS_TIMEOUT_SECONDS = 10
 
+# Timeouts and socket errors mean the WHOIS server is struggling; parse errors
+# and "no match" answers do not. The timeouts are listed explicitly: before
+# Python 3.11 they are not OSError subclasses.
+whois_breaker = CircuitBreaker(
+    "whois", failure_exceptions=(OSError, TimeoutError, concurrent.futures.TimeoutError),
+)
+wayback_breaker = CircuitBreaker("wayback")
+
 
 def _whois_lookup(domain_name: str):
     """Runs whois.whois in a thread with timeout protection."""
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
         future = executor.submit(whois.whois, domain_name)
         return future.result(timeout=WHOIS_TIMEOUT_SECONDS)
+    finally:
+        # Don't block on a hung lookup after the timeout has fired.
+        executor.shutdown(wait=False)
 
 
 def check_domain_age(domain_name: str) -> dict:
-    """Checks the creation date of a domain."""
+    """Checks the creation date of a domain. Raises ProviderUnavailable while WHOIS is tripped."""
     try:
-        w = _whois_lookup(domain_name)
+        w = whois_breaker.call(hedged, "whois", _whois_lookup, domain_name)
         creation_date = w.creation_date[0] if isinstance(w.creation_date, list) else w.creation_date
         if not creation_date:
             return {"is_new": False, "reason": "Could not determine creation date."}
@@ -31,39 +55,48 @@ def check_domain_age(domain_name: str) -> dict:
             "is_new": is_new,
             "reason": f"Domain was created on {creation_date.strftime('%Y-%m-%d')}"
         }
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         return {"is_new": False, "reason": f"Whois lookup failed: {e}"}
 
+def _find_threat_matches(url: str) -> list:
+    payload = {
+        "client": {"clientId": "fraudcheck", "clientVersion": "1.0"},
+        "threatInfo": {
+            "threatTypes": ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE"],
+            "platformTypes": ["ANY_PLATFORM"],
+            "threatEntryTypes": ["URL"],
+            "threatEntries": [{"url": url}],
+        },
+    }
+    response = requests.post(
+        f"{settings.SAFE_BROWSING_API_URL}/threatMatches:find",
+        params={"key": settings.GOOGLE_SAFE_BROWSING_API_KEY},
+        json=payload,
+        timeout=10,
+    )
+    response.raise_for_status()
+    return [match.get("threatType") for match in response.json().get("matches", [])]
+
 def check_url_blacklist(url: str) -> dict:
     """
-    Checks a URL against the Google Safe Browsing API.
-    Requires GOOGLE_SAFE_BROWSING_API_KEY env var.
+    Checks a URL against Google Safe Browsing: against the local hash-prefix
+    database (see safe_browsing) once it has been downloaded, otherwise with
+    a threatMatches:find request.
+    Requires GOOGLE_SAFE_BROWSING_API_KEY.
     Falls back to SKIPPED if key is not configured.
     """
-    import os
-    api_key = os.environ.get("GOOGLE_SAFE_BROWSING_API_KEY")
-    if not api_key:
+    if not settings.GOOGLE_SAFE_BROWSING_API_KEY:
         return {
             "is_blacklisted": False,
             "reason": "No verificado."
         }
     try:
-        payload = {
-            "client": {"clientId": "fraudcheck", "clientVersion": "1.0"},
-            "threatInfo": {
-                "threatTypes": ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE"],
-                "platformTypes": ["ANY_PLATFORM"],
-                "threatEntryTypes": ["URL"],
-                "threatEntries": [{"url": url}],
-            },
-        }
-        response = requests.post(
-            f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}",
-            json=payload,
-            timeout=10,
-        )
-        response.raise_for_status()
-        matches = response.json().get("matches", [])
+        if settings.SAFE_BROWSING_UPDATE_INTERVAL_SECONDS > 0 and safe_browsing.get_database().ready():
+            matches = safe_browsing.lookup(url)
+        else:
+            matches = _find_threat_matches(url)
         is_blacklisted = len(matches) > 0
         return {
             "is_blacklisted": is_blacklisted,
@@ -72,18 +105,133 @@ def check_url_blacklist(url: str) -> dict:
     except Exception as e:
         return {"is_blacklisted": False, "reason": f"Safe Browsing check failed: {e}"}
 
-def check_archive_history(url: str) -> dict:
-    """Checks if a URL has a history on the Wayback Machine."""
+# --- Wayback Machine history (CDX API), cached by canonical URL and domain ---
+
+WAYBACK_CDX_URL = "https://web.archive.org/cdx/search/cdx"
+
+
+def _cdx_date(timestamp: str) -> str:
+    return f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}"
+
+
+def _fetch_cdx_history(target: str) -> dict:
+    """
+    First capture, last captured month and number of months with captures
+    of `target` (host and path), from one CDX query collapsed to a row per month.
+    """
+    response = requests.get(
+        WAYBACK_CDX_URL,
+        params={
+            "url": target,
+            "output": "json",
+            "fl": "timestamp",
+            "filter": "!statuscode:[45]..",
+            "collapse": "timestamp:6",
+        },
+        timeout=10,
+    )
+    response.raise_for_status()
+    rows = response.json() if response.text.strip() else []
+    timestamps = [row[0] for row in rows[1:]]  # the first row is the header
+    if not timestamps:
+        return {"first_seen": None, "last_seen": None, "months_captured": 0}
+    return {"first_seen": _cdx_date(timestamps[0]), "last_seen": _cdx_date(timestamps[-1]), "months_captured": len(timestamps)}
+
+
+def _wayback_key(kind: str, target: str) -> str:
+    return f"wayback:{kind}:{hashlib.sha256(target.encode()).hexdigest()[:32]}"
+
+
+def _wayback_connection():
+    from app.workers.queues import get_redis_conn
+    return get_redis_conn()
+
+
+def _read_wayback_cache(connection, targets: dict) -> dict:
+    if connection is None:
+        return {}
     try:
-        api_url = f"http://archive.org/wayback/available?url={url}"
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        has_history = bool(data.get("archived_snapshots"))
-        return {
-            "has_history": has_history,
-            "reason": "URL has an archive history." if has_history else "URL has no archive history."
-        }
-    except Exception as e:
-        return {"has_history": False, "reason": f"Archive check failed: {e}"}
\ No newline at end of file
+        entries = connection.mget([_wayback_key(kind, target) for kind, target in targets.items()])
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Wayback cache unavailable: {e}")
+        return {}
+    return {kind: json.loads(entry) for kind, entry in zip(targets, entries) if entry}
+
+
+def _write_wayback_cache(connection, targets: dict, histories: dict):
+    if connection is None or not histories:
+        return
+    try:
+        pipe = connection.pipeline(transaction=False)
+        for kind, history in histories.items():
+            ttl = settings.WAYBACK_CACHE_TTL_SECONDS if history["months_captured"] else settings.WAYBACK_EMPTY_CACHE_TTL_SECONDS
+            pipe.set(_wayback_key(kind, targets[kind]), json.dumps(history), ex=ttl)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Could not cache Wayback history: {e}")
+
+
+def _days_since(day: str | None) -> int | None:
+    if not day:
+        return None
+    return (datetime.now(timezone.utc).date() - datetime.strptime(day, "%Y-%m-%d").date()).days
+
+
+def check_archive_history(url: str) -> dict:
+    """
+    Wayback Machine history of the listing URL and of its domain's home page:
+    first capture, last captured month and months with captures. Histories
+    are cached in Redis by canonical URL and by domain, so listings and
+    domains seen before cost no request; misses are fetched in parallel.
+    Raises ProviderUnavailable while Wayback is tripped.
+    """
+    targets = {"url": normalize_url(url), "domain": normalize_domain(url)}
+    if targets["url"] == targets["domain"]:
+        # The listing URL is the home page: one history answers both.
+        del targets["domain"]
+    targets = {kind: target for kind, target in targets.items() if target}
+    if "url" not in targets:
+        return {"has_history": False, "reason": "Archive check failed: invalid URL."}
+    connection = _wayback_connection()
+    histories = _read_wayback_cache(connection, targets)
+    missing = [kind for kind in targets if kind not in histories]
+
+    errors = {}
+    if missing:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            futures = {
+                kind: executor.submit(
+                    wayback_breaker.call, hedged, "wayback", _fetch_cdx_history,
+                    targets[kind] if kind == "url" else f"{targets[kind]}/",
+                )
+                for kind in missing
+            }
+        fetched = {}
+        for kind, future in futures.items():
+            try:
+                fetched[kind] = future.result()
+            except ProviderUnavailable:
+                raise
+            except Exception as e:
+                errors[kind] = e
+        _write_wayback_cache(connection, targets, fetched)
+        histories.update(fetched)
+
+    if "url" in errors:
+        return {"has_history": False, "reason": f"Archive check failed: {errors['url']}"}
+    history = histories["url"]
+    has_history = history["months_captured"] > 0
+    result = {
+        "has_history": has_history,
+        "reason": (
+            f"URL archived since {history['first_seen']} ({history['months_captured']} months with captures)."
+            if has_history else "URL has no archive history."
+        ),
+        **history,
+    }
+    domain = histories.get("domain", history if "domain" not in targets else None)
+    if domain is not None:
+        result["domain_first_seen"] = domain["first_seen"]
+        result["domain_months_captured"] = domain["months_captured"]
+        result["domain_age_days"] = _days_since(domain["first_seen"])
+    return result
@@ -2,6 +2,13 @@
 from pathlib import Path
 import json
 import hashlib
+import logging
+import threading
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 # Get the base directory of the 'app' package
 APP_DIR = Path(__file__).parent.parent
 
@@ -38,4 +45,27 @@ def get_nested(data: dict, keys: list, default=None):
             data = data.get(key)
         else:
             return default
-    return data if data is not None else default
\ No newline at end of file
+    return data if data is not None else default
+
+
+def lazy_client(name: str, factory: Callable[[], T]) -> Callable[[], T | None]:
+    """
+    Returns a getter that builds an SDK client on first call and reuses it.
+    Keeps heavy SDK imports out of module import time (inside `factory`).
+    If the factory fails the error is logged once and the getter returns None.
+    """
+    lock = threading.Lock()
+    state: dict = {}
+
+    def get():
+        if "client" not in state:
+            with lock:
+                if "client" not in state:
+                    try:
+                        state["client"] = factory()
+                    except Exception as e:
+                        logger.error(f"Failed to initialize {name} client: {e}")
+                        state["client"] = None
+        return state["client"]
+
+    return get
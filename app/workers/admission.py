@@ -0,0 +1,167 @@
+"""
+Queue-state signals for readiness, autoscaling and admission control.
+
+`snapshot()` reads, per base queue: depth (all lanes), age of the oldest
+waiting job, registered workers, recent completion rate and an estimated
+drain time. `decide()` turns a snapshot into an admission decision for
+POST /analysis: accept, degrade (run in a lighter analysis mode, see
+modes.degraded_mode) or reject with Retry-After.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from rq import Queue, Worker
+from rq.utils import utcparse
+
+from app.core.config import settings
+from app.workers.fair_queue import LANES_KEY, base_name, priority_lane_name
+
+logger = logging.getLogger(__name__)
+
+MONITORED_QUEUES = ("analysis-fast", "analysis-heavy")
+
+# Completions are counted per minute; the rate uses the last few minutes.
+COMPLETIONS_KEY = "admission:done:{base}:{minute}"
+RATE_WINDOW_MINUTES = 5
+
+ACCEPT = "accept"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+# Retry-After is clamped to this range (seconds).
+MIN_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 600
+
+_cache_lock = threading.Lock()
+_cache: dict = {}
+
+
+def record_completion(connection, queue_name: str):
+    """Counts a finished job towards its base queue's completion rate."""
+    minute = int(time.time() // 60)
+    key = COMPLETIONS_KEY.format(base=base_name(queue_name), minute=minute)
+    pipe = connection.pipeline()
+    pipe.incr(key)
+    pipe.expire(key, (RATE_WINDOW_MINUTES + 1) * 60)
+    pipe.execute()
+
+
+def _lane_keys(connection, base: str) -> list[str]:
+    lanes = {base, priority_lane_name(base)}
+    lanes.update(m.decode() if isinstance(m, bytes) else m for m in connection.smembers(LANES_KEY.format(base=base)))
+    return [Queue.redis_queue_namespace_prefix + lane for lane in sorted(lanes)]
+
+
+def _queue_stats(connection, base: str) -> dict:
+    lane_keys = _lane_keys(connection, base)
+
+    pipe = connection.pipeline()
+    for key in lane_keys:
+        pipe.llen(key)
+        pipe.lindex(key, 0)
+    replies = pipe.execute()
+    depths, heads = replies[0::2], replies[1::2]
+
+    pipe = connection.pipeline()
+    head_ids = [h.decode() if isinstance(h, bytes) else h for h in heads if h]
+    for job_id in head_ids:
+        pipe.hget(f"rq:job:{job_id}", "enqueued_at")
+    enqueued = [e for e in pipe.execute() if e]
+
+    now = datetime.now(timezone.utc)
+    oldest_age = 0.0
+    for value in enqueued:
+        enqueued_at = utcparse(value.decode() if isinstance(value, bytes) else value).replace(tzinfo=timezone.utc)
+        oldest_age = max(oldest_age, (now - enqueued_at).total_seconds())
+
+    current_minute = int(time.time() // 60)
+    pipe = connection.pipeline()
+    for minute in range(current_minute - RATE_WINDOW_MINUTES + 1, current_minute + 1):
+        pipe.get(COMPLETIONS_KEY.format(base=base, minute=minute))
+    completed = sum(int(c) for c in pipe.execute() if c)
+    window_seconds = (RATE_WINDOW_MINUTES - 1) * 60 + (time.time() % 60)
+    rate = completed / window_seconds
+
+    depth = sum(depths)
+    workers = Worker.count(connection=connection, queue=Queue(base, connection=connection))
+
+    if depth == 0:
+        drain = 0.0
+    elif rate > 0:
+        drain = depth / rate
+    elif workers > 0:
+        drain = depth * settings.ADMISSION_FALLBACK_JOB_SECONDS / workers
+    else:
+        drain = None  # nothing is consuming this queue
+
+    return {
+        "depth": depth,
+        "oldest_job_age_seconds": round(oldest_age, 1),
+        "workers": workers,
+        "completions_per_second": round(rate, 3),
+        "estimated_drain_seconds": round(drain, 1) if drain is not None else None,
+    }
+
+
+def snapshot(connection, max_age: float | None = None) -> dict:
+    """
+    Returns queue stats for every monitored queue. Results are cached in
+    process for `max_age` seconds (ADMISSION_CACHE_SECONDS by default).
+    """
+    max_age = settings.ADMISSION_CACHE_SECONDS if max_age is None else max_age
+    with _cache_lock:
+        cached = _cache.get("snapshot")
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+
+    stats = {"queues": {base: _queue_stats(connection, base) for base in MONITORED_QUEUES}}
+    stats["admission"] = decide(stats)
+
+    with _cache_lock:
+        _cache["snapshot"] = (time.monotonic(), stats)
+    return stats
+
+
+def _over_slo(queue: dict, factor: float = 1.0) -> bool:
+    drain = queue["estimated_drain_seconds"]
+    if drain is not None and drain > settings.ADMISSION_MAX_DRAIN_SECONDS * factor:
+        return True
+    return queue["oldest_job_age_seconds"] > settings.ADMISSION_MAX_WAIT_SECONDS * factor
+
+
+def _retry_after(queue: dict) -> int:
+    drain = queue["estimated_drain_seconds"]
+    if drain is None:
+        wait = queue["oldest_job_age_seconds"] - settings.ADMISSION_MAX_WAIT_SECONDS
+    else:
+        wait = drain - settings.ADMISSION_MAX_DRAIN_SECONDS
+    return min(max(math.ceil(wait), MIN_RETRY_AFTER), MAX_RETRY_AFTER)
+
+
+def decide(stats: dict) -> dict:
+    """
+    Admission decision from a snapshot.
+      - fast queue within SLO, heavy queue over it: degrade (deep checks run
+        in standard mode: no heavy jobs, fast-model report).
+      - fast queue over SLO: degrade if ADMISSION_OVERLOAD_ACTION is "degrade"
+        and the backlog is under twice the SLO, otherwise reject.
+    """
+    if not settings.ADMISSION_ENABLED:
+        return {"action": ACCEPT, "retry_after": None}
+
+    fast = stats["queues"]["analysis-fast"]
+    heavy = stats["queues"]["analysis-heavy"]
+
+    if _over_slo(fast):
+        if settings.ADMISSION_OVERLOAD_ACTION == DEGRADE and not _over_slo(fast, factor=2.0):
+            return {"action": DEGRADE, "retry_after": None}
+        return {"action": REJECT, "retry_after": _retry_after(fast)}
+
+    if _over_slo(heavy):
+        return {"action": DEGRADE, "retry_after": None}
+
+    return {"action": ACCEPT, "retry_after": None}
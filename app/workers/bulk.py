@@ -0,0 +1,186 @@
+"""
+Bulk analysis batches (POST /analysis/bulk).
+
+A batch is a set of checks screened together. Its state lives in Redis so
+any API instance can stream it and any worker can advance it:
+
+    batch:{id}              hash: session_id, total, concurrency
+    batch:{id}:items        hash: check_id -> {"input_hash", "records"}
+    batch:{id}:pending      list of checks waiting for a slot
+    batch:{id}:active       set of checks started (or already running)
+    batch:{id}:done         list of finished checks, in completion order
+    check:{id}:batches      set of batches waiting on a check
+
+At most `concurrency` checks of a batch run at once. When a check finishes
+(finalizer success or any job failure) `on_check_finished` moves it to
+`done` and starts the next pending checks. Every key expires
+BULK_BATCH_TTL_SECONDS after the batch last moved; the batch id is the
+resume token for streaming its results.
+"""
+
+import json
+import logging
+import time
+import uuid
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BATCH_KEY = "batch:{batch_id}"
+CHECK_BATCHES_KEY = "check:{check_id}:batches"
+
+# KEYS: pending, active, done. ARGV: finished check id (or ""), concurrency, ttl.
+# Moves the finished check to `done` (once), then fills free slots from `pending`.
+_RELEASE = """
+if ARGV[1] ~= '' then
+    if redis.call('SREM', KEYS[2], ARGV[1]) == 0 then
+        return {}
+    end
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+end
+local started = {}
+local limit = tonumber(ARGV[2])
+while redis.call('SCARD', KEYS[2]) < limit do
+    local check_id = redis.call('LPOP', KEYS[1])
+    if not check_id then
+        break
+    end
+    redis.call('SADD', KEYS[2], check_id)
+    table.insert(started, check_id)
+end
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return started
+"""
+
+
+def _key(batch_id: str, part: str | None = None) -> str:
+    key = BATCH_KEY.format(batch_id=batch_id)
+    return f"{key}:{part}" if part else key
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def cache_scope(batch_id: str) -> str:
+    """Cache namespace shared by every check of a batch (see tasks._run_cached_job)."""
+    return f"batch:{batch_id}"
+
+
+def create_batch(
+    connection,
+    session_id: str,
+    items: dict[str, dict],
+    to_start: list[str],
+    running: list[str],
+    finished: list[str],
+    concurrency: int,
+) -> tuple[str, list[str]]:
+    """
+    Registers a batch. `items` maps every check id to its input hash and
+    JSONL line numbers. `to_start` are new checks, `running` checks already
+    in progress elsewhere (they take a slot and are awaited) and `finished`
+    checks that are already done (streamed first). Returns the batch id and
+    the checks that may be started right away.
+    """
+    batch_id = str(uuid.uuid4())
+    ttl = settings.BULK_BATCH_TTL_SECONDS
+    pipe = connection.pipeline()
+    pipe.hset(_key(batch_id), mapping={
+        "session_id": session_id,
+        "total": len(items),
+        "concurrency": concurrency,
+        "created_at": int(time.time()),
+    })
+    pipe.hset(_key(batch_id, "items"), mapping={check_id: json.dumps(item) for check_id, item in items.items()})
+    if to_start:
+        pipe.rpush(_key(batch_id, "pending"), *to_start)
+    if running:
+        pipe.sadd(_key(batch_id, "active"), *running)
+    if finished:
+        pipe.rpush(_key(batch_id, "done"), *finished)
+    for check_id in [*to_start, *running]:
+        pipe.sadd(CHECK_BATCHES_KEY.format(check_id=check_id), batch_id)
+        pipe.expire(CHECK_BATCHES_KEY.format(check_id=check_id), ttl)
+    for part in (None, "items", "pending", "active", "done"):
+        pipe.expire(_key(batch_id, part), ttl)
+    pipe.execute()
+    return batch_id, release(connection, batch_id, concurrency)
+
+
+def release(connection, batch_id: str, concurrency: int, finished_check_id: str = "") -> list[str]:
+    """Marks `finished_check_id` done (if given) and returns the checks to start now."""
+    started = connection.eval(
+        _RELEASE, 3,
+        _key(batch_id, "pending"), _key(batch_id, "active"), _key(batch_id, "done"),
+        finished_check_id, concurrency, settings.BULK_BATCH_TTL_SECONDS,
+    )
+    return [_decode(check_id) for check_id in started]
+
+
+def get_batch(connection, batch_id: str) -> dict | None:
+    """The batch's metadata, or None if it does not exist (or expired)."""
+    meta = {_decode(k): _decode(v) for k, v in connection.hgetall(_key(batch_id)).items()}
+    if not meta:
+        return None
+    return {
+        "batch_id": batch_id,
+        "session_id": meta["session_id"],
+        "total": int(meta["total"]),
+        "concurrency": int(meta["concurrency"]),
+    }
+
+
+def read_done(connection, batch_id: str, start: int) -> list[tuple[str, dict]]:
+    """Finished checks from position `start` on, with their batch item."""
+    check_ids = [_decode(c) for c in connection.lrange(_key(batch_id, "done"), start, -1)]
+    if not check_ids:
+        return []
+    items = connection.hmget(_key(batch_id, "items"), check_ids)
+    return [(check_id, json.loads(item) if item else {}) for check_id, item in zip(check_ids, items)]
+
+
+def active_checks(connection, batch_id: str) -> list[str]:
+    return [_decode(c) for c in connection.smembers(_key(batch_id, "active"))]
+
+
+def enqueue_checks(batch: dict, check_ids: list[str]):
+    """
+    Enqueues the orchestrator for `check_ids` on the batch session's lane. If
+    the orchestrator fails, handle_job_failure still frees the check's slot.
+    """
+    from app.workers.queues import get_lane_queue
+    from app.workers.utils import handle_job_failure
+
+    if not check_ids:
+        return
+    queue = get_lane_queue("analysis-fast", batch["session_id"])
+    if queue is None:
+        logger.error(f"Could not start {len(check_ids)} checks of batch {batch['batch_id']}: Redis unavailable.")
+        return
+    for check_id in check_ids:
+        queue.enqueue(
+            "app.workers.orchestrator.start_full_analysis", check_id, batch_id=batch["batch_id"],
+            result_ttl=settings.JOB_RESULT_TTL_SECONDS, failure_ttl=settings.JOB_FAILURE_TTL_SECONDS,
+            on_failure=handle_job_failure,
+        )
+
+
+def finish_check(connection, batch: dict, check_id: str) -> list[str]:
+    """Marks `check_id` done in `batch` and starts the next pending checks. Idempotent."""
+    started = release(connection, batch["batch_id"], batch["concurrency"], check_id)
+    enqueue_checks(batch, started)
+    return started
+
+
+def on_check_finished(connection, check_id: str):
+    """Worker hook: advances every batch waiting on `check_id`."""
+    key = CHECK_BATCHES_KEY.format(check_id=check_id)
+    for batch_id in connection.smembers(key):
+        batch = get_batch(connection, _decode(batch_id))
+        if batch:
+            finish_check(connection, batch, check_id)
+    connection.delete(key)
@@ -0,0 +1,113 @@
+"""
+Per-session fair scheduling on top of RQ.
+
+Every analysis is enqueued into a lane of its base queue instead of the shared
+FIFO list:
+  - `<base>:priority`    checks started from the browser extension
+  - `<base>:s:<digest>`  one sub-queue per session (digest of the session id)
+
+Lanes that hold jobs are tracked in the Redis set `fairq:<base>:lanes`.
+Workers drain the priority lane first and then visit session lanes
+round-robin, so one session submitting many checks only delays itself.
+"""
+
+import hashlib
+import logging
+
+from rq.queue import Queue
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_SUFFIX = "priority"
+SESSION_MARKER = ":s:"
+LANES_KEY = "fairq:{base}:lanes"
+
+# Drops an empty lane from the active set, atomically with the emptiness check
+# so a concurrent push (RPUSH then SADD) can never leave a lane orphaned.
+_RELEASE_LANE = """
+if redis.call('LLEN', KEYS[2]) == 0 then
+    return redis.call('SREM', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def base_name(queue_name: str) -> str:
+    """'analysis-fast:s:ab12' -> 'analysis-fast'. Plain queue names are returned as is."""
+    if SESSION_MARKER in queue_name:
+        return queue_name.split(SESSION_MARKER, 1)[0]
+    if queue_name.endswith(f":{PRIORITY_SUFFIX}"):
+        return queue_name[: -len(PRIORITY_SUFFIX) - 1]
+    return queue_name
+
+
+def priority_lane_name(base: str) -> str:
+    return f"{base}:{PRIORITY_SUFFIX}"
+
+
+def lane_name(base: str, session_id: str | None, priority: bool = False) -> str:
+    """Queue name for a check from `session_id` on `base`."""
+    if priority:
+        return priority_lane_name(base)
+    if not session_id:
+        return base
+    digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:16]
+    return f"{base}{SESSION_MARKER}{digest}"
+
+
+class FairQueue(Queue):
+    """
+    Queue that registers its session lane as active whenever a job id is
+    pushed, including dependents released by RQ after their parent finishes.
+    """
+
+    def push_job_id(self, job_id: str, pipeline=None, at_front: bool = False):
+        super().push_job_id(job_id, pipeline=pipeline, at_front=at_front)
+        if SESSION_MARKER in self.name:
+            connection = pipeline if pipeline is not None else self.connection
+            connection.sadd(LANES_KEY.format(base=base_name(self.name)), self.name)
+
+
+def get_lane_queue(base: str, session_id: str | None, connection, priority: bool = False, **kwargs) -> FairQueue:
+    return FairQueue(lane_name(base, session_id, priority), connection=connection, **kwargs)
+
+
+class LaneScheduler:
+    """
+    Builds the dequeue order for a worker: for each base queue (in the
+    worker's priority order) its priority lane, then its session lanes and the
+    base queue itself rotated round-robin after the last lane served.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._release = connection.register_script(_RELEASE_LANE)
+        self._last_served: dict[str, str] = {}
+
+    def active_lanes(self, base: str) -> list[str]:
+        members = self.connection.smembers(LANES_KEY.format(base=base))
+        return sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+
+    def order(self, bases: list[str]) -> list[str]:
+        ordered = []
+        for base in bases:
+            ring = [base] + self.active_lanes(base)
+            last = self._last_served.get(base)
+            if last in ring:
+                start = ring.index(last) + 1
+                ring = ring[start:] + ring[:start]
+            ordered.append(priority_lane_name(base))
+            ordered.extend(ring)
+        return ordered
+
+    def served(self, queue_name: str):
+        """Records the lane a job was just taken from and drops it if now empty."""
+        base = base_name(queue_name)
+        if queue_name == priority_lane_name(base):
+            return
+        self._last_served[base] = queue_name
+        if SESSION_MARKER in queue_name:
+            self._release(
+                keys=[LANES_KEY.format(base=base), Queue.redis_queue_namespace_prefix + queue_name],
+                args=[queue_name],
+            )
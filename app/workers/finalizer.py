@@ -2,18 +2,23 @@ import uuid
 import json
 import logging
 import rq
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.db.models import FraudCheck, JobStatus
-from app.services import gemini_analysis
-from app.workers.scoring import calculate_job_risk_score, calculate_weighted_score, compute_outcome
+from app.services import gemini_analysis, precheck
+from app.workers import local_report, modes
+from app.workers.job_graph import fetch_dependency_results
+from app.workers.scoring import calculate_weighted_score, score_steps
 
 logger = logging.getLogger(__name__)
 
 def job_aggregate_and_conclude(check_id_arg):
     """
     Collects the full AnalysisStep results from all dependencies, calculates
-    structured risk scores, calls the final AI model for synthesis, and saves
-    the complete report.
+    structured risk scores, writes the report the way the check's analysis
+    mode asks for (advanced model, fast model or templates), and saves it.
+    Unambiguous checks get a template report instead of the LLM's
+    (app/workers/local_report.py).
     """
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -25,45 +30,65 @@ def job_aggregate_and_conclude(check_id_arg):
     db = SessionLocal()
     try:
         current_job = rq.get_current_job()
-        dependencies = current_job.fetch_dependencies()
+        all_job_steps = fetch_dependency_results(current_job)
 
-        all_job_steps = [dep.result for dep in dependencies]
+        check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
+        if not check:
+            raise Exception(f"FraudCheck ID {check_id} not found in finalizer.")
 
-        # Calculate structured risk scores for each job
-        job_scores = {}
-        for step in all_job_steps:
-            if not isinstance(step, dict):
-                continue
-            job_name = step.get("job_name", "")
-            status = step.get("status", "ERROR")
-            result = step.get("result", {})
-            score_data = calculate_job_risk_score(job_name, result, status)
-            step["risk_score"] = score_data["risk_score"]
-            step["confidence"] = score_data["confidence"]
-            step["outcome"] = compute_outcome(step)
-            if job_name:
-                job_scores[job_name] = score_data
+        # Keep steps the orchestrator recorded itself (historical cross-check,
+        # jobs skipped at plan time) unless a dependency produced the same step.
+        dependency_job_names = {step.get("job_name") for step in all_job_steps if isinstance(step, dict)}
+        recorded_steps = [
+            step for step in (check.analysis_steps or [])
+            if isinstance(step, dict) and step.get("job_name") not in dependency_job_names
+        ]
+        all_job_steps = recorded_steps + all_job_steps
+
+        # Calculate structured risk scores for each job. Recorded steps are
+        # context for the report, not scored signals.
+        job_scores = score_steps(all_job_steps, dependency_job_names)
 
         # Calculate weighted aggregate score
         scoring_summary = calculate_weighted_score(job_scores)
 
-        check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
-        if not check:
-            raise Exception(f"FraudCheck ID {check_id} not found in finalizer.")
-
         full_context = {
             "user_provided_data": check.input_data,
             "analysis_steps": all_job_steps,
             "scoring_summary": scoring_summary,
         }
 
-        synthesis_report = gemini_analysis.synthesize_advanced_report(full_context)
+        mode = check.mode or modes.DEEP
+        synthesis = modes.get_mode(mode)["synthesis"]
+        # Clearly low or clearly high checks don't need the LLM to write the report.
+        outcome = None
+        if synthesis is not None and settings.LOCAL_SYNTHESIS_ENABLED:
+            outcome = local_report.unambiguous_outcome(all_job_steps, scoring_summary)
+        if synthesis is None:
+            synthesis_report = local_report.build_local_report(all_job_steps, scoring_summary, local_report.QUICK)
+        elif outcome:
+            logger.info(f"Check {check_id} is clearly {outcome} risk; writing the report locally.")
+            synthesis_report = local_report.build_local_report(all_job_steps, scoring_summary, outcome)
+        elif synthesis == "fast":
+            synthesis_report = gemini_analysis.synthesize_simple_report(full_context)
+        else:
+            synthesis_report = gemini_analysis.synthesize_advanced_report(full_context)
 
         check.analysis_steps = all_job_steps
         check.final_report = synthesis_report
         check.status = JobStatus.COMPLETED if "error" not in synthesis_report else JobStatus.FAILED
         db.commit()
 
+        # Quick checks only echo what the indicators already hold.
+        if check.status == JobStatus.COMPLETED and mode != modes.QUICK:
+            try:
+                precheck.record_check(
+                    current_job.connection, str(check_id), check.input_data or {}, all_job_steps,
+                    scoring_summary["calculated_risk_score"],
+                )
+            except Exception as e:
+                logger.warning(f"Could not record precheck indicators for {check_id} (non-blocking): {e}")
+
         logger.info(
             "[finalizer:%s] PAYLOAD SENT TO FRONTEND\n"
             "=== FINAL REPORT ===\n%s\n"
@@ -73,7 +98,7 @@ def job_aggregate_and_conclude(check_id_arg):
             len(all_job_steps),
             json.dumps(all_job_steps, ensure_ascii=False, indent=2),
         )
-        logger.info(f"Completed fraud check for job_id: {check_id}.")
+        logger.info(f"Completed fraud check for job_id: {check_id} ({mode} mode).")
         return synthesis_report
 
     except Exception as e:
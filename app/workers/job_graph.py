@@ -0,0 +1,95 @@
+"""
+Round-trip-efficient RQ helpers for the analysis DAG.
+
+`JobGraph` builds every job of a check locally and enqueues the whole graph
+in one MULTI/EXEC. Plain `Queue.enqueue` costs several round-trips per job
+(and a WATCH/retry loop for each dependent job); here the graph is a single
+round-trip and workers never see half of it.
+
+`fetch_dependency_results` reads the latest result of each dependency of a
+job in one pipelined round-trip, instead of one fetch per dependency.
+"""
+
+import logging
+
+from rq import Queue
+from rq.job import Job, JobStatus
+from rq.results import Result
+
+logger = logging.getLogger(__name__)
+
+
+class JobGraph:
+    """
+    A set of new jobs, possibly across queues, enqueued atomically.
+    Dependencies must be jobs added to the same graph earlier: since none of
+    them can have run before the graph is committed, dependent jobs are
+    registered as deferred without checking their dependencies' status.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.entries: list[tuple[Queue, Job]] = []
+        self._job_ids: set[str] = set()
+
+    def add(self, queue: Queue, func, *args, depends_on=None, job_timeout=None, **options) -> Job:
+        """Adds `func(*args)` to `queue`. Accepts the usual enqueue options (result_ttl, on_success, ...)."""
+        dependencies = [] if depends_on is None else (depends_on if isinstance(depends_on, list) else [depends_on])
+        for dependency in dependencies:
+            if not isinstance(dependency, Job) or dependency.id not in self._job_ids:
+                raise ValueError("JobGraph dependencies must be jobs added to the same graph.")
+
+        job = queue.create_job(
+            func,
+            args=args,
+            timeout=job_timeout,
+            depends_on=dependencies or None,
+            status=JobStatus.DEFERRED if dependencies else JobStatus.QUEUED,
+            **options,
+        )
+        job.origin = queue.name
+        self.entries.append((queue, job))
+        self._job_ids.add(job.id)
+        return job
+
+    def enqueue(self) -> list[Job]:
+        """Commits every job in one transaction. Returns the jobs in insertion order."""
+        with self.connection.pipeline() as pipe:
+            for queue in {queue.name: queue for queue, _ in self.entries}.values():
+                pipe.sadd(queue.redis_queues_keys, queue.key)
+            for queue, job in self.entries:
+                if job._dependency_ids:
+                    job.save(pipeline=pipe)
+                    job.register_dependency(pipeline=pipe)
+                else:
+                    queue._enqueue_job(job, pipeline=pipe)
+            pipe.execute()
+        return [job for _, job in self.entries]
+
+
+def fetch_dependency_results(job: Job) -> list:
+    """
+    Return values of `job`'s dependencies, in dependency order, read in one
+    round-trip. A dependency with no successful result yields None.
+    """
+    dependency_ids = list(job._dependency_ids)
+    if not dependency_ids:
+        return []
+
+    pipe = job.connection.pipeline(transaction=False)
+    for dependency_id in dependency_ids:
+        pipe.xrevrange(Result.get_key(dependency_id), "+", "-", count=1)
+    responses = pipe.execute()
+
+    results = []
+    for dependency_id, response in zip(dependency_ids, responses):
+        if not response:
+            logger.warning(f"No result stored for dependency {dependency_id} of job {job.id}")
+            results.append(None)
+            continue
+        result_id, payload = response[0]
+        result = Result.restore(
+            dependency_id, result_id.decode(), payload, connection=job.connection, serializer=job.serializer
+        )
+        results.append(result.return_value if result.type == Result.Type.SUCCESSFUL else None)
+    return results
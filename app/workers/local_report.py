@@ -0,0 +1,321 @@
+"""
+Template-based final reports: every quick-mode check, and standard or deep
+checks whose outcome is not in doubt.
+
+The finalizer uses it instead of the synthesis LLM when the weighted risk
+score is clearly low or clearly high, no step failed and enough steps produced
+evidence (see `unambiguous_outcome`). Everything else still goes to the LLM,
+which can weigh contradictions and judge where reused photos or text were
+found. Reports written here carry `"synthesized_by": "local"`;
+`python -m benchmarks.report_parity` compares them with the LLM's reports on
+stored checks.
+"""
+
+from app.core.config import settings
+from app.workers.scoring import HIGH_RISK_THRESHOLD, NEW_DOMAIN_DAYS, WEIGHTS
+
+LOW = "low"
+HIGH = "high"
+# Quick mode: no synthesis LLM whatever the score.
+QUICK = "quick"
+
+# Their matches can be legitimate marketing on other rental platforms; only
+# the LLM judges the URLs, so they can't make a check clearly high on their own.
+INTERPRETED_JOBS = frozenset({"reverse_image_search", "description_plagiarism_check"})
+
+THEMES_ES = {
+    # communication_analysis
+    "Risky Payment Request": "El anfitrión pide un pago por un método arriesgado o irreversible.",
+    "High-Pressure Tactics": "El anfitrión presiona para cerrar la reserva o pagar cuanto antes.",
+    "Refusal to View": "El anfitrión evita que se visite el inmueble antes de pagar.",
+    "Evasive Answers": "El anfitrión responde de forma evasiva a preguntas concretas.",
+    "Phishing Attempt": "La conversación intenta obtener datos personales o bancarios.",
+    # description_analysis
+    "Urgency Pressure": "La descripción del anuncio mete prisa para reservar.",
+    "Unprofessional Language": "La descripción del anuncio usa un lenguaje poco profesional.",
+    "Vague Details": "La descripción del anuncio es vaga y apenas da detalles del inmueble.",
+    "Unrealistic Promises": "La descripción del anuncio hace promesas poco realistas.",
+    # host_profile_check (rule-based, see tasks.job_host_profile_check)
+    "Host profile is not verified.": "El perfil del anfitrión no está verificado.",
+    "Host account is very new (created recently).": "La cuenta del anfitrión es muy reciente.",
+}
+
+COMPOUND_RULES_ES = {
+    "stolen_images_plus_new_host": "Fotos reutilizadas junto a un anfitrión nuevo o sin verificar.",
+    "low_price_plus_pressure": "Precio sospechosamente bajo junto a presión para pagar.",
+    "new_domain_plus_plagiarism": "Dominio reciente con una descripción copiada de otros sitios.",
+    "stolen_images_plus_low_price": "Fotos reutilizadas y precio sospechosamente bajo: un patrón típico de estafa.",
+    "iban_mismatch_plus_low_price": "IBAN extranjero y precio sospechosamente bajo: un patrón típico de estafa por adelantado.",
+    "iban_mismatch_plus_pressure": "IBAN extranjero junto a presión para pagar.",
+    "verified_safe": "Anfitrión verificado sin antecedentes negativos.",
+}
+
+REVIEW_QUALITY = {"Positive": 75, "Neutral": 60, "Mixed": 50, "Negative": 30}
+
+
+def _count(n: int, singular: str, plural: str) -> str:
+    return f"{n} {singular if n == 1 else plural}"
+
+
+def _themes(result: dict) -> list[str]:
+    return [THEMES_ES.get(theme, theme) for theme in result.get("themes", [])]
+
+
+# Each template returns (risk findings, positive finding or None) for a step result.
+
+def _reverse_image_search(result: dict):
+    reused = sum(1 for item in result.get("reverse_search_results", []) if isinstance(item, dict) and item.get("is_reused"))
+    if reused:
+        return [f"{_count(reused, 'imagen del anuncio aparece publicada', 'imágenes del anuncio aparecen publicadas')} en otros sitios web."], None
+    return [], "Las imágenes del anuncio no aparecen publicadas en otros sitios web."
+
+
+def _ai_image_detection(result: dict):
+    suspect = sum(
+        1 for item in result.get("ai_detection_results", [])
+        if isinstance(item, dict) and item.get("verdict") in ("Possibly AI", "Likely AI")
+    )
+    if suspect:
+        return [f"{_count(suspect, 'imagen muestra', 'imágenes muestran')} señales de haber sido generadas con IA."], None
+    return [], "Las imágenes analizadas no muestran señales de haber sido generadas con IA."
+
+
+def _url_forensics(result: dict):
+    archive_age = (result.get("archive_check") or {}).get("domain_age_days")
+    if (result.get("blacklist_check") or {}).get("is_blacklisted"):
+        return ["La URL del anuncio figura en las listas de sitios peligrosos de Google Safe Browsing."], None
+    if (result.get("domain_age") or {}).get("is_new"):
+        return [f"El dominio del anuncio se registró hace menos de {NEW_DOMAIN_DAYS} días."], None
+    if archive_age is not None and archive_age < NEW_DOMAIN_DAYS:
+        return [f"El Archivo de Internet vio el dominio del anuncio por primera vez hace {archive_age} días."], None
+    return [], "El dominio del anuncio no es reciente ni figura en listas de sitios peligrosos."
+
+
+def _description_plagiarism_check(result: dict):
+    if result.get("plagiarized"):
+        found = len(result.get("found_urls", []))
+        return [f"La descripción del anuncio aparece en {_count(found, 'sitio web más', 'sitios web más')}."], None
+    return [], "La descripción del anuncio no aparece copiada en otros sitios web."
+
+
+def _reputation_check(result: dict):
+    if result.get("search_results_text"):
+        return ["Hay resultados públicos asociados al contacto del anfitrión que conviene revisar."], None
+    return [], "No hay resultados públicos asociados al contacto del anfitrión."
+
+
+def _iban_country_check(result: dict):
+    if result.get("is_suspicious"):
+        return [
+            f"El IBAN facilitado es de {m['iban_country']}, pero el inmueble está en {m['property_country']}."
+            for m in result.get("mismatches", [])
+        ], None
+    return [], "El IBAN facilitado es del mismo país que el inmueble."
+
+
+def _price_sanity_check(result: dict):
+    verdict = result.get("verdict")
+    if verdict == "Suspiciously Low":
+        return ["El precio es sospechosamente bajo para la zona."], None
+    if verdict == "High":
+        return ["El precio está por encima de lo habitual en la zona."], None
+    return [], "El precio está en línea con el mercado de la zona."
+
+
+def _address_cross_platform_search(result: dict):
+    if result.get("verdict") == "suspicious":
+        return ["La dirección aparece en otros anuncios con datos que no coinciden."], None
+    return [], "La dirección aparece de forma coherente en otras plataformas."
+
+
+def _communication_analysis(result: dict):
+    return _themes(result), "La conversación con el anfitrión no muestra tácticas de fraude."
+
+
+def _description_analysis(result: dict):
+    return _themes(result), "La descripción del anuncio no muestra señales de alerta."
+
+
+def _host_profile_check(result: dict):
+    return _themes(result), "El perfil del anfitrión no muestra señales de alerta."
+
+
+def _listing_reviews_analysis(result: dict):
+    positive = "Las reseñas de huéspedes anteriores son positivas." if result.get("sentiment") == "Positive" else None
+    return [], positive
+
+
+def _local_indicators(result: dict):
+    return [signal["detail"] for signal in result.get("signals", [])], None
+
+
+def _historical_cross_check(result: dict):
+    warnings = len(result.get("warnings", []))
+    return [f"El contacto o la dirección coinciden con {_count(warnings, 'análisis anterior', 'análisis anteriores')} de alto riesgo."], None
+
+
+TEMPLATES = {
+    "reverse_image_search": _reverse_image_search,
+    "ai_image_detection": _ai_image_detection,
+    "url_forensics": _url_forensics,
+    "description_plagiarism_check": _description_plagiarism_check,
+    "reputation_check": _reputation_check,
+    "iban_country_check": _iban_country_check,
+    "price_sanity_check": _price_sanity_check,
+    "address_cross_platform_search": _address_cross_platform_search,
+    "communication_analysis": _communication_analysis,
+    "description_analysis": _description_analysis,
+    "host_profile_check": _host_profile_check,
+    "listing_reviews_analysis": _listing_reviews_analysis,
+    "local_indicators": _local_indicators,
+    "historical_cross_check": _historical_cross_check,
+}
+
+
+def _completed(all_job_steps: list) -> list[dict]:
+    return [step for step in all_job_steps if isinstance(step, dict) and step.get("status") == "COMPLETED"]
+
+
+def _has_historical_warnings(all_job_steps: list) -> bool:
+    return any(
+        step.get("job_name") == "historical_cross_check" and (step.get("result") or {}).get("warnings")
+        for step in _completed(all_job_steps)
+    )
+
+
+def step_flags(step: dict) -> list[dict]:
+    """Report flags for one scored, completed step."""
+    template = TEMPLATES.get(step.get("job_name"))
+    if template is None:
+        return []
+    findings, positive = template(step.get("result") or {})
+    risk = step.get("risk_score", 0)
+    if step.get("job_name") == "historical_cross_check":
+        return [{"category": "High", "description": finding} for finding in findings]
+    if findings and risk > 0:
+        category = "High" if risk >= HIGH_RISK_THRESHOLD else "Medium"
+        return [{"category": category, "description": finding} for finding in findings]
+    if positive and step.get("confidence"):
+        return [{"category": "Positive", "description": positive}]
+    return []
+
+
+def unambiguous_outcome(all_job_steps: list, scoring_summary: dict) -> str | None:
+    """
+    LOW or HIGH when a template report can stand in for the synthesis LLM,
+    None when the check needs it. Expects steps already run through
+    score_steps.
+
+    Clearly low: the score is at most LOCAL_SYNTHESIS_LOW_RISK and no step
+    raised even a medium signal. Clearly high: the score is at least
+    LOCAL_SYNTHESIS_HIGH_RISK and at least one high signal needs no
+    interpretation (INTERPRETED_JOBS). Either way no step may have failed and
+    at least LOCAL_SYNTHESIS_MIN_EVIDENCE weighted steps must have produced
+    evidence, otherwise the LLM moderates the score for missing data.
+    """
+    if any(isinstance(step, dict) and step.get("status") == "ERROR" for step in all_job_steps):
+        return None
+    evidence = [
+        step for step in _completed(all_job_steps)
+        if step.get("job_name") in WEIGHTS and step.get("confidence")
+    ]
+    if len(evidence) < settings.LOCAL_SYNTHESIS_MIN_EVIDENCE:
+        return None
+
+    risk_score = scoring_summary["calculated_risk_score"]
+    if risk_score <= settings.LOCAL_SYNTHESIS_LOW_RISK:
+        if any(step.get("risk_score", 0) >= 30 for step in evidence) or _has_historical_warnings(all_job_steps):
+            return None
+        return LOW
+    if risk_score >= settings.LOCAL_SYNTHESIS_HIGH_RISK:
+        if set(scoring_summary.get("high_risk_signals", [])) - INTERPRETED_JOBS:
+            return HIGH
+    return None
+
+
+def _suggested_actions(outcome: str, steps: list[dict]) -> list[str]:
+    if outcome == QUICK:
+        return [
+            "Solicita un análisis completo antes de reservar.",
+            "No pagues por transferencia bancaria ni fuera de la plataforma.",
+        ]
+    if outcome == LOW:
+        return [
+            "Paga siempre a través de la plataforma de reserva, nunca por transferencia directa.",
+            "Guarda por escrito las condiciones acordadas con el anfitrión antes de pagar.",
+        ]
+    flagged = {step.get("job_name") for step in steps if step.get("risk_score", 0) >= 30}
+    actions = ["No realices ningún pago ni transferencia por adelantado."]
+    if "iban_country_check" in flagged:
+        actions.append("No envíes dinero a cuentas bancarias de un país distinto al del inmueble.")
+    if flagged & {"reverse_image_search", "ai_image_detection", "host_profile_check"}:
+        actions.append("Pide una visita en persona o una videollamada en directo desde el inmueble.")
+    actions.append("Denuncia el anuncio en la plataforma donde lo encontraste.")
+    return actions[:3]
+
+
+def _quick_summary(risk_score: int) -> str:
+    if risk_score >= 60:
+        return "El análisis rápido encontró señales de alto riesgo. No realices ningún pago sin un análisis completo."
+    if risk_score >= 30:
+        return "El análisis rápido encontró algunas señales de riesgo. Conviene hacer un análisis completo."
+    return "El análisis rápido no encontró señales de riesgo en los datos disponibles."
+
+
+def build_local_report(all_job_steps: list, scoring_summary: dict, outcome: str) -> dict:
+    """
+    Final report with the synthesized report's fields, written from templates
+    for a quick-mode check (QUICK) or one `unambiguous_outcome` classified as
+    LOW or HIGH.
+    """
+    risk_score = scoring_summary["calculated_risk_score"]
+    steps = _completed(all_job_steps)
+    flags = [flag for step in steps for flag in step_flags(step)]
+    risks = [flag for flag in flags if flag["category"] != "Positive"]
+    positives = [flag for flag in flags if flag["category"] == "Positive"]
+    skipped = sum(1 for step in all_job_steps if isinstance(step, dict) and step.get("status") == "SKIPPED")
+    evidence = sum(1 for step in steps if step.get("job_name") in WEIGHTS and step.get("confidence"))
+
+    if outcome == QUICK:
+        summary = _quick_summary(risk_score)
+    elif outcome == HIGH:
+        # Lead with a finding that needs no interpretation.
+        ordered = sorted(steps, key=lambda step: step.get("job_name") in INTERPRETED_JOBS)
+        high = [flag["description"] for step in ordered for flag in step_flags(step) if flag["category"] == "High"] \
+            or [flag["description"] for flag in risks]
+        summary = (
+            f"Se encontraron {_count(len(high), 'señal grave', 'señales graves')} de fraude. {high[0]} "
+            "No realices ningún pago ni compartas datos personales."
+        )
+    else:
+        summary = (
+            f"El anuncio superó {_count(evidence, 'comprobación', 'comprobaciones')} sin señales de fraude. "
+            "Aun así, paga siempre a través de la plataforma."
+        )
+
+    sections = [summary]
+    if outcome == QUICK:
+        sections.append("Este análisis solo usa comprobaciones locales y análisis anteriores; no consulta servicios externos.")
+    sections += [
+        f"**Puntuación de riesgo calculada:** {risk_score}/100, a partir de "
+        f"{_count(evidence, 'comprobación con resultado', 'comprobaciones con resultado')}"
+        + (f" ({_count(skipped, 'omitida', 'omitidas')})." if skipped else "."),
+    ]
+    if risks:
+        sections.append("### Señales de riesgo\n" + "\n".join(f"- {flag['description']}" for flag in risks))
+    compound = [COMPOUND_RULES_ES[name] for name in scoring_summary.get("compound_rules_triggered", []) if name in COMPOUND_RULES_ES]
+    if compound:
+        sections.append("### Combinaciones de señales\n" + "\n".join(f"- {text}" for text in compound))
+    if positives:
+        sections.append("### Señales positivas\n" + "\n".join(f"- {flag['description']}" for flag in positives))
+
+    reviews = next((step.get("result") or {} for step in steps if step.get("job_name") == "listing_reviews_analysis"), {})
+    return {
+        "authenticity_score": 100 - risk_score,
+        "quality_score": REVIEW_QUALITY.get(reviews.get("sentiment"), 50),
+        "sidebar_summary": summary,
+        "explanation": "\n\n".join(sections),
+        "suggested_actions": _suggested_actions(outcome, steps),
+        "flags": flags,
+        "synthesized_by": "local",
+    }
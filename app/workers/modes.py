@@ -0,0 +1,71 @@
+"""
+Analysis modes: which jobs a check runs, how long each may take, where they
+are queued and how the final report is written.
+
+    quick     local heuristics and indicators earlier checks left in Redis
+              (app/services/precheck.py); no provider calls and no synthesis
+              LLM, the report is built from the weighted score.
+    standard  every job except the heavy-queue ones (reverse image search
+              and AI image detection); the report is synthesized by the
+              fast model.
+    deep      every job; the report is synthesized by the advanced model with
+              thinking. This is what every check ran before modes existed.
+
+The mode is stored on the check (fraud_checks.mode) so cost and latency can be
+reported per mode. When admission control degrades a check under load it runs
+in the lighter mode `degraded_mode` gives, and that is the mode stored. This
+module is imported by the API: keep it free of worker and SDK imports.
+"""
+
+QUICK = "quick"
+STANDARD = "standard"
+DEEP = "deep"
+
+# Jobs whose result feeds the score. Every set must include the jobs its
+# members depend on (geocode for the Layer 2 jobs).
+STANDARD_JOBS = frozenset({
+    "geocode",
+    "url_forensics",
+    "description_plagiarism_check",
+    "description_analysis",
+    "communication_analysis",
+    "listing_reviews_analysis",
+    "price_sanity_check",
+    "host_profile_check",
+    "reputation_check",
+    "iban_country_check",
+    "address_cross_platform_search",
+})
+
+ANALYSIS_MODES = {
+    QUICK: {
+        "jobs": frozenset({"host_profile_check", "local_indicators"}),
+        "job_timeout": 20,
+        "synthesis": None,
+    },
+    STANDARD: {
+        "jobs": STANDARD_JOBS,
+        "job_timeout": 60,
+        "synthesis": "fast",
+    },
+    DEEP: {
+        "jobs": STANDARD_JOBS | {"reverse_image_search", "ai_image_detection"},
+        # RQ's default (180 s); the heavy-queue jobs keep their own 300 s.
+        "job_timeout": None,
+        "synthesis": "advanced",
+    },
+}
+
+
+# What each mode drops to under load: deep loses the heavy-queue jobs and the
+# advanced model; standard and quick are already light.
+DEGRADED_MODES = {DEEP: STANDARD}
+
+
+def degraded_mode(name: str) -> str:
+    return DEGRADED_MODES.get(name, name)
+
+
+def get_mode(name: str | None) -> dict:
+    """The mode's settings; checks created before modes existed are deep."""
+    return ANALYSIS_MODES.get(name or DEEP, ANALYSIS_MODES[DEEP])
@@ -0,0 +1,336 @@
+"""
+Offline batch analysis: runs the analysis jobs and the finalizer's scoring
+over a corpus of listings on one machine, with no API, RQ or Postgres.
+
+Usage:
+    python -m app.workers.offline listings.jsonl -o results.jsonl
+    python -m app.workers.offline listings.csv -o results.jsonl --processes 8 --parquet results.parquet
+
+Input is JSONL or CSV with ExtractedData fields. CSV cells holding a JSON
+list or object (image_urls, reviews, host_profile) are decoded. An optional
+"id" field names each record, otherwise its line number does.
+
+Each worker process keeps the checks it is analyzing in its own SQLite file
+under --workdir, where the jobs read them as they would from Postgres. All
+processes share one on-disk result cache there (cache.sqlite3), so re-runs
+and repeated inputs don't call the providers again. There is no Gemini
+synthesis: each result carries the steps and the finalizer's weighted score.
+
+Results are appended to the output as they finish. Re-running with the same
+output skips records that already completed. Provider credentials come from
+the usual settings (.env). Gemini rate limits, circuit breakers and hedging
+use Redis when it is reachable and fail open when it is not.
+
+This module must not import the app at top level: worker processes point
+DATABASE_URL at their SQLite file before the settings are loaded.
+"""
+
+import argparse
+import concurrent.futures
+import contextvars
+import csv
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Same DAG as orchestrator.build_analysis_graph: layer 2 needs geocode's result.
+LAYER_1 = (
+    "geocode",
+    "url_forensics",
+    "description_plagiarism_check",
+    "description_analysis",
+    "communication_analysis",
+    "listing_reviews_analysis",
+    "price_sanity_check",
+    "host_profile_check",
+    "reverse_image_search",
+    "ai_image_detection",
+)
+LAYER_2 = ("reputation_check", "iban_country_check", "address_cross_platform_search")
+
+CACHE_FILE = "cache.sqlite3"
+# Statuses that are not retried on resume.
+FINAL_STATUSES = {"COMPLETED", "INVALID"}
+
+
+class DiskCache:
+    """Job result cache in a SQLite file, shared by processes and threads."""
+
+    def __init__(self, path: Path):
+        from app.workers.serialization import decode, encode
+
+        self._encode, self._decode = encode, decode
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, written_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def set(self, key: str, value):
+        blob = self._encode(value)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, blob, time.time()))
+            self._conn.commit()
+
+
+@dataclass
+class LocalRun:
+    """What tasks.local_run expects: finished steps by job name and a result cache."""
+    cache: DiskCache
+    results: dict = field(default_factory=dict)
+
+
+# --- Worker process ---
+
+_cache: DiskCache | None = None
+_job_threads = 4
+
+
+def _init_worker(workdir: str, job_threads: int):
+    global _cache, _job_threads
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(workdir) / f'checks-{os.getpid()}.sqlite3'}"
+    from app.db.session import Base, engine
+    from app.db import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(engine)
+    _cache = DiskCache(Path(workdir) / CACHE_FILE)
+    _job_threads = job_threads
+
+
+def _run_jobs(check_id: str, input_data: dict) -> tuple[list[dict], dict]:
+    """Runs the check's jobs in dependency order. Returns the steps the finalizer would see and its weighted score."""
+    from app.workers import tasks
+    from app.workers.scoring import calculate_weighted_score, score_steps
+
+    planned_skips = tasks.plan_skips(input_data)
+    run = LocalRun(cache=_cache)
+    token = tasks.local_run.set(run)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=_job_threads) as executor:
+            for layer in (LAYER_1, LAYER_2):
+                futures = {
+                    name: executor.submit(contextvars.copy_context().run, getattr(tasks, f"job_{name}"), check_id)
+                    for name in layer if name not in planned_skips
+                }
+                for name, future in futures.items():
+                    run.results[name] = future.result()
+    finally:
+        tasks.local_run.reset(token)
+
+    leaf_steps = [step for name, step in run.results.items() if name != "geocode"]
+    steps = list(planned_skips.values()) + leaf_steps
+    job_scores = score_steps(steps, {step.get("job_name") for step in leaf_steps})
+    return steps, calculate_weighted_score(job_scores)
+
+
+def analyze_record(record_id: str, record: dict) -> dict:
+    """Analyzes one listing record. Never raises: failures become a FAILED row."""
+    from pydantic import ValidationError
+    from app.db import models
+    from app.db.session import SessionLocal
+    from app.schemas import ExtractedData
+    from app.utils.helpers import generate_hash
+
+    started = time.perf_counter()
+    try:
+        input_data = ExtractedData.model_validate(record).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        return {"record_id": record_id, "status": "INVALID", "error": e.errors(include_url=False, include_context=False)}
+
+    check_id = uuid.uuid4()
+    row = {"record_id": record_id, "input_hash": generate_hash(input_data)}
+    db = SessionLocal()
+    try:
+        db.add(models.FraudCheck(
+            id=check_id,
+            input_hash=check_id.hex,
+            input_data=input_data,
+            session_id="offline",
+            status=models.JobStatus.IN_PROGRESS,
+        ))
+        db.commit()
+        steps, scoring_summary = _run_jobs(str(check_id), input_data)
+        row.update(
+            status="COMPLETED",
+            calculated_risk_score=scoring_summary.get("calculated_risk_score"),
+            scoring_summary=scoring_summary,
+            analysis_steps=steps,
+        )
+    except Exception as e:
+        row.update(status="FAILED", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc(limit=5))
+    finally:
+        db.query(models.FraudCheck).filter(models.FraudCheck.id == check_id).delete()
+        db.commit()
+        db.close()
+    row["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+# --- Input and output ---
+
+def _decode_cell(value: str):
+    value = value.strip()
+    if value[:1] in "[{":
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            pass
+    return value
+
+
+def read_records(path: Path):
+    """Yields (record_id, record) from a JSONL or CSV file. Blank rows and cells are dropped."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                record = {key: _decode_cell(value) for key, value in row.items() if key and value and value.strip()}
+                if record:
+                    yield str(record.pop("id", line_number)), record
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    record = json.loads(line)
+                    yield str(record.pop("id", line_number)), record
+
+
+def completed_record_ids(output: Path) -> set[str]:
+    """Ids of records the output already holds a final result for."""
+    if not output.exists():
+        return set()
+    done = set()
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if row.get("status") in FINAL_STATUSES:
+                done.add(row["record_id"])
+    return done
+
+
+def write_parquet(jsonl_path: Path, parquet_path: Path):
+    """Converts the JSONL results (last row per record wins) to Parquet. Needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+
+    rows = {}
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows[row["record_id"]] = row
+    table = pa.table({
+        "record_id": [row["record_id"] for row in rows.values()],
+        "input_hash": [row.get("input_hash") for row in rows.values()],
+        "status": [row["status"] for row in rows.values()],
+        "calculated_risk_score": pa.array([row.get("calculated_risk_score") for row in rows.values()], type=pa.float64()),
+        "elapsed_seconds": pa.array([row.get("elapsed_seconds") for row in rows.values()], type=pa.float64()),
+        "result": [json.dumps(row, ensure_ascii=False) for row in rows.values()],
+    })
+    pq.write_table(table, parquet_path)
+
+
+class Progress:
+    """Prints processed/total, throughput and ETA to stderr every `interval` seconds."""
+
+    def __init__(self, total: int, interval: float):
+        self.total, self.interval = total, interval
+        self.done = self.failed = 0
+        self.started = self.last_report = time.monotonic()
+
+    def update(self, row: dict):
+        self.done += 1
+        self.failed += row["status"] != "COMPLETED"
+        now = time.monotonic()
+        if now - self.last_report >= self.interval or self.done == self.total:
+            self.last_report = now
+            self.report(now)
+
+    def report(self, now: float | None = None):
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else float("inf")
+        print(
+            f"{self.done}/{self.total} records ({self.failed} not completed), "
+            f"{rate:.2f} records/s, ETA {eta:.0f}s",
+            file=sys.stderr, flush=True,
+        )
+
+
+def run(input_path: Path, output: Path, workdir: Path, processes: int, job_threads: int, progress_interval: float) -> Progress:
+    workdir.mkdir(parents=True, exist_ok=True)
+    done = completed_record_ids(output)
+    total = sum(1 for record_id, _ in read_records(input_path) if record_id not in done)
+    if done:
+        print(f"Resuming: {len(done)} records already in {output}.", file=sys.stderr)
+    progress = Progress(total, progress_interval)
+
+    pending = ((record_id, record) for record_id, record in read_records(input_path) if record_id not in done)
+    # Spawned (not forked) so each process loads the settings with its own DATABASE_URL.
+    with open(output, "a", encoding="utf-8") as out, concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(str(workdir), job_threads),
+    ) as pool:
+        in_flight = set()
+        for record_id, record in pending:
+            in_flight.add(pool.submit(analyze_record, record_id, record))
+            # Bounded window: the corpus is never loaded into memory at once.
+            if len(in_flight) >= processes * 2:
+                finished, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                _write_rows(out, finished, progress)
+        finished, _ = concurrent.futures.wait(in_flight)
+        _write_rows(out, finished, progress)
+    return progress
+
+
+def _write_rows(out, futures, progress: Progress):
+    for future in futures:
+        row = future.result()
+        out.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        progress.update(row)
+    out.flush()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="JSONL or CSV file of listings")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL results file (appended to; used to resume)")
+    parser.add_argument("--parquet", type=Path, help="also write the results to this Parquet file at the end")
+    parser.add_argument("--workdir", type=Path, default=Path(".offline"), help="SQLite files and the shared result cache")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=4, help="jobs of one listing run at once")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    run(args.input, args.output, args.workdir, args.processes, args.threads, args.progress_every)
+    print(f"Done in {time.monotonic() - started:.1f}s. Results in {args.output}.", file=sys.stderr)
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+        print(f"Parquet written to {args.parquet}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
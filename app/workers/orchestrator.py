@@ -1,8 +1,11 @@
 import json
 import logging
 import uuid
-from .queues import analysis_fast_queue, analysis_heavy_queue, redis_conn
-from app.workers import tasks, finalizer
+from .queues import get_lane_queue, get_redis_conn
+from app.core.config import settings
+from app.workers.job_graph import JobGraph
+from app.workers.admission import record_completion
+from app.workers import bulk, modes, tasks, finalizer
 from app.workers.utils import handle_job_failure
 from app.db.session import SessionLocal
 from app.db.models import FraudCheck, JobStatus
@@ -69,24 +72,130 @@ def _check_historical_fraud(db, check: FraudCheck) -> list[dict]:
 
 def _handle_job_success(job, connection, result, *args, **kwargs):
     """RQ on_success callback — publishes job progress to Redis for SSE."""
+    try:
+        record_completion(connection, job.origin)
+    except Exception as e:
+        logger.warning(f"Could not record completion of job {job.id}: {e}")
     if not isinstance(result, dict) or "job_name" not in result:
         return
     check_id_str = job.args[0] if job.args else None
-    if check_id_str and redis_conn:
-        try:
+    if check_id_str and connection:
+        _publish_progress(connection, check_id_str, [result])
+
+
+def _handle_check_finished(job, connection, result, *args, **kwargs):
+    """on_success callback of the finalizer: also advances the check's bulk batches."""
+    _handle_job_success(job, connection, result, *args, **kwargs)
+    try:
+        bulk.on_check_finished(connection, str(job.args[0]))
+    except Exception as e:
+        logger.warning(f"Could not advance bulk batches of check {job.args[0]}: {e}")
+
+
+def _publish_progress(connection, check_id_str: str, steps: list[dict]):
+    """Publishes finished (or skipped) steps to the check's SSE progress channel."""
+    try:
+        pipe = connection.pipeline(transaction=False)
+        for step in steps:
             event = json.dumps({
-                "job_name": result.get("job_name", ""),
-                "status": result.get("status", ""),
-                "description": result.get("description", ""),
+                "job_name": step.get("job_name", ""),
+                "status": step.get("status", ""),
+                "description": step.get("description", ""),
             })
-            redis_conn.publish(f"analysis:{check_id_str}:progress", event)
-        except Exception:
-            pass
+            pipe.publish(f"analysis:{check_id_str}:progress", event)
+        pipe.execute()
+    except Exception:
+        pass
 
-def start_full_analysis(check_id_arg):
+def build_analysis_graph(
+    check_id_str: str,
+    analysis_fast_queue,
+    analysis_heavy_queue,
+    skipped: frozenset = frozenset(),
+    cache_scope: str | None = None,
+    mode: str = modes.DEEP,
+) -> JobGraph:
+    """
+    Builds the check's job DAG (not yet enqueued) with the jobs of its
+    analysis `mode`, leaving out the jobs named in `skipped`.
+    `JobGraph.enqueue()` then writes it to Redis in a single transaction.
+    Jobs of checks with the same `cache_scope` (a bulk batch) share one
+    result cache instead of the per-check one.
+    """
+    mode_config = modes.get_mode(mode)
+    graph = JobGraph(analysis_fast_queue.connection)
+    job_options = {
+        "on_failure": handle_job_failure,
+        "on_success": _handle_job_success,
+        "result_ttl": settings.JOB_RESULT_TTL_SECONDS,
+        "failure_ttl": settings.JOB_FAILURE_TTL_SECONDS,
+    }
+    if cache_scope:
+        job_options["meta"] = {"cache_scope": cache_scope}
+
+    def add(job_name, queue, func, **options):
+        if job_name in skipped or job_name not in mode_config["jobs"]:
+            return None
+        if mode_config["job_timeout"]:
+            options.setdefault("job_timeout", mode_config["job_timeout"])
+        return graph.add(queue, func, check_id_str, **job_options, **options)
+
+    # --- Layer 1: Enqueue initial, independent data-gathering jobs ---
+    # These can all start immediately.
+    geocode_job = add("geocode", analysis_fast_queue, tasks.job_geocode)
+    url_forensics_job = add("url_forensics", analysis_fast_queue, tasks.job_url_forensics)
+    plagiarism_job = add("description_plagiarism_check", analysis_fast_queue, tasks.job_description_plagiarism_check)
+    description_analysis_job = add("description_analysis", analysis_fast_queue, tasks.job_description_analysis)
+    communication_analysis_job = add("communication_analysis", analysis_fast_queue, tasks.job_communication_analysis)
+    reviews_job = add("listing_reviews_analysis", analysis_fast_queue, tasks.job_listing_reviews_analysis)
+    price_sanity_job = add("price_sanity_check", analysis_fast_queue, tasks.job_price_sanity_check)
+    host_profile_job = add("host_profile_check", analysis_fast_queue, tasks.job_host_profile_check)
+    reverse_search_job = add("reverse_image_search", analysis_heavy_queue, tasks.job_reverse_image_search, job_timeout=300)
+    ai_detection_job = add("ai_image_detection", analysis_heavy_queue, tasks.job_ai_image_detection, job_timeout=300)
+    local_indicators_job = add("local_indicators", analysis_fast_queue, tasks.job_local_indicators)
+
+    # --- Layer 2: Enqueue jobs that depend on Layer 1 jobs ---
+    reputation_job = add("reputation_check", analysis_fast_queue, tasks.job_reputation_check, depends_on=geocode_job)
+    iban_check_job = add("iban_country_check", analysis_fast_queue, tasks.job_iban_country_check, depends_on=geocode_job)
+    cross_platform_job = add("address_cross_platform_search", analysis_fast_queue, tasks.job_address_cross_platform_search, depends_on=geocode_job)
+
+    # --- Final Step: The finalizer depends on all "leaf" jobs in the tree ---
+    all_final_dependencies = [
+        url_forensics_job,
+        plagiarism_job,
+        description_analysis_job,
+        communication_analysis_job,
+        reverse_search_job,
+        ai_detection_job,
+        reviews_job,
+        price_sanity_job,
+        host_profile_job,
+        reputation_job,
+        iban_check_job,
+        cross_platform_job,
+        local_indicators_job,
+    ]
+    all_final_dependencies = [job for job in all_final_dependencies if job is not None]
+
+    graph.add(
+        analysis_fast_queue,
+        finalizer.job_aggregate_and_conclude,
+        check_id_str,
+        depends_on=all_final_dependencies,
+        **{**job_options, "on_success": _handle_check_finished},
+    )
+    return graph
+
+def start_full_analysis(check_id_arg, priority: bool = False, batch_id: str | None = None):
     """
     This orchestrator enqueues all individual and synthesis jobs, managing the
-    multi-layered dependency graph.
+    multi-layered dependency graph. Jobs go to the check's session lane (or the
+    priority lane for extension checks) so sessions are served fairly.
+    Jobs whose skip rule matches the check's inputs are not enqueued: their
+    SKIPPED steps are written straight to analysis_steps, as are the jobs
+    the check's analysis mode leaves out (a check degraded by admission
+    control already has its lighter mode). Checks of a bulk batch
+    (`batch_id`) share the batch's result cache.
     """
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -98,8 +207,15 @@ def start_full_analysis(check_id_arg):
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check:
             logger.error(f"FraudCheck ID {check_id} not found.")
+            connection = get_redis_conn()
+            if batch_id and connection is not None:
+                # No finalizer will run for it: free the check's batch slot now.
+                bulk.on_check_finished(connection, str(check_id))
             return
         check.status = JobStatus.IN_PROGRESS
+        session_id = check.session_id
+        mode = check.mode or modes.DEEP
+        mode_config = modes.get_mode(mode)
 
         # Historical cross-check: flag if same email/phone/address appeared in previous high-risk analyses
         historical_warnings = _check_historical_fraud(db, check)
@@ -114,50 +230,30 @@ def start_full_analysis(check_id_arg):
             })
             check.analysis_steps = existing_steps
 
+        planned_skips = {
+            job_name: step for job_name, step in tasks.plan_skips(check.input_data).items()
+            if job_name in mode_config["jobs"]
+        }
+        for job_name in sorted(modes.ANALYSIS_MODES[modes.DEEP]["jobs"] - mode_config["jobs"] - {"geocode"}):
+            planned_skips[job_name] = tasks.skipped_step(job_name, {}, f"Not run in {mode} mode.")
+        if planned_skips:
+            check.analysis_steps = list(check.analysis_steps or []) + list(planned_skips.values())
+
         db.commit()
     finally:
         db.close()
 
     check_id_str = str(check_id)
+    analysis_fast_queue = get_lane_queue("analysis-fast", session_id, priority)
+    analysis_heavy_queue = get_lane_queue("analysis-heavy", session_id, priority)
 
-    # --- Layer 1: Enqueue initial, independent data-gathering jobs ---
-    # These can all start immediately.
-    geocode_job = analysis_fast_queue.enqueue(tasks.job_geocode, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    url_forensics_job = analysis_fast_queue.enqueue(tasks.job_url_forensics, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    plagiarism_job = analysis_fast_queue.enqueue(tasks.job_description_plagiarism_check, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    description_analysis_job = analysis_fast_queue.enqueue(tasks.job_description_analysis, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    communication_analysis_job = analysis_fast_queue.enqueue(tasks.job_communication_analysis, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    reviews_job = analysis_fast_queue.enqueue(tasks.job_listing_reviews_analysis, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    price_sanity_job = analysis_fast_queue.enqueue(tasks.job_price_sanity_check, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    host_profile_job = analysis_fast_queue.enqueue(tasks.job_host_profile_check, check_id_str, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    reverse_search_job = analysis_heavy_queue.enqueue(tasks.job_reverse_image_search, check_id_str, job_timeout=300, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    
-    # --- Layer 2: Enqueue jobs that depend on Layer 1 jobs ---
-    reputation_job = analysis_fast_queue.enqueue(tasks.job_reputation_check, check_id_str, depends_on=geocode_job, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    iban_check_job = analysis_fast_queue.enqueue(tasks.job_iban_country_check, check_id_str, depends_on=geocode_job, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-    cross_platform_job = analysis_fast_queue.enqueue(tasks.job_address_cross_platform_search, check_id_str, depends_on=geocode_job, on_failure=handle_job_failure, on_success=_handle_job_success, result_ttl=3600)
-
-    # --- Final Step: The finalizer depends on all "leaf" jobs in the tree ---
-    all_final_dependencies = [
-        url_forensics_job,
-        plagiarism_job,
-        description_analysis_job,
-        communication_analysis_job,
-        reverse_search_job,
-        reviews_job,
-        price_sanity_job,
-        host_profile_job,
-        reputation_job,
-        iban_check_job,
-        cross_platform_job,
-    ]
+    build_analysis_graph(
+        check_id_str, analysis_fast_queue, analysis_heavy_queue,
+        skipped=frozenset(planned_skips),
+        cache_scope=bulk.cache_scope(batch_id) if batch_id else None,
+        mode=mode,
+    ).enqueue()
+    if planned_skips:
+        _publish_progress(analysis_fast_queue.connection, check_id_str, list(planned_skips.values()))
 
-    analysis_fast_queue.enqueue(
-        finalizer.job_aggregate_and_conclude,
-        check_id_str,
-        depends_on=all_final_dependencies,
-        on_failure=handle_job_failure,
-        on_success=_handle_job_success,
-    )
-    
-    logger.info(f"Enqueued all analysis jobs for FraudCheck ID: {check_id}.")
\ No newline at end of file
+    logger.info(f"Enqueued all analysis jobs for FraudCheck ID: {check_id} ({mode} mode).")
\ No newline at end of file
@@ -1,29 +1,82 @@
 import logging
+import time
 import redis
 from rq import Queue
 from app.core.config import settings
+from app.workers import fair_queue
+from app.workers.serialization import CompactSerializer
 
 logger = logging.getLogger(__name__)
 
-try:
-    redis_conn = redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        password=settings.REDIS_PASSWORD,
-        ssl=settings.REDIS_SSL,
-    )
-    redis_conn.ping()
-    logger.info("Successfully connected to Redis for RQ.")
-except redis.exceptions.ConnectionError as e:
-    logger.critical(f"Could not connect to Redis for RQ. Error: {e}")
-    redis_conn = None
-
-# Create the queue objects only if the Redis connection was successful
-if redis_conn:
-    analysis_fast_queue = Queue('analysis-fast', connection=redis_conn)
-    analysis_heavy_queue = Queue('analysis-heavy', connection=redis_conn)
-    chat_queue = Queue('chats', connection=redis_conn)
-else:
-    analysis_fast_queue = None
-    analysis_heavy_queue = None
-    chat_queue = None
\ No newline at end of file
+# The connection is made on first use (or by the API lifespan hook), never at
+# import time, so importing the app does not block on Redis.
+_redis_conn = None
+_initialized = False
+_last_attempt = 0.0
+_queues: dict[str, Queue] = {}
+
+# After a failed connection, get_redis_conn() retries at most this often.
+RECONNECT_INTERVAL_SECONDS = 10
+
+
+def init_redis():
+    """Connects to Redis and pings it. Returns the connection, or None if unavailable."""
+    global _redis_conn, _initialized, _last_attempt
+    _last_attempt = time.monotonic()
+    _queues.clear()
+    try:
+        conn = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD,
+            ssl=settings.REDIS_SSL,
+        )
+        conn.ping()
+        logger.info("Successfully connected to Redis for RQ.")
+        _redis_conn = conn
+    except redis.exceptions.ConnectionError as e:
+        logger.critical(f"Could not connect to Redis for RQ. Error: {e}")
+        _redis_conn = None
+    _initialized = True
+    return _redis_conn
+
+
+def get_redis_conn():
+    """Returns the shared Redis connection (None if Redis is unavailable)."""
+    if not _initialized:
+        init_redis()
+    elif _redis_conn is None and time.monotonic() - _last_attempt > RECONNECT_INTERVAL_SECONDS:
+        init_redis()
+    return _redis_conn
+
+
+def get_queue(name: str):
+    """Returns the RQ queue `name`, or None if Redis is unavailable."""
+    conn = get_redis_conn()
+    if not conn:
+        return None
+    if name not in _queues:
+        _queues[name] = Queue(name, connection=conn, serializer=CompactSerializer)
+    return _queues[name]
+
+
+def get_lane_queue(base: str, session_id: str | None, priority: bool = False):
+    """
+    Returns the queue a check's jobs should go to: its session lane (or the
+    priority lane) when fair scheduling is on, otherwise the shared `base` queue.
+    """
+    if not settings.FAIR_SCHEDULING:
+        return get_queue(base)
+    conn = get_redis_conn()
+    if not conn:
+        return None
+    return fair_queue.get_lane_queue(base, session_id, conn, priority=priority, serializer=CompactSerializer)
+
+
+def close_redis():
+    global _redis_conn, _initialized
+    if _redis_conn is not None:
+        _redis_conn.close()
+    _redis_conn = None
+    _initialized = False
+    _queues.clear()
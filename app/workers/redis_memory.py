@@ -0,0 +1,210 @@
+"""
+TTL policies, memory accounting and a background sweeper for Redis.
+
+Every key family this app writes has an explicit lifetime (KEY_FAMILIES).
+The sweeper runs in the worker process and, at most once per
+SWEEPER_INTERVAL_SECONDS across all workers:
+  - gives cache hashes written before TTLs existed a TTL,
+  - keeps the analysis cache under CACHE_MAX_BYTES by evicting the oldest
+    entries first (largest first among entries written in the same second).
+
+Usage:
+    python -m app.workers.redis_memory report     # bytes and keys per key family
+    python -m app.workers.redis_memory sweep      # run one sweep now
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "cache:"
+# Sorted set of cache keys scored by write time; used for age-ordered eviction.
+CACHE_INDEX_KEY = "meta:cache_index"
+SWEEPER_LOCK_KEY = "meta:sweeper_lock"
+SCAN_BATCH = 500
+
+# Prefix -> how keys under it expire. Most specific prefix first.
+KEY_FAMILIES = {
+    "cache:": "CACHE_TTL_SECONDS after the last write; evicted by age above CACHE_MAX_BYTES",
+    "rq:results:": "JOB_RESULT_TTL_SECONDS (RQ result_ttl)",
+    "rq:job:": "JOB_RESULT_TTL_SECONDS after success, JOB_FAILURE_TTL_SECONDS after failure",
+    "rq:": "RQ queues and registries (cleaned by workers)",
+    "fairq:": "lane sets (idle lanes removed by workers)",
+    "admission:": "per-minute counters, 6 minutes",
+    "ratelimit:": "token buckets and leases, minutes; AIMD limits 1 day",
+    "hedge:": "latency samples capped at 200 per provider; counters 2 minutes",
+    "breaker:": "one small hash per provider; failure counters BREAKER_WINDOW_SECONDS",
+    "batch:": "bulk batch state, BULK_BATCH_TTL_SECONDS after the batch last moved",
+    "check:": "batches waiting on a check, BULK_BATCH_TTL_SECONDS",
+    "ind:": "precheck indicators, PRECHECK_INDICATOR_TTL_SECONDS after the last write",
+    "revimg:": "reverse image search verdicts, REVERSE_IMAGE_CACHE_TTL_SECONDS; hit/miss counters",
+    "aiimg:": "AI image detection verdicts by image content, AI_IMAGE_CACHE_TTL_SECONDS",
+    "wayback:": "Wayback Machine histories by URL and domain, WAYBACK_CACHE_TTL_SECONDS",
+    "meta:": "cache index and sweeper lock",
+    "LIMITS:": "slowapi rate-limit windows",
+}
+
+
+def _family(key: str) -> str:
+    for prefix in KEY_FAMILIES:
+        if key.startswith(prefix):
+            return prefix
+    return key.split(":", 1)[0] + ":" if ":" in key else "(other)"
+
+
+def record_cache_write(pipe, cache_key: str):
+    """Queues the TTL and index update for a cache hash write on `pipe`."""
+    pipe.expire(cache_key, settings.CACHE_TTL_SECONDS)
+    pipe.zadd(CACHE_INDEX_KEY, {cache_key: time.time()})
+
+
+def _scan_sizes(connection, match: str | None = None):
+    """Yields (key, bytes or None, ttl seconds) for every key, a batch per round-trip."""
+    for batch in _batches(connection.scan_iter(match=match, count=SCAN_BATCH), SCAN_BATCH):
+        pipe = connection.pipeline(transaction=False)
+        for key in batch:
+            pipe.memory_usage(key)
+            pipe.ttl(key)
+        replies = pipe.execute(raise_on_error=False)
+        for key, size, ttl in zip(batch, replies[0::2], replies[1::2]):
+            size = size if isinstance(size, int) else None
+            yield key.decode() if isinstance(key, bytes) else key, size, ttl if isinstance(ttl, int) else -1
+
+
+def _batches(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def memory_report(connection) -> dict:
+    """Bytes, key count and keys without a TTL per key family, largest first."""
+    families: dict[str, dict] = {}
+    for key, size, ttl in _scan_sizes(connection):
+        family = families.setdefault(_family(key), {"keys": 0, "bytes": 0, "without_ttl": 0, "unsized": 0})
+        family["keys"] += 1
+        if size is None:
+            family["unsized"] += 1
+        else:
+            family["bytes"] += size
+        if ttl == -1:
+            family["without_ttl"] += 1
+
+    ordered = dict(sorted(families.items(), key=lambda item: item[1]["bytes"], reverse=True))
+    for prefix, family in ordered.items():
+        family["policy"] = KEY_FAMILIES.get(prefix, "no policy")
+    return {
+        "total_bytes": sum(f["bytes"] for f in ordered.values()),
+        "families": ordered,
+    }
+
+
+def sweep(connection) -> dict:
+    """Applies cache TTLs and enforces CACHE_MAX_BYTES. Returns what was done."""
+    now = time.time()
+    stats = {"ttl_applied": 0, "evicted": 0, "evicted_bytes": 0, "cache_bytes": 0}
+
+    # Expired keys leave stale index members behind.
+    connection.zremrangebyscore(CACHE_INDEX_KEY, "-inf", now - settings.CACHE_TTL_SECONDS)
+    written_at = {
+        (member.decode() if isinstance(member, bytes) else member): score
+        for member, score in connection.zrange(CACHE_INDEX_KEY, 0, -1, withscores=True)
+    }
+
+    entries = []
+    pipe = connection.pipeline(transaction=False)
+    for key, size, ttl in _scan_sizes(connection, match=f"{CACHE_PREFIX}*"):
+        if ttl == -1:
+            pipe.expire(key, settings.CACHE_TTL_SECONDS)
+            stats["ttl_applied"] += 1
+        if key not in written_at:
+            # Written before the index existed: as old as its remaining TTL allows.
+            remaining = ttl if ttl > 0 else settings.CACHE_TTL_SECONDS
+            written_at[key] = now - (settings.CACHE_TTL_SECONDS - remaining)
+            pipe.zadd(CACHE_INDEX_KEY, {key: written_at[key]})
+        entries.append((written_at[key], -(size or 0), key, size or 0))
+        stats["cache_bytes"] += size or 0
+    pipe.execute()
+
+    excess = stats["cache_bytes"] - settings.CACHE_MAX_BYTES
+    if excess > 0:
+        pipe = connection.pipeline(transaction=False)
+        for _, _, key, size in sorted(entries):
+            if excess <= 0:
+                break
+            pipe.delete(key)
+            pipe.zrem(CACHE_INDEX_KEY, key)
+            excess -= size
+            stats["evicted"] += 1
+            stats["evicted_bytes"] += size
+        pipe.execute()
+        logger.info(f"Cache over {settings.CACHE_MAX_BYTES} bytes: evicted {stats['evicted']} oldest entries ({stats['evicted_bytes']} bytes).")
+    return stats
+
+
+def start_sweeper(connection, interval: float | None = None) -> threading.Thread:
+    """
+    Runs `sweep` in a daemon thread every `interval` seconds. A Redis lock
+    makes sure only one worker process sweeps per interval.
+    """
+    interval = settings.SWEEPER_INTERVAL_SECONDS if interval is None else interval
+
+    def loop():
+        while True:
+            try:
+                if connection.set(SWEEPER_LOCK_KEY, "1", nx=True, ex=max(1, int(interval))):
+                    stats = sweep(connection)
+                    logger.debug(f"Redis sweep: {stats}")
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Redis sweep failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="redis-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.workers.queues import get_redis_conn
+
+    parser = argparse.ArgumentParser(description="Redis memory accounting and cache sweeping.")
+    parser.add_argument("command", choices=["report", "sweep"])
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    connection = get_redis_conn()
+    if connection is None:
+        print("Redis unavailable.")
+        return 1
+
+    if args.command == "sweep":
+        print(json.dumps(sweep(connection), indent=2))
+        return 0
+
+    report = memory_report(connection)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{'family':<16} {'keys':>8} {'KiB':>12} {'no TTL':>8}  policy")
+    for prefix, family in report["families"].items():
+        print(f"{prefix:<16} {family['keys']:>8} {family['bytes'] / 1024:>12.1f} {family['without_ttl']:>8}  {family['policy']}")
+    print(f"\nTotal: {report['total_bytes'] / 1024:.1f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ The finalizer aggregates weighted scores and applies compound rules.
 # Weights for each job (must sum to ~1.0 for normalization)
 WEIGHTS: dict[str, float] = {
     "reverse_image_search": 0.20,
+    "ai_image_detection": 0.10,
     "iban_country_check": 0.15,
     "communication_analysis": 0.13,
     "price_sanity_check": 0.12,
@@ -16,6 +17,8 @@ WEIGHTS: dict[str, float] = {
     "reputation_check": 0.08,
     "address_cross_platform_search": 0.07,
     "host_profile_check": 0.05,
+    # Quick mode only (see app/workers/modes.py).
+    "local_indicators": 0.20,
 }
 
 # Compound rules: combinations of signals that amplify risk
@@ -67,6 +70,8 @@ COMPOUND_RULES: list[dict] = [
 # Thresholds for considering a job's score as "high risk" or "low risk"
 HIGH_RISK_THRESHOLD = 60
 LOW_RISK_THRESHOLD = 20
+# Same bar as url_analysis.check_domain_age.
+NEW_DOMAIN_DAYS = 90
 
 
 def calculate_job_risk_score(job_name: str, result: dict, status: str) -> dict:
@@ -92,15 +97,33 @@ def calculate_job_risk_score(job_name: str, result: dict, status: str) -> dict:
             score = 0
             confidence = 0.8
 
+    elif job_name == "ai_image_detection":
+        items = result.get("ai_detection_results", [])
+        scores = [
+            float(item.get("confidence_score") or 0.0) for item in items
+            if isinstance(item, dict) and item.get("verdict") in ("Likely Real", "Possibly AI", "Likely AI")
+        ]
+        if scores:
+            score = int(max(scores) * 100)
+            confidence = 0.6  # Visual forensics by an LLM; weaker than a reverse image match
+        else:
+            score = 0
+            confidence = 0.0  # No image could be analyzed
+
     elif job_name == "url_forensics":
         domain_age = result.get("domain_age", {})
         blacklist = result.get("blacklist_check", {})
+        archive_age = (result.get("archive_check") or {}).get("domain_age_days")
         if blacklist.get("is_blacklisted"):
             score = 95
             confidence = 0.95
         elif domain_age.get("is_new"):
             score = 55
             confidence = 0.8
+        elif archive_age is not None and archive_age < NEW_DOMAIN_DAYS:
+            # WHOIS didn't flag it, but the Wayback Machine first saw the domain recently.
+            score = 40
+            confidence = 0.6
         else:
             score = 0
             confidence = 0.7
@@ -180,6 +203,23 @@ def calculate_job_risk_score(job_name: str, result: dict, status: str) -> dict:
             score = 0
             confidence = 0.0  # No IBAN found, can't assess
 
+    elif job_name == "local_indicators":
+        prior = result.get("prior_report")
+        level = result.get("risk_level")
+        if level == "high":
+            score = 85
+            confidence = 0.85
+        elif prior:
+            # A full analysis of this very listing already exists.
+            score = prior.get("risk_score", 0)
+            confidence = 0.8
+        elif level == "medium":
+            score = 50
+            confidence = 0.6
+        else:
+            score = 0
+            confidence = 0.0  # Nothing known about this listing yet
+
     elif job_name == "address_cross_platform_search":
         verdict = result.get("verdict", "not_evaluable")
         if verdict == "suspicious":
@@ -216,6 +256,26 @@ def compute_outcome(step: dict) -> str:
     return "no_risk"
 
 
+def score_steps(steps: list, scored_job_names: set) -> dict[str, dict]:
+    """
+    Adds risk_score, confidence and outcome to every step dict. Returns the
+    score data of the steps named in `scored_job_names`, keyed by job name,
+    for calculate_weighted_score.
+    """
+    job_scores = {}
+    for step in steps:
+        if not isinstance(step, dict):
+            continue
+        job_name = step.get("job_name", "")
+        score_data = calculate_job_risk_score(job_name, step.get("result", {}), step.get("status", "ERROR"))
+        step["risk_score"] = score_data["risk_score"]
+        step["confidence"] = score_data["confidence"]
+        step["outcome"] = compute_outcome(step)
+        if job_name and job_name in scored_job_names:
+            job_scores[job_name] = score_data
+    return job_scores
+
+
 def calculate_weighted_score(job_scores: dict[str, dict]) -> dict:
     """
     Calculates the final weighted risk score from all job scores.
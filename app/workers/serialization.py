@@ -0,0 +1,114 @@
+"""
+Compact serialization for RQ job payloads/results and cached step results.
+
+Encoded values start with a 5-byte header: MAGIC, a codec byte and a
+compression byte. Plain JSON data (dicts with string keys, lists, strings,
+numbers, booleans, None), which covers every step dict, is encoded with
+orjson. Anything else (RQ's job tuple, UUIDs, exceptions) falls back to
+pickle, so values round-trip with their original types. Payloads of at
+least SERIALIZER_COMPRESS_MIN_BYTES are zlib-compressed.
+
+`decode` also reads values written before this format existed: RQ's pickles
+and the plain JSON the cache used to store.
+"""
+
+import json
+import math
+import pickle
+import zlib
+
+import orjson
+
+from app.core.config import settings
+
+MAGIC = b"LFC"
+CODEC_JSON = b"j"
+CODEC_PICKLE = b"p"
+COMPRESSED = b"z"
+UNCOMPRESSED = b"-"
+HEADER_SIZE = len(MAGIC) + 2
+# Speed matters more than ratio here; level 3 gets most of the gain on text.
+ZLIB_LEVEL = 3
+
+_PICKLE_PREFIX = b"\x80"
+
+
+def _is_plain_json(value) -> bool:
+    """True if orjson would round-trip `value` without changing a type."""
+    kind = type(value)
+    if kind is str or kind is bool or value is None:
+        return True
+    if kind is int:
+        return -(2**63) <= value < 2**64
+    if kind is float:
+        return math.isfinite(value)
+    if kind is dict:
+        return all(type(k) is str and _is_plain_json(v) for k, v in value.items())
+    if kind is list:
+        return all(_is_plain_json(v) for v in value)
+    return False
+
+
+def encode(value) -> bytes:
+    """Encodes `value` in the compact format."""
+    if _is_plain_json(value):
+        codec, payload = CODEC_JSON, orjson.dumps(value)
+    else:
+        codec, payload = CODEC_PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if len(payload) >= settings.SERIALIZER_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload, ZLIB_LEVEL)
+        if len(compressed) < len(payload):
+            return MAGIC + codec + COMPRESSED + compressed
+    return MAGIC + codec + UNCOMPRESSED + payload
+
+
+def decode(data):
+    """Decodes the compact format, legacy pickles and legacy JSON."""
+    if isinstance(data, str):
+        data = data.encode()
+    if data[:len(MAGIC)] != MAGIC:
+        if data[:1] == _PICKLE_PREFIX:
+            return pickle.loads(data)
+        return orjson.loads(data)
+
+    codec, compression = data[len(MAGIC):len(MAGIC) + 1], data[len(MAGIC) + 1:HEADER_SIZE]
+    payload = data[HEADER_SIZE:]
+    if compression == COMPRESSED:
+        payload = zlib.decompress(payload)
+    elif compression != UNCOMPRESSED:
+        raise ValueError(f"Unknown compression flag {compression!r}")
+
+    if codec == CODEC_JSON:
+        return orjson.loads(payload)
+    if codec == CODEC_PICKLE:
+        return pickle.loads(payload)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+class CompactSerializer:
+    """
+    RQ serializer (job data, meta and results). With COMPACT_SERIALIZATION
+    off it writes RQ's plain pickles but still reads both formats, so workers
+    can be upgraded before producers start writing the new format.
+    """
+
+    @staticmethod
+    def dumps(value) -> bytes:
+        if not settings.COMPACT_SERIALIZATION:
+            return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return encode(value)
+
+    @staticmethod
+    def loads(data):
+        return decode(data)
+
+
+def dumps_cache_entry(value) -> bytes:
+    """Encodes a step result for the `cache:{check_id}` hash."""
+    if not settings.COMPACT_SERIALIZATION:
+        return json.dumps(value).encode()
+    return encode(value)
+
+
+loads_cache_entry = decode
@@ -1,46 +1,212 @@
 import concurrent.futures
-import json
+import contextvars
 import logging
 import uuid
 from datetime import datetime
+from app.core.config import settings
 from app.db.models import FraudCheck
 
 logger = logging.getLogger(__name__)
 from app.utils.helpers import generate_hash, get_nested
-from app.workers.queues import redis_conn
-import re
-from app.services import google_search, image_analysis, gemini_analysis, google_apis, url_analysis
+from app.utils.iban import IBAN_FIELDS, input_ibans
+from app.workers.queues import get_redis_conn
+from app.workers.redis_memory import record_cache_write
+from app.workers.serialization import dumps_cache_entry, loads_cache_entry
+from app.services import google_search, image_analysis, image_selection, gemini_analysis, google_apis, precheck, url_analysis
+from app.services.circuit_breaker import ProviderUnavailable
 from app.db.session import SessionLocal 
 from urllib.parse import urlparse
 import rq
 # --- Constants for Input Limits ---
 MAX_REVIEWS_TO_ANALYZE = 10
 MAX_IMAGES_TO_ANALYZE = 5
+# Distinct image URLs considered when choosing the ones to analyze.
+MAX_IMAGE_CANDIDATES = 20
+
+# --- Offline runs ---
+# app/workers/offline.py runs these jobs in-process, without RQ or Redis. It
+# sets this to an object with `results` (finished steps by job name) and
+# `cache` (get/set by key), which replace the job's dependency and the
+# Redis cache.
+local_run: contextvars.ContextVar = contextvars.ContextVar("local_run", default=None)
+
+def _geocode_result():
+    """Result of the geocode job the current job depends on."""
+    run = local_run.get()
+    if run is not None:
+        return run.results["geocode"]
+    return rq.get_current_job().dependency.result
 
 # --- The Caching Helper ---
 def _run_cached_job(check_id: str, job_name: str, inputs: dict, task_function):
-    """A helper to abstract away the caching logic for each job."""
+    """
+    A helper to abstract away the caching logic for each job. Results are
+    cached per check, or per batch for bulk checks (the job's "cache_scope").
+    """
     data_to_hash = {"job_name": job_name, "inputs": inputs}
     cache_field_key = generate_hash(data_to_hash)
-    redis_main_key = f"cache:{check_id}"
+
+    run = local_run.get()
+    if run is not None:
+        cached_result = run.cache.get(cache_field_key)
+        if cached_result is not None:
+            return cached_result
+        result = task_function(inputs)
+        if not (isinstance(result, dict) and result.get("unavailable_providers")):
+            run.cache.set(cache_field_key, result)
+        return result
+
+    current_job = rq.get_current_job()
+    cache_scope = current_job.meta.get("cache_scope") if current_job else None
+    redis_main_key = f"cache:{cache_scope or check_id}"
+    redis_conn = get_redis_conn()
 
     cached_result = redis_conn.hget(redis_main_key, cache_field_key)
     if cached_result:
         logger.debug(f"Cache HIT for {job_name} (Check ID: {check_id})")
-        return json.loads(cached_result)
+        return loads_cache_entry(cached_result)
 
     logger.info(f"Cache MISS for {job_name} (Check ID: {check_id}). Running task...")
     result = task_function(inputs)
-    redis_conn.hset(redis_main_key, cache_field_key, json.dumps(result))
+    # Partial results (a provider's circuit was open) are not cached, so a
+    # re-run after the provider recovers gets the full answer.
+    if not (isinstance(result, dict) and result.get("unavailable_providers")):
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.hset(redis_main_key, cache_field_key, dumps_cache_entry(result))
+        record_cache_write(pipe, redis_main_key)
+        pipe.execute()
     return result
 
+def _provider_unavailable_step(job_name: str, job_description: str, inputs: dict, error: ProviderUnavailable) -> dict:
+    """SKIPPED step for a job whose provider's circuit breaker is open."""
+    return {
+        "job_name": job_name,
+        "description": job_description,
+        "status": "SKIPPED",
+        "inputs_used": inputs,
+        "result": {"reason": "Provider unavailable.", "provider": error.provider}
+    }
+
+# --- Step descriptions shown to the user ---
+JOB_DESCRIPTIONS = {
+    "geocode": "Valida la dirección del inmueble con la API de Geocoding de Google Maps y obtiene detalles de ubicación.",
+    "reputation_check": "Busca en la web informes o reseñas vinculados a los datos de contacto del anfitrión.",
+    "description_plagiarism_check": "Realiza una búsqueda exacta en la web para detectar si la descripción del anuncio ha sido copiada de otros sitios.",
+    "url_forensics": "Comprueba la antigüedad del dominio, listas negras y archivos históricos de la URL del anuncio.",
+    "description_analysis": "Analiza la descripción del anuncio en busca de señales de alerta como tácticas de presión o detalles vagos.",
+    "communication_analysis": "Analiza el texto de comunicación en busca de patrones de fraude como solicitudes de pago de alto riesgo.",
+    "listing_reviews_analysis": "Analiza las reseñas del anuncio para detectar sentimiento negativo y posibles señales de fraude.",
+    "reverse_image_search": "Busca cada imagen en la web para detectar si ha sido robada o reutilizada de otros anuncios, una táctica habitual en estafas.",
+    "price_sanity_check": "Analiza el precio del anuncio según su ubicación, tipo y descripción para detectar si es sospechosamente bajo o alto.",
+    "host_profile_check": "Comprueba el perfil del anfitrión en busca de señales de alerta como cuenta no verificada o muy reciente.",
+    "iban_country_check": "Detecta números IBAN en la comunicación y la descripción y alerta si el país del banco no coincide con la ubicación del inmueble.",
+    "address_cross_platform_search": "Busca la dirección del inmueble en otras plataformas para detectar anuncios duplicados de distintos anfitriones.",
+    "ai_image_detection": "Analiza las imágenes del anuncio en busca de señales de haber sido generadas o manipuladas con inteligencia artificial.",
+    "local_indicators": "Comprueba si el anuncio, el email, el teléfono, el IBAN o las imágenes aparecen en análisis anteriores.",
+}
+
+# --- Plan-time skip rules ---
+# Input-only conditions under which a job has nothing to do. Each rule maps the
+# check's input_data to (inputs_used, skip reason or None). The orchestrator
+# evaluates them before enqueueing, so a job that would skip is written straight
+# to analysis_steps and never takes a queue slot; the jobs apply the same rules.
+def _skip_url_forensics(input_data: dict):
+    inputs = {"listing_url": input_data.get("listing_url")}
+    return inputs, None if inputs["listing_url"] else "No listing URL was provided."
+
+def _skip_description_plagiarism_check(input_data: dict):
+    inputs = {"description": input_data.get("description")}
+    description = inputs["description"]
+    return inputs, None if description and len(description) >= 150 else "Description was missing or too short to check."
+
+def _skip_description_analysis(input_data: dict):
+    inputs = {"description": input_data.get("description")}
+    return inputs, None if inputs["description"] else "No description provided."
+
+def _skip_communication_analysis(input_data: dict):
+    inputs = {"communication_text": input_data.get("communication_text")}
+    text = inputs["communication_text"]
+    return inputs, None if text and len(text) >= 50 else "No communication_text provided."
+
+def _skip_listing_reviews_analysis(input_data: dict):
+    inputs = {"reviews": (input_data.get("reviews") or [])[:MAX_REVIEWS_TO_ANALYZE]}
+    return inputs, None if inputs["reviews"] else "No reviews were provided."
+
+def _skip_reverse_image_search(input_data: dict):
+    inputs = {"image_urls": image_selection.dedupe_urls(input_data.get("image_urls") or [])[:MAX_IMAGE_CANDIDATES]}
+    return inputs, None if inputs["image_urls"] else "No image URLs were provided."
+
+def _skip_ai_image_detection(input_data: dict):
+    return _skip_reverse_image_search(input_data)
+
+def _skip_price_sanity_check(input_data: dict):
+    inputs = {
+        "price_details": input_data.get("price_details"),
+        "property_type": input_data.get("property_type"),
+        "address": input_data.get("address"),
+        "description": input_data.get("description")
+    }
+    if all(inputs.values()):
+        return inputs, None
+    return inputs, "Missing price, type, description or address for analysis."
+
+def _skip_host_profile_check(input_data: dict):
+    inputs = {"host_profile": input_data.get("host_profile")}
+    return inputs, None if inputs["host_profile"] else "No host profile data was provided."
+
+def _skip_reputation_check(input_data: dict):
+    inputs = {"host_email": input_data.get("host_email"), "host_phone": input_data.get("host_phone")}
+    if inputs["host_email"] or inputs["host_phone"]:
+        return inputs, None
+    return inputs, "No host email and phone provided."
+
+def _skip_iban_country_check(input_data: dict):
+    inputs = {field: input_data.get(field) for field in IBAN_FIELDS}
+    if not any(inputs.values()):
+        return inputs, "No communication text, description or IBAN provided."
+    if not input_ibans(inputs):
+        return inputs, "No IBAN found in provided data."
+    return inputs, None
+
+SKIP_RULES = {
+    "url_forensics": _skip_url_forensics,
+    "description_plagiarism_check": _skip_description_plagiarism_check,
+    "description_analysis": _skip_description_analysis,
+    "communication_analysis": _skip_communication_analysis,
+    "listing_reviews_analysis": _skip_listing_reviews_analysis,
+    "reverse_image_search": _skip_reverse_image_search,
+    "ai_image_detection": _skip_ai_image_detection,
+    "price_sanity_check": _skip_price_sanity_check,
+    "host_profile_check": _skip_host_profile_check,
+    "reputation_check": _skip_reputation_check,
+    "iban_country_check": _skip_iban_country_check,
+}
+
+def skipped_step(job_name: str, inputs: dict, reason: str, job_description: str | None = None) -> dict:
+    return {
+        "job_name": job_name,
+        "description": job_description or JOB_DESCRIPTIONS[job_name],
+        "status": "SKIPPED",
+        "inputs_used": inputs,
+        "result": {"reason": reason}
+    }
+
+def plan_skips(input_data: dict) -> dict[str, dict]:
+    """SKIPPED steps, by job name, for every job whose skip rule matches `input_data`."""
+    planned = {}
+    for job_name, rule in SKIP_RULES.items():
+        inputs, reason = rule(input_data or {})
+        if reason:
+            planned[job_name] = skipped_step(job_name, inputs, reason)
+    return planned
+
 def job_geocode(check_id_arg):
     """
     Validates address with Google Maps and returns a standardized AnalysisStep result.
     """
     # --- 1. Define Job Metadata ---
     job_name = "geocode"
-    job_description = "Valida la dirección del inmueble con la API de Geocoding de Google Maps y obtiene detalles de ubicación."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -100,7 +266,7 @@ def job_reputation_check(check_id_arg):
     Checks host reputation and returns a standardized AnalysisStep result.
     """
     job_name = "reputation_check"
-    job_description = "Busca en la web informes o reseñas vinculados a los datos de contacto del anfitrión."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -110,20 +276,15 @@ def job_reputation_check(check_id_arg):
     db = SessionLocal()
     try:
         # Get country_code from the geocode job dependency
-        current_job = rq.get_current_job()
-        geocode_result = current_job.dependency.result
+        geocode_result = _geocode_result()
         country_code = get_nested(geocode_result, ["result", "country_code"], default='us')
 
         # Get host details from the database
-        db = SessionLocal()
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: raise Exception("FraudCheck not found")
 
-        inputs = {
-            "host_email": check.input_data.get("host_email"),
-            "host_phone": check.input_data.get("host_phone"),
-            "country_code": country_code
-        }
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
+        inputs["country_code"] = country_code
     except Exception as e:
         # This will catch failures in getting the dependency or the DB record
         return {
@@ -137,14 +298,8 @@ def job_reputation_check(check_id_arg):
         db.close()
 
     # SKIPPED Case
-    if not inputs["host_email"] and not inputs["host_phone"]:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No host email and phone provided."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     try:
         def task(data):
             queries_to_run = google_search.prepare_reputation_queries(data)
@@ -159,6 +314,8 @@ def job_reputation_check(check_id_arg):
                         search_results = future.result()
                         for item in search_results:
                             all_results_text += f"Title: {item.get('title')}\nSnippet: {item.get('snippet')}\n\n"
+                    except ProviderUnavailable:
+                        raise
                     except Exception as e:
                         logging.error(f"A reputation search query failed: {e}")
             
@@ -177,6 +334,8 @@ def job_reputation_check(check_id_arg):
             "inputs_used": inputs,
             "result": task_result
         }
+    except ProviderUnavailable as e:
+        return _provider_unavailable_step(job_name, job_description, inputs, e)
     except Exception as e:
         return {
             "job_name": job_name,
@@ -189,7 +348,7 @@ def job_reputation_check(check_id_arg):
 def job_description_plagiarism_check(check_id_arg):
     """Checks for description plagiarism and returns a standardized AnalysisStep result."""
     job_name = "description_plagiarism_check"
-    job_description = "Realiza una búsqueda exacta en la web para detectar si la descripción del anuncio ha sido copiada de otros sitios."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -200,18 +359,12 @@ def job_description_plagiarism_check(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        inputs = {"description": check.input_data.get("description")}
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
     description = inputs.get("description")
-    if not description or len(description) < 150:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "Description was missing or too short to check."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     
     try:
         def task(data):
@@ -235,6 +388,8 @@ def job_description_plagiarism_check(check_id_arg):
             "inputs_used": inputs,
             "result": task_result
         }
+    except ProviderUnavailable as e:
+        return _provider_unavailable_step(job_name, job_description, inputs, e)
     except Exception as e:
         return {
             "job_name": job_name,
@@ -249,7 +404,7 @@ def job_url_forensics(check_id_arg):
     Performs domain age, blacklist, and archive checks on the listing URL in parallel.
     """
     job_name = "url_forensics"
-    job_description = "Comprueba la antigüedad del dominio, listas negras y archivos históricos de la URL del anuncio."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -260,18 +415,12 @@ def job_url_forensics(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        inputs = {"listing_url": check.input_data.get("listing_url")}
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
         
-    if not inputs["listing_url"]:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No listing URL was provided."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     try:
         def task(data):
             url = data["listing_url"]
@@ -279,14 +428,18 @@ def job_url_forensics(check_id_arg):
             results = {}
 
             with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                future_age = executor.submit(url_analysis.check_domain_age, domain_name)
-                future_blacklist = executor.submit(url_analysis.check_url_blacklist, url)
-                future_archive = executor.submit(url_analysis.check_archive_history, url)
-
-                results["domain_age"] = future_age.result()
-                results["blacklist_check"] = future_blacklist.result()
-                results["archive_check"] = future_archive.result()
-                
+                futures = {
+                    "domain_age": executor.submit(url_analysis.check_domain_age, domain_name),
+                    "blacklist_check": executor.submit(url_analysis.check_url_blacklist, url),
+                    "archive_check": executor.submit(url_analysis.check_archive_history, url),
+                }
+                for key, future in futures.items():
+                    try:
+                        results[key] = future.result()
+                    except ProviderUnavailable as e:
+                        results[key] = {"status": "SKIPPED", "reason": f"Provider unavailable ({e.provider})."}
+                        results.setdefault("unavailable_providers", []).append(e.provider)
+
             return results
 
         task_result = _run_cached_job(str(check_id), job_name, inputs, task)
@@ -316,7 +469,7 @@ def job_description_analysis(check_id_arg):
     """
     # --- 1. Define Job Metadata ---
     job_name = "description_analysis"
-    job_description = "Analiza la descripción del anuncio en busca de señales de alerta como tácticas de presión o detalles vagos."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -327,19 +480,11 @@ def job_description_analysis(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        inputs = {
-            "description": check.input_data.get("description"),
-        }
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
-    if not inputs["description"]:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No description provided."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
         
     try:
         def task(data):
@@ -372,7 +517,7 @@ def job_communication_analysis(check_id_arg):
     """
     # --- 1. Define Job Metadata ---
     job_name = "communication_analysis"
-    job_description = "Analiza el texto de comunicación en busca de patrones de fraude como solicitudes de pago de alto riesgo."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -383,21 +528,12 @@ def job_communication_analysis(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        inputs = {
-            "communication_text": check.input_data.get("communication_text"),
-        }
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
-    communication_text = inputs.get("communication_text")
 
-    if not communication_text or len(communication_text) < 50:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No communication_text provided."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
         
     try:
         def task(data):
@@ -427,7 +563,7 @@ def job_communication_analysis(check_id_arg):
 def job_listing_reviews_analysis(check_id_arg):
     """Analyzes a limited number of the listing's own reviews."""
     job_name = "listing_reviews_analysis"
-    job_description = "Analiza las reseñas del anuncio para detectar sentimiento negativo y posibles señales de fraude."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -438,18 +574,11 @@ def job_listing_reviews_analysis(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        reviews = (check.input_data.get("reviews") or [])[:MAX_REVIEWS_TO_ANALYZE]
-        inputs = {"reviews": reviews}
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
-    if not inputs["reviews"]:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No reviews were provided."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     try:
         def task(data):
             return gemini_analysis.analyze_listing_reviews(data["reviews"])
@@ -478,7 +607,7 @@ def job_listing_reviews_analysis(check_id_arg):
 def job_reverse_image_search(check_id_arg):
     """Performs reverse image search on a limited number of images."""
     job_name = "reverse_image_search"
-    job_description = "Busca cada imagen en la web para detectar si ha sido robada o reutilizada de otros anuncios, una táctica habitual en estafas."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -489,29 +618,86 @@ def job_reverse_image_search(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        image_urls = (check.input_data.get("image_urls") or [])[:MAX_IMAGES_TO_ANALYZE]
-        inputs = {"image_urls": image_urls}
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
 
-    if not inputs["image_urls"]:
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
+    try:
+        def task(data):
+            # Vision is paid per image: spend it on the most different photos.
+            selection = image_selection.select_images(data["image_urls"], MAX_IMAGES_TO_ANALYZE)
+            hashes = selection["content_hashes"]
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                results = list(executor.map(
+                    lambda url: image_analysis.cached_reverse_image_search(url, hashes.get(url)),
+                    selection["selected_urls"],
+                ))
+            return {"reverse_search_results": results, "image_selection": selection["stats"]}
+
+        task_result = _run_cached_job(str(check_id), job_name, inputs, task)
+
+        if task_result.get("error"):
+            raise Exception(task_result.get("error"))
+
         return {
             "job_name": job_name,
             "description": job_description,
-            "status": "SKIPPED",
+            "status": "COMPLETED",
             "inputs_used": inputs,
-            "result": {"reason": "No image URLs were provided."}
+            "result": task_result
+        }
+    except ProviderUnavailable as e:
+        return _provider_unavailable_step(job_name, job_description, inputs, e)
+    except Exception as e:
+        return {
+            "job_name": job_name,
+            "description": job_description,
+            "status": "ERROR",
+            "inputs_used": inputs,
+            "result": {"error_message": str(e)}
         }
+
+
+def job_ai_image_detection(check_id_arg):
+    """Checks the most distinct images for signs of AI generation, several per Gemini request."""
+    job_name = "ai_image_detection"
+    job_description = JOB_DESCRIPTIONS[job_name]
+
+    if isinstance(check_id_arg, str):
+        check_id = uuid.UUID(check_id_arg)
+    else:
+        check_id = check_id_arg
+
+    db = SessionLocal()
+    try:
+        check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
+        if not check: return {"error": "Check not found"}
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
+    finally:
+        db.close()
+
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     try:
         def task(data):
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                results = list(executor.map(image_analysis.reverse_image_search, data["image_urls"]))
-            return {"reverse_search_results": results}
+            selection = image_selection.select_images(data["image_urls"], settings.AI_IMAGE_MAX_PER_CHECK, keep_bytes=True)
+            detection = image_analysis.detect_ai_images(
+                selection["selected_urls"], selection["content_hashes"], selection["image_bytes"]
+            )
+            return {
+                "ai_detection_results": detection["results"],
+                "cached_images": detection["cached"],
+                "gemini_requests": detection["gemini_requests"],
+                "image_selection": selection["stats"],
+            }
 
         task_result = _run_cached_job(str(check_id), job_name, inputs, task)
 
-        if task_result.get("error"):
-            raise Exception(task_result.get("error"))
+        results = task_result["ai_detection_results"]
+        if results and all(item.get("verdict") == "Error" for item in results):
+            raise Exception(results[0]["artifacts"][0])
 
         return {
             "job_name": job_name,
@@ -533,7 +719,7 @@ def job_reverse_image_search(check_id_arg):
 def job_price_sanity_check(check_id_arg):
     """Performs a price sanity check using Gemini."""
     job_name = "price_sanity_check"
-    job_description = "Analiza el precio del anuncio según su ubicación, tipo y descripción para detectar si es sospechosamente bajo o alto."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -545,22 +731,11 @@ def job_price_sanity_check(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        inputs = {
-            "price_details": check.input_data.get("price_details"),
-            "property_type": check.input_data.get("property_type"),
-            "address": check.input_data.get("address"),
-            "description": check.input_data.get("description") 
-        }
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
-    if not all([inputs["price_details"], inputs["property_type"], inputs["address"],inputs["description"]]):
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "Missing price, type, description or address for analysis."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     
     try:
         def task(data):
@@ -597,7 +772,7 @@ def job_host_profile_check(check_id_arg):
     Performs a simple, rule-based check on the host's profile data.
     """
     job_name = "host_profile_check"
-    job_description = "Comprueba el perfil del anfitrión en busca de señales de alerta como cuenta no verificada o muy reciente."
+    job_description = JOB_DESCRIPTIONS[job_name]
     
     if isinstance(check_id_arg, str):
         check_id = uuid.UUID(check_id_arg)
@@ -608,19 +783,13 @@ def job_host_profile_check(check_id_arg):
     try:
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check: return {"error": "Check not found"}
-        inputs = {"host_profile": check.input_data.get("host_profile")}
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
     finally:
         db.close()
         
     # SKIPPED Case
-    if not inputs["host_profile"]:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No host profile data was provided."}
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
     
     try:
         host_profile = inputs.get("host_profile", {})
@@ -651,17 +820,65 @@ def job_host_profile_check(check_id_arg):
             "result": {"error_message": str(e)}
         }
 
+def job_local_indicators(check_id_arg):
+    """
+    Looks the check's listing, contacts and images up in the indicators earlier
+    checks left in Redis (quick mode). Calls no provider.
+    """
+    job_name = "local_indicators"
+    job_description = JOB_DESCRIPTIONS[job_name]
+
+    if isinstance(check_id_arg, str):
+        check_id = uuid.UUID(check_id_arg)
+    else:
+        check_id = check_id_arg
+
+    db = SessionLocal()
+    try:
+        check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
+        if not check: return {"error": "Check not found"}
+        input_data = check.input_data or {}
+    finally:
+        db.close()
+
+    inputs = {
+        "listing_url": input_data.get("listing_url"),
+        "host_email": input_data.get("host_email"),
+        "host_phone": input_data.get("host_phone"),
+        "ibans": input_ibans(input_data),
+        "image_urls": (input_data.get("image_urls") or [])[:20],
+    }
+    if not any(inputs.values()):
+        return skipped_step(job_name, inputs, "No listing URL, contact details, IBAN or images were provided.", job_description)
+
+    try:
+        return {
+            "job_name": job_name,
+            "description": job_description,
+            "status": "COMPLETED",
+            "inputs_used": inputs,
+            "result": precheck.precheck(get_redis_conn(), **inputs),
+        }
+    except Exception as e:
+        return {
+            "job_name": job_name,
+            "description": job_description,
+            "status": "ERROR",
+            "inputs_used": inputs,
+            "result": {"error_message": str(e)}
+        }
+
 def job_iban_country_check(check_id_arg):
     """
-    Extracts IBAN numbers from communication text and flags if the bank country
+    Extracts valid IBANs from the IBAN field, communication text and description
+    (app.utils.iban, as the precheck indicators do) and flags if the bank country
     doesn't match the property country — a strong fraud indicator.
     """
     job_name = "iban_country_check"
-    job_description = "Detecta números IBAN en la comunicación y alerta si el país del banco no coincide con la ubicación del inmueble."
+    job_description = JOB_DESCRIPTIONS[job_name]
 
     try:
-        current_job = rq.get_current_job()
-        geocode_result = current_job.dependency.result
+        geocode_result = _geocode_result()
         country_code = get_nested(geocode_result, ["result", "country_code"], default="")
     except Exception as e:
         return {
@@ -682,53 +899,16 @@ def job_iban_country_check(check_id_arg):
         check = db.query(FraudCheck).filter(FraudCheck.id == check_id).first()
         if not check:
             return {"error": "Check not found"}
-        inputs = {
-            "communication_text": check.input_data.get("communication_text"),
-            "iban": check.input_data.get("iban"),
-            "country_code": country_code,
-        }
+        inputs, skip_reason = SKIP_RULES[job_name](check.input_data)
+        inputs["country_code"] = country_code
     finally:
         db.close()
 
-    has_communication = bool(inputs["communication_text"])
-    has_direct_iban = bool(inputs["iban"])
-
-    if not has_communication and not has_direct_iban:
-        return {
-            "job_name": job_name,
-            "description": job_description,
-            "status": "SKIPPED",
-            "inputs_used": inputs,
-            "result": {"reason": "No communication text or IBAN provided."},
-        }
+    if skip_reason:
+        return skipped_step(job_name, inputs, skip_reason, job_description)
 
     try:
-        iban_pattern = r'[A-Z]{2}\d{2}[A-Z0-9]{11,30}'
-        ibans_found: list[str] = []
-
-        # Direct IBAN field takes priority
-        if has_direct_iban:
-            direct_clean = re.sub(r'[\s\-]', '', inputs["iban"].upper())
-            direct_matches = re.findall(iban_pattern, direct_clean)
-            ibans_found.extend(direct_matches)
-
-        # Also scan communication text
-        if has_communication:
-            text_clean = re.sub(r'[\s\-]', '', inputs["communication_text"].upper())
-            ibans_found.extend(re.findall(iban_pattern, text_clean))
-
-        # Deduplicate preserving order
-        seen: set[str] = set()
-        ibans_found = [x for x in ibans_found if not (x in seen or seen.add(x))]  # type: ignore[func-returns-value]
-
-        if not ibans_found:
-            return {
-                "job_name": job_name,
-                "description": job_description,
-                "status": "SKIPPED",
-                "inputs_used": inputs,
-                "result": {"reason": "No IBAN found in provided data."},
-            }
+        ibans_found = input_ibans(inputs)
 
         mismatches = []
         for iban in ibans_found:
@@ -781,11 +961,10 @@ def job_address_cross_platform_search(check_id_arg):
     on multiple platforms with different hosts or inconsistent details.
     """
     job_name = "address_cross_platform_search"
-    job_description = "Busca la dirección del inmueble en otras plataformas para detectar anuncios duplicados de distintos anfitriones."
+    job_description = JOB_DESCRIPTIONS[job_name]
 
     try:
-        current_job = rq.get_current_job()
-        geocode_result = current_job.dependency.result
+        geocode_result = _geocode_result()
         formatted_address = get_nested(geocode_result, ["result", "formatted_address"])
     except Exception as e:
         return {
@@ -826,6 +1005,8 @@ def job_address_cross_platform_search(check_id_arg):
             "inputs_used": inputs,
             "result": task_result,
         }
+    except ProviderUnavailable as e:
+        return _provider_unavailable_step(job_name, job_description, inputs, e)
     except Exception as e:
         return {
             "job_name": job_name,
@@ -12,6 +12,12 @@ def handle_job_failure(job, connection, type, value, traceback):
     """
     logger.error(f"Job {job.id} failed. Handling failure.")
 
+    from app.workers.admission import record_completion
+    try:
+        record_completion(connection, job.origin)
+    except Exception as e:
+        logger.warning(f"Could not record completion of job {job.id}: {e}")
+
     # The first argument to our jobs is always the check_id
     check_id_arg = job.args[0]
 
@@ -29,4 +35,10 @@ def handle_job_failure(job, connection, type, value, traceback):
             db.commit()
             logger.info(f"Updated FraudCheck {check_id} status to FAILED.")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+    from app.workers.bulk import on_check_finished
+    try:
+        on_check_finished(connection, str(check_id))
+    except Exception as e:
+        logger.warning(f"Could not advance bulk batches of check {check_id}: {e}")
\ No newline at end of file
@@ -0,0 +1,42 @@
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def preload_clients() -> dict[str, bool]:
+    """
+    Imports every job module and builds the lazily-created SDK clients
+    (Gemini, Vision, Maps, Custom Search) once in the parent process.
+    Returns which clients initialized successfully.
+    """
+    # gRPC (Vision) refuses to be used across fork() unless fork support is on.
+    os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT", "1")
+
+    from app.workers import tasks, finalizer, orchestrator  # noqa: F401
+    from app.services import gemini_analysis, image_analysis, google_apis, google_search
+    import PIL.Image  # noqa: F401
+
+    status = {
+        "gemini": gemini_analysis.get_client() is not None,
+        "vision": image_analysis.get_vision_client() is not None,
+        "maps": google_apis.get_gmaps() is not None,
+        "search": google_search.get_search_service() is not None,
+    }
+    logger.info(f"Preloaded clients: {status}")
+    return status
+
+
+def prepare_for_fork():
+    """
+    Called in the parent right before forking the worker processes.
+    Drops pooled DB connections so children never share a socket, and moves
+    everything imported so far to the permanent GC generation so the garbage
+    collector does not touch (and un-share) those pages after fork.
+    """
+    from app.db.session import engine
+
+    engine.dispose(close=False)
+    gc.collect()
+    gc.freeze()
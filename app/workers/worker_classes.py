@@ -0,0 +1,280 @@
+"""
+Custom RQ worker classes for the analysis queues.
+
+ThreadedWorker runs several I/O-bound jobs concurrently inside one process,
+with an overall limit and optional per-queue limits.
+FairSchedulingMixin makes any worker dequeue from per-session lanes
+round-robin (see app.workers.fair_queue).
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from rq.exceptions import DequeueTimeout
+from rq.job import Job
+from rq.queue import Queue
+from rq.registry import clean_registries
+from rq.timeouts import TimerDeathPenalty
+from rq.utils import as_text
+from rq.worker import SimpleWorker, Worker, WorkerStatus
+
+from app.core.config import settings
+from app.workers.fair_queue import FairQueue, LaneScheduler, base_name
+
+logger = logging.getLogger(__name__)
+
+# While jobs are running the dequeue loop wakes up at least this often, so a
+# slot freed on a queue that was at its limit is picked up promptly.
+CAPACITY_POLL_SECONDS = 1
+# Longest a fair worker blocks on BLPOP before re-reading the active lanes.
+LANE_POLL_SECONDS = 1
+
+
+def pop_job(worker, queues: list[Queue], timeout: int | None):
+    """
+    Pops the next job from `queues` (in order) for `worker`.
+
+    Unlike Queue.dequeue_any this always uses (B)LPOP, never the single-queue
+    LMOVE into the intermediate queue: perform_job only cleans that queue up
+    when the worker's static queue list has exactly one entry, which is not
+    true when we dequeue from a dynamic subset.
+    """
+    queue_keys = [q.key for q in queues]
+    while True:
+        result = worker.queue_class.lpop(queue_keys, timeout, connection=worker.connection)
+        if result is None:
+            return None
+        queue_key, job_id = map(as_text, result)
+        queue = worker.queue_class.from_queue_key(
+            queue_key,
+            connection=worker.connection,
+            job_class=worker.job_class,
+            serializer=worker.serializer,
+            death_penalty_class=worker.death_penalty_class,
+        )
+        job = worker.job_class.fetch(job_id, connection=worker.connection, serializer=worker.serializer)
+        if job is None:
+            continue
+        return job, queue
+
+
+class ThreadedWorker(SimpleWorker):
+    """
+    Runs up to `concurrency` jobs at once on a thread pool. Jobs are popped
+    only from queues that still have a free slot under `queue_limits`.
+
+    Each task opens and closes its own SessionLocal(), so sessions are never
+    shared between threads; concurrency is capped to the DB pool capacity so
+    threads never starve waiting for a connection.
+    """
+
+    # Signal-based timeouts only work on the main thread.
+    death_penalty_class = TimerDeathPenalty
+
+    def __init__(self, *args, concurrency: int | None = None, queue_limits: dict[str, int] | None = None, **kwargs):
+        # Must exist before BaseWorker.__init__ assigns self.execution.
+        self._thread_state = threading.local()
+        super().__init__(*args, **kwargs)
+
+        concurrency = concurrency or settings.WORKER_THREADS
+        db_capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        if concurrency > db_capacity:
+            logger.warning(
+                f"Requested {concurrency} threads but the DB pool only holds {db_capacity} connections; "
+                f"capping concurrency to {db_capacity}."
+            )
+            concurrency = db_capacity
+
+        self.concurrency = concurrency
+        self.queue_limits = queue_limits if queue_limits is not None else settings.worker_queue_limits
+        self._in_flight: dict[str, int] = defaultdict(int)
+        self._capacity = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"rq-{self.name[:8]}")
+
+    # The current Execution is per job, so it has to be per thread here.
+    @property
+    def execution(self):
+        return getattr(self._thread_state, "execution", None)
+
+    @execution.setter
+    def execution(self, value):
+        self._thread_state.execution = value
+
+    @property
+    def running_jobs(self) -> int:
+        return sum(self._in_flight.values())
+
+    def _candidate_queues(self) -> list[Queue]:
+        """Queues to dequeue from, in priority order."""
+        return list(self._ordered_queues)
+
+    def _limit_key(self, queue: Queue) -> str:
+        """Name the per-queue concurrency limit of `queue` is counted under."""
+        return queue.name
+
+    def _queues_with_capacity(self) -> list[Queue]:
+        if self.running_jobs >= self.concurrency:
+            return []
+        return [
+            q for q in self._candidate_queues()
+            if self._in_flight[self._limit_key(q)] < self.queue_limits.get(self._limit_key(q), self.concurrency)
+        ]
+
+    def _wait_for_capacity(self) -> list[Queue]:
+        with self._capacity:
+            while True:
+                available = self._queues_with_capacity()
+                if available or self._stop_requested:
+                    return available
+                self._capacity.wait(timeout=CAPACITY_POLL_SECONDS)
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int | None, max_idle_time: int | None = None):
+        idle_since = time.monotonic()
+        connection_wait_time = 1.0
+        while True:
+            self.heartbeat()
+            if self.should_run_maintenance_tasks:
+                self.run_maintenance_tasks()
+
+            queues = self._wait_for_capacity()
+            if self._stop_requested:
+                return None
+            if self.running_jobs == 0:
+                self.set_state(WorkerStatus.IDLE)
+
+            poll = timeout
+            if self.running_jobs:
+                # Burst mode must not quit while running jobs can still enqueue dependents.
+                poll = CAPACITY_POLL_SECONDS if timeout is None else min(timeout, CAPACITY_POLL_SECONDS)
+            if max_idle_time is not None and poll is not None:
+                poll = max(1, min(poll, max_idle_time))
+
+            try:
+                result = pop_job(self, queues, poll)
+            except DequeueTimeout:
+                if max_idle_time is not None and self.running_jobs == 0:
+                    if time.monotonic() - idle_since >= max_idle_time:
+                        return None
+                continue
+            except redis.exceptions.ConnectionError as conn_err:
+                self.log.error(
+                    f"Worker {self.name}: could not connect to Redis instance: {conn_err} "
+                    f"retrying in {connection_wait_time} seconds..."
+                )
+                time.sleep(connection_wait_time)
+                connection_wait_time = min(connection_wait_time * self.exponential_backoff_factor,
+                                           self.max_connection_wait_time)
+                continue
+
+            if result is None:
+                # Only reached in burst mode with nothing running.
+                return None
+
+            job, queue = result
+            self.reorder_queues(reference_queue=queue)
+            self.log.info(f"Worker {self.name}: {queue.name}: {job.id}")
+            return job, queue
+
+    def execute_job(self, job: Job, queue: Queue):
+        """Hands the job to the thread pool and returns immediately."""
+        with self._capacity:
+            self._in_flight[self._limit_key(queue)] += 1
+        self.set_state(WorkerStatus.BUSY)
+        self._executor.submit(self._run_job, job, queue)
+
+    def _run_job(self, job: Job, queue: Queue):
+        try:
+            self.prepare_execution(job)
+            self.perform_job(job, queue)
+        except Exception:
+            logger.error(f"Unhandled error running job {job.id} in thread", exc_info=True)
+        finally:
+            self.execution = None
+            with self._capacity:
+                self._in_flight[self._limit_key(queue)] -= 1
+                self._capacity.notify_all()
+
+    def teardown(self):
+        """Waits for every in-flight job before deregistering the worker."""
+        self.log.info(f"Worker {self.name}: waiting for {self.running_jobs} running job(s) to finish")
+        self._executor.shutdown(wait=True)
+        super().teardown()
+
+
+class FairSchedulingMixin:
+    """
+    Dequeues from the worker's queues through their fair lanes: priority
+    lane first, then session lanes round-robin. The lane order is rebuilt
+    on every dequeue attempt, and blocking pops are capped so new lanes are
+    picked up quickly.
+    """
+
+    queue_class = FairQueue
+
+    @property
+    def _ordered_queues(self) -> list[Queue]:
+        if getattr(self, "_lane_scheduler", None) is None:
+            self._lane_scheduler = LaneScheduler(self.connection)
+        names = self._lane_scheduler.order([q.name for q in self.queues])
+        return [
+            self.queue_class(
+                name,
+                connection=self.connection,
+                job_class=self.job_class,
+                serializer=self.serializer,
+                death_penalty_class=self.death_penalty_class,
+            )
+            for name in names
+        ]
+
+    @_ordered_queues.setter
+    def _ordered_queues(self, value):
+        # BaseWorker assigns the static order in __init__; ours is computed.
+        pass
+
+    def reorder_queues(self, reference_queue: Queue):
+        self._lane_scheduler.served(reference_queue.name)
+
+    def _limit_key(self, queue: Queue) -> str:
+        return base_name(queue.name)
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int | None, max_idle_time: int | None = None):
+        if timeout is not None:
+            timeout = min(timeout, LANE_POLL_SECONDS)
+        return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+
+    def clean_registries(self):
+        """Also cleans the lanes' registries and forgets lanes with nothing left in them."""
+        super().clean_registries()
+        bases = {q.name for q in self.queues}
+        for lane in self.queue_class.all(connection=self.connection, job_class=self.job_class, serializer=self.serializer):
+            if lane.name in bases or base_name(lane.name) not in bases:
+                continue
+            if not lane.acquire_maintenance_lock():
+                continue
+            try:
+                clean_registries(lane, self._exc_handlers)
+                registries = (
+                    lane.started_job_registry, lane.deferred_job_registry, lane.scheduled_job_registry,
+                    lane.finished_job_registry, lane.failed_job_registry, lane.canceled_job_registry,
+                )
+                if lane.is_empty() and not any(registry.count for registry in registries):
+                    lane.delete(delete_jobs=False)
+            finally:
+                lane.release_maintenance_lock()
+
+
+class FairWorker(FairSchedulingMixin, Worker):
+    pass
+
+
+class FairSimpleWorker(FairSchedulingMixin, SimpleWorker):
+    pass
+
+
+class FairThreadedWorker(FairSchedulingMixin, ThreadedWorker):
+    pass
@@ -0,0 +1,299 @@
+"""
+Deterministic, representative inputs for the micro-benchmarks.
+
+Each supported platform gets a synthetic "pasted page" that mimics what users
+copy with Ctrl+A: navigation chrome, the listing itself, host details,
+reviews, survey widgets, FAQ blocks and footer boilerplate. Corpora are
+generated from a fixed seed so numbers are comparable between runs.
+"""
+
+import json
+import random
+import uuid
+from datetime import datetime, timezone
+
+PLATFORMS = (
+    "idealista",
+    "fotocasa",
+    "airbnb",
+    "booking",
+    "pisos",
+    "habitaclia",
+    "milanuncios",
+    "wallapop",
+    "vrbo",
+)
+
+PAGE_TARGET_CHARS = 50_000
+
+_NAV = {
+    "idealista": ["Idealista", "Buscar", "Publicar anuncio gratis", "Favoritos", "Mensajes", "Alquiler", "Venta"],
+    "fotocasa": ["Fotocasa", "Comprar", "Alquilar", "Compartir", "Obra nueva", "Publica tu anuncio"],
+    "airbnb": ["Airbnb", "Stays", "Experiences", "Airbnb your home", "Share", "Save", "Show all photos"],
+    "booking": ["Booking.com", "EUR", "Stays", "Flights", "Car rentals", "Register", "Sign in", "Reserve"],
+    "pisos": ["pisos.com", "Alquiler", "Venta", "Obra nueva", "Mis alertas", "Acceder"],
+    "habitaclia": ["habitaclia", "Comprar", "Llogar", "Obra nova", "Publica", "Accedeix"],
+    "milanuncios": ["milanuncios", "Inmobiliaria", "Pisos", "Publicar anuncio", "Mis anuncios", "Chat"],
+    "wallapop": ["Wallapop", "Inmobiliaria", "Subir producto", "Buzón", "Tú", "Favoritos"],
+    "vrbo": ["Vrbo", "Trip Boards", "List your property", "Help", "Sign in", "Book now"],
+}
+
+_LANG = {
+    "idealista": "es", "fotocasa": "es", "pisos": "es", "milanuncios": "es", "wallapop": "es",
+    "habitaclia": "ca", "airbnb": "en", "booking": "en", "vrbo": "en",
+}
+
+_SENTENCES = {
+    "es": [
+        "Piso luminoso y reformado en pleno centro de la ciudad.",
+        "A cinco minutos andando del metro y de la estación de cercanías.",
+        "La cocina está totalmente equipada con horno, microondas y lavavajillas.",
+        "El dormitorio principal tiene armario empotrado y baño en suite.",
+        "Edificio con ascensor, portero físico y trastero incluido.",
+        "Ideal para estudiantes o profesionales que buscan tranquilidad.",
+        "No se admiten mascotas ni fiestas en la vivienda.",
+        "Gastos de comunidad incluidos en el precio del alquiler.",
+    ],
+    "ca": [
+        "Pis lluminós i reformat al centre de la ciutat.",
+        "A cinc minuts a peu del metro i de l'estació de rodalies.",
+        "La cuina està totalment equipada amb forn i rentaplats.",
+        "Edifici amb ascensor, porter i traster inclòs.",
+        "Ideal per a estudiants o professionals que busquen tranquil·litat.",
+        "No s'admeten mascotes ni festes a l'habitatge.",
+    ],
+    "en": [
+        "Bright, fully renovated apartment right in the heart of the old town.",
+        "Five minutes on foot from the metro and the main train station.",
+        "The kitchen is fully equipped with oven, microwave and dishwasher.",
+        "The master bedroom has a built-in wardrobe and an en-suite bathroom.",
+        "Building with elevator, concierge and a private storage room.",
+        "Perfect for couples, business travellers and families with kids.",
+        "No pets, no parties, quiet hours from 10pm to 8am.",
+        "Self check-in with a keypad, fast wifi and a dedicated workspace.",
+    ],
+}
+
+_NOISE = [
+    "Show availability", "Mostrar disponibilidad", "Reserva ahora", "Book now", "1 de 2", "2 de 2",
+    "Question image", "Neutral", "Strongly agree", "Agree", "Disagree", "Muy de acuerdo",
+    "24 fotos más", "Read all reviews", "Leer todos los comentarios", "Save as favourite",
+]
+
+_FAQ = {
+    "es": ["Preguntas frecuentes", "¿Se admiten mascotas?", "¿Hay parking?", "¿Cuál es la fianza?"],
+    "ca": ["Preguntes freqüents", "S'admeten mascotes?", "Hi ha pàrquing?", "Quina és la fiança?"],
+    "en": ["Frequently asked questions", "Are pets allowed?", "Is there parking?", "What is the deposit?"],
+}
+
+_FOOTER = {
+    "es": ["Política de privacidad", "Todos los derechos reservados", "© 2026"],
+    "ca": ["Política de privadesa", "Tots els drets reservats", "© 2026"],
+    "en": ["Privacy policy", "Terms of service", "All rights reserved", "© 2026"],
+}
+
+_NAMES = ["Laura", "Marc", "Sofía", "James", "Anna", "Pierre", "Lucía", "Tom", "Núria", "Hans"]
+
+
+def _paragraph(rng: random.Random, lang: str, sentences: int) -> str:
+    return " ".join(rng.choice(_SENTENCES[lang]) for _ in range(sentences))
+
+
+def listing_page(platform: str, target_chars: int = PAGE_TARGET_CHARS) -> str:
+    """Builds a synthetic pasted listing page of roughly ``target_chars`` characters."""
+    rng = random.Random(f"page:{platform}")
+    lang = _LANG[platform]
+    lines: list[str] = []
+    lines.extend(_NAV[platform])
+    lines.append(f"<div class=\"title\">Apartamento {rng.randint(40, 120)} m² - {platform}</div>")
+    lines.append(f"{rng.randint(600, 2400)} €/mes")
+    for _ in range(6):
+        lines.append(_paragraph(rng, lang, rng.randint(3, 6)))
+        lines.append(rng.choice(_NOISE))
+
+    lines.append(f"Anfitrión: {rng.choice(_NAMES)} · Miembro desde {rng.randint(2012, 2026)}")
+    lines.append(f"Contacto: host{rng.randint(1, 999)}@example.com · +34 6{rng.randint(10_000_000, 99_999_999)}")
+
+    # Reviews and related listings make up the bulk of a real pasted page,
+    # with plenty of repeated lines that the sanitizer has to deduplicate.
+    review_no = 0
+    size = sum(len(line) + 1 for line in lines)
+    while size < target_chars * 0.9:
+        review_no += 1
+        block = [
+            f"{rng.choice(_NAMES)} · {rng.randint(1, 28)} de {rng.choice(['marzo', 'abril', 'mayo'])} de 2026",
+            _paragraph(rng, lang, rng.randint(1, 4)),
+            rng.choice(_NOISE),
+        ]
+        if review_no % 25 == 0:
+            block.extend(_NAV[platform])
+        if review_no == 120:
+            block.extend(_FAQ[lang])
+        lines.extend(block)
+        size += sum(len(line) + 1 for line in block)
+
+    lines.extend(_FOOTER[lang])
+    size += sum(len(line) + 1 for line in _FOOTER[lang])
+    while size < target_chars:
+        line = f"Enlace relacionado {len(lines)}: {rng.choice(_SENTENCES[lang])}"
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:target_chars]
+
+
+def input_data(platform: str) -> dict:
+    """A full ``FraudCheck.input_data`` payload as stored by ``POST /analysis``."""
+    rng = random.Random(f"input:{platform}")
+    lang = _LANG[platform]
+    return {
+        "listing_url": f"https://www.{platform}.com/listing/{rng.randint(10_000_000, 99_999_999)}",
+        "address": f"Calle Mayor {rng.randint(1, 200)}, 28013 Madrid, España",
+        "description": "\n".join(_paragraph(rng, lang, 6) for _ in range(8))[:5000],
+        "image_urls": [
+            f"https://img.{platform}.com/photos/{rng.getrandbits(64):x}.jpg?im_w=1200" for _ in range(20)
+        ],
+        "communication_text": communication_text(platform),
+        "host_email": f"host{rng.randint(1, 999)}@example.com",
+        "host_phone": f"+34 6{rng.randint(10_000_000, 99_999_999)}",
+        "reviews": [
+            {
+                "reviewer_name": rng.choice(_NAMES),
+                "review_date": f"2026-0{rng.randint(1, 9)}-{rng.randint(10, 28)}",
+                "review_text": _paragraph(rng, lang, rng.randint(1, 3)),
+            }
+            for _ in range(50)
+        ],
+        "price_details": f"Precio base: {rng.randint(600, 2400)} €/mes\nLimpieza: 60 €\nFianza: 2 meses",
+        "host_profile": {"name": rng.choice(_NAMES), "is_verified": rng.random() > 0.5, "member_since": "2024"},
+        "property_type": rng.choice(["apartment", "studio", "house", "room"]),
+    }
+
+
+def communication_text(platform: str, chars: int = 6000) -> str:
+    """Host/guest conversation with a couple of IBANs written in different styles."""
+    rng = random.Random(f"comm:{platform}")
+    lang = _LANG[platform]
+    parts = []
+    size = 0
+    while size < chars:
+        parts.append(_paragraph(rng, lang, 3))
+        if rng.random() < 0.1:
+            parts.append("Please send the deposit to IBAN GB29 NWBK 6016 1331 9268 19 today.")
+        if rng.random() < 0.1:
+            parts.append("Transferencia a ES91-2100-0418-4502-0005-1332 antes del viernes.")
+        size = sum(len(p) + 1 for p in parts)
+    return "\n".join(parts)[:chars]
+
+
+def gemini_response(fenced: bool = True) -> str:
+    """A synthesis-sized model reply, optionally wrapped in a ```json fence."""
+    rng = random.Random("gemini")
+    payload = {
+        "authenticity_score": 42,
+        "quality_score": 55,
+        "sidebar_summary": _paragraph(rng, "en", 2),
+        "explanation": "\n\n".join(_paragraph(rng, "en", 5) for _ in range(8)),
+        "suggested_actions": [_paragraph(rng, "en", 1) for _ in range(3)],
+        "flags": [
+            {"category": rng.choice(["High", "Medium", "Positive"]), "description": _paragraph(rng, "en", 1)}
+            for _ in range(8)
+        ],
+    }
+    body = json.dumps(payload, ensure_ascii=False, indent=2)
+    return f"Here is the report:\n```json\n{body}\n```\n" if fenced else body
+
+
+def catastro_coordinates_xml() -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<consulta_coordenadas xmlns="http://www.catastro.meh.es/">'
+        "<control><cucoor>1</cucoor><cuerr>0</cuerr></control>"
+        "<coordenadas><coord><pc><pc1>9872023</pc1><pc2>VH5797S</pc2></pc>"
+        "<geo><xcen>-3.7038</xcen><ycen>40.4168</ycen><srs>EPSG:4326</srs></geo>"
+        "<ldt>CL MAYOR 10 MADRID (MADRID)</ldt></coord></coordenadas>"
+        "</consulta_coordenadas>"
+    )
+
+
+def catastro_address_xml(properties: int = 40) -> str:
+    entries = "".join(
+        "<rcdnp><rc><pc1>9872023</pc1><pc2>VH5797S</pc2>"
+        f"<car>{i:04d}</car><cc1>X</cc1><cc2>Y</cc2></rc>"
+        f"<dt><locs><lous><lourb><dir><cv>1234</cv><pnp>10</pnp></dir>"
+        f"<loint><es>1</es><pt>{i // 4:02d}</pt><pu>{i % 4:02d}</pu></loint></lourb></lous></locs></dt>"
+        "<debi><luso>Residencial</luso><sfc>85</sfc></debi></rcdnp>"
+        for i in range(properties)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<consulta_dnp xmlns="http://www.catastro.meh.es/">'
+        f"<control><cudnp>{properties}</cudnp></control>"
+        f"<lrcdnp>{entries}</lrcdnp><ldt>CL MAYOR 10 MADRID (MADRID)</ldt>"
+        "</consulta_dnp>"
+    )
+
+
+def analysis_steps(platform: str) -> list[dict]:
+    """Step dicts shaped like the ones the finalizer stores on a completed check."""
+    data = input_data(platform)
+    rng = random.Random(f"steps:{platform}")
+    steps = [
+        ("geocode", {"address": data["address"]}, {"formatted_address": data["address"], "country_code": "es"}),
+        ("url_forensics", {"listing_url": data["listing_url"]}, {
+            "domain_age": {"is_new": False, "reason": "Domain was created on 2004-05-01"},
+            "blacklist_check": {"is_blacklisted": False, "reason": "URL not found on blacklists."},
+            "archive_check": {"has_history": True, "reason": "URL has an archive history."},
+        }),
+        ("description_plagiarism_check", {"description": data["description"]}, {"plagiarized": False, "found_urls": []}),
+        ("description_analysis", {"description": data["description"]}, {"sentiment": "Neutral", "themes": []}),
+        ("communication_analysis", {"communication_text": data["communication_text"]}, {
+            "sentiment": "Negative", "themes": ["Risky Payment Request"],
+        }),
+        ("listing_reviews_analysis", {"reviews": data["reviews"][:10]}, {"sentiment": "Positive", "themes": []}),
+        ("price_sanity_check", {"price_details": data["price_details"]}, {"verdict": "Reasonable"}),
+        ("host_profile_check", {"host_profile": data["host_profile"]}, {"themes": []}),
+        ("reverse_image_search", {"image_urls": data["image_urls"][:5]}, {
+            "reverse_search_results": [
+                {"url": url, "is_reused": rng.random() < 0.2, "reason": "Image appears to be unique."}
+                for url in data["image_urls"][:5]
+            ],
+        }),
+        ("reputation_check", {"host_email": data["host_email"]}, {"summary": "No results found."}),
+        ("iban_country_check", {"communication_text": data["communication_text"]}, {"is_suspicious": True}),
+        ("address_cross_platform_search", {"formatted_address": data["address"]}, {"verdict": "legitimate"}),
+    ]
+    return [
+        {
+            "job_name": name,
+            "description": f"Step {name}",
+            "status": "COMPLETED",
+            "inputs_used": inputs,
+            "result": result,
+            "risk_score": rng.randint(0, 90),
+            "confidence": round(rng.uniform(0.5, 0.95), 2),
+        }
+        for name, inputs, result in steps
+    ]
+
+
+def job_scores(platform: str) -> dict[str, dict]:
+    return {
+        step["job_name"]: {"risk_score": step["risk_score"], "confidence": step["confidence"]}
+        for step in analysis_steps(platform)
+    }
+
+
+def job_status_payload(platform: str) -> dict:
+    """Attribute set for ``JobStatusResponse.model_validate`` (mirrors the ORM object)."""
+    return {
+        "id": uuid.UUID(int=random.Random(f"id:{platform}").getrandbits(128)),
+        "status": "COMPLETED",
+        "input_data": input_data(platform),
+        "final_report": json.loads(gemini_response(fenced=False)),
+        "created_at": datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc),
+        "chat": {
+            "id": uuid.UUID(int=1),
+            "messages": [{"role": "user", "content": "¿Es fiable?"}, {"role": "assistant", "content": "Depende."}],
+        },
+        "analysis_steps": analysis_steps(platform),
+    }
@@ -0,0 +1,109 @@
+"""
+Image preprocessing throughput on a synthetic listing-photo corpus: the old
+path (full decode, LANCZOS thumbnail, re-encode every image) against
+app.services.image_preprocessing inline and with its process pool.
+
+Usage:
+    python -m benchmarks.image_preprocessing [--images 40] [--processes 4]
+
+The corpus mixes what listing pages serve: phone-camera JPEGs (4032x3024),
+web-sized JPEGs (2048x1365), CDN thumbnails already under 1024 px, and PNG
+screenshots. Generated from a fixed seed; no network needed.
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks.db")
+os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_GEMINI_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "bench-id")
+os.environ.setdefault("ENVIRONMENT", "production")
+
+# (width, height, format) and their share of the corpus.
+SHAPES = (
+    ((4032, 3024, "JPEG"), 3),
+    ((2048, 1365, "JPEG"), 3),
+    ((1024, 683, "JPEG"), 3),
+    ((1600, 1200, "PNG"), 1),
+)
+
+
+def _photo(width: int, height: int, fmt: str, rng: random.Random) -> bytes:
+    """A photo-like image: smooth colour gradient plus sensor noise."""
+    from PIL import Image, ImageFilter
+
+    tile = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), rng.uniform(8, 16)).filter(ImageFilter.GaussianBlur(1.5))
+    image = Image.merge("RGB", (tile, noise, tile.rotate(rng.choice((90, 180)), expand=False).resize((width, height))))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def corpus(count: int) -> list[bytes]:
+    rng = random.Random(42)
+    shapes = [shape for shape, weight in SHAPES for _ in range(weight)]
+    rng.shuffle(shapes)
+    cache: dict[tuple, bytes] = {}
+    images = []
+    for i in range(count):
+        shape = shapes[i % len(shapes)]
+        if shape not in cache:
+            cache[shape] = _photo(*shape, rng)
+        images.append(cache[shape])
+    return images
+
+
+def legacy(data: bytes) -> bytes:
+    """What check_for_ai_artifacts did before preprocessing existed."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.thumbnail((1024, 1024), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _throughput(fn, images: list[bytes]) -> float:
+    start = time.perf_counter()
+    fn(images)
+    return len(images) / (time.perf_counter() - start)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    from app.core.config import settings
+    from app.services import image_preprocessing
+
+    images = corpus(args.images)
+    print(f"{len(images)} images, {sum(map(len, images)) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    settings.IMAGE_PREPROCESS_PROCESSES = 0
+    rows = [
+        ("legacy (full decode + re-encode)", _throughput(lambda batch: [legacy(d) for d in batch], images)),
+        ("draft decode + pass-through, inline", _throughput(image_preprocessing.prepare_images, images)),
+    ]
+
+    settings.IMAGE_PREPROCESS_PROCESSES = args.processes
+    image_preprocessing.prepare_images(images[:args.processes])  # start the pool
+    rows.append((f"same, {args.processes}-process pool", _throughput(image_preprocessing.prepare_images, images)))
+    image_preprocessing.shutdown_pool()
+
+    print(f"{'path':<40} {'images/s':>10} {'speed-up':>10}")
+    for name, rate in rows:
+        print(f"{name:<40} {rate:>10.1f} {rate / rows[0][1]:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
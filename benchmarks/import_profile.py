@@ -0,0 +1,127 @@
+"""
+Profiles the import time of the API process (what a Cloud Run cold start pays
+before the first request) and checks it against the startup budget.
+
+Usage:
+    python -m benchmarks.import_profile            # total time + slowest modules
+    python -m benchmarks.import_profile --top 40   # show more modules
+    python -m benchmarks.import_profile --check    # exit 1 if over budget or a lazy SDK was imported
+
+Each run imports the module in a fresh interpreter with `-X importtime`.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BUDGETS_PATH = Path(__file__).parent / "budgets.json"
+REPO_ROOT = Path(__file__).parent.parent
+
+# SDKs the API must only load on first use, never while importing app.main.
+LAZY_MODULES = (
+    "google.cloud.vision",
+    "googleapiclient",
+    "googlemaps",
+    "playwright",
+    "PIL",
+    "google.genai",
+)
+
+# Same defaults as the tests.
+_ENV_DEFAULTS = {
+    "DATABASE_URL": "sqlite:///benchmarks.db",
+    "GOOGLE_API_KEY": "bench-key",
+    "GOOGLE_GEMINI_API_KEY": "bench-key",
+    "GOOGLE_SEARCH_ENGINE_ID": "bench-id",
+    "ENVIRONMENT": "production",
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+lazy = {lazy!r}
+loaded = sorted(m for m in lazy if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "loaded_lazy_modules": loaded}}))
+"""
+
+
+def profile_import(module: str = "app.main", importtime: bool = True) -> dict:
+    """
+    Imports `module` in a fresh interpreter. Returns the wall time of the
+    import, which lazy SDKs got loaded, and (with `importtime`) the per-module
+    cumulative times parsed from `-X importtime`, slowest first.
+    """
+    env = {**_ENV_DEFAULTS, **os.environ}
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _PROBE.format(module=module, lazy=LAZY_MODULES)]
+
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = round(time.perf_counter() - started, 3)
+    result["modules"] = _parse_importtime(proc.stderr) if importtime else []
+    return result
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int]]:
+    """Returns (module, cumulative microseconds) pairs, slowest first."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name.strip(), int(cumulative)))
+    return sorted(modules, key=lambda m: m[1], reverse=True)
+
+
+def load_startup_budget() -> dict:
+    with open(BUDGETS_PATH, encoding="utf-8") as f:
+        return json.load(f)["startup"]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20, help="how many of the slowest modules to print")
+    parser.add_argument("--check", action="store_true", help="fail if the import exceeds the startup budget")
+    args = parser.parse_args(argv)
+
+    result = profile_import(args.module)
+    print(f"import {args.module}: {result['seconds']:.3f}s (process total {result['process_seconds']:.3f}s)")
+    print(f"\n{'module':<60} {'cumulative (ms)':>16}")
+    for name, cumulative_us in result["modules"][:args.top]:
+        print(f"{name:<60} {cumulative_us / 1000:>16.1f}")
+
+    if result["loaded_lazy_modules"]:
+        print(f"\nLazy SDKs loaded at import: {', '.join(result['loaded_lazy_modules'])}")
+
+    if args.check:
+        budget = load_startup_budget()
+        failures = []
+        if result["seconds"] > budget["max_import_seconds"]:
+            failures.append(f"import took {result['seconds']:.3f}s > budget {budget['max_import_seconds']}s")
+        if result["loaded_lazy_modules"]:
+            failures.append(f"lazy SDKs imported: {', '.join(result['loaded_lazy_modules'])}")
+        if failures:
+            print("\nStartup budget exceeded:")
+            for line in failures:
+                print(f"  - {line}")
+            return 1
+        print("\nStartup within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Counts Redis round-trips for enqueuing one check's job graph and for the
+finalizer's read of its dependency results, per-call (how RQ's Queue.enqueue /
+Job.fetch_dependencies do it) vs batched (JobGraph / fetch_dependency_results).
+
+Usage:
+    python -m benchmarks.redis_roundtrips            # print round-trips and wall time
+    python -m benchmarks.redis_roundtrips --check    # exit 1 if batched counts exceed budgets.json
+
+Needs a Redis server (REDIS_HOST / REDIS_PORT / REDIS_PASSWORD / REDIS_SSL as
+for the app). Jobs go to throwaway "benchmark-*" queues that no worker
+listens on and are deleted afterwards. Against a remote TLS Redis each
+round-trip costs a network RTT, so the wall times show the real saving.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks.db")
+os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_GEMINI_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "bench-id")
+os.environ.setdefault("ENVIRONMENT", "production")
+
+import redis
+from redis.connection import AbstractConnection
+
+BUDGETS_PATH = Path(__file__).parent / "budgets.json"
+
+
+@contextmanager
+def count_roundtrips():
+    """Counts requests sent to Redis (a pipeline is one request)."""
+    counter = {"roundtrips": 0}
+    original = AbstractConnection.send_packed_command
+
+    def counting(self, command, check_health=True):
+        counter["roundtrips"] += 1
+        return original(self, command, check_health)
+
+    AbstractConnection.send_packed_command = counting
+    started = time.perf_counter()
+    try:
+        yield counter
+    finally:
+        counter["seconds"] = time.perf_counter() - started
+        AbstractConnection.send_packed_command = original
+
+
+def _connect():
+    from app.core.config import settings
+    return redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASSWORD,
+        ssl=settings.REDIS_SSL,
+    )
+
+
+def _queues(connection):
+    from app.workers.fair_queue import FairQueue
+    return FairQueue("benchmark-fast", connection=connection), FairQueue("benchmark-heavy", connection=connection)
+
+
+def _graph(connection):
+    from app.workers.orchestrator import build_analysis_graph
+    fast, heavy = _queues(connection)
+    return build_analysis_graph(str(uuid.uuid4()), fast, heavy)
+
+
+def measure(connection) -> dict:
+    from rq.job import Job
+    from rq.results import Result
+    from rq.utils import get_version
+    from app.workers.job_graph import fetch_dependency_results
+
+    get_version(connection)  # RQ asks once per connection; keep it out of the counts
+    results = {}
+
+    per_call = _graph(connection)
+    with count_roundtrips() as counter:
+        for queue, job in per_call.entries:
+            queue.enqueue_job(job)
+    results["enqueue_per_call"] = counter
+
+    batched = _graph(connection)
+    with count_roundtrips() as counter:
+        batched.enqueue()
+    results["enqueue_graph"] = counter
+
+    # Give every dependency of the finalizer a stored result, as workers would.
+    finalizer_job = batched.entries[-1][1]
+    for _, job in batched.entries[:-1]:
+        Result.create(job, Result.Type.SUCCESSFUL, ttl=60, return_value={"job_name": job.func_name, "status": "COMPLETED"})
+    finalizer_job = Job.fetch(finalizer_job.id, connection=connection)
+
+    with count_roundtrips() as counter:
+        steps = [dep.return_value() for dep in finalizer_job.fetch_dependencies()]
+    results["fetch_dependencies_per_call"] = counter
+
+    with count_roundtrips() as counter:
+        batched_steps = fetch_dependency_results(finalizer_job)
+    results["fetch_dependency_results"] = counter
+    assert len(steps) == len(batched_steps) and all(batched_steps), "batched read returned different results"
+
+    for graph in (per_call, batched):
+        for _, job in graph.entries:
+            job.delete()
+            connection.delete(Result.get_key(job.id))
+    for queue in _queues(connection):
+        queue.delete(delete_jobs=True)
+    return results
+
+
+def load_budget() -> dict:
+    with open(BUDGETS_PATH, encoding="utf-8") as f:
+        return json.load(f)["redis_roundtrips"]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="fail if a batched path exceeds its round-trip budget")
+    args = parser.parse_args(argv)
+
+    results = measure(_connect())
+    print(f"{'path':<30} {'round-trips':>12} {'ms':>10}")
+    for name, counter in results.items():
+        print(f"{name:<30} {counter['roundtrips']:>12} {counter['seconds'] * 1000:>10.1f}")
+
+    if args.check:
+        budget = load_budget()
+        failures = [
+            f"{name}: {results[name]['roundtrips']} round-trips > budget {limit}"
+            for name, limit in budget.items()
+            if results[name]["roundtrips"] > limit
+        ]
+        if failures:
+            print("\nRound-trip budget exceeded:")
+            for line in failures:
+                print(f"  - {line}")
+            return 1
+        print("\nRound-trips within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Compares the local template report (app/workers/local_report.py) with the
+report the synthesis LLM wrote, on checks already stored in the database.
+
+Usage:
+    python -m benchmarks.report_parity                 # latest 500 LLM-written checks
+    python -m benchmarks.report_parity --limit 2000 --mode deep
+    python -m benchmarks.report_parity --all           # also checks the local synthesizer would not take
+    python -m benchmarks.report_parity --check         # exit 1 if the reports drift apart
+
+Only checks whose report came from the LLM are read (not quick mode, not
+already written locally). Each is re-scored from its stored steps, and the
+ones `unambiguous_outcome` would hand to the local synthesizer are compared:
+authenticity score, verdict band (the same 40/70 cut-offs the frontend
+colours by) and flag categories. Needs DATABASE_URL pointing at the app's
+database; nothing is written and no LLM is called.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from collections import Counter
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks.db")
+os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_GEMINI_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "bench-id")
+os.environ.setdefault("ENVIRONMENT", "production")
+
+# The LLM may move authenticity this far from 100 - risk (synthesis prompt).
+MAX_MEAN_DELTA = 15
+MIN_BAND_AGREEMENT = 0.9
+
+# Steps the orchestrator records itself; the finalizer doesn't score them.
+RECORDED_JOBS = {"historical_cross_check"}
+
+
+def band(authenticity_score: int) -> str:
+    if authenticity_score >= 70:
+        return "low_risk"
+    if authenticity_score >= 40:
+        return "medium_risk"
+    return "high_risk"
+
+
+def compare_reports(local: dict, llm: dict) -> dict:
+    """Differences between two final reports for the same check."""
+    local_categories = Counter(flag.get("category") for flag in local.get("flags", []))
+    llm_categories = Counter(flag.get("category") for flag in llm.get("flags", []))
+    return {
+        "authenticity_delta": local["authenticity_score"] - int(llm.get("authenticity_score", 0)),
+        "quality_delta": local["quality_score"] - int(llm.get("quality_score", 0)),
+        "same_band": band(local["authenticity_score"]) == band(int(llm.get("authenticity_score", 0))),
+        "high_flags_agree": bool(local_categories["High"]) == bool(llm_categories["High"]),
+        "local_flags": dict(local_categories),
+        "llm_flags": dict(llm_categories),
+    }
+
+
+def local_counterpart(steps: list, include_ambiguous: bool = False) -> tuple[str | None, dict | None]:
+    """(outcome, local report) for a stored check's steps; (None, None) if it isn't eligible."""
+    from app.workers import local_report
+    from app.workers.scoring import calculate_weighted_score, score_steps
+
+    scored = {step.get("job_name") for step in steps if isinstance(step, dict)} - RECORDED_JOBS
+    scoring_summary = calculate_weighted_score(score_steps(steps, scored))
+    outcome = local_report.unambiguous_outcome(steps, scoring_summary)
+    if outcome is None and include_ambiguous:
+        risk = scoring_summary["calculated_risk_score"]
+        outcome = local_report.LOW if risk < 50 else local_report.HIGH
+        return "ambiguous", local_report.build_local_report(steps, scoring_summary, outcome)
+    if outcome is None:
+        return None, None
+    return outcome, local_report.build_local_report(steps, scoring_summary, outcome)
+
+
+def _stored_checks(limit: int, mode: str | None):
+    from app.db.models import FraudCheck, JobStatus
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        query = db.query(FraudCheck).filter(FraudCheck.status == JobStatus.COMPLETED, FraudCheck.mode != "quick")
+        if mode:
+            query = query.filter(FraudCheck.mode == mode)
+        for check in query.order_by(FraudCheck.created_at.desc()).limit(limit):
+            report = check.final_report or {}
+            if "authenticity_score" in report and report.get("synthesized_by") != "local":
+                yield check.id, check.analysis_steps or [], report
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=500, help="most recent checks to read")
+    parser.add_argument("--mode", choices=("standard", "deep"), help="only checks run in this mode")
+    parser.add_argument("--all", action="store_true", help="also compare checks that would still go to the LLM")
+    parser.add_argument("--check", action="store_true", help="exit 1 if the eligible reports drift from the LLM's")
+    args = parser.parse_args(argv)
+
+    rows, read = [], 0
+    for check_id, steps, llm_report in _stored_checks(args.limit, args.mode):
+        read += 1
+        outcome, local = local_counterpart(steps, include_ambiguous=args.all)
+        if local is not None:
+            rows.append((check_id, outcome, compare_reports(local, llm_report)))
+
+    print(f"{'check':<38} {'outcome':<10} {'Δ auth':>7} {'Δ qual':>7} {'band':>5} {'flags (local / llm)'}")
+    for check_id, outcome, diff in rows:
+        print(
+            f"{str(check_id):<38} {outcome:<10} {diff['authenticity_delta']:>+7} {diff['quality_delta']:>+7} "
+            f"{'ok' if diff['same_band'] else 'DIFF':>5} {diff['local_flags']} / {diff['llm_flags']}"
+        )
+
+    eligible = [diff for _, outcome, diff in rows if outcome != "ambiguous"]
+    print(f"\n{read} LLM reports read, {len(eligible)} the local synthesizer would write.")
+    if not eligible:
+        return 0
+    mean_delta = statistics.mean(abs(diff["authenticity_delta"]) for diff in eligible)
+    band_agreement = sum(diff["same_band"] for diff in eligible) / len(eligible)
+    high_agreement = sum(diff["high_flags_agree"] for diff in eligible) / len(eligible)
+    print(f"Mean |Δ authenticity|: {mean_delta:.1f} (max {max(abs(d['authenticity_delta']) for d in eligible)})")
+    print(f"Same verdict band: {band_agreement:.0%}. Agree on High flags: {high_agreement:.0%}.")
+
+    if args.check and (mean_delta > MAX_MEAN_DELTA or band_agreement < MIN_BAND_AGREEMENT):
+        print(f"\nParity below target (mean Δ ≤ {MAX_MEAN_DELTA}, band agreement ≥ {MIN_BAND_AGREEMENT:.0%}).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
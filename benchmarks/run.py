@@ -0,0 +1,223 @@
+"""
+Runs the CPU hot-path micro-benchmarks and checks them against budgets.json.
+
+Usage:
+    python -m benchmarks.run                 # print timings and allocations
+    python -m benchmarks.run --check         # exit 1 if any budget is exceeded
+    python -m benchmarks.run --update        # rewrite budgets.json from this machine
+    python -m benchmarks.run -k sanitize     # only benchmarks whose name matches
+
+Timings are the median per-call time over several repeats; allocations are the
+tracemalloc peak of a single call. Each benchmark runs once per platform corpus
+and the budget applies to the slowest platform.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+# Settings require these before any app import (same defaults as the tests).
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks.db")
+os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_GEMINI_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "bench-id")
+os.environ.setdefault("ENVIRONMENT", "production")
+
+from benchmarks import corpora
+
+BUDGETS_PATH = Path(__file__).parent / "budgets.json"
+
+# --update writes measured values multiplied by this factor so the check is
+# not flaky on a busy laptop, while still catching order-of-magnitude slips.
+BUDGET_HEADROOM = 2.0
+REPEATS = 5
+# Each repeat loops the call until roughly this many seconds have elapsed.
+REPEAT_SECONDS = 0.05
+
+
+def _bench_sanitize(platform: str):
+    from app.utils.text_sanitizer import sanitize_listing_text
+    page = corpora.listing_page(platform)
+    return lambda: sanitize_listing_text(page)
+
+
+def _bench_generate_hash(platform: str):
+    from app.utils.helpers import generate_hash
+    data = corpora.input_data(platform)
+    return lambda: generate_hash(data)
+
+
+def _bench_iban_scan(platform: str):
+    from app.utils.iban import find_ibans
+    text = corpora.communication_text(platform)
+    return lambda: find_ibans("ES91 2100 0418 4502 0005 1332", text)
+
+
+def _bench_weighted_score(platform: str):
+    from app.workers.scoring import calculate_weighted_score
+    scores = corpora.job_scores(platform)
+    return lambda: calculate_weighted_score(scores)
+
+
+def _bench_catastro_coordinates(platform: str):
+    from app.services.catastro import _parse_catastro_response
+    xml_text = corpora.catastro_coordinates_xml()
+    return lambda: _parse_catastro_response(xml_text)
+
+
+def _bench_catastro_address(platform: str):
+    from app.services.catastro import _parse_catastro_response
+    xml_text = corpora.catastro_address_xml()
+    return lambda: _parse_catastro_response(xml_text)
+
+
+def _bench_gemini_json(platform: str):
+    from app.services.gemini_analysis import _parse_json_response
+    text = corpora.gemini_response(fenced=True)
+    return lambda: _parse_json_response(text)
+
+
+def _bench_job_status_serialize(platform: str):
+    from app.schemas import JobStatusResponse
+    payload = corpora.job_status_payload(platform)
+
+    def run():
+        return JobStatusResponse.model_validate(payload).model_dump_json()
+    return run
+
+
+# Platform-independent benchmarks still run per corpus so every entry has the
+# same shape; their inputs simply do not vary.
+BENCHMARKS: dict[str, Callable[[str], Callable[[], object]]] = {
+    "sanitize_listing_text": _bench_sanitize,
+    "generate_hash": _bench_generate_hash,
+    "iban_scan": _bench_iban_scan,
+    "calculate_weighted_score": _bench_weighted_score,
+    "parse_catastro_coordinates": _bench_catastro_coordinates,
+    "parse_catastro_address": _bench_catastro_address,
+    "gemini_json_parse": _bench_gemini_json,
+    "job_status_response_serialize": _bench_job_status_serialize,
+}
+
+
+def measure(fn) -> dict:
+    """Returns median per-call microseconds and the peak allocation of one call."""
+    timer = timeit.Timer(fn)
+    single = timer.timeit(number=1)
+    number = max(1, int(REPEAT_SECONDS / max(single, 1e-7)))
+    runs = timer.repeat(repeat=REPEATS, number=number)
+    per_call_us = statistics.median(runs) / number * 1e6
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"time_us": round(per_call_us, 2), "peak_kib": round(peak / 1024, 1)}
+
+
+def run_all(name_filter: str | None = None) -> dict[str, dict]:
+    """Runs every selected benchmark on every platform corpus."""
+    results: dict[str, dict] = {}
+    for name, factory in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        per_platform = {platform: measure(factory(platform)) for platform in corpora.PLATFORMS}
+        worst_platform = max(per_platform, key=lambda p: per_platform[p]["time_us"])
+        results[name] = {
+            "time_us": per_platform[worst_platform]["time_us"],
+            "peak_kib": max(m["peak_kib"] for m in per_platform.values()),
+            "worst_platform": worst_platform,
+            "platforms": per_platform,
+        }
+    return results
+
+
+def check_budgets(results: dict[str, dict], budgets: dict[str, dict]) -> list[str]:
+    """Returns a human-readable line for every exceeded or missing budget."""
+    violations = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            violations.append(f"{name}: no budget defined in {BUDGETS_PATH.name}")
+            continue
+        if result["time_us"] > budget["max_time_us"]:
+            violations.append(
+                f"{name}: {result['time_us']:.1f} us > budget {budget['max_time_us']:.1f} us "
+                f"(worst platform: {result['worst_platform']})"
+            )
+        if result["peak_kib"] > budget["max_peak_kib"]:
+            violations.append(f"{name}: peak {result['peak_kib']:.1f} KiB > budget {budget['max_peak_kib']:.1f} KiB")
+    return violations
+
+
+def load_budgets() -> dict[str, dict]:
+    with open(BUDGETS_PATH, encoding="utf-8") as f:
+        return json.load(f)["benchmarks"]
+
+
+def write_budgets(results: dict[str, dict]) -> None:
+    budgets = {
+        name: {
+            "max_time_us": round(result["time_us"] * BUDGET_HEADROOM, 1),
+            "max_peak_kib": round(max(result["peak_kib"], 1.0) * BUDGET_HEADROOM, 1),
+        }
+        for name, result in results.items()
+    }
+    document = {}
+    if BUDGETS_PATH.exists():
+        with open(BUDGETS_PATH, encoding="utf-8") as f:
+            document = json.load(f)
+    document.setdefault("benchmarks", {}).update(budgets)
+    document["headroom"] = BUDGET_HEADROOM
+    with open(BUDGETS_PATH, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _print_table(results: dict[str, dict]) -> None:
+    print(f"{'benchmark':<32} {'time (us)':>12} {'peak (KiB)':>12}  worst platform")
+    for name, result in results.items():
+        print(f"{name:<32} {result['time_us']:>12.1f} {result['peak_kib']:>12.1f}  {result['worst_platform']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="name_filter", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--check", action="store_true", help="fail if any result exceeds budgets.json")
+    parser.add_argument("--update", action="store_true", help="rewrite budgets.json from the measured results")
+    parser.add_argument("--json", dest="json_out", help="also write the full results to this file")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.name_filter)
+    _print_table(results)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update:
+        write_budgets(results)
+        print(f"Budgets written to {BUDGETS_PATH}")
+
+    if args.check:
+        violations = check_budgets(results, load_budgets())
+        if violations:
+            print("\nBudget regressions:")
+            for line in violations:
+                print(f"  - {line}")
+            return 1
+        print("\nAll benchmarks within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Bytes stored in Redis per check, and encode/decode time, for the legacy
+formats (RQ's pickle for job payloads and results, JSON for cached step
+results) against the compact serializer.
+
+Usage:
+    python -m benchmarks.serialization
+
+Per check this counts the 12 analysis jobs' payloads plus their results and
+cache entries, built from the per-platform corpora. No Redis needed.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks.db")
+os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_GEMINI_API_KEY", "bench-key")
+os.environ.setdefault("GOOGLE_SEARCH_ENGINE_ID", "bench-id")
+os.environ.setdefault("ENVIRONMENT", "production")
+
+from benchmarks import corpora
+from benchmarks.run import measure
+
+
+def _check_values(platform: str) -> tuple[list, list]:
+    """(RQ values, cache values) written for one check."""
+    check_id = str(uuid.uuid4())
+    steps = corpora.analysis_steps(platform)
+    job_data = [(f"app.workers.tasks.job_{step['job_name']}", None, (check_id,), {}) for step in steps]
+    return job_data + steps, [step["result"] for step in steps]
+
+
+def _legacy():
+    return (lambda v: pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads), (lambda v: json.dumps(v).encode(), json.loads)
+
+
+def _compact():
+    from app.workers.serialization import CompactSerializer, dumps_cache_entry, loads_cache_entry
+    return (CompactSerializer.dumps, CompactSerializer.loads), (dumps_cache_entry, loads_cache_entry)
+
+
+def run(platform: str, formats) -> dict:
+    rq_values, cache_values = _check_values(platform)
+    (rq_dumps, rq_loads), (cache_dumps, cache_loads) = formats
+    rq_blobs = [rq_dumps(v) for v in rq_values]
+    cache_blobs = [cache_dumps(v) for v in cache_values]
+
+    def encode():
+        for v in rq_values:
+            rq_dumps(v)
+        for v in cache_values:
+            cache_dumps(v)
+
+    def decode():
+        for b in rq_blobs:
+            rq_loads(b)
+        for b in cache_blobs:
+            cache_loads(b)
+
+    return {
+        "bytes": sum(map(len, rq_blobs)) + sum(map(len, cache_blobs)),
+        "encode_us": measure(encode)["time_us"],
+        "decode_us": measure(decode)["time_us"],
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args(argv)
+
+    print(f"{'platform':<12} {'format':<8} {'bytes/check':>12} {'encode (us)':>12} {'decode (us)':>12}")
+    for platform in corpora.PLATFORMS:
+        legacy, compact = run(platform, _legacy()), run(platform, _compact())
+        for name, result in (("legacy", legacy), ("compact", compact)):
+            print(f"{platform:<12} {name:<8} {result['bytes']:>12} {result['encode_us']:>12.1f} {result['decode_us']:>12.1f}")
+        print(f"{'':<12} {'saved':<8} {1 - compact['bytes'] / legacy['bytes']:>12.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 const DEFAULT_API_URL = "https://listing-fraud-check-api-999434601012.us-central1.run.app";
 const API_ENDPOINT = "/api/v1/extract-data";
+const PRECHECK_ENDPOINT = "/api/v1/precheck";
+const PRECHECK_TIMEOUT_MS = 1500;
 
 const btnAnalyze = document.getElementById("btn-analyze");
 const btnAnalyzeAnyway = document.getElementById("btn-analyze-anyway");
@@ -84,6 +86,44 @@ function checkRedFlags(text) {
   return flags;
 }
 
+/**
+ * Asks the server what earlier analyses already know about this listing
+ * (known-bad email/phone/IBAN, new domain, reused photos, a prior report).
+ * Returns flag descriptions for medium/high risk; [] on timeout or error so
+ * the local stages still decide.
+ */
+async function precheckListing(text, url, images, apiUrl) {
+  if (!validateHttpUrl(apiUrl)) return [];
+
+  const email = text.match(/[a-z0-9._%+\-]+@[a-z0-9.\-]+\.[a-z]{2,}/i)?.[0] || null;
+  const phone = text.match(/\+?\d[\d\s().\-]{8,}\d/)?.[0]?.substring(0, 30) || null;
+  const ibans = (text.toUpperCase().match(/\b[A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){2,7}(?:\s?[A-Z0-9]{1,4})?\b/g) || []).slice(0, 10);
+
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), PRECHECK_TIMEOUT_MS);
+  try {
+    const apiResponse = await fetch(`${apiUrl}${PRECHECK_ENDPOINT}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ listing_url: url, host_email: email, host_phone: phone, ibans, image_urls: images.slice(0, 20) }),
+      signal: controller.signal,
+    });
+    if (!apiResponse.ok) return [];
+    const result = await apiResponse.json();
+    if (result.risk_level !== "high" && result.risk_level !== "medium") return [];
+
+    const flags = result.signals.map((s) => s.detail);
+    if (result.prior_report) {
+      flags.push(`Anuncio ya analizado: riesgo ${result.prior_report.risk_score}/100`);
+    }
+    return flags;
+  } catch {
+    return [];
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
 /**
  * Runs Gemini Nano (chrome.languageModel) locally to score the listing for fraud risk.
  * Returns a number 0-10, or null if the model is unavailable/errors out.
@@ -327,8 +367,9 @@ btnAnalyze.addEventListener("click", async () => {
 
     const apiUrl = apiUrlInput.value.trim().replace(/\/+$/, "") || DEFAULT_API_URL;
 
-    // Stage 1: Regex red flag filter
-    const flags = checkRedFlags(text);
+    // Stage 1: Regex red flags plus what the server already knows (fast, local state only)
+    setStatus("Comprobando antecedentes...", "loading");
+    const flags = [...checkRedFlags(text), ...(await precheckListing(text, url, images, apiUrl))];
     if (flags.length === 0) {
       // Stage 2: Local AI triaje via Gemini Nano (Chrome 138+, on-device, $0 cost)
       setStatus("Analizando con IA local...", "loading");
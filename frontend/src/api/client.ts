@@ -1,6 +1,6 @@
 // frontend/src/api/client.ts
 
-import { ExtractedData, Analysis, JobCreationResponse, HistoryResponse, ChatResponse, AnalysisStep } from '../types';
+import { ExtractedData, AnalysisSource, Analysis, JobCreationResponse, HistoryResponse, ChatResponse, AnalysisStep } from '../types';
 
 // Obtiene la URL base de las variables de entorno de Vite.
 // import.meta.env.VITE_API_BASE_URL será reemplazada por la URL de producción durante el build.
@@ -50,8 +50,8 @@ class ApiClient {
     });
   }
 
-  async startAnalysis(sessionId: string, data: ExtractedData): Promise<JobCreationResponse> {
-    const payload = { session_id: sessionId, ...data };
+  async startAnalysis(sessionId: string, data: ExtractedData, source: AnalysisSource = 'web'): Promise<JobCreationResponse> {
+    const payload = { session_id: sessionId, source, ...data };
     return this.request<JobCreationResponse>('/analysis', {
       method: 'POST',
       body: JSON.stringify(payload),
@@ -42,7 +42,12 @@ const UrlForensicsStep: React.FC<UrlForensicsStepProps> = ({ inputs_used, result
 
   const extractArchiveCheck = (d: any) => {
     if (!d || typeof d !== 'object') return null;
-    return { found: d.found !== false, consistent: d.consistent !== false };
+    return {
+      found: (d.has_history ?? d.found) !== false,
+      consistent: d.consistent !== false,
+      firstSeen: d.first_seen as string | undefined,
+      domainFirstSeen: d.domain_first_seen as string | undefined,
+    };
   };
 
   const domainAge    = extractDomainAge(result.domain_age);
@@ -112,7 +117,12 @@ const UrlForensicsStep: React.FC<UrlForensicsStepProps> = ({ inputs_used, result
               <p style={{ color: archive.found ? '#35D48A' : '#F2B84B', fontWeight: 600, fontSize: 14, margin: 0 }}>
                 {archive.found ? 'Encontrado' : 'No encontrado'}
               </p>
-              <p style={DIM}>{archive.consistent ? 'Historial consistente' : 'Datos inconsistentes'}</p>
+              <p style={DIM}>
+                {archive.firstSeen
+                  ? `Archivado desde ${archive.firstSeen}`
+                  : archive.consistent ? 'Historial consistente' : 'Datos inconsistentes'}
+              </p>
+              {archive.domainFirstSeen && <p style={DIM}>Dominio archivado desde {archive.domainFirstSeen}</p>}
             </div>
           )}
         </div>
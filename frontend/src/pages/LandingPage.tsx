@@ -98,7 +98,7 @@ export const LandingPage: React.FC = () => {
         if (data && typeof data === 'object' && !Array.isArray(data)) {
           window.history.replaceState({}, '', '/');
           toast.success('Datos recibidos de la extensión de Chrome');
-          navigate('/review', { state: { extractedData: data } });
+          navigate('/review', { state: { extractedData: data, source: 'extension' } });
           return;
         }
       } catch { /* discard malformed data */ }
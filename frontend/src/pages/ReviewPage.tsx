@@ -120,7 +120,7 @@ const ReviewPage: React.FC = () => {
     }
     setIsStartingAnalysis(true);
     try {
-      const newAnalysis = await dispatch(startAnalysisAsync(editableData)).unwrap();
+      const newAnalysis = await dispatch(startAnalysisAsync({ extractedData: editableData, source: location.state?.source })).unwrap();
       navigate(`/results/${newAnalysis.id}`);
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : 'Error al iniciar el análisis.';
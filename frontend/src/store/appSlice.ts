@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk, PayloadAction } from '@reduxjs/toolkit';
-import { AppState, Analysis, ExtractedData } from '../types';
+import { AppState, Analysis, AnalysisSource, ExtractedData } from '../types';
 import { apiClient } from '../api/client';
 import { v4 as uuidv4 } from 'uuid';
 import { RootState } from './index';
@@ -39,11 +39,14 @@ export const fetchHistoryAsync = createAsyncThunk(
 
 export const startAnalysisAsync = createAsyncThunk(
   'app/startAnalysis',
-  async (extractedData: ExtractedData, { getState, dispatch }) => {
+  async (
+    { extractedData, source = 'web' }: { extractedData: ExtractedData; source?: AnalysisSource },
+    { getState, dispatch }
+  ) => {
     const { sessionId, sessionHistory } = (getState() as RootState).app;
     if (!sessionId) throw new Error('Falta el ID de sesión.');
 
-    const response = await apiClient.startAnalysis(sessionId, extractedData);
+    const response = await apiClient.startAnalysis(sessionId, extractedData, source);
     const existingAnalysis = sessionHistory.find(a => a.id === response.job_id);
     if (existingAnalysis && (existingAnalysis.status === 'COMPLETED' || existingAnalysis.status === 'FAILED')) {
       dispatch(setError("Este análisis ya se ha completado."))
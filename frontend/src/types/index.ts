@@ -22,6 +22,9 @@ export interface ChatResponse {
 
 
 // --- Data Structures ---
+// Where an analysis was started from; extension checks get the priority lane.
+export type AnalysisSource = 'web' | 'extension';
+
 export interface ExtractedData {
   listing_url?: string;
   address?: string;
@@ -1,16 +1,31 @@
 # healthcheck.py
+# Worker container healthcheck: Redis must answer PING and at least one RQ
+# worker on this host must be registered (i.e. heartbeating).
 import os
 import socket
 import sys
 
+import redis
+from rq import Worker
+
 redis_host = os.environ.get('REDIS_HOST', 'localhost')
 redis_port = int(os.environ.get('REDIS_PORT', 6379))
+redis_password = os.environ.get('REDIS_PASSWORD') or None
+redis_ssl = os.environ.get('REDIS_SSL', '').lower() in ('1', 'true', 'yes')
 
 try:
-    s = socket.create_connection((redis_host, redis_port), timeout=5)
-    s.close()
+    conn = redis.Redis(
+        host=redis_host,
+        port=redis_port,
+        password=redis_password,
+        ssl=redis_ssl,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+    )
+    conn.ping()
+    hostname = socket.gethostname()
+    if not any(worker.hostname == hostname for worker in Worker.all(connection=conn)):
+        sys.exit(1)
     sys.exit(0)
 except Exception:
     sys.exit(1)
-    
-    
@@ -1,9 +1,9 @@
 #!/bin/bash
 set -e
 
-# Start RQ workers in background
-rq worker analysis-fast analysis-heavy chats \
-  --url "rediss://default:${REDIS_PASSWORD}@${REDIS_HOST}:${REDIS_PORT}" &
+# Start RQ workers in background (pre-forked pool, clients warmed once)
+python analysis_worker.py --mode prefork --processes "${WORKER_PROCESSES:-2}" \
+  --queues analysis-fast analysis-heavy chats &
 
 # Start API server (foreground — Cloud Run needs this)
 exec gunicorn -k uvicorn.workers.UvicornWorker -w 2 --timeout 600 --bind "0.0.0.0:${PORT:-8000}" app.main:app
@@ -0,0 +1,53 @@
+"""Tests for the admission controller decision."""
+from app.core.config import settings
+from app.workers.admission import ACCEPT, DEGRADE, MAX_RETRY_AFTER, REJECT, decide
+
+
+def _queue(drain=0.0, oldest=0.0):
+    return {
+        "depth": 0,
+        "oldest_job_age_seconds": oldest,
+        "workers": 1,
+        "completions_per_second": 1.0,
+        "estimated_drain_seconds": drain,
+    }
+
+
+def _stats(fast=None, heavy=None):
+    return {"queues": {"analysis-fast": fast or _queue(), "analysis-heavy": heavy or _queue()}}
+
+
+class TestDecide:
+    """SLO-based accept / degrade / reject."""
+
+    def test_accepts_within_slo(self):
+        assert decide(_stats())["action"] == ACCEPT
+
+    def test_heavy_backlog_degrades(self):
+        heavy = _queue(drain=settings.ADMISSION_MAX_DRAIN_SECONDS + 1)
+        assert decide(_stats(heavy=heavy))["action"] == DEGRADE
+
+    def test_fast_backlog_degrades_then_rejects(self, monkeypatch):
+        monkeypatch.setattr(settings, "ADMISSION_OVERLOAD_ACTION", "degrade")
+        slo = settings.ADMISSION_MAX_DRAIN_SECONDS
+        assert decide(_stats(fast=_queue(drain=slo * 1.5)))["action"] == DEGRADE
+
+        decision = decide(_stats(fast=_queue(drain=slo * 3)))
+        assert decision["action"] == REJECT
+        assert decision["retry_after"] == slo * 2
+
+    def test_reject_mode_never_degrades_fast_backlog(self, monkeypatch):
+        monkeypatch.setattr(settings, "ADMISSION_OVERLOAD_ACTION", "reject")
+        fast = _queue(drain=settings.ADMISSION_MAX_DRAIN_SECONDS + 1)
+        assert decide(_stats(fast=fast))["action"] == REJECT
+
+    def test_old_jobs_without_workers_reject(self):
+        fast = _queue(drain=None, oldest=settings.ADMISSION_MAX_WAIT_SECONDS * 10)
+        decision = decide(_stats(fast=fast))
+        assert decision["action"] == REJECT
+        assert decision["retry_after"] == MAX_RETRY_AFTER
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+        fast = _queue(drain=settings.ADMISSION_MAX_DRAIN_SECONDS * 10)
+        assert decide(_stats(fast=fast))["action"] == ACCEPT
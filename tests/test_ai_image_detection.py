@@ -0,0 +1,155 @@
+"""Tests for batched AI-generated image detection."""
+import hashlib
+import io
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.services import image_analysis, image_selection
+from app.workers.scoring import calculate_job_risk_score
+
+
+def _image(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+IMAGES = {f"https://x.com/{i}.jpg": _image((i * 40, 0, 0)) for i in range(6)}
+
+
+class _Redis:
+    """mget/set over a dict."""
+
+    def __init__(self):
+        self.store = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        pipe = MagicMock()
+        pipe.set.side_effect = lambda key, value, ex=None: self.store.__setitem__(key, value)
+        return pipe
+
+
+def _verdicts(images):
+    return {"images": [
+        {"index": i, "confidence_score": 0.9, "verdict": "Likely AI", "reason": "Warped lines.", "artifacts": ["warped door"]}
+        for i in range(len(images))
+    ]}
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_PREPROCESS_PROCESSES", 0)
+    monkeypatch.setattr(settings, "AI_IMAGE_BATCH_SIZE", 4)
+    conn = _Redis()
+    with patch.object(image_analysis, "_download_image", side_effect=IMAGES.__getitem__), \
+         patch.object(image_analysis, "_ai_cache_connection", return_value=conn):
+        yield conn
+
+
+class TestDetectAiImages:
+    """Images are batched per request and verdicts cached by content."""
+
+    def test_images_are_batched(self, connection):
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=_verdicts) as analyze:
+            detection = image_analysis.detect_ai_images(list(IMAGES))
+
+        assert [len(call.args[0]) for call in analyze.call_args_list] == [4, 2]
+        assert detection["gemini_requests"] == 2
+        assert [item["url"] for item in detection["results"]] == list(IMAGES)
+        assert all(item["verdict"] == "Likely AI" for item in detection["results"])
+
+    def test_analyzed_images_are_not_sent_again(self, connection):
+        urls = list(IMAGES)
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=_verdicts) as analyze:
+            image_analysis.detect_ai_images(urls[:3])
+            detection = image_analysis.detect_ai_images(urls)
+
+        assert [len(call.args[0]) for call in analyze.call_args_list] == [3, 3]
+        assert detection["cached"] == 3
+
+    def test_missing_verdicts_are_errors_and_not_cached(self, connection):
+        def first_only(images):
+            return {"images": _verdicts(images)["images"][:1]}
+
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=first_only):
+            detection = image_analysis.detect_ai_images(list(IMAGES)[:2])
+
+        assert [item["verdict"] for item in detection["results"]] == ["Likely AI", "Error"]
+        assert len(connection.store) == 1
+
+    def test_failed_request_fails_only_its_batch(self, connection):
+        responses = iter([{"error": "Gemini API call failed: 503"}, None])
+
+        def flaky(images):
+            response = next(responses)
+            return response or _verdicts(images)
+
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=flaky):
+            detection = image_analysis.detect_ai_images(list(IMAGES))
+
+        assert [item["verdict"] for item in detection["results"]] == ["Error"] * 4 + ["Likely AI"] * 2
+
+
+class TestSelectionReuse:
+    """Bytes and hashes fetched by image_selection are not downloaded again."""
+
+    def test_cached_hashes_skip_the_download(self, connection):
+        urls = list(IMAGES)[:3]
+        hashes = {url: hashlib.sha256(IMAGES[url]).hexdigest() for url in urls}
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=_verdicts):
+            image_analysis.detect_ai_images(urls)
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai") as analyze, \
+             patch.object(image_analysis, "_download_image") as download:
+            detection = image_analysis.detect_ai_images(urls, hashes)
+
+        download.assert_not_called()
+        analyze.assert_not_called()
+        assert detection["cached"] == 3
+        assert [item["url"] for item in detection["results"]] == urls
+
+    def test_selection_bytes_are_analyzed_without_downloading(self, connection):
+        urls = list(IMAGES)[:3]
+        with patch.object(image_selection.requests, "get") as get:
+            get.side_effect = lambda url, **kwargs: MagicMock(raw=MagicMock(read=lambda *a, **k: IMAGES[url]))
+            selection = image_selection.select_images(urls, 3, keep_bytes=True)
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=_verdicts) as analyze, \
+             patch.object(image_analysis, "_download_image") as download:
+            detection = image_analysis.detect_ai_images(
+                selection["selected_urls"], selection["content_hashes"], selection["image_bytes"]
+            )
+
+        download.assert_not_called()
+        assert selection["image_bytes"] == {url: IMAGES[url] for url in selection["selected_urls"]}
+        assert [len(call.args[0]) for call in analyze.call_args_list] == [len(selection["selected_urls"])]
+        assert sorted(connection.store) == sorted(f"aiimg:{h}" for h in selection["content_hashes"].values())
+
+    def test_images_the_selection_missed_are_downloaded(self, connection):
+        urls = list(IMAGES)[:2]
+        with patch.object(image_analysis.gemini_analysis, "analyze_images_for_ai", side_effect=_verdicts), \
+             patch.object(image_analysis, "_download_image", side_effect=IMAGES.__getitem__) as download:
+            detection = image_analysis.detect_ai_images(urls, {}, {urls[0]: IMAGES[urls[0]]})
+
+        download.assert_called_once_with(urls[1])
+        assert all(item["verdict"] == "Likely AI" for item in detection["results"])
+
+
+class TestAiImageScoring:
+    """The most AI-looking analyzed image sets the score."""
+
+    def test_max_confidence_sets_the_score(self):
+        result = {"ai_detection_results": [
+            {"verdict": "Likely Real", "confidence_score": 0.1},
+            {"verdict": "Likely AI", "confidence_score": 0.85},
+            {"verdict": "Error", "confidence_score": 0.0},
+        ]}
+        assert calculate_job_risk_score("ai_image_detection", result, "COMPLETED") == {"risk_score": 85, "confidence": 0.6}
+
+    def test_nothing_analyzed_is_excluded(self):
+        result = {"ai_detection_results": [{"verdict": "Error", "confidence_score": 0.0}]}
+        assert calculate_job_risk_score("ai_image_detection", result, "COMPLETED")["confidence"] == 0.0
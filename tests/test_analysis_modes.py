@@ -0,0 +1,140 @@
+"""Tests for quick, standard and deep analysis modes."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+from rq import Queue
+
+from app.workers import modes, orchestrator
+from app.workers.local_report import QUICK, build_local_report
+from app.workers.orchestrator import build_analysis_graph
+from app.workers.scoring import calculate_weighted_score, score_steps
+
+
+def _graph(mode):
+    conn = MagicMock()
+    fast, heavy = Queue("analysis-fast", connection=conn), Queue("analysis-heavy", connection=conn)
+    return build_analysis_graph("check-1", fast, heavy, mode=mode)
+
+
+def _func_names(graph):
+    return [job.func_name.rsplit(".", 1)[-1] for _, job in graph.entries]
+
+
+class TestModeGraphs:
+    """Each mode builds its own job set, budgets and queues."""
+
+    def test_quick_runs_local_jobs_only(self):
+        graph = _graph(modes.QUICK)
+        assert _func_names(graph) == ["job_host_profile_check", "job_local_indicators", "job_aggregate_and_conclude"]
+        assert all(job.timeout == 20 for _, job in graph.entries[:-1])
+
+    def test_standard_leaves_out_the_heavy_queue(self):
+        graph = _graph(modes.STANDARD)
+        assert "job_reverse_image_search" not in _func_names(graph)
+        assert {queue.name for queue, _ in graph.entries} == {"analysis-fast"}
+        assert len(graph.entries[-1][1]._dependency_ids) == 10
+
+    def test_deep_is_the_full_graph(self):
+        graph = _graph(modes.DEEP)
+        names = _func_names(graph)
+        assert "job_reverse_image_search" in names and "job_local_indicators" not in names
+        assert "job_ai_image_detection" in names
+        assert len(graph.entries[-1][1]._dependency_ids) == 12
+
+    def test_quick_bulk_checks_keep_their_session_lane(self):
+        check = MagicMock(session_id="s", mode=modes.QUICK, input_data={}, analysis_steps=[])
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = check
+        with patch.object(orchestrator, "SessionLocal", return_value=db), \
+             patch.object(orchestrator, "_check_historical_fraud", return_value=[]), \
+             patch.object(orchestrator, "get_lane_queue") as get_lane_queue, \
+             patch.object(orchestrator, "build_analysis_graph"), \
+             patch.object(orchestrator, "_publish_progress"):
+            orchestrator.start_full_analysis("00000000-0000-0000-0000-000000000001", batch_id="b1")
+
+        assert [c.args for c in get_lane_queue.call_args_list] == [("analysis-fast", "s", False), ("analysis-heavy", "s", False)]
+
+    def test_mode_sets_include_their_dependencies(self):
+        layer_2 = {"reputation_check", "iban_country_check", "address_cross_platform_search"}
+        for config in modes.ANALYSIS_MODES.values():
+            assert not (config["jobs"] & layer_2) or "geocode" in config["jobs"]
+
+
+class TestQuickReport:
+    """Quick checks get a report without a synthesis LLM."""
+
+    def test_report_from_scored_steps(self):
+        steps = [
+            {"job_name": "local_indicators", "status": "COMPLETED", "result": {
+                "risk_level": "high",
+                "signals": [{"kind": "known_bad_phone", "detail": "Teléfono visto en un fraude."}],
+                "prior_report": None,
+            }},
+            {"job_name": "host_profile_check", "status": "COMPLETED", "result": {"themes": []}},
+        ]
+        summary = calculate_weighted_score(score_steps(steps, {"local_indicators", "host_profile_check"}))
+        report = build_local_report(steps, summary, QUICK)
+
+        assert report["authenticity_score"] == 100 - summary["calculated_risk_score"]
+        assert {"category": "High", "description": "Teléfono visto en un fraude."} in report["flags"]
+        assert any(flag["category"] == "Positive" for flag in report["flags"])
+        assert set(report) == {"authenticity_score", "quality_score", "sidebar_summary", "explanation", "suggested_actions", "flags", "synthesized_by"}
+
+    def test_prior_report_score_is_reused(self):
+        step = {"job_name": "local_indicators", "status": "COMPLETED", "result": {
+            "risk_level": "medium", "signals": [], "prior_report": {"check_id": "c0", "risk_score": 42, "analyzed_at": 0},
+        }}
+        assert score_steps([step], {"local_indicators"})["local_indicators"]["risk_score"] == 42
+
+
+# ---------------------------------------------------------------------------
+# POST /api/v1/analysis
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+class TestCreateAnalysisMode:
+    """The requested mode is stored, hashed and routed."""
+
+    def _patches(self, mock_db):
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = None
+        mock_db.execute.return_value = mock_result
+        decision = {"action": "accept", "retry_after": None}
+        return (
+            patch("app.api.endpoints.get_lane_queue", return_value=MagicMock()),
+            patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()),
+            patch("app.api.endpoints.admission.snapshot", return_value={"admission": decision}),
+        )
+
+    async def test_quick_mode_is_recorded_on_the_session_lane(self, client, mock_db):
+        payload = {"session_id": "s", "address": "Calle Mayor 1, Madrid", "mode": "quick"}
+        lane, conn, snapshot = self._patches(mock_db)
+        with lane as get_lane_queue, conn, snapshot:
+            response = await client.post("/api/v1/analysis", json=payload)
+
+        assert response.status_code == 202
+        assert get_lane_queue.call_args.args == ("analysis-fast", "s", False)
+        check = mock_db.add.call_args_list[0].args[0]
+        assert check.mode == "quick"
+        assert "mode" not in check.input_data
+
+    async def test_extension_checks_are_prioritized(self, client, mock_db):
+        payload = {"session_id": "s", "address": "Calle Mayor 1, Madrid", "mode": "quick", "source": "extension"}
+        lane, conn, snapshot = self._patches(mock_db)
+        with lane as get_lane_queue, conn, snapshot:
+            await client.post("/api/v1/analysis", json=payload)
+        assert get_lane_queue.call_args.args == ("analysis-fast", "s", True)
+
+    async def test_modes_of_the_same_listing_are_separate_checks(self, client, mock_db):
+        hashes = []
+        for mode in ("deep", "standard"):
+            payload = {"session_id": "s", "address": "Calle Mayor 1, Madrid", "mode": mode}
+            lane, conn, snapshot = self._patches(mock_db)
+            with lane, conn, snapshot:
+                await client.post("/api/v1/analysis", json=payload)
+            hashes.append(mock_db.add.call_args_list[-2].args[0].input_hash)
+        assert hashes[0] != hashes[1]
+
+    async def test_rejects_unknown_mode(self, client):
+        response = await client.post("/api/v1/analysis", json={"session_id": "s", "mode": "turbo"})
+        assert response.status_code == 422
@@ -4,6 +4,8 @@ from unittest.mock import patch, MagicMock, AsyncMock
 
 import pytest
 
+from app.utils.helpers import generate_hash
+
 pytestmark = pytest.mark.asyncio
 
 
@@ -186,6 +188,58 @@ class TestGetAnalysis:
         assert response.status_code == 403
 
 
+# ---------------------------------------------------------------------------
+# POST /api/v1/analysis (admission control)
+# ---------------------------------------------------------------------------
+
+class TestCreateAnalysisAdmission:
+    """Tests for load shedding on analysis creation."""
+
+    payload = {"session_id": "test-session", "address": "Calle Mayor 1, Madrid"}
+
+    def _no_existing_check(self, mock_db):
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = None
+        mock_db.execute.return_value = mock_result
+
+    async def test_rejects_with_retry_after_when_overloaded(self, client, mock_db):
+        """Backlog over the SLO returns 429 with Retry-After and enqueues nothing."""
+        self._no_existing_check(mock_db)
+        queue = MagicMock()
+        decision = {"action": "reject", "retry_after": 42}
+        with patch("app.api.endpoints.get_lane_queue", return_value=queue), \
+             patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()), \
+             patch("app.api.endpoints.admission.snapshot", return_value={"admission": decision}):
+            response = await client.post("/api/v1/analysis", json=self.payload)
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "42"
+        queue.enqueue.assert_not_called()
+        mock_db.add.assert_not_called()
+
+    async def test_degrades_when_heavy_queue_is_behind(self, client, mock_db):
+        """A degrade decision still accepts the check, run and recorded in standard mode."""
+        self._no_existing_check(mock_db)
+        queue = MagicMock()
+        decision = {"action": "degrade", "retry_after": None}
+        with patch("app.api.endpoints.get_lane_queue", return_value=queue), \
+             patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()), \
+             patch("app.api.endpoints.admission.snapshot", return_value={"admission": decision}):
+            response = await client.post("/api/v1/analysis", json=self.payload)
+
+        assert response.status_code == 202
+        check = mock_db.add.call_args_list[0].args[0]
+        assert check.mode == "standard"
+        assert check.input_hash != generate_hash(check.input_data)
+        assert "degraded" not in queue.enqueue.call_args.kwargs
+
+    async def test_ready_without_redis(self, client):
+        """Readiness fails when Redis is unreachable."""
+        with patch("app.api.endpoints.get_redis_conn", return_value=None):
+            response = await client.get("/api/v1/ready")
+        assert response.status_code == 503
+
+
 # ---------------------------------------------------------------------------
 # POST /api/v1/analysis/{check_id}/feedback
 # ---------------------------------------------------------------------------
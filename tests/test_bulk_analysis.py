@@ -0,0 +1,192 @@
+"""Tests for bulk analysis batches and the NDJSON endpoints."""
+import json
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.db import models
+from app.utils.helpers import generate_hash
+from app.workers import bulk, orchestrator
+from app.workers.utils import handle_job_failure
+
+
+def _rows(*rows):
+    result = MagicMock()
+    result.__iter__.return_value = iter(rows)
+    return result
+
+
+def _row(**fields):
+    row = MagicMock()
+    for name, value in fields.items():
+        setattr(row, name, value)
+    return row
+
+
+class TestBatchState:
+    """Batch bookkeeping in Redis."""
+
+    def test_release_marks_done_and_returns_started_checks(self):
+        conn = MagicMock()
+        conn.eval.return_value = [b"c2", b"c3"]
+        assert bulk.release(conn, "b1", 2, "c1") == ["c2", "c3"]
+        args = conn.eval.call_args.args
+        assert args[2:5] == ("batch:b1:pending", "batch:b1:active", "batch:b1:done")
+        assert args[5:7] == ("c1", 2)
+
+    def test_on_check_finished_advances_every_waiting_batch(self):
+        conn = MagicMock()
+        conn.smembers.return_value = {b"b1", b"b2"}
+        conn.hgetall.return_value = {b"session_id": b"s", b"total": b"3", b"concurrency": b"1"}
+        conn.eval.return_value = [b"next"]
+        with patch.object(bulk, "enqueue_checks") as enqueue_checks:
+            bulk.on_check_finished(conn, "c1")
+
+        assert conn.eval.call_count == 2
+        assert all(call.args[0]["session_id"] == "s" and call.args[1] == ["next"] for call in enqueue_checks.call_args_list)
+        conn.delete.assert_called_once_with("check:c1:batches")
+
+    def test_orchestrator_failure_frees_the_slot(self):
+        queue = MagicMock()
+        batch = {"batch_id": "b1", "session_id": "s"}
+        with patch("app.workers.queues.get_lane_queue", return_value=queue):
+            bulk.enqueue_checks(batch, ["c1"])
+        assert queue.enqueue.call_args.kwargs["on_failure"] is handle_job_failure
+
+    def test_missing_check_frees_the_slot(self):
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = None
+        conn = MagicMock()
+        with patch.object(orchestrator, "SessionLocal", return_value=db), \
+             patch.object(orchestrator, "get_redis_conn", return_value=conn), \
+             patch.object(orchestrator.bulk, "on_check_finished") as on_check_finished:
+            orchestrator.start_full_analysis("00000000-0000-0000-0000-000000000001", batch_id="b1")
+        on_check_finished.assert_called_once_with(conn, "00000000-0000-0000-0000-000000000001")
+
+
+# ---------------------------------------------------------------------------
+# POST /api/v1/analysis/bulk
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+class TestCreateBulkAnalysis:
+    """Parsing, deduplication and the streamed results."""
+
+    headers = {"session-id": "bulk-session"}
+
+    async def test_invalid_line_is_reported_with_its_number(self, client):
+        body = '{"address": "Calle Mayor 1"}\n{"number_of_people": "many"}\n'
+        response = await client.post("/api/v1/analysis/bulk", content=body, headers=self.headers)
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["line"] == 2
+
+    async def test_duplicates_are_analyzed_once_and_results_streamed(self, client, mock_db):
+        record = {"address": "Calle Mayor 1, Madrid"}
+        body = "\n".join([json.dumps(record), json.dumps(record), json.dumps({"address": "Gran Via 2"})])
+        check_ids = {}
+
+        def create_batch(conn, session_id, items, to_start, running, finished, concurrency):
+            check_ids.update(items)
+            assert len(to_start) == 2 and not running and not finished
+            return "b1", to_start
+
+        def read_done(conn, batch_id, start):
+            return list(check_ids.items())[start:]
+
+        def db_results():
+            yield _rows()  # no existing checks
+            yield _rows(*[
+                _row(id=uuid.UUID(check_id), status=models.JobStatus.COMPLETED, final_report={"risk_score": 10})
+                for check_id in check_ids
+            ])
+
+        mock_db.execute.side_effect = db_results()
+        batch = {"batch_id": "b1", "session_id": "bulk-session", "total": 2, "concurrency": 5}
+        with patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()), \
+             patch("app.api.endpoints.admission.snapshot", return_value={"admission": {"action": "accept"}}), \
+             patch.object(bulk, "create_batch", side_effect=create_batch), \
+             patch.object(bulk, "get_batch", return_value=batch), \
+             patch.object(bulk, "enqueue_checks") as enqueue_checks, \
+             patch.object(bulk, "read_done", side_effect=read_done):
+            response = await client.post("/api/v1/analysis/bulk", content=body, headers=self.headers)
+
+        assert response.status_code == 202
+        assert response.headers["x-batch-id"] == "b1"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["type"] == "batch" and lines[0]["duplicates"] == 1 and lines[0]["total"] == 2
+        results = [line for line in lines if line["type"] == "result"]
+        assert [r["seq"] for r in results] == [0, 1]
+        assert sorted(len(r["records"]) for r in results) == [1, 2]
+        assert lines[-1]["type"] == "end"
+        assert len(enqueue_checks.call_args.args[1]) == 2
+
+    async def _create_one(self, client, mock_db, action, **params):
+        """Posts one new record and returns the FraudCheck it created."""
+        check_ids = {}
+
+        def create_batch(conn, session_id, items, to_start, running, finished, concurrency):
+            check_ids.update(items)
+            return "b1", to_start
+
+        def db_results():
+            yield _rows()  # no existing checks
+            if action == "degrade":
+                yield _rows()  # none in the degraded mode either
+            yield _rows(*[
+                _row(id=uuid.UUID(check_id), status=models.JobStatus.COMPLETED, final_report={"risk_score": 10})
+                for check_id in check_ids
+            ])
+
+        mock_db.execute.side_effect = db_results()
+        batch = {"batch_id": "b1", "session_id": "bulk-session", "total": 1, "concurrency": 5}
+        with patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()), \
+             patch("app.api.endpoints.admission.snapshot", return_value={"admission": {"action": action}}), \
+             patch.object(bulk, "create_batch", side_effect=create_batch), \
+             patch.object(bulk, "get_batch", return_value=batch), \
+             patch.object(bulk, "enqueue_checks"), \
+             patch.object(bulk, "read_done", side_effect=lambda conn, batch_id, start: list(check_ids.items())[start:]):
+            response = await client.post(
+                "/api/v1/analysis/bulk", params=params, content='{"address": "Gran Via 2"}', headers=self.headers,
+            )
+
+        assert response.status_code == 202
+        checks = [call.args[0] for call in mock_db.add.call_args_list if isinstance(call.args[0], models.FraudCheck)]
+        assert len(checks) == 1
+        return checks[0]
+
+    async def test_default_mode(self, client, mock_db, monkeypatch):
+        monkeypatch.setattr(settings, "DEFAULT_ANALYSIS_MODE", "deep")
+        check = await self._create_one(client, mock_db, "accept")
+        assert check.mode == "deep"
+        assert check.input_hash == generate_hash({"address": "Gran Via 2"})
+
+    async def test_mode_parameter_sets_the_mode_and_hash(self, client, mock_db):
+        check = await self._create_one(client, mock_db, "accept", mode="quick")
+        assert check.mode == "quick"
+        assert check.input_hash == generate_hash({"address": "Gran Via 2", "analysis_mode": "quick"})
+
+    async def test_degraded_batch_runs_in_standard_mode(self, client, mock_db):
+        check = await self._create_one(client, mock_db, "degrade", mode="deep")
+        assert check.mode == "standard"
+        assert check.input_hash == generate_hash({"address": "Gran Via 2", "analysis_mode": "standard"})
+
+    async def test_unknown_mode_is_rejected(self, client):
+        response = await client.post(
+            "/api/v1/analysis/bulk", params={"mode": "thorough"}, content='{"address": "Gran Via 2"}', headers=self.headers,
+        )
+        assert response.status_code == 422
+
+    async def test_resume_requires_the_owning_session(self, client):
+        batch = {"batch_id": "b1", "session_id": "someone-else", "total": 1, "concurrency": 1}
+        with patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()), \
+             patch.object(bulk, "get_batch", return_value=batch):
+            response = await client.get("/api/v1/analysis/bulk/b1", headers=self.headers)
+        assert response.status_code == 403
+
+    async def test_resume_unknown_batch(self, client):
+        with patch("app.api.endpoints.get_redis_conn", return_value=MagicMock()), \
+             patch.object(bulk, "get_batch", return_value=None):
+            response = await client.get("/api/v1/analysis/bulk/missing", headers=self.headers)
+        assert response.status_code == 404
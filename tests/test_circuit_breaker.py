@@ -0,0 +1,90 @@
+"""Tests for the per-provider circuit breakers."""
+import concurrent.futures
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import redis
+
+from app.services import url_analysis
+from app.services.circuit_breaker import CircuitBreaker, ProviderUnavailable
+
+
+def _breaker(**kwargs):
+    breaker = CircuitBreaker("test", connection=MagicMock(), **kwargs)
+    breaker.record_success = MagicMock()
+    breaker.record_failure = MagicMock()
+    return breaker
+
+
+class TestCircuitBreakerCall:
+    """call() fails fast while open and classifies errors."""
+
+    def test_open_breaker_fails_fast(self):
+        breaker = _breaker()
+        func = MagicMock()
+        with patch.object(breaker, "allow", return_value=False):
+            with pytest.raises(ProviderUnavailable) as exc:
+                breaker.call(func)
+        func.assert_not_called()
+        assert exc.value.provider == "test"
+
+    def test_failure_is_recorded_and_reraised(self):
+        breaker = _breaker()
+        with patch.object(breaker, "allow", return_value=True):
+            with pytest.raises(TimeoutError):
+                breaker.call(MagicMock(side_effect=TimeoutError()))
+        breaker.record_failure.assert_called_once()
+        breaker.record_success.assert_not_called()
+
+    def test_non_failure_exception_counts_as_answer(self):
+        breaker = _breaker(failure_exceptions=(OSError,))
+        with patch.object(breaker, "allow", return_value=True):
+            with pytest.raises(ValueError):
+                breaker.call(MagicMock(side_effect=ValueError("no match")))
+        breaker.record_failure.assert_not_called()
+        breaker.record_success.assert_called_once()
+
+    def test_allows_calls_when_redis_is_down(self):
+        conn = MagicMock()
+        conn.eval.side_effect = redis.exceptions.ConnectionError("down")
+        assert CircuitBreaker("test", connection=conn).allow() is True
+
+
+class TestProviderUnavailable:
+    """Services surface an open breaker instead of swallowing it as a generic failure."""
+
+    def test_domain_age_propagates_open_breaker(self):
+        with patch.object(url_analysis.whois_breaker, "allow", return_value=False), \
+             patch.object(url_analysis, "_whois_lookup") as lookup:
+            with pytest.raises(ProviderUnavailable):
+                url_analysis.check_domain_age("example.com")
+        lookup.assert_not_called()
+
+    def test_hung_whois_lookup_counts_as_failure(self):
+        release = threading.Event()
+        with patch.object(url_analysis, "WHOIS_TIMEOUT_SECONDS", 0.05), \
+             patch.object(url_analysis.whois, "whois", side_effect=lambda domain: release.wait(5)), \
+             patch.object(url_analysis, "hedged", side_effect=lambda provider, func, *args: func(*args)), \
+             patch.object(url_analysis.whois_breaker, "allow", return_value=True), \
+             patch.object(url_analysis.whois_breaker, "record_success") as record_success, \
+             patch.object(url_analysis.whois_breaker, "record_failure") as record_failure:
+            result = url_analysis.check_domain_age("example.com")
+        release.set()
+
+        assert result["is_new"] is False
+        record_failure.assert_called_once()
+        record_success.assert_not_called()
+
+    def test_whois_timeouts_are_failures_on_every_python(self):
+        failures = url_analysis.whois_breaker.failure_exceptions
+        assert concurrent.futures.TimeoutError in failures and TimeoutError in failures
+
+    def test_archive_errors_still_degrade_gracefully(self):
+        with patch.object(url_analysis.wayback_breaker, "allow", return_value=True), \
+             patch.object(url_analysis.wayback_breaker, "record_failure") as record_failure, \
+             patch.object(url_analysis, "_wayback_connection", return_value=None), \
+             patch.object(url_analysis, "_fetch_cdx_history", side_effect=OSError("reset")):
+            result = url_analysis.check_archive_history("https://example.com")
+        assert result["has_history"] is False
+        record_failure.assert_called_once()
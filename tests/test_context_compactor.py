@@ -0,0 +1,106 @@
+"""Tests for the token-budgeted JSON context sent with Gemini prompts."""
+import json
+from unittest.mock import patch
+
+from app.services import gemini_analysis
+from app.services.context_compactor import compact_context, estimate_tokens
+
+DESCRIPTION = "Piso luminoso de dos habitaciones a cinco minutos de la playa, totalmente reformado. " * 8
+COMMUNICATION = "Para reservar necesito el depósito hoy mismo por transferencia a ES91 2100 0418 4502 0005 1332. " * 4
+
+
+def _context():
+    return {
+        "user_provided_data": {"description": DESCRIPTION, "communication_text": COMMUNICATION, "host_phone": None},
+        "analysis_steps": [
+            {"job_name": "description_analysis", "status": "COMPLETED", "description": "Analiza la descripción.",
+             "inputs_used": {"description": DESCRIPTION}, "result": {"sentiment": "Neutral", "themes": []}},
+            {"job_name": "communication_analysis", "status": "COMPLETED", "description": "Analiza la conversación.",
+             "inputs_used": {"communication_text": COMMUNICATION}, "result": {"themes": ["Risky Payment Request"]}},
+            {"job_name": "description_plagiarism_check", "status": "COMPLETED", "description": "Busca la descripción.",
+             "inputs_used": {"snippet": DESCRIPTION[:150]}, "result": {"plagiarized": False}},
+            {"job_name": "reputation_check", "status": "COMPLETED", "description": "Busca el contacto.",
+             "inputs_used": {}, "result": {"search_results_text": "Title: Foro\nSnippet: opiniones de inquilinos. " * 200}},
+            {"job_name": "reverse_image_search", "status": "SKIPPED", "description": "Busca las imágenes.",
+             "inputs_used": {}, "result": {"reason": "No images provided."}},
+        ],
+        "scoring_summary": {"calculated_risk_score": 64, "high_risk_signals": ["communication_analysis"], "compound_rules_triggered": []},
+    }
+
+
+class TestEstimateTokens:
+    """Local estimate: digits one token each, words about one per five letters."""
+
+    def test_estimate(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("2100") == 4
+        assert estimate_tokens('{"a":"hola"}') == 9
+        assert estimate_tokens("habitaciones") == 3
+
+
+class TestCompactContext:
+    """Dedupe, drop skipped and empty values, then truncate by priority."""
+
+    def test_dedupes_and_drops_without_truncating(self):
+        text, stats = compact_context(_context(), budget_tokens=100_000)
+        context = json.loads(text)
+
+        steps = {step["job_name"]: step for step in context["analysis_steps"]}
+        assert "reverse_image_search" not in steps
+        assert context["skipped_steps"] == ["reverse_image_search: No images provided."]
+        assert steps["description_analysis"]["inputs_used"]["description"] == "(same as user_provided_data.description)"
+        assert steps["description_plagiarism_check"]["inputs_used"]["snippet"] == "(part of user_provided_data.description)"
+        assert "themes" not in steps["description_analysis"]["result"]
+        assert "host_phone" not in context["user_provided_data"]
+        assert "depósito" in text and "\n" not in text.replace("\\n", "")
+        assert stats["truncated_fields"] == 0 and stats["saved_tokens"] > 0 and not stats["over_budget"]
+
+    def test_truncates_raw_search_text_first(self):
+        full, _ = compact_context(_context(), budget_tokens=100_000)
+        text, stats = compact_context(_context(), budget_tokens=estimate_tokens(full) - 500)
+        context = json.loads(text)
+
+        assert stats["truncated_fields"] == 1 and not stats["over_budget"]
+        assert "chars cut]" in context["analysis_steps"][3]["result"]["search_results_text"]
+        assert context["user_provided_data"]["description"] == DESCRIPTION
+
+    def test_chat_history_keeps_its_end(self):
+        history = "\n".join(f"user: pregunta número {i} sobre el anuncio" for i in range(400))
+        text, stats = compact_context({**_context(), "chat_history": history}, budget_tokens=600)
+
+        assert json.loads(text)["chat_history"].endswith("user: pregunta número 399 sobre el anuncio")
+        assert stats["truncated_fields"] > 1
+
+    def test_input_is_not_modified(self):
+        context = _context()
+        compact_context(context, budget_tokens=100)
+        assert context == _context()
+
+
+class TestGeminiContext:
+    """Synthesis and Q&A prompts send the compacted context and log the saving."""
+
+    def test_synthesis_sends_compact_context(self, caplog):
+        with patch.object(gemini_analysis, "_call_gemini", return_value={}) as call, \
+             patch.object(gemini_analysis, "load_prompt", return_value="Prompt [LANGUAGE_CODE]"):
+            with caplog.at_level("INFO", logger=gemini_analysis.__name__):
+                gemini_analysis.synthesize_advanced_report(_context())
+
+        sent = call.call_args.args[1][1]
+        assert json.loads(sent)["skipped_steps"]
+        assert estimate_tokens(sent) < estimate_tokens(json.dumps(_context(), indent=2))
+        assert "Gemini context for synthesize_advanced_report" in caplog.text and "saved" in caplog.text
+
+    def test_consistency_check_splits_one_budget(self, monkeypatch, caplog):
+        prompt = "Prompt " * 400
+        monkeypatch.setattr(gemini_analysis.settings, "GEMINI_PROMPT_TOKENS", 2000)
+        with patch.object(gemini_analysis, "_call_gemini", return_value={}), \
+             patch.object(gemini_analysis, "load_prompt", return_value=prompt), \
+             patch.object(gemini_analysis, "compact_context", return_value=("{}", {
+                 "tokens": 1, "saved_tokens": 0, "truncated_fields": 0, "over_budget": False,
+             })) as compact, caplog.at_level("INFO", logger=gemini_analysis.__name__):
+            gemini_analysis.check_data_consistency({"address": "Calle Mayor 1"}, {"name": "Calle Mayor 1"})
+
+        half = (2000 - estimate_tokens(prompt)) // 2
+        assert [call.args[1] for call in compact.call_args_list] == [half, half]
+        assert "check_data_consistency.listing" in caplog.text and "check_data_consistency.google" in caplog.text
@@ -0,0 +1,54 @@
+"""Tests for per-session fair scheduling lanes."""
+from unittest.mock import MagicMock
+
+from app.workers.fair_queue import LaneScheduler, base_name, lane_name
+
+
+class TestLaneNames:
+    """Lane naming and mapping back to the base queue."""
+
+    def test_session_lane_is_stable_and_opaque(self):
+        lane = lane_name("analysis-fast", "session-123")
+        assert lane == lane_name("analysis-fast", "session-123")
+        assert lane.startswith("analysis-fast:s:")
+        assert "session-123" not in lane
+
+    def test_priority_lane(self):
+        assert lane_name("analysis-fast", "session-123", priority=True) == "analysis-fast:priority"
+
+    def test_no_session_uses_base_queue(self):
+        assert lane_name("analysis-heavy", None) == "analysis-heavy"
+
+    def test_base_name(self):
+        assert base_name(lane_name("analysis-heavy", "abc")) == "analysis-heavy"
+        assert base_name("analysis-fast:priority") == "analysis-fast"
+        assert base_name("chats") == "chats"
+
+
+class TestLaneScheduler:
+    """Dequeue order: priority lane first, then lanes round-robin."""
+
+    def _scheduler(self, lanes_by_base: dict[str, list[str]]):
+        conn = MagicMock()
+        conn.smembers.side_effect = lambda key: {
+            lane.encode() for lane in lanes_by_base.get(key.split(":")[1], [])
+        }
+        return LaneScheduler(conn)
+
+    def test_priority_lane_comes_first(self):
+        scheduler = self._scheduler({"analysis-fast": ["analysis-fast:s:a", "analysis-fast:s:b"]})
+        order = scheduler.order(["analysis-fast"])
+        assert order[0] == "analysis-fast:priority"
+        assert set(order[1:]) == {"analysis-fast", "analysis-fast:s:a", "analysis-fast:s:b"}
+
+    def test_rotates_after_last_served_lane(self):
+        scheduler = self._scheduler({"analysis-fast": ["analysis-fast:s:a", "analysis-fast:s:b"]})
+        scheduler.served("analysis-fast:s:a")
+        assert scheduler.order(["analysis-fast"])[1:] == [
+            "analysis-fast:s:b", "analysis-fast", "analysis-fast:s:a",
+        ]
+
+    def test_base_queues_keep_worker_order(self):
+        scheduler = self._scheduler({"analysis-heavy": ["analysis-heavy:s:a"]})
+        order = scheduler.order(["analysis-fast", "analysis-heavy"])
+        assert order.index("analysis-fast") < order.index("analysis-heavy:priority")
@@ -0,0 +1,89 @@
+"""Tests for hedged requests."""
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import hedging
+
+
+def _slow_then_fast():
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    return func, calls
+
+
+@pytest.fixture
+def redis_conn():
+    conn = MagicMock()
+    with patch.object(hedging, "_get_connection", return_value=conn), \
+         patch.object(hedging, "_count_request"), \
+         patch.object(hedging, "record_latency"):
+        yield conn
+
+
+class TestHedged:
+    """Second attempt after the p90, within budget."""
+
+    def test_slow_primary_is_hedged(self, redis_conn):
+        func, calls = _slow_then_fast()
+        with patch.object(hedging, "hedge_delay", return_value=0.05), \
+             patch.object(hedging, "take_budget", return_value=True):
+            started = time.monotonic()
+            assert hedging.hedged("whois", func) == "fast"
+        assert time.monotonic() - started < 0.4
+        assert len(calls) == 2
+
+    def test_budget_exhausted_waits_for_primary(self, redis_conn):
+        func, calls = _slow_then_fast()
+        with patch.object(hedging, "hedge_delay", return_value=0.05), \
+             patch.object(hedging, "take_budget", return_value=False):
+            assert hedging.hedged("whois", func) == "slow"
+        assert len(calls) == 1
+
+    def test_no_hedge_without_enough_samples(self, redis_conn):
+        func, calls = _slow_then_fast()
+        with patch.object(hedging, "hedge_delay", return_value=None), \
+             patch.object(hedging, "take_budget") as take_budget:
+            assert hedging.hedged("whois", func) == "slow"
+        take_budget.assert_not_called()
+
+    def test_failed_primary_falls_back_to_hedge(self, redis_conn):
+        attempts = []
+
+        def func():
+            attempts.append(1)
+            if len(attempts) == 1:
+                time.sleep(0.1)
+                raise TimeoutError("primary")
+            time.sleep(0.2)
+            return "hedge"
+
+        with patch.object(hedging, "hedge_delay", return_value=0.05), \
+             patch.object(hedging, "take_budget", return_value=True):
+            assert hedging.hedged("whois", func) == "hedge"
+
+    def test_all_attempts_failing_raises(self, redis_conn):
+        with patch.object(hedging, "hedge_delay", return_value=0.01), \
+             patch.object(hedging, "take_budget", return_value=True):
+            with pytest.raises(ValueError):
+                hedging.hedged("whois", MagicMock(side_effect=ValueError("down")))
+
+    def test_providers_not_opted_in_run_once(self):
+        func = MagicMock(return_value="ok")
+        with patch.object(hedging, "_get_connection") as get_connection:
+            assert hedging.hedged("catastro", func) == "ok"
+        get_connection.assert_not_called()
+        func.assert_called_once()
+
+
+class TestPercentile:
+    def test_p90(self):
+        assert hedging._percentile([float(i) for i in range(1, 11)], 0.9) == 9.0
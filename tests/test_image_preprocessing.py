@@ -0,0 +1,59 @@
+"""Tests for image preprocessing (draft decode, pass-through, process pool)."""
+import io
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from app.core.config import settings
+from app.services import image_preprocessing
+
+
+def _image(width, height, fmt="JPEG", mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), "teal").save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def inline(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_PREPROCESS_PROCESSES", 0)
+
+
+class TestPrepareImages:
+    """Which images are transformed and what comes out."""
+
+    def test_small_jpeg_is_passed_through(self):
+        data = _image(800, 600)
+        assert image_preprocessing.prepare_image(data) == {"mime_type": "image/jpeg", "data": data}
+
+    def test_large_jpeg_is_draft_decoded_and_fitted(self):
+        draft = JpegImagePlugin.JpegImageFile.draft
+        with patch.object(JpegImagePlugin.JpegImageFile, "draft", autospec=True, side_effect=draft) as spy:
+            part = image_preprocessing.prepare_image(_image(4000, 1000))
+        # 1024x256 fits in 1/2 scale (2000x500) but not 1/4 (1000x250).
+        assert spy.call_args_list[0].args[1:] == ("RGB", (1024, 256))
+        out = Image.open(io.BytesIO(part["data"]))
+        assert out.format == "JPEG" and out.size == (1024, 256)
+
+    def test_png_and_cmyk_are_reencoded(self):
+        for data in (_image(640, 480, "PNG"), _image(640, 480, "JPEG", "CMYK")):
+            out = Image.open(io.BytesIO(image_preprocessing.prepare_image(data)["data"]))
+            assert out.format == "JPEG" and out.mode == "RGB" and out.size == (640, 480)
+
+    def test_oversized_bytes_are_reencoded(self, monkeypatch):
+        data = _image(800, 600)
+        monkeypatch.setattr(settings, "IMAGE_TARGET_MAX_BYTES", len(data) - 1)
+        assert image_preprocessing.needs_transform(data)
+
+    def test_only_transforms_go_to_the_pool(self, monkeypatch):
+        small, large = _image(800, 600), _image(3000, 2000)
+        pool = MagicMock()
+        pool.map.side_effect = lambda fn, items: [fn(item) for item in items]
+        monkeypatch.setattr(image_preprocessing, "get_pool", lambda: pool)
+
+        parts = image_preprocessing.prepare_images([small, large, small])
+
+        assert pool.map.call_args.args[1] == [large]
+        assert parts[0]["data"] == small and parts[2]["data"] == small
+        assert Image.open(io.BytesIO(parts[1]["data"])).size == (1024, 683)
@@ -0,0 +1,86 @@
+"""Tests for image URL canonicalization, fingerprinting and diverse selection."""
+import io
+import random
+from unittest.mock import patch
+
+from PIL import Image
+
+from app.services import image_selection
+from app.workers import tasks
+
+
+def _photo(seed: int, size=(800, 600)) -> bytes:
+    """A smooth random scene; the same seed at another size is the same photo."""
+    rng = random.Random(seed)
+    image = Image.frombytes("L", (16, 12), rng.randbytes(16 * 12)).resize(size, Image.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class TestCanonicalUrl:
+    """Resize variants of one image share a canonical URL."""
+
+    def test_platform_size_variants(self):
+        same = [
+            ("https://cf.bstatic.com/xdata/images/hotel/max1024x768/123.jpg?k=abc&o=",
+             "https://cf.bstatic.com/xdata/images/hotel/square60/123.jpg?k=def"),
+            ("https://a0.muscache.com/im/pictures/abc.jpg?im_w=720",
+             "https://a0.muscache.com/im/pictures/abc.jpg?im_w=1200#photo"),
+            ("https://img3.idealista.com/blur/WEB_LISTING/0/id.pro.es.image.master/4f/12.jpg",
+             "https://img3.idealista.com/blur/WEB_DETAIL-M-L/0/id.pro.es.image.master/4f/12.jpg"),
+            ("https://example.com/wp-content/uploads/flat-1024x768.jpg",
+             "https://example.com/wp-content/uploads/flat.jpg"),
+        ]
+        for a, b in same:
+            assert image_selection.canonical_url(a) == image_selection.canonical_url(b)
+
+    def test_other_parameters_are_kept(self):
+        a = image_selection.canonical_url("https://cdn.example.com/img?id=1&w=300")
+        b = image_selection.canonical_url("https://cdn.example.com/img?id=2&w=300")
+        assert a != b
+
+    def test_dedupe_keeps_first_url(self):
+        urls = ["https://x.com/a.jpg?w=100", "https://x.com/a.jpg?w=900", "https://x.com/b.jpg", ""]
+        assert image_selection.dedupe_urls(urls) == ["https://x.com/a.jpg?w=100", "https://x.com/b.jpg"]
+
+
+class TestFingerprints:
+    """dHash is stable across resizes and tells different photos apart."""
+
+    def test_resized_copy_is_a_near_duplicate(self):
+        original = image_selection.dhash(_photo(1, (1600, 1200)))
+        thumbnail = image_selection.dhash(_photo(1, (400, 300)))
+        other = image_selection.dhash(_photo(2))
+        assert image_selection.hamming(original, thumbnail) <= image_selection.DUPLICATE_DISTANCE
+        assert image_selection.hamming(original, other) > image_selection.DUPLICATE_DISTANCE
+
+
+class TestSelectImages:
+    """Near-duplicates are clustered and the most different photos are picked."""
+
+    def test_picks_one_per_cluster(self):
+        photos = {
+            "https://x.com/1.jpg": _photo(1),
+            "https://x.com/2.jpg": _photo(1, (640, 480)),
+            "https://x.com/3.jpg": _photo(2),
+            "https://x.com/4.jpg": _photo(3),
+        }
+        with patch.object(image_selection, "fingerprint", side_effect=lambda url: (image_selection.dhash(photos[url]), url)):
+            selection = image_selection.select_images(list(photos), 3)
+
+        assert selection["selected_urls"] == ["https://x.com/1.jpg", "https://x.com/3.jpg", "https://x.com/4.jpg"]
+        assert selection["stats"]["near_duplicates"] == 1
+        assert selection["content_hashes"]["https://x.com/3.jpg"] == "https://x.com/3.jpg"
+
+    def test_unfetchable_images_are_kept(self):
+        with patch.object(image_selection, "fingerprint", return_value=None):
+            selection = image_selection.select_images(["https://x.com/1.jpg", "https://x.com/2.jpg"], 5)
+        assert len(selection["selected_urls"]) == 2
+
+    def test_skip_rule_dedupes_candidates(self):
+        urls = [f"https://x.com/{i}.jpg?w={w}" for i in range(30) for w in (300, 1200)]
+        inputs, reason = tasks.SKIP_RULES["reverse_image_search"]({"image_urls": urls})
+        assert reason is None
+        assert len(inputs["image_urls"]) == tasks.MAX_IMAGE_CANDIDATES
+        assert all(url.endswith("w=300") for url in inputs["image_urls"])
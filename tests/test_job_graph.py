@@ -0,0 +1,64 @@
+"""Tests for atomic DAG enqueue and batched dependency reads."""
+import pickle
+from base64 import b64encode
+from unittest.mock import MagicMock
+
+import pytest
+from rq import Queue
+from rq.job import Job, JobStatus
+
+from app.workers.job_graph import JobGraph, fetch_dependency_results
+
+
+def _step(name):
+    return {"job_name": name, "status": "COMPLETED"}
+
+
+def _stored(value, type_=1):
+    payload = {b"type": str(type_).encode(), b"return_value": b64encode(pickle.dumps(value))}
+    return [(b"1700000000000-0", payload)]
+
+
+class TestJobGraph:
+    """Jobs are built locally and committed in one pipeline."""
+
+    def test_enqueue_uses_a_single_pipeline(self):
+        conn = MagicMock()
+        queue = Queue("analysis-fast", connection=conn)
+        graph = JobGraph(conn)
+        root = graph.add(queue, _step, "geocode")
+        child = graph.add(queue, _step, "reputation", depends_on=root)
+
+        assert root.get_status(refresh=False) == JobStatus.QUEUED
+        assert child.get_status(refresh=False) == JobStatus.DEFERRED
+
+        graph.enqueue()
+
+        conn.pipeline.assert_called_once()
+        pipe = conn.pipeline.return_value.__enter__.return_value
+        pipe.execute.assert_called_once()
+        pipe.sadd.assert_any_call(Job.dependents_key_for(root.id), child.id)
+        pipe.rpush.assert_called_once_with(queue.key, root.id)
+
+    def test_dependencies_must_come_from_the_graph(self):
+        conn = MagicMock()
+        queue = Queue("analysis-fast", connection=conn)
+        outside = queue.create_job(_step, args=("outside",))
+        with pytest.raises(ValueError):
+            JobGraph(conn).add(queue, _step, "x", depends_on=outside)
+
+
+class TestFetchDependencyResults:
+    """One pipelined read for every dependency's latest result."""
+
+    def test_results_in_dependency_order(self):
+        conn = MagicMock()
+        pipe = conn.pipeline.return_value
+        pipe.execute.return_value = [_stored(_step("a")), [], _stored(_step("c"), type_=2)]
+
+        job = Job.create(_step, args=("finalizer",), connection=conn)
+        job._dependency_ids = ["a", "b", "c"]
+
+        assert fetch_dependency_results(job) == [_step("a"), None, None]
+        assert pipe.xrevrange.call_count == 3
+        pipe.execute.assert_called_once()
@@ -0,0 +1,166 @@
+"""Tests for the template report written when a check's outcome is clear."""
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from benchmarks.report_parity import compare_reports, local_counterpart
+from app.workers import finalizer, local_report, tasks
+from app.workers.scoring import calculate_weighted_score, score_steps
+
+
+def _step(job_name, result, status="COMPLETED"):
+    return {"job_name": job_name, "description": job_name, "status": status, "inputs_used": {}, "result": result}
+
+
+def _clean_steps():
+    return [
+        _step("reverse_image_search", {"reverse_search_results": [{"is_reused": False}]}),
+        _step("url_forensics", {"domain_age": {"is_new": False}, "blacklist_check": {}, "archive_check": {"domain_age_days": 4000}}),
+        _step("iban_country_check", {"is_suspicious": False, "ibans_found": 1}),
+        _step("price_sanity_check", {"verdict": "Reasonable"}),
+        _step("communication_analysis", {"sentiment": "Positive", "themes": []}),
+        _step("listing_reviews_analysis", {"sentiment": "Positive", "negative_themes": []}),
+    ]
+
+
+def _scam_steps():
+    return [
+        _step("reverse_image_search", {"reverse_search_results": [{"is_reused": True}, {"is_reused": True}]}),
+        _step("iban_country_check", {"is_suspicious": True, "mismatches": [
+            {"iban_prefix": "LT121000...", "iban_country": "LT", "property_country": "ES"},
+        ]}),
+        _step("price_sanity_check", {"verdict": "Suspiciously Low"}),
+        _step("communication_analysis", {"sentiment": "Hostile", "themes": ["Risky Payment Request", "High-Pressure Tactics"]}),
+        _step("url_forensics", {"domain_age": {"is_new": True}, "blacklist_check": {}}),
+    ]
+
+
+def _score(steps):
+    return calculate_weighted_score(score_steps(steps, {step["job_name"] for step in steps}))
+
+
+class TestUnambiguousOutcome:
+    """Only clearly low or clearly high checks with enough evidence skip the LLM."""
+
+    def test_clean_check_is_low(self):
+        steps = _clean_steps()
+        assert local_report.unambiguous_outcome(steps, _score(steps)) == local_report.LOW
+
+    def test_scam_check_is_high(self):
+        steps = _scam_steps()
+        assert local_report.unambiguous_outcome(steps, _score(steps)) == local_report.HIGH
+
+    def test_failed_step_needs_the_llm(self):
+        steps = _clean_steps() + [_step("description_analysis", {"reason": "timeout"}, status="ERROR")]
+        assert local_report.unambiguous_outcome(steps, _score(steps)) is None
+
+    def test_too_little_evidence_needs_the_llm(self):
+        steps = _clean_steps()[:2] + [_step("host_profile_check", {}, status="SKIPPED")]
+        assert local_report.unambiguous_outcome(steps, _score(steps)) is None
+
+    def test_medium_signal_in_a_low_check_needs_the_llm(self):
+        steps = _clean_steps() + [_step("description_plagiarism_check", {"plagiarized": True, "found_urls": ["a"]})]
+        summary = _score(steps)
+        assert summary["calculated_risk_score"] <= 15
+        assert local_report.unambiguous_outcome(steps, summary) is None
+
+    def test_high_score_from_reused_content_alone_needs_the_llm(self):
+        steps = _clean_steps()
+        summary = {"calculated_risk_score": 80, "high_risk_signals": ["reverse_image_search"], "compound_rules_triggered": []}
+        assert local_report.unambiguous_outcome(steps, summary) is None
+
+
+class TestBuildLocalReport:
+    """Template reports have the synthesized report's fields, in Spanish."""
+
+    def test_low_report(self):
+        steps = _clean_steps()
+        summary = _score(steps)
+        report = local_report.build_local_report(steps, summary, local_report.LOW)
+
+        assert report["authenticity_score"] == 100 - summary["calculated_risk_score"]
+        assert report["quality_score"] == 75
+        assert {flag["category"] for flag in report["flags"]} == {"Positive"}
+        assert {"category": "Positive", "description": "El precio está en línea con el mercado de la zona."} in report["flags"]
+        assert len(report["suggested_actions"]) == 2
+        assert report["synthesized_by"] == "local"
+
+    def test_high_report(self):
+        steps = _scam_steps()
+        report = local_report.build_local_report(steps, _score(steps), local_report.HIGH)
+
+        assert {"category": "High", "description": "El IBAN facilitado es de LT, pero el inmueble está en ES."} in report["flags"]
+        assert {"category": "High", "description": "2 imágenes del anuncio aparecen publicadas en otros sitios web."} in report["flags"]
+        assert "### Combinaciones de señales" in report["explanation"]
+        assert report["sidebar_summary"].startswith("Se encontraron 5 señales graves de fraude. El IBAN")
+        assert 2 <= len(report["suggested_actions"]) <= 3
+        assert report["suggested_actions"][1].startswith("No envíes dinero")
+
+    def test_host_profile_findings_are_translated(self):
+        check = MagicMock(input_data={"host_profile": {"is_verified": False, "member_since": str(datetime.now().year)}})
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = check
+        with patch.object(tasks, "SessionLocal", return_value=db):
+            step = tasks.job_host_profile_check("00000000-0000-0000-0000-000000000001")
+        steps = _scam_steps() + [step]
+        report = local_report.build_local_report(steps, _score(steps), local_report.HIGH)
+
+        descriptions = [flag["description"] for flag in report["flags"]]
+        assert "El perfil del anfitrión no está verificado." in descriptions
+        assert "La cuenta del anfitrión es muy reciente." in descriptions
+        assert not any(theme in report["explanation"] for theme in step["result"]["themes"])
+
+
+class TestFinalizerDispatch:
+    """The finalizer only calls the synthesis LLM for ambiguous checks."""
+
+    def _run(self, steps, mode="deep"):
+        check = MagicMock(id="c1", mode=mode, input_data={}, analysis_steps=[])
+        db = MagicMock()
+        db.query.return_value.filter.return_value.first.return_value = check
+        with patch.object(finalizer, "SessionLocal", return_value=db), \
+             patch.object(finalizer.rq, "get_current_job"), \
+             patch.object(finalizer, "fetch_dependency_results", return_value=steps), \
+             patch.object(finalizer.precheck, "record_check"), \
+             patch.object(finalizer.gemini_analysis, "synthesize_advanced_report", return_value={"authenticity_score": 50}) as llm:
+            report = finalizer.job_aggregate_and_conclude("00000000-0000-0000-0000-000000000001")
+        return report, llm
+
+    def test_clear_check_skips_the_llm(self):
+        report, llm = self._run(_scam_steps())
+        assert report["synthesized_by"] == "local"
+        llm.assert_not_called()
+
+    def test_quick_check_uses_the_same_templates(self):
+        steps = [_step("host_profile_check", {"themes": ["Host profile is not verified."]})]
+        report, llm = self._run(steps, mode="quick")
+        assert {"category": "Medium", "description": "El perfil del anfitrión no está verificado."} in report["flags"]
+        assert report["sidebar_summary"].startswith("El análisis rápido")
+        llm.assert_not_called()
+
+    def test_ambiguous_check_uses_the_llm(self):
+        steps = _clean_steps() + [_step("description_analysis", {}, status="ERROR")]
+        report, llm = self._run(steps)
+        assert report == {"authenticity_score": 50}
+        llm.assert_called_once()
+
+    def test_ambiguous_standard_check_uses_the_fast_model(self):
+        steps = _clean_steps() + [_step("description_analysis", {}, status="ERROR")]
+        with patch.object(finalizer.gemini_analysis, "synthesize_simple_report", return_value={"authenticity_score": 60}) as fast:
+            report, llm = self._run(steps, mode="standard")
+        assert report == {"authenticity_score": 60}
+        fast.assert_called_once()
+        llm.assert_not_called()
+
+
+class TestReportParity:
+    """benchmarks/report_parity.py compares stored LLM reports with the local one."""
+
+    def test_compare_reports(self):
+        steps = _clean_steps()
+        outcome, local = local_counterpart(steps)
+        llm = {"authenticity_score": 85, "quality_score": 70, "flags": [{"category": "Positive", "description": "x"}]}
+
+        diff = compare_reports(local, llm)
+        assert outcome == local_report.LOW
+        assert diff["authenticity_delta"] == local["authenticity_score"] - 85
+        assert diff["same_band"] and diff["high_flags_agree"]
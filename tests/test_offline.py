@@ -0,0 +1,67 @@
+"""Tests for the offline batch analysis CLI."""
+import json
+from unittest.mock import MagicMock, patch
+
+from app.workers import offline, tasks
+
+
+class TestReadRecords:
+    """JSONL and CSV input."""
+
+    def test_jsonl_ids_default_to_line_numbers(self, tmp_path):
+        path = tmp_path / "listings.jsonl"
+        path.write_text('{"id": "x1", "address": "Calle Mayor 1"}\n\n{"address": "Gran Via 2"}\n', encoding="utf-8")
+        assert list(offline.read_records(path)) == [("x1", {"address": "Calle Mayor 1"}), ("3", {"address": "Gran Via 2"})]
+
+    def test_csv_decodes_json_cells_and_drops_blanks(self, tmp_path):
+        path = tmp_path / "listings.csv"
+        path.write_text('id,address,image_urls,host_email\nl1,Calle Mayor 1,"[""https://a/1.jpg""]",\n', encoding="utf-8")
+        assert list(offline.read_records(path)) == [("l1", {"address": "Calle Mayor 1", "image_urls": ["https://a/1.jpg"]})]
+
+
+class TestResume:
+    """Records with a final result are skipped; failures are retried."""
+
+    def test_completed_record_ids(self, tmp_path):
+        output = tmp_path / "results.jsonl"
+        rows = [{"record_id": "a", "status": "COMPLETED"}, {"record_id": "b", "status": "FAILED"}, {"record_id": "c", "status": "INVALID"}]
+        output.write_text("\n".join(json.dumps(r) for r in rows) + '\n{"record_id": "d", "sta', encoding="utf-8")
+        assert offline.completed_record_ids(output) == {"a", "c"}
+
+
+class TestLocalRun:
+    """Jobs use the offline cache instead of Redis."""
+
+    def test_run_cached_job_uses_the_disk_cache(self, tmp_path):
+        cache = offline.DiskCache(tmp_path / offline.CACHE_FILE)
+        task = MagicMock(return_value={"verdict": "Reasonable"})
+        token = tasks.local_run.set(offline.LocalRun(cache=cache))
+        try:
+            with patch.object(tasks, "get_redis_conn") as get_redis_conn:
+                first = tasks._run_cached_job("check-1", "price_sanity_check", {"price_details": "90 EUR"}, task)
+                second = tasks._run_cached_job("check-2", "price_sanity_check", {"price_details": "90 EUR"}, task)
+        finally:
+            tasks.local_run.reset(token)
+
+        assert first == second == {"verdict": "Reasonable"}
+        task.assert_called_once()
+        get_redis_conn.assert_not_called()
+
+    def test_layer_two_sees_geocode_result(self, tmp_path):
+        geocode_step = {"job_name": "geocode", "status": "COMPLETED", "result": {"country_code": "es"}}
+        seen = {}
+
+        def reputation(check_id):
+            seen["geocode"] = tasks._geocode_result()
+            return {"job_name": "reputation_check", "status": "COMPLETED", "result": {}}
+
+        input_data = {"address": "Calle Mayor 1", "host_email": "host@example.com"}
+        with patch.object(offline, "_cache", offline.DiskCache(tmp_path / offline.CACHE_FILE)), \
+             patch.object(tasks, "job_geocode", return_value=geocode_step), \
+             patch.object(tasks, "job_reputation_check", side_effect=reputation), \
+             patch.object(tasks, "job_address_cross_platform_search", return_value={"job_name": "address_cross_platform_search", "status": "SKIPPED", "result": {}}):
+            steps, scoring = offline._run_jobs("check-1", input_data)
+
+        assert seen["geocode"] == geocode_step
+        assert "geocode" not in {step["job_name"] for step in steps}
+        assert "calculated_risk_score" in scoring
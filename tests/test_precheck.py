@@ -0,0 +1,180 @@
+"""Tests for the precheck indicator store and POST /precheck."""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import redis
+
+from app.services import precheck
+from app.utils.iban import find_ibans, input_ibans
+from app.workers import tasks
+
+
+class _Pipeline:
+    """Just enough of a Redis pipeline over a dict of hashes and strings."""
+
+    def __init__(self, store):
+        self.store = store
+        self.replies = []
+
+    def hset(self, key, mapping):
+        self.store.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def expire(self, key, ttl):
+        pass
+
+    def hgetall(self, key):
+        self.replies.append({k.encode(): v.encode() for k, v in self.store.get(key, {}).items()})
+
+    def get(self, key):
+        value = self.store.get(key)
+        self.replies.append(value.encode() if isinstance(value, str) else None)
+
+    def execute(self):
+        replies, self.replies = self.replies, []
+        return replies
+
+
+def _connection(store=None):
+    conn = MagicMock()
+    store = {} if store is None else store
+    conn.pipeline.side_effect = lambda transaction=True: _Pipeline(store)
+    return conn
+
+
+INPUT = {
+    "listing_url": "https://www.example-rentals.com/flat/42?ref=ad",
+    "host_email": "Owner@Example.com",
+    "host_phone": "+34 600 111 222",
+    "communication_text": "Pague la fianza a ES91 2100 0418 4502 0005 1332 antes del viernes.",
+}
+STEPS = [
+    {"job_name": "url_forensics", "status": "COMPLETED", "result": {"domain_age": {"is_new": True, "reason": "Registrado hace 12 días."}}},
+    {"job_name": "reverse_image_search", "status": "COMPLETED", "result": {"reverse_search_results": [
+        {"url": "https://img.example.com/a.jpg", "is_reused": True, "reason": "Aparece en otro portal."},
+        {"url": "https://img.example.com/b.jpg", "is_reused": False},
+    ]}},
+]
+
+
+class TestNormalization:
+    """Values from the page and from check inputs compare equal."""
+
+    def test_contacts(self):
+        assert precheck.normalize_email(" Owner@Example.COM ") == "owner@example.com"
+        assert precheck.normalize_phone("+34 600-111-222") == precheck.normalize_phone("600111222")
+        assert precheck.normalize_iban("es91 2100 0418 4502 0005 1332") == "ES9121000418450200051332"
+        assert precheck.normalize_iban("not an iban") is None
+
+    def test_ibans(self):
+        text = "Pago a ES91-2100-0418-4502-0005-1332 o GB29NWBK60161331926819; no a ES00 1234 5678 9012 3456 7890."
+        assert find_ibans(text, "es91 2100 0418 4502 0005 1332 ANTES") == ["ES9121000418450200051332", "GB29NWBK60161331926819"]
+
+    def test_iban_check_and_indicators_see_the_same_ibans(self):
+        input_data = {"description": "Fianza por transferencia: GB29 NWBK 6016 1331 9268 19.", "iban": "ES91 2100 0418 4502 0005 1332"}
+        inputs, skip_reason = tasks.SKIP_RULES["iban_country_check"](input_data)
+
+        assert skip_reason is None
+        assert input_ibans(inputs) == ["ES9121000418450200051332", "GB29NWBK60161331926819"]
+        assert [value for kind, value in precheck._contact_indicators(input_data) if kind == "iban"] == input_ibans(inputs)
+
+    def test_urls(self):
+        assert precheck.normalize_url("https://www.Example.com/flat/42/?utm=x#top") == "example.com/flat/42"
+        assert precheck.normalize_domain("http://www.example.com/x") == "example.com"
+
+
+class TestPrecheck:
+    """Levels computed from what finished checks recorded."""
+
+    def test_resized_copy_of_a_reused_image_matches(self):
+        store = {}
+        steps = [{"job_name": "reverse_image_search", "status": "COMPLETED", "result": {"reverse_search_results": [
+            {"url": "https://cf.bstatic.com/xdata/images/hotel/max1024x768/123.jpg?k=abc", "is_reused": True},
+        ]}}]
+        precheck.record_check(_connection(store), "c1", INPUT, steps, 20)
+
+        result = precheck.precheck(_connection(store), image_urls=["https://cf.bstatic.com/xdata/images/hotel/square60/123.jpg?k=abc"])
+        assert {s["kind"] for s in result["signals"]} == {"reused_images"}
+
+    def test_reverse_image_cache_verdicts_count(self):
+        from app.services import reverse_image_cache
+        url = "https://img.example.com/c.jpg?w=800"
+        store = {reverse_image_cache.url_key(url): json.dumps({"verdict": {"is_reused": True}, "content_hash": None})}
+
+        result = precheck.precheck(_connection(store), image_urls=["https://img.example.com/c.jpg?w=200", url])
+        assert result["risk_level"] == precheck.MEDIUM
+        assert result["signals"][0]["detail"].startswith("1 imagen(es)")
+
+    def test_nothing_known_is_unknown(self):
+        result = precheck.precheck(_connection(), listing_url="https://new.example.org/1")
+        assert result["risk_level"] == precheck.UNKNOWN
+        assert result["deep_analysis_recommended"] is True
+
+    def test_high_risk_check_marks_its_contacts_bad(self):
+        store = {}
+        precheck.record_check(_connection(store), "c1", INPUT, STEPS, 85)
+
+        result = precheck.precheck(
+            _connection(store),
+            listing_url="https://other-site.net/listing/9",
+            host_phone="600 111 222",
+            ibans=["ES91 2100 0418 4502 0005 1332"],
+        )
+        assert result["risk_level"] == precheck.HIGH
+        assert {s["kind"] for s in result["signals"]} == {"known_bad_phone", "known_bad_iban"}
+        assert result["prior_report"] is None
+
+    def test_prior_report_answers_without_deep_analysis(self):
+        store = {}
+        precheck.record_check(_connection(store), "c1", INPUT, STEPS, 55)
+
+        result = precheck.precheck(
+            _connection(store),
+            listing_url="http://example-rentals.com/flat/42",
+            host_email="owner@example.com",
+            image_urls=["https://img.example.com/a.jpg", "https://img.example.com/b.jpg"],
+        )
+        # Below the high-risk bar the contacts are not marked bad.
+        assert result["risk_level"] == precheck.MEDIUM
+        assert result["prior_report"]["check_id"] == "c1" and result["prior_report"]["risk_score"] == 55
+        assert result["deep_analysis_recommended"] is False
+        assert {s["kind"] for s in result["signals"]} == {"new_domain", "reused_images"}
+
+    def test_feedback_marks_contacts_bad(self):
+        store = {}
+        precheck.record_feedback(_connection(store), "c1", INPUT)
+        result = precheck.precheck(_connection(store), host_email="OWNER@example.com")
+        assert result["risk_level"] == precheck.HIGH
+        assert result["signals"][0]["check_id"] == "c1"
+
+
+# ---------------------------------------------------------------------------
+# POST /api/v1/precheck
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+class TestPrecheckEndpoint:
+    """The endpoint never fails because Redis does."""
+
+    async def test_returns_level_and_timing(self, client):
+        store = {}
+        precheck.record_check(_connection(store), "c1", INPUT, STEPS, 90)
+        with patch("app.api.endpoints.get_redis_conn", return_value=_connection(store)):
+            response = await client.post("/api/v1/precheck", json={"host_email": "owner@example.com"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["risk_level"] == "high"
+        assert body["elapsed_ms"] >= 0
+
+    async def test_redis_down_is_unknown(self, client):
+        conn = MagicMock()
+        conn.pipeline.return_value.execute.side_effect = redis.exceptions.ConnectionError("down")
+        with patch("app.api.endpoints.get_redis_conn", return_value=conn):
+            response = await client.post("/api/v1/precheck", json={"listing_url": "https://example.com/1"})
+        assert response.status_code == 200
+        assert response.json()["risk_level"] == "unknown"
+        assert response.json()["deep_analysis_recommended"] is True
+
+    async def test_rejects_too_many_images(self, client):
+        response = await client.post("/api/v1/precheck", json={"image_urls": ["https://x.com/a.jpg"] * 21})
+        assert response.status_code == 422
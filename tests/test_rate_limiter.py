@@ -0,0 +1,106 @@
+"""Tests for Gemini retry/backoff around the shared rate limiter."""
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+from google.genai import errors
+
+from app.services import gemini_analysis
+from app.core.config import settings
+from app.services.rate_limiter import AdaptiveConcurrency, backoff_delay
+
+
+def _limiters():
+    requests_bucket, tokens_bucket, concurrency = MagicMock(), MagicMock(), MagicMock()
+    concurrency.slot.return_value = nullcontext()
+    return requests_bucket, tokens_bucket, concurrency
+
+
+def _throttled():
+    return errors.ClientError(429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}})
+
+
+class TestGeminiRetries:
+    """_call_gemini backs off on 429s and reports them to the AIMD limiter."""
+
+    def test_retries_after_throttle_then_succeeds(self):
+        limiters = _limiters()
+        client = MagicMock()
+        client.models.generate_content.side_effect = [_throttled(), MagicMock(text='{"ok": true}')]
+
+        with patch.object(gemini_analysis, "get_client", return_value=client), \
+             patch.object(gemini_analysis, "_get_limiters", return_value=limiters), \
+             patch.object(gemini_analysis.time, "sleep") as sleep:
+            result = gemini_analysis._call_gemini(gemini_analysis.FAST_MODEL, ["prompt"])
+
+        assert result == {"ok": True}
+        limiters[2].record_throttle.assert_called_once()
+        limiters[2].record_success.assert_called_once()
+        sleep.assert_called_once()
+
+    def test_gives_up_after_max_retries(self):
+        limiters = _limiters()
+        client = MagicMock()
+        client.models.generate_content.side_effect = _throttled()
+
+        with patch.object(gemini_analysis, "get_client", return_value=client), \
+             patch.object(gemini_analysis, "_get_limiters", return_value=limiters), \
+             patch.object(gemini_analysis.time, "sleep"), \
+             patch.object(gemini_analysis, "backoff_delay", return_value=0.0):
+            result = gemini_analysis._call_gemini(gemini_analysis.FAST_MODEL, ["prompt"])
+
+        assert "error" in result
+        assert client.models.generate_content.call_count == gemini_analysis.settings.GEMINI_MAX_RETRIES + 1
+
+    def test_does_not_retry_client_errors(self):
+        limiters = _limiters()
+        client = MagicMock()
+        client.models.generate_content.side_effect = errors.ClientError(400, {"error": {"code": 400, "message": "bad"}})
+
+        with patch.object(gemini_analysis, "get_client", return_value=client), \
+             patch.object(gemini_analysis, "_get_limiters", return_value=limiters):
+            result = gemini_analysis._call_gemini(gemini_analysis.FAST_MODEL, ["prompt"])
+
+        assert "error" in result
+        assert client.models.generate_content.call_count == 1
+        limiters[2].record_throttle.assert_not_called()
+
+    def test_backoff_is_bounded(self):
+        assert all(0 <= backoff_delay(attempt, base=1.0, cap=8.0) <= 8.0 for attempt in range(10))
+
+
+class _LeaseRedis:
+    """Runs the lease script over a set: a slot is free while fewer leases than the limit are held."""
+
+    def __init__(self):
+        self.leases = set()
+
+    def register_script(self, script):
+        def acquire(keys, args):
+            if len(self.leases) < int(float(args[2])):
+                self.leases.add(args[0])
+                return 1
+            return 0
+        return acquire
+
+    def zrem(self, key, lease_id):
+        self.leases.discard(lease_id)
+
+
+class TestAdaptiveConcurrency:
+    """The initial limit is clamped so at least one slot is granted."""
+
+    def test_initial_limit_is_clamped(self):
+        limiter = AdaptiveConcurrency(None, "x", initial=0, minimum=0, maximum=1, latency_target=1, lease_seconds=5)
+        assert (limiter.initial, limiter.minimum, limiter.maximum) == (1, 1, 1)
+        assert AdaptiveConcurrency(None, "x", initial=50, minimum=2, maximum=8, latency_target=1, lease_seconds=5).initial == 8
+
+    def test_single_slot_gemini_limiter_grants_a_slot(self, monkeypatch):
+        monkeypatch.setattr(settings, "GEMINI_MAX_CONCURRENCY", 1)
+        conn = _LeaseRedis()
+        monkeypatch.setattr(gemini_analysis, "_limiters", {})
+        with patch("app.workers.queues.get_redis_conn", return_value=conn):
+            concurrency = gemini_analysis._get_limiters(gemini_analysis.FAST_MODEL)[2]
+
+        with concurrency.slot(deadline=0):
+            assert len(conn.leases) == 1
+        assert not conn.leases
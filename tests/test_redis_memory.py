@@ -0,0 +1,86 @@
+"""Tests for Redis TTL policies, memory accounting and the cache sweeper."""
+import time
+from unittest.mock import MagicMock
+
+from app.core.config import settings
+from app.workers import redis_memory
+
+
+def _connection(sizes: dict, ttls: dict, index: dict | None = None):
+    """Connection whose SCAN returns `sizes`' keys and whose pipelines answer MEMORY USAGE / TTL."""
+    conn = MagicMock()
+    conn.scan_iter.side_effect = lambda match=None, count=None: [
+        key.encode() for key in sizes if match is None or key.startswith(match.rstrip("*"))
+    ]
+    conn.zrange.return_value = [(member.encode(), score) for member, score in (index or {}).items()]
+
+    pipes = []
+
+    def pipeline(transaction=True):
+        pipe = MagicMock()
+        queued = []
+        pipe.memory_usage.side_effect = lambda key: queued.append(sizes[key.decode()])
+        pipe.ttl.side_effect = lambda key: queued.append(ttls.get(key.decode(), -1))
+        pipe.execute.side_effect = lambda raise_on_error=True: list(queued)
+        pipes.append(pipe)
+        return pipe
+
+    conn.pipeline.side_effect = pipeline
+    conn.pipes = pipes
+    return conn
+
+
+class TestMemoryReport:
+    """Bytes and keys are aggregated per key family."""
+
+    def test_groups_by_prefix(self):
+        conn = _connection(
+            {"cache:a": 1000, "cache:b": 3000, "rq:job:1": 500, "rq:results:1": 200, "breaker:vision": 100},
+            {"cache:a": 60, "rq:job:1": 3600},
+        )
+        report = redis_memory.memory_report(conn)
+
+        assert report["total_bytes"] == 4800
+        assert list(report["families"])[0] == "cache:"
+        cache = report["families"]["cache:"]
+        assert cache["keys"] == 2 and cache["bytes"] == 4000 and cache["without_ttl"] == 1
+        assert report["families"]["rq:results:"]["bytes"] == 200
+        assert report["families"]["breaker:"]["policy"] == redis_memory.KEY_FAMILIES["breaker:"]
+
+
+class TestSweep:
+    """Legacy cache keys get a TTL; the cache is trimmed oldest-first."""
+
+    def test_applies_missing_ttls(self, monkeypatch):
+        monkeypatch.setattr(settings, "CACHE_MAX_BYTES", 10_000)
+        conn = _connection({"cache:a": 100, "cache:b": 100}, {"cache:a": 500})
+        stats = redis_memory.sweep(conn)
+
+        assert stats["ttl_applied"] == 1
+        assert stats["evicted"] == 0
+        conn.pipes[0].expire.assert_called_once_with("cache:b", settings.CACHE_TTL_SECONDS)
+
+    def test_evicts_oldest_until_under_budget(self, monkeypatch):
+        monkeypatch.setattr(settings, "CACHE_MAX_BYTES", 2500)
+        now = time.time()
+        conn = _connection(
+            {"cache:old": 1000, "cache:mid": 1000, "cache:new": 1000},
+            {"cache:old": 100, "cache:mid": 200, "cache:new": 300},
+            index={"cache:old": now - 300, "cache:mid": now - 200, "cache:new": now - 100},
+        )
+        stats = redis_memory.sweep(conn)
+
+        assert stats["evicted"] == 1 and stats["evicted_bytes"] == 1000
+        evict_pipe = conn.pipes[-1]
+        evict_pipe.delete.assert_called_once_with("cache:old")
+        evict_pipe.zrem.assert_called_once_with(redis_memory.CACHE_INDEX_KEY, "cache:old")
+
+
+class TestRecordCacheWrite:
+    """Cache writes are given a TTL and indexed in the same pipeline."""
+
+    def test_sets_ttl_and_index(self):
+        pipe = MagicMock()
+        redis_memory.record_cache_write(pipe, "cache:abc")
+        pipe.expire.assert_called_once_with("cache:abc", settings.CACHE_TTL_SECONDS)
+        assert "cache:abc" in pipe.zadd.call_args.args[1]
@@ -0,0 +1,102 @@
+"""Tests for the reverse image search verdict cache."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+import redis
+
+from app.services import reverse_image_cache
+
+
+class _Redis:
+    """Just enough of Redis over a dict: strings, one stats hash, pipelines."""
+
+    def __init__(self):
+        self.store = {}
+        self.counters = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value.encode()
+
+    def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def hincrby(self, key, field, amount):
+        self.counters[field] = self.counters.get(field, 0) + amount
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.counters.items()}
+
+    def pipeline(self, transaction=True):
+        pipe = MagicMock()
+        pipe.set.side_effect = self.set
+        return pipe
+
+
+REUSED = {"is_reused": True, "reason": "Image found on 2 external sites.", "suspicious_urls": ["https://other.com/x"]}
+
+
+@pytest.fixture
+def connection():
+    conn = _Redis()
+    with patch.object(reverse_image_cache, "_get_connection", return_value=conn):
+        yield conn
+
+
+def _search(verdict=REUSED):
+    return MagicMock(side_effect=lambda url: {**verdict, "url": url})
+
+
+class TestCachedSearch:
+    """When a verdict is reused and when Vision is called."""
+
+    def test_resized_copy_hits_the_url_key(self, connection):
+        search = _search()
+        reverse_image_cache.cached_search(search, "https://a0.muscache.com/im/pictures/abc.jpg?im_w=720")
+        result = reverse_image_cache.cached_search(search, "https://a0.muscache.com/im/pictures/abc.jpg?im_w=1200")
+
+        assert search.call_count == 1
+        assert result["is_reused"] and result["url"].endswith("im_w=1200")
+
+    def test_rehosted_copy_hits_the_content_key(self, connection):
+        search = _search()
+        reverse_image_cache.cached_search(search, "https://cdn-a.com/1.jpg", "abc123")
+        reverse_image_cache.cached_search(search, "https://cdn-b.com/other-name.jpg", "abc123")
+        reverse_image_cache.cached_search(search, "https://cdn-c.com/3.jpg", "def456")
+
+        assert [c.args[0] for c in search.call_args_list] == ["https://cdn-a.com/1.jpg", "https://cdn-c.com/3.jpg"]
+
+    def test_errors_are_not_cached(self, connection):
+        search = _search({"is_reused": False, "reason": "Error during reverse image search.", "error": "timeout"})
+        reverse_image_cache.cached_search(search, "https://x.com/1.jpg")
+        reverse_image_cache.cached_search(search, "https://x.com/1.jpg")
+        assert search.call_count == 2
+
+    def test_refresh_and_forget_search_again(self, connection):
+        search = _search()
+        reverse_image_cache.cached_search(search, "https://x.com/1.jpg", "abc123")
+        reverse_image_cache.cached_search(search, "https://x.com/1.jpg", "abc123", refresh=True)
+        assert reverse_image_cache.forget(connection, "https://x.com/1.jpg") == 2
+        reverse_image_cache.cached_search(search, "https://x.com/1.jpg", "abc123")
+        assert search.call_count == 3
+
+    def test_stats_count_saved_calls(self, connection):
+        search = _search()
+        for _ in range(3):
+            reverse_image_cache.cached_search(search, "https://x.com/1.jpg")
+        stats = reverse_image_cache.stats(connection)
+        assert stats == {"hits": 2, "misses": 1, "vision_calls_saved": 2, "hit_rate": 0.667}
+
+    def test_redis_down_searches_uncached(self):
+        conn = MagicMock()
+        conn.mget.side_effect = redis.exceptions.ConnectionError("down")
+        search = _search()
+        with patch.object(reverse_image_cache, "_get_connection", return_value=conn):
+            result = reverse_image_cache.cached_search(search, "https://x.com/1.jpg")
+        assert result["is_reused"] and search.call_count == 1
+        conn.hincrby.assert_not_called()
@@ -0,0 +1,197 @@
+"""Tests for the local Safe Browsing database, against a stand-in update server."""
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services import safe_browsing, url_analysis
+
+LISTED = "http://evil.example.com/login/pay.html?ref=1"
+LISTED_HASH = hashlib.sha256(b"evil.example.com/login/").digest()
+# Same 4-byte prefix as LISTED_HASH, different full hash.
+COLLIDING_HASH = LISTED_HASH[:4] + b"\x00" * 28
+
+
+class _Server:
+    """Answers threatListUpdates:fetch and fullHashes:find with what the test sets."""
+
+    def __init__(self):
+        self.updates = []   # one response body per threatListUpdates:fetch call
+        self.full_hashes = {"matches": []}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                method = self.path.split("?")[0].rsplit("/", 1)[-1]
+                server.requests.append((method, body))
+                reply = server.updates.pop(0) if method == "threatListUpdates:fetch" else server.full_hashes
+                data = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/v4"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def calls(self, method):
+        return [body for name, body in self.requests if name == method]
+
+
+def _list_update(prefixes, response_type="FULL_UPDATE", removals=None, state="s1", threat_type="MALWARE", checksum=None,
+                 prefix_size=4):
+    merged = sorted(prefixes)
+    return {
+        "threatType": threat_type,
+        "platformType": "ANY_PLATFORM",
+        "threatEntryType": "URL",
+        "responseType": response_type,
+        "additions": [{"compressionType": "RAW", "rawHashes": {"prefixSize": prefix_size, "rawHashes": base64.b64encode(b"".join(prefixes)).decode()}}],
+        "removals": [{"compressionType": "RAW", "rawIndices": {"indices": removals}}] if removals else [],
+        "newClientState": state,
+        "checksum": {"sha256": base64.b64encode(checksum or hashlib.sha256(b"".join(merged)).digest()).decode()},
+    }
+
+
+def _full_update(malware_prefixes):
+    return {"listUpdateResponses": [
+        _list_update(malware_prefixes),
+        _list_update([], threat_type="SOCIAL_ENGINEERING"),
+        _list_update([], threat_type="UNWANTED_SOFTWARE"),
+    ], "minimumWaitDuration": "0s"}
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    server = _Server()
+    monkeypatch.setattr(settings, "SAFE_BROWSING_API_URL", server.url)
+    monkeypatch.setattr(settings, "SAFE_BROWSING_DB_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "GOOGLE_SAFE_BROWSING_API_KEY", "test-key")
+    monkeypatch.setattr(safe_browsing, "_full_hashes", {})
+    yield server
+    server.httpd.shutdown()
+
+
+class TestUrlExpressions:
+    """Canonicalization and host/path expressions follow the Safe Browsing rules."""
+
+    def test_spec_example(self):
+        assert safe_browsing.url_expressions("http://a.b.c/1/2.html?param=1") == [
+            "a.b.c/1/2.html?param=1", "a.b.c/1/2.html", "a.b.c/", "a.b.c/1/",
+            "b.c/1/2.html?param=1", "b.c/1/2.html", "b.c/", "b.c/1/",
+        ]
+
+    def test_canonicalization(self):
+        assert safe_browsing.canonicalize("http://%31%36%38.%31%38%38.%39%39.%32%36/%2E%73%65%63%75%72%65/%77%77%77%2E%65%62%61%79%2E%63%6F%6D/") == \
+            ("168.188.99.26", "/.secure/www.ebay.com/", None)
+        assert safe_browsing.canonicalize("http://www.GOOgle.com./a/../b/./c#frag") == ("www.google.com", "/b/c", None)
+        assert safe_browsing.canonicalize("http://3279880203/blah") == ("195.127.0.11", "/blah", None)
+        assert safe_browsing.canonicalize("http://host.com/%25%32%35") == ("host.com", "/%25", None)
+
+
+class TestUpdates:
+    """Full and partial updates, checksums and client states."""
+
+    def test_partial_update_applies_removals_then_additions(self, server):
+        a, b, c = b"\x01\x00\x00\x00", b"\x02\x00\x00\x00", b"\x03\x00\x00\x00"
+        server.updates.append(_full_update([c, a]))
+        server.updates.append({"listUpdateResponses": [_list_update(
+            [b], "PARTIAL_UPDATE", removals=[0], state="s2", checksum=hashlib.sha256(b + c).digest(),
+        )]})
+
+        assert safe_browsing.update()["MALWARE_ANY_PLATFORM_URL"] == 2
+        counts = safe_browsing.update()
+
+        assert counts["MALWARE_ANY_PLATFORM_URL"] == 2
+        assert server.calls("threatListUpdates:fetch")[1]["listUpdateRequests"][0]["state"] == "s1"
+        database = safe_browsing.get_database()
+        assert database.matching_prefixes([b + b"x", c + b"x", a + b"x"]) == {b, c}
+
+    def test_checksum_mismatch_resets_the_list(self, server):
+        server.updates.append(_full_update([b"\x01\x00\x00\x00"]))
+        server.updates.append({"listUpdateResponses": [
+            _list_update([b"\x02\x00\x00\x00"], "PARTIAL_UPDATE", state="s2", checksum=b"\x00" * 32),
+        ]})
+        safe_browsing.update()
+        safe_browsing.update()
+
+        assert not safe_browsing.get_database().ready()
+        server.updates.append(_full_update([]))
+        safe_browsing.update()
+        assert server.calls("threatListUpdates:fetch")[2]["listUpdateRequests"][0]["state"] == ""
+
+    def test_partial_update_after_cut_prefixes(self, server):
+        # The server's checksums cover the 32-byte prefix; the local list only has its first 4 bytes.
+        server.updates.append({"listUpdateResponses": [
+            _list_update([LISTED_HASH], prefix_size=32),
+            _list_update([], threat_type="SOCIAL_ENGINEERING"),
+            _list_update([], threat_type="UNWANTED_SOFTWARE"),
+        ], "minimumWaitDuration": "0s"})
+        other = b"\x01\x00\x00\x00"
+        server.updates.append({"listUpdateResponses": [_list_update(
+            [other], "PARTIAL_UPDATE", state="s2", checksum=hashlib.sha256(b"".join(sorted([other, LISTED_HASH]))).digest(),
+        )]})
+        safe_browsing.update()
+        counts = safe_browsing.update()
+
+        assert counts["MALWARE_ANY_PLATFORM_URL"] == 2
+        assert safe_browsing.get_database().ready()
+        manifest = safe_browsing._read_manifest(safe_browsing.Path(settings.SAFE_BROWSING_DB_DIR))
+        assert manifest["lists"]["MALWARE_ANY_PLATFORM_URL"]["state"] == "s2"
+
+        server.updates.append(_full_update([other]))
+        safe_browsing.update()
+        manifest = safe_browsing._read_manifest(safe_browsing.Path(settings.SAFE_BROWSING_DB_DIR))
+        assert manifest["lists"]["MALWARE_ANY_PLATFORM_URL"]["truncated"] is False
+
+
+class TestLookups:
+    """Prefix misses never leave the process; prefix hits are confirmed by full hash."""
+
+    def test_clean_url_needs_no_request(self, server):
+        server.updates.append(_full_update([LISTED_HASH[:4]]))
+        safe_browsing.update()
+
+        assert url_analysis.check_url_blacklist("https://www.idealista.com/inmueble/1/")["is_blacklisted"] is False
+        assert server.calls("fullHashes:find") == []
+
+    def test_listed_url_is_confirmed_by_full_hash(self, server):
+        server.updates.append(_full_update([LISTED_HASH[:4]]))
+        safe_browsing.update()
+        server.full_hashes = {"matches": [{
+            "threatType": "SOCIAL_ENGINEERING", "platformType": "ANY_PLATFORM", "threatEntryType": "URL",
+            "threat": {"hash": base64.b64encode(LISTED_HASH).decode()}, "cacheDuration": "300s",
+        }], "negativeCacheDuration": "300s"}
+
+        assert url_analysis.check_url_blacklist(LISTED)["is_blacklisted"] is True
+        assert safe_browsing.lookup(LISTED) == ["SOCIAL_ENGINEERING"]
+        assert len(server.calls("fullHashes:find")) == 1
+
+    def test_prefix_collision_is_not_a_match(self, server):
+        server.updates.append(_full_update([LISTED_HASH[:4]]))
+        safe_browsing.update()
+        server.full_hashes = {"matches": [{
+            "threatType": "MALWARE", "platformType": "ANY_PLATFORM", "threatEntryType": "URL",
+            "threat": {"hash": base64.b64encode(COLLIDING_HASH).decode()}, "cacheDuration": "300s",
+        }], "negativeCacheDuration": "300s"}
+
+        assert safe_browsing.lookup(LISTED) == []
+        assert safe_browsing.lookup(LISTED) == []
+        assert len(server.calls("fullHashes:find")) == 1
+
+    def test_remote_lookup_until_the_database_is_ready(self, server):
+        server.full_hashes = {"matches": []}
+        result = url_analysis.check_url_blacklist(LISTED)
+        assert result["is_blacklisted"] is False
+        assert [name for name, _ in server.requests] == ["threatMatches:find"]
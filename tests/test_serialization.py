@@ -0,0 +1,60 @@
+"""Tests for the compact RQ/cache serializer."""
+import json
+import pickle
+import uuid
+
+from app.core.config import settings
+from app.workers import serialization
+from app.workers.serialization import CompactSerializer, decode, encode
+
+
+STEP = {
+    "job_name": "communication_analysis",
+    "status": "COMPLETED",
+    "inputs_used": {"communication_text": "Please pay the deposit by bank transfer. " * 100},
+    "result": {"sentiment": "Negative", "themes": ["Risky Payment Request"], "score": 0.75},
+}
+
+
+class TestEncode:
+    """Codec choice, compression and round-trips."""
+
+    def test_step_dict_uses_json_and_compresses(self):
+        blob = encode(STEP)
+        assert blob.startswith(serialization.MAGIC + serialization.CODEC_JSON + serialization.COMPRESSED)
+        assert len(blob) < len(json.dumps(STEP)) / 4
+        assert decode(blob) == STEP
+
+    def test_small_values_are_not_compressed(self):
+        blob = encode({"ok": True})
+        assert blob[len(serialization.MAGIC) + 1:serialization.HEADER_SIZE] == serialization.UNCOMPRESSED
+        assert decode(blob) == {"ok": True}
+
+    def test_non_json_values_keep_their_types(self):
+        job_data = ("app.workers.tasks.job_geocode", None, (uuid.UUID(int=7),), {})
+        blob = encode(job_data)
+        assert blob[len(serialization.MAGIC):len(serialization.MAGIC) + 1] == serialization.CODEC_PICKLE
+        assert decode(blob) == job_data
+
+    def test_nan_is_not_turned_into_null(self):
+        value = {"score": float("nan")}
+        assert decode(encode(value))["score"] != decode(encode(value))["score"]
+
+
+class TestLegacyDecoding:
+    """Values written before the compact format are still readable."""
+
+    def test_rq_pickle(self):
+        assert CompactSerializer.loads(pickle.dumps(STEP)) == STEP
+
+    def test_cache_json(self):
+        assert serialization.loads_cache_entry(json.dumps(STEP).encode()) == STEP
+
+
+class TestCompactSerializationSetting:
+    """With the setting off, the old formats are written."""
+
+    def test_writes_legacy_formats(self, monkeypatch):
+        monkeypatch.setattr(settings, "COMPACT_SERIALIZATION", False)
+        assert pickle.loads(CompactSerializer.dumps(STEP)) == STEP
+        assert json.loads(serialization.dumps_cache_entry(STEP)) == STEP
@@ -0,0 +1,61 @@
+"""Tests for plan-time skip rules in the orchestrator."""
+from unittest.mock import MagicMock
+
+from rq import Queue
+
+from app.workers import tasks
+from app.workers.orchestrator import build_analysis_graph
+
+
+FULL_INPUT = {
+    "listing_url": "https://www.example-rentals.com/listing/123",
+    "description": "Bright two-bedroom flat close to the beach. " * 5,
+    "communication_text": "Please pay the deposit by bank transfer to ES91 2100 0418 4502 0005 1332 today.",
+    "reviews": ["Great stay."],
+    "image_urls": ["https://images.example.com/1.jpg"],
+    "price_details": "90 EUR/night",
+    "property_type": "apartment",
+    "address": "Carrer de Mallorca 1, Barcelona",
+    "host_profile": {"is_verified": True},
+    "host_email": "host@example.com",
+}
+
+
+def _graph_func_names(graph):
+    return [job.func_name.rsplit(".", 1)[-1] for _, job in graph.entries]
+
+
+class TestPlanSkips:
+    """Skip rules evaluated against the input snapshot."""
+
+    def test_nothing_skipped_with_full_input(self):
+        assert tasks.plan_skips(FULL_INPUT) == {}
+
+    def test_empty_input_skips_every_rule(self):
+        planned = tasks.plan_skips({})
+        assert set(planned) == set(tasks.SKIP_RULES)
+        step = planned["communication_analysis"]
+        assert step["status"] == "SKIPPED"
+        assert step["description"] == tasks.JOB_DESCRIPTIONS["communication_analysis"]
+        assert step["result"]["reason"]
+
+    def test_iban_rule_looks_for_an_iban(self):
+        planned = tasks.plan_skips({**FULL_INPUT, "communication_text": "Hello, is the flat still available for July?"})
+        assert planned["iban_country_check"]["result"]["reason"] == "No IBAN found in provided data."
+
+
+class TestBuildAnalysisGraph:
+    """Skipped jobs are left out of the DAG and of the finalizer's dependencies."""
+
+    def test_skipped_jobs_are_not_enqueued(self):
+        conn = MagicMock()
+        fast, heavy = Queue("analysis-fast", connection=conn), Queue("analysis-heavy", connection=conn)
+        graph = build_analysis_graph("check-1", fast, heavy, skipped=frozenset({"communication_analysis", "iban_country_check"}))
+
+        names = _graph_func_names(graph)
+        assert "job_communication_analysis" not in names
+        assert "job_iban_country_check" not in names
+        assert "job_geocode" in names
+
+        finalizer_job = graph.entries[-1][1]
+        assert len(finalizer_job._dependency_ids) == 10
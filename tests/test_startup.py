@@ -0,0 +1,15 @@
+"""Cold-start budget for the API process."""
+from benchmarks.import_profile import LAZY_MODULES, load_startup_budget, profile_import
+
+
+class TestApiImport:
+    """Importing app.main must stay cheap: no heavy SDKs, no network."""
+
+    def test_heavy_sdks_are_not_imported(self):
+        result = profile_import("app.main", importtime=False)
+        assert result["loaded_lazy_modules"] == [], f"expected lazy: {LAZY_MODULES}"
+
+    def test_import_within_budget(self):
+        budget = load_startup_budget()
+        result = profile_import("app.main", importtime=False)
+        assert result["seconds"] < budget["max_import_seconds"]
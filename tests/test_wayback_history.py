@@ -0,0 +1,97 @@
+"""Tests for Wayback CDX history lookups and their cache."""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services import url_analysis
+from app.workers.scoring import calculate_job_risk_score
+
+
+class _Redis:
+    """mget/set over a dict, remembering each key's TTL."""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.store[key], self.ttls[key] = value, ex
+
+    def pipeline(self, transaction=True):
+        pipe = MagicMock()
+        pipe.set.side_effect = self.set
+        return pipe
+
+
+def _cdx_response(timestamps):
+    rows = [["timestamp"]] + [[ts] for ts in timestamps]
+    response = MagicMock(text=json.dumps(rows) if timestamps else "")
+    response.json.return_value = rows
+    return response
+
+
+HISTORIES = {
+    "example.com/flat/42": ["20190302101010", "20200115000000", "20240901121212"],
+    "example.com/": ["20120704000000", "20240930000000"],
+    "example.com/flat/43": [],
+}
+
+
+@pytest.fixture
+def cdx():
+    conn = _Redis()
+
+    def get(url, params, timeout):
+        return _cdx_response(HISTORIES[params["url"]])
+
+    with patch.object(url_analysis, "_wayback_connection", return_value=conn), \
+         patch.object(url_analysis.wayback_breaker, "allow", return_value=True), \
+         patch.object(url_analysis.requests, "get", side_effect=get) as requests_get:
+        yield requests_get, conn
+
+
+class TestArchiveHistory:
+    """First and last capture from one CDX query per URL, cached by URL and domain."""
+
+    def test_first_and_last_seen(self, cdx):
+        result = url_analysis.check_archive_history("https://www.example.com/flat/42?utm_source=ad")
+
+        assert result["has_history"] is True
+        assert (result["first_seen"], result["last_seen"], result["months_captured"]) == ("2019-03-02", "2024-09-01", 3)
+        assert (result["domain_first_seen"], result["domain_months_captured"]) == ("2012-07-04", 2)
+        assert result["domain_age_days"] > 4000
+
+    def test_url_variants_and_domain_are_cached(self, cdx):
+        requests_get, conn = cdx
+        url_analysis.check_archive_history("https://www.example.com/flat/42")
+        url_analysis.check_archive_history("http://example.com/flat/42/?ref=1")
+        result = url_analysis.check_archive_history("https://example.com/flat/43")
+
+        queried = sorted(c.kwargs["params"]["url"] for c in requests_get.call_args_list)
+        assert queried == ["example.com/", "example.com/flat/42", "example.com/flat/43"]
+        assert result["has_history"] is False and result["domain_first_seen"] == "2012-07-04"
+        # Empty histories are kept for less time.
+        assert sorted(conn.ttls.values()) == [86400, 7 * 86400, 7 * 86400]
+
+    def test_failures_are_not_cached(self, cdx):
+        requests_get, conn = cdx
+        requests_get.side_effect = OSError("reset")
+        result = url_analysis.check_archive_history("https://example.com/flat/42")
+        assert result["has_history"] is False and "reset" in result["reason"]
+        assert conn.store == {}
+
+
+class TestArchiveScoring:
+    """A domain the Wayback Machine first saw recently is a signal even when WHOIS isn't."""
+
+    def test_recently_archived_domain(self):
+        result = {"domain_age": {"is_new": False}, "blacklist_check": {}, "archive_check": {"domain_age_days": 20}}
+        assert calculate_job_risk_score("url_forensics", result, "COMPLETED") == {"risk_score": 40, "confidence": 0.6}
+
+    def test_unknown_archive_age_is_ignored(self):
+        result = {"domain_age": {"is_new": False}, "blacklist_check": {}, "archive_check": {"domain_age_days": None}}
+        assert calculate_job_risk_score("url_forensics", result, "COMPLETED")["risk_score"] == 0
@@ -0,0 +1,190 @@
+"""Tests for the threaded and fair-scheduling RQ workers, on fakeredis."""
+import threading
+import time
+
+import pytest
+from rq.job import JobStatus
+from rq.queue import Queue
+
+from app.workers.fair_queue import FairQueue, LANES_KEY, get_lane_queue
+from app.workers.worker_classes import FairThreadedWorker, ThreadedWorker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+# Shared with the jobs: the worker runs them on threads of this process.
+release = threading.Event()
+running: list[str] = []
+ran: list[str] = []
+peak = {"running": 0}
+lock = threading.Lock()
+
+
+def hold(name):
+    """Runs until `release` is set."""
+    with lock:
+        running.append(name)
+        peak["running"] = max(peak["running"], len(running))
+    try:
+        release.wait(timeout=10)
+    finally:
+        with lock:
+            running.remove(name)
+    ran.append(name)
+    return name
+
+
+def record(name):
+    ran.append(name)
+    return name
+
+
+def sleep_loop(seconds):
+    """Sleeps in short steps so the timeout exception reaches the thread."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def conn():
+    release.clear()
+    running.clear()
+    ran.clear()
+    peak["running"] = 0
+    yield fakeredis.FakeStrictRedis()
+    release.set()
+
+
+def _release_when(condition, snapshot: dict, queues=()):
+    """
+    Releases the held jobs shortly after `condition()` holds, saving what was
+    running then and how many jobs were still waiting in `queues`.
+    """
+    def watch():
+        deadline = time.monotonic() + 10
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.2)
+        with lock:
+            snapshot["running"] = sorted(running)
+        snapshot["queued"] = sum(queue.count for queue in queues)
+        release.set()
+    thread = threading.Thread(target=watch, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestThreadedWorker:
+    """Concurrency cap, per-queue limits, burst exit and timeouts."""
+
+    def test_concurrency_cap(self, conn):
+        queues = [Queue("analysis-fast", connection=conn), Queue("analysis-heavy", connection=conn)]
+        jobs = [queue.enqueue(hold, f"{queue.name}{i}") for queue in queues for i in range(2)]
+        worker = ThreadedWorker(queues, connection=conn, concurrency=2, queue_limits={})
+        snapshot = {}
+        _release_when(lambda: len(running) == 2, snapshot, queues)
+
+        worker.work(burst=True)
+
+        assert len(snapshot["running"]) == 2 and snapshot["queued"] == 2
+        assert peak["running"] == 2
+        assert all(job.get_status() == JobStatus.FINISHED for job in jobs)
+
+    def test_concurrency_is_capped_to_the_db_pool(self, conn, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 2)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 1)
+        worker = ThreadedWorker(["analysis-fast"], connection=conn, concurrency=10, queue_limits={})
+        assert worker.concurrency == 3
+
+    def test_per_queue_limit(self, conn):
+        heavy = Queue("analysis-heavy", connection=conn)
+        fast = Queue("analysis-fast", connection=conn)
+        for i in range(3):
+            heavy.enqueue(hold, f"heavy{i}")
+        fast.enqueue(hold, "fast0")
+        worker = ThreadedWorker([heavy, fast], connection=conn, concurrency=3, queue_limits={"analysis-heavy": 1})
+        snapshot = {}
+        _release_when(lambda: len(running) == 2 and "fast0" in running, snapshot)
+
+        worker.work(burst=True)
+
+        assert snapshot["running"] == ["fast0", "heavy0"]
+        assert peak["running"] == 2
+        assert sorted(ran) == ["fast0", "heavy0", "heavy1", "heavy2"]
+
+    def test_burst_waits_for_dependents_of_running_jobs(self, conn):
+        queue = Queue("analysis-fast", connection=conn)
+        parent = queue.enqueue(hold, "parent")
+        child = queue.enqueue(record, "child", depends_on=parent)
+        worker = ThreadedWorker([queue], connection=conn, concurrency=2, queue_limits={})
+        _release_when(lambda: running == ["parent"], {})
+
+        worker.work(burst=True)
+
+        assert ran == ["parent", "child"]
+        assert child.get_status() == JobStatus.FINISHED
+
+    def test_job_timeout(self, conn):
+        queue = Queue("analysis-fast", connection=conn)
+        slow = queue.enqueue(sleep_loop, 5, job_timeout=1)
+        quick = queue.enqueue(record, "quick")
+        worker = ThreadedWorker([queue], connection=conn, concurrency=2, queue_limits={})
+
+        started = time.monotonic()
+        worker.work(burst=True)
+
+        assert time.monotonic() - started < 4
+        assert slow.get_status() == JobStatus.FAILED
+        assert "JobTimeoutException" in slow.latest_result().exc_string
+        assert quick.get_status() == JobStatus.FINISHED
+
+
+class TestFairThreadedWorker:
+    """Priority lane first, session lanes round-robin, idle lanes forgotten."""
+
+    def _worker(self, conn, **kwargs):
+        return FairThreadedWorker(["analysis-fast"], connection=conn, concurrency=1, queue_limits={}, **kwargs)
+
+    def test_round_robin_lane_order(self, conn):
+        busy = get_lane_queue("analysis-fast", "busy-session", conn)
+        other = get_lane_queue("analysis-fast", "other-session", conn)
+        for i in range(3):
+            busy.enqueue(record, f"busy{i}")
+        other.enqueue(record, "other0")
+        get_lane_queue("analysis-fast", "busy-session", conn, priority=True).enqueue(record, "extension")
+
+        self._worker(conn).work(burst=True)
+
+        assert ran[0] == "extension"
+        assert ran.index("other0") < ran.index("busy1")
+        assert [name for name in ran if name.startswith("busy")] == ["busy0", "busy1", "busy2"]
+
+    def test_per_queue_limit_counts_every_lane(self, conn):
+        for session in ("a", "b", "c"):
+            get_lane_queue("analysis-fast", session, conn).enqueue(hold, session)
+        worker = FairThreadedWorker(
+            ["analysis-fast"], connection=conn, concurrency=3, queue_limits={"analysis-fast": 2}
+        )
+        snapshot = {}
+        _release_when(lambda: len(running) == 2, snapshot)
+
+        worker.work(burst=True)
+
+        assert len(snapshot["running"]) == 2 and peak["running"] == 2
+        assert sorted(ran) == ["a", "b", "c"]
+
+    def test_idle_lanes_are_cleaned_up(self, conn):
+        done = get_lane_queue("analysis-fast", "done-session", conn)
+        done.enqueue(record, "done", result_ttl=0)
+        worker = self._worker(conn)
+        worker.work(burst=True)
+        waiting = get_lane_queue("analysis-fast", "waiting-session", conn)
+        waiting.enqueue(record, "waiting")
+
+        assert conn.smembers(LANES_KEY.format(base="analysis-fast")) == {waiting.name.encode()}
+        worker.clean_registries()
+
+        names = {queue.name for queue in FairQueue.all(connection=conn)}
+        assert done.name not in names
+        assert waiting.name in names